@@ -29,6 +29,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'estoque.middleware.ReplicaLeituraMiddleware',
+    'estoque.auditoria.AuditoriaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -53,15 +55,68 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'almoxarifado.wsgi.application'
 
+# Conexões persistentes (segundos) com verificação de saúde antes de reutilizar
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Réplica de leitura para relatórios e APIs (estoque.routers). Sem
+    # DJANGO_DB_REPLICA, localmente aponta para o mesmo arquivo do primário.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_REPLICA', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Modo de alta concorrência do SQLite (estoque/sqlite.py): pragmas aplicados a
+# cada conexão e BEGIN IMMEDIATE no registro de movimentações
+SQLITE_ALTA_CONCORRENCIA = os.environ.get('DJANGO_SQLITE_ALTA_CONCORRENCIA') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -64 * 1024,  # negativo = KiB
+    'temp_store': 'MEMORY',
+}
+
+DATABASE_ROUTERS = ['estoque.routers.ReplicaLeituraRouter']
+DATABASE_ALIAS_LEITURA = 'replica'
+# Segundos em que as leituras de um usuário ficam no primário após uma escrita
+REPLICA_ATRASO_MAXIMO = 5
+# Segundos até tentar de novo uma réplica que falhou
+REPLICA_INTERVALO_VERIFICACAO = 30
+
 AUTH_PASSWORD_VALIDATORS = []
 
+# Usuário e permissões de cada requisição lidos do cache (estoque/autenticacao.py)
+AUTHENTICATION_BACKENDS = ['estoque.autenticacao.BackendPermissoesEmCache']
+# Alias em CACHES do usuário e das permissões em cache
+PERMISSOES_CACHE = 'default'
+# Validade (s) do usuário e das permissões em cache com um cache compartilhado
+PERMISSOES_CACHE_TTL = 300
+# Validade (s) com cache em memória do processo (LocMemCache): limite de
+# defasagem entre processos após desativar um usuário ou revogar uma permissão
+PERMISSOES_CACHE_TTL_LOCAL = 5
+
+# Armazenamento das sessões: 'banco' (uma consulta por requisição), 'cache_banco'
+# (cache com o banco como reserva) ou 'cookie' (assinado, sem armazenamento)
+MODOS_SESSAO = {
+    'banco': 'django.contrib.sessions.backends.db',
+    'cache_banco': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSAO_MODO = os.environ.get('DJANGO_SESSAO_MODO', 'banco')
+SESSION_ENGINE = MODOS_SESSAO[SESSAO_MODO]
+
 LANGUAGE_CODE = 'pt-br'
 TIME_ZONE = 'America/Cuiaba'
 USE_I18N = True
@@ -69,8 +124,51 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# Bibliotecas de front-end sem cópia em static/vendor/ vêm da CDN (estoque/ativos.py);
+# sem esta opção, a falta da cópia é um erro
+ATIVOS_CDN = DEBUG
+# Destino do collectstatic (produção)
+STATIC_ROOT = os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles')
+# Entrega STATIC_ROOT pelo próprio Django com cache longo (estoque/estaticos.py)
+SERVIR_ESTATICOS = False
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Tempo (s) que o HTML de cada linha das listagens fica em cache
+CACHE_LINHAS_TIMEOUT = 60 * 60
+
+# Máximo de contagens aceitas por requisição na API de inventário físico
+INVENTARIO_LOTE_MAXIMO = 5000
+
+# Sincronização: após quantos segundos um número da sequência sem registro
+# visível é dado como de transação desfeita (e não segura mais os lotes)
+SINCRONIZACAO_ESPERA_LACUNA = 60
+
+# Índice em memória código -> item da leitura de códigos de barras (por processo)
+INDICE_CODIGOS_TAMANHO = 50000
+# Validade (s) de cada entrada: limite de defasagem entre processos
+INDICE_CODIGOS_TTL = 30
+
+# Cache da busca de itens da listagem (estoque/busca.py), por processo: termos
+# guardados, validade (s) e maior resultado guardado (e refinado em memória)
+BUSCA_CACHE_TAMANHO = 256
+BUSCA_CACHE_TTL = 30
+BUSCA_CACHE_REFINAR_MAXIMO = 2000
+
+# Processos dos relatórios por faixas de itens (estoque/particoes.py); None = núcleos da máquina
+RELATORIOS_TRABALHADORES = int(os.environ.get('DJANGO_RELATORIOS_TRABALHADORES', 0)) or None
+
+# Trilha de auditoria (estoque/auditoria.py): gravada em lote por uma thread a
+# cada AUDITORIA_LOTE registros ou AUDITORIA_INTERVALO segundos
+AUDITORIA_ASSINCRONA = True
+AUDITORIA_LOTE = 500
+AUDITORIA_INTERVALO = 2.0
+
+# Código do almoxarifado usado quando a movimentação não informa o local
+ALMOXARIFADO_PADRAO = 'CENTRAL'
+
+# Segmentos do razão de movimentações arquivado (manage.py archive_movimentacoes)
+ARQUIVO_MOVIMENTACOES_DIR = os.environ.get('DJANGO_ARQUIVO_MOVIMENTACOES', BASE_DIR / 'arquivo_movimentacoes')
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -0,0 +1,66 @@
+"""
+Configurações de produção.
+
+Uso:
+    DJANGO_SETTINGS_MODULE=almoxarifado.settings_producao
+    gunicorn -c gunicorn.conf.py  (já usa este módulo)
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import MODOS_SESSAO, SECRET_KEY, TEMPLATES
+
+DEBUG = False
+# Bibliotecas de front-end só da cópia local (estoque/ativos.py, check estoque.E001)
+ATIVOS_CDN = os.environ.get('DJANGO_ATIVOS_CDN') == '1'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+ALLOWED_HOSTS = [h for h in os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost').split(',') if h]
+
+# Cache em memória do processo, com espaço para as linhas das listagens
+# (o padrão do Django guarda só 300 chaves)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'almoxarifado',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 50000))},
+    },
+}
+
+# Sessões e permissões decidem o acesso: com vários workers, o cache delas
+# precisa ser compartilhado para que logout, desativação de usuário e
+# revogação de permissão valham em todos na hora. Com DJANGO_REDIS_URL
+# (requer o pacote redis), ficam no Redis; sem ele, as sessões vêm do banco
+# e as permissões do cache do processo, com validade curta
+# (PERMISSOES_CACHE_TTL_LOCAL, ver estoque/autenticacao.py).
+REDIS_URL = os.environ.get('DJANGO_REDIS_URL')
+if REDIS_URL:
+    CACHES['compartilhado'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'almoxarifado',
+    }
+    PERMISSOES_CACHE = 'compartilhado'
+    SESSION_CACHE_ALIAS = 'compartilhado'
+SESSAO_MODO = os.environ.get('DJANGO_SESSAO_MODO', 'cache_banco' if REDIS_URL else 'banco')
+SESSION_ENGINE = MODOS_SESSAO[SESSAO_MODO]
+
+SQLITE_ALTA_CONCORRENCIA = os.environ.get('DJANGO_SQLITE_ALTA_CONCORRENCIA', '1') == '1'
+
+# Templates compilados uma única vez por processo (loader com cache explícito)
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# Estáticos com hash no nome e versões .gz/.br geradas pelo collectstatic
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'estoque.estaticos.ArmazenamentoComprimido'},
+}
+# Desligue quando o nginx servir STATIC_ROOT diretamente (ver README2.md)
+SERVIR_ESTATICOS = os.environ.get('DJANGO_SERVIR_ESTATICOS', '1') == '1'
@@ -0,0 +1,45 @@
+"""
+Configurações da suíte de testes.
+
+Uso (o manage.py já escolhe este módulo para ``test``):
+    python manage.py test estoque
+    python manage.py test estoque --parallel auto
+
+Hash de senha rápido, banco SQLite em memória e tabelas criadas direto dos
+models, sem rodar as migrações. Para validar as migrações também:
+    DJANGO_TESTES_COM_MIGRACOES=1 python manage.py test estoque
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# PBKDF2 com centenas de milhares de iterações domina create_user/login
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Banco de testes em memória (a réplica é espelho do primário, TEST.MIRROR)
+DATABASES = copy.deepcopy(DATABASES)
+DATABASES['default']['TEST'] = {'NAME': ':memory:'}
+
+SQLITE_ALTA_CONCORRENCIA = False
+
+# Os testes não dependem das bibliotecas de front-end vendorizadas
+ATIVOS_CDN = True
+
+# Sem a thread de gravação: os testes gravam a fila com auditoria.descarregar()
+AUDITORIA_ASSINCRONA = False
+
+
+class _SemMigracoes:
+    """MIGRATION_MODULES que responde None para todos os apps."""
+
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return None
+
+
+if os.environ.get('DJANGO_TESTES_COM_MIGRACOES') != '1':
+    MIGRATION_MODULES = _SemMigracoes()
@@ -1,16 +1,164 @@
 from django.contrib import admin
-from .models import Fornecedor, Item, Movimentacao
+from .models import (
+    Fornecedor, Item, Movimentacao, Inventario, Almoxarifado, SaldoEstoque, RegistroAuditoria, PedidoCompra,
+    ItemPedidoCompra, Lote,
+)
+
+
+class ListagemEnxutaMixin:
+    """
+    Carrega na listagem do admin só as colunas de ``list_only`` (inclusive
+    das FKs de ``list_select_related``); as telas de edição continuam
+    carregando o objeto inteiro.
+    """
+    list_only = ()
+
+    def get_changelist(self, request, **kwargs):
+        changelist = super().get_changelist(request, **kwargs)
+        campos = self.list_only
+        if not campos:
+            return changelist
+
+        class ListagemEnxuta(changelist):
+            def get_queryset(self, request, *args, **kwargs):
+                return super().get_queryset(request, *args, **kwargs).only(*campos)
+
+        return ListagemEnxuta
+
+
+class SemExclusaoEmMassaMixin:
+    """
+    Remove a ação "excluir selecionados": ela exclui pelo QuerySet, sem o
+    delete() do modelo que mantém o ResumoEstoque e as exclusões da
+    sincronização.
+    """
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
 
 @admin.register(Fornecedor)
-class FornecedorAdmin(admin.ModelAdmin):
+class FornecedorAdmin(SemExclusaoEmMassaMixin, ListagemEnxutaMixin, admin.ModelAdmin):
     list_display = ('nome', 'cnpj', 'contato')
+    list_only = list_display
+    search_fields = ('nome', 'cnpj')
+    show_full_result_count = False
+
+@admin.register(Almoxarifado)
+class AlmoxarifadoAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nome', 'ativo')
+    search_fields = ('codigo', 'nome')
+
+class SaldoEstoqueInline(admin.TabularInline):
+    # Saldos mudam só por movimentações, transferências e inventários
+    model = SaldoEstoque
+    fields = ('almoxarifado', 'quantidade', 'status_estoque')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('almoxarifado')
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(SemExclusaoEmMassaMixin, ListagemEnxutaMixin, admin.ModelAdmin):
     list_display = ('codigo', 'descricao', 'quantidade_atual', 'estoque_minimo', 'estoque_maximo')
+    list_only = list_display
     search_fields = ('codigo', 'descricao')
+    autocomplete_fields = ('fornecedor',)
+    show_full_result_count = False
+    inlines = (SaldoEstoqueInline,)
 
 @admin.register(Movimentacao)
-class MovimentacaoAdmin(admin.ModelAdmin):
-    list_display = ('item', 'tipo', 'quantidade', 'data', 'usuario')
-    list_filter = ('tipo',)
+class MovimentacaoAdmin(ListagemEnxutaMixin, admin.ModelAdmin):
+    list_display = ('item', 'almoxarifado', 'tipo', 'quantidade', 'data', 'usuario')
+    list_filter = ('tipo', 'almoxarifado')
+    list_select_related = ('item', 'almoxarifado', 'usuario')
+    list_only = (
+        'tipo', 'quantidade', 'data', 'item__codigo', 'item__descricao',
+        'almoxarifado__nome', 'usuario__username',
+    )
+    # Hierarquia e ordenação pelo índice mov_data_idx; sem o COUNT da tabela inteira
+    date_hierarchy = 'data'
+    ordering = ('-data',)
+    show_full_result_count = False
+    autocomplete_fields = ('item', 'almoxarifado')
+    raw_id_fields = ('usuario', 'inventario', 'transferencia', 'pedido')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Movimentações gravadas não mudam de efeito (Movimentacao.CAMPOS_EFEITO)
+        if obj is None:
+            return self.readonly_fields
+        return (*self.readonly_fields, *(campo.removesuffix('_id') for campo in Movimentacao.CAMPOS_EFEITO))
+
+    def has_delete_permission(self, request, obj=None):
+        # Correções são movimentações inversas (ver Movimentacao.delete)
+        return False
+
+@admin.register(Lote)
+class LoteAdmin(ListagemEnxutaMixin, admin.ModelAdmin):
+    # Lotes mudam só por movimentações (ver Lote)
+    list_display = ('item', 'numero', 'validade', 'almoxarifado', 'quantidade')
+    list_filter = ('almoxarifado',)
+    list_select_related = ('item', 'almoxarifado')
+    list_only = ('numero', 'validade', 'quantidade', 'item__codigo', 'item__descricao', 'almoxarifado__nome')
+    search_fields = ('numero', 'item__codigo')
+    date_hierarchy = 'validade'
+    ordering = ('validade',)
+    show_full_result_count = False
+    readonly_fields = ('item', 'almoxarifado', 'numero', 'validade', 'quantidade', 'criado_em')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(Inventario)
+class InventarioAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'almoxarifado', 'status', 'criado_em', 'aplicado_em')
+    list_filter = ('status', 'almoxarifado')
+    list_select_related = ('almoxarifado',)
+    show_full_result_count = False
+    raw_id_fields = ('criado_por', 'aplicado_por')
+
+class ItemPedidoCompraInline(admin.TabularInline):
+    model = ItemPedidoCompra
+    fields = ('item', 'quantidade', 'custo_unitario')
+    raw_id_fields = ('item',)
+    extra = 0
+
+@admin.register(PedidoCompra)
+class PedidoCompraAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'fornecedor', 'almoxarifado', 'status', 'criado_em', 'recebido_em')
+    list_filter = ('status', 'almoxarifado')
+    list_select_related = ('fornecedor', 'almoxarifado')
+    show_full_result_count = False
+    autocomplete_fields = ('fornecedor',)
+    raw_id_fields = ('criado_por', 'recebido_por')
+    # O recebimento passa por PedidoCompra.receber() (tela do pedido)
+    readonly_fields = ('status', 'recebido_em', 'recebido_por')
+    inlines = (ItemPedidoCompraInline,)
+
+@admin.register(RegistroAuditoria)
+class RegistroAuditoriaAdmin(ListagemEnxutaMixin, admin.ModelAdmin):
+    # Somente leitura: os registros vêm de estoque/auditoria.py
+    list_display = ('data', 'modelo', 'objeto_id', 'acao', 'usuario')
+    list_filter = ('modelo', 'acao')
+    list_select_related = ('usuario',)
+    list_only = ('data', 'modelo', 'objeto_id', 'acao', 'usuario__username')
+    date_hierarchy = 'data'
+    ordering = ('-data',)
+    show_full_result_count = False
+    readonly_fields = ('modelo', 'objeto_id', 'acao', 'alteracoes', 'usuario', 'data')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
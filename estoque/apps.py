@@ -5,9 +5,51 @@ class EstoqueConfig(AppConfig):
     name = 'estoque'
 
     def ready(self):
+        from django.core import checks
+        from . import ativos
+        checks.register(ativos.verificar_copias, checks.Tags.staticfiles)
+
+        from django.db.backends.signals import connection_created
+        from .sqlite import aplicar_pragmas
+        connection_created.connect(aplicar_pragmas, dispatch_uid='estoque_sqlite_pragmas')
+
+        from django.db.models.signals import post_delete, post_save
+        from .codigos import item_alterado
+        post_save.connect(item_alterado, sender='estoque.Item', dispatch_uid='estoque_indice_codigos_save')
+        post_delete.connect(item_alterado, sender='estoque.Item', dispatch_uid='estoque_indice_codigos_delete')
+
+        from . import busca
+        post_save.connect(busca.item_alterado, sender='estoque.Item', dispatch_uid='estoque_busca_save')
+        post_delete.connect(busca.item_alterado, sender='estoque.Item', dispatch_uid='estoque_busca_delete')
+
+        from django.db.models.signals import pre_save
+        from . import auditoria
+        for modelo in ('Item', 'Fornecedor', 'Movimentacao'):
+            sender = f'estoque.{modelo}'
+            pre_save.connect(auditoria.preparar, sender=sender, dispatch_uid=f'estoque_auditoria_pre_{modelo}')
+            post_save.connect(auditoria.registrar_save, sender=sender, dispatch_uid=f'estoque_auditoria_{modelo}')
+        # Movimentações não são excluídas (Movimentacao.delete); as do item saem com ele
+        for modelo in ('Item', 'Fornecedor'):
+            post_delete.connect(
+                auditoria.registrar_exclusao, sender=f'estoque.{modelo}', dispatch_uid=f'estoque_auditoria_exclusao_{modelo}',
+            )
+
+        from django.contrib.auth.models import Group, Permission, User
+        from django.db.models.signals import m2m_changed
+        from . import autenticacao
+        post_save.connect(autenticacao.usuario_alterado, sender=User, dispatch_uid='estoque_auth_usuario_save')
+        post_delete.connect(autenticacao.usuario_alterado, sender=User, dispatch_uid='estoque_auth_usuario_delete')
+        for sender in (Group, Permission):
+            nome = sender._meta.model_name
+            post_save.connect(autenticacao.permissoes_alteradas, sender=sender, dispatch_uid=f'estoque_auth_{nome}_save')
+            post_delete.connect(autenticacao.permissoes_alteradas, sender=sender, dispatch_uid=f'estoque_auth_{nome}_delete')
+        for sender in (User.groups.through, User.user_permissions.through, Group.permissions.through):
+            m2m_changed.connect(
+                autenticacao.permissoes_alteradas, sender=sender, dispatch_uid=f'estoque_auth_m2m_{sender._meta.model_name}',
+            )
+
         # Try to create groups if possible (safe to fail during migrations)
         try:
-            from django.contrib.auth.models import Group
             Group.objects.get_or_create(name='Gestor')
             Group.objects.get_or_create(name='Colaborador')
         except Exception:
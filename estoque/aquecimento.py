@@ -0,0 +1,177 @@
+"""
+Aquecimento do processo antes de atender requisições.
+
+Sem ele, as primeiras requisições de cada processo pagam a compilação das
+expressões regulares das rotas, a leitura e compilação dos templates, a
+abertura da conexão com o banco (pragmas do SQLite) e os caches em memória
+vazios. ``aquecer()`` faz esse trabalho de uma vez:
+
+* rotas: popula o resolver e compila o padrão de cada rota;
+* templates: compila todos os templates no loader com cache;
+* ativos: resolve a URL de cada biblioteca de front-end (``ativos.local``);
+* alertas: lê os itens em alerta pelo índice de status, como a API de
+  alertas, trazendo as páginas do índice para o cache do SQLite/SO;
+* busca: guarda a listagem sem termo e os ``termos`` informados (``busca.py``);
+* códigos: carrega o índice de leitura de códigos (``codigos.py``).
+
+Com o servidor carregando a aplicação antes de criar os workers
+(``gunicorn.conf.py``, ``preload_app``), as ``ETAPAS_COMPARTILHADAS`` rodam
+uma vez no processo mestre e os workers as herdam pelo fork; as conexões
+com o banco devem ser fechadas antes do fork (``when_ready``). As
+``ETAPAS_DO_PROCESSO`` preenchem caches com validade curta e invalidados só
+no processo que grava: herdados do mestre, chegariam vencidos (ou perto
+disso) aos workers criados depois, como os reiniciados por
+``max_requests``. Por isso cada worker as executa ao nascer (``post_fork``).
+"""
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import URLResolver, get_resolver
+
+# Códigos carregados por SELECT no aquecimento do índice de códigos
+TAMANHO_LOTE_CODIGOS = 1000
+
+
+def _rotas(padroes):
+    total = 0
+    for padrao in padroes:
+        # Compila e guarda a expressão regular (LocaleRegexDescriptor)
+        padrao.pattern.regex
+        if isinstance(padrao, URLResolver):
+            total += _rotas(padrao.url_patterns)
+        else:
+            total += 1
+    return total
+
+
+def aquecer_rotas():
+    """
+    Returns:
+        int: Rotas compiladas
+    """
+    resolver = get_resolver()
+    # Monta reverse_dict/namespace_dict (reverse) e compila os padrões (resolve)
+    resolver.reverse_dict
+    return _rotas(resolver.url_patterns)
+
+
+def _nomes_templates(engine):
+    pastas = [Path(pasta) for pasta in engine.dirs]
+    if engine.app_dirs:
+        pastas += [Path(pasta) for pasta in get_app_template_dirs('templates')]
+    nomes = set()
+    for pasta in pastas:
+        nomes.update(caminho.relative_to(pasta).as_posix() for caminho in pasta.rglob('*.html'))
+    return sorted(nomes)
+
+
+def aquecer_templates():
+    """
+    Compila os templates (.html) das pastas do engine Django. Templates que
+    não compilam fora do contexto de uso (ex.: tags de apps não instaladas)
+    são ignorados.
+
+    Returns:
+        tuple: (compilados, ignorados)
+    """
+    compilados = ignorados = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for nome in _nomes_templates(engine):
+            try:
+                engine.get_template(nome)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                ignorados += 1
+            else:
+                compilados += 1
+    return compilados, ignorados
+
+
+def aquecer_ativos():
+    from . import ativos
+
+    for nome in ativos.ATIVOS:
+        ativos.url(nome)
+    return len(ativos.ATIVOS)
+
+
+def aquecer_alertas():
+    """
+    Returns:
+        int: Itens em alerta
+    """
+    from .models import EstoqueManager, Item
+    from .views import STATUS_ALERTA
+
+    itens = Item.objects.filter(status_estoque__in=STATUS_ALERTA).only(
+        *EstoqueManager.colunas_item(EstoqueManager.CAMPOS_ALERTA),
+    )
+    return sum(1 for item in itens.iterator())
+
+
+def aquecer_busca(termos=()):
+    """
+    Returns:
+        int: Termos em cache
+    """
+    from . import busca
+    from .models import normalizar_busca
+
+    for termo in ('', *termos):
+        busca.buscar(normalizar_busca(termo))
+    return busca.estatisticas()['termos']
+
+
+def aquecer_codigos():
+    """
+    Returns:
+        int: Códigos carregados (até ``settings.INDICE_CODIGOS_TAMANHO``)
+    """
+    from . import codigos
+    from .models import Item
+
+    limite = getattr(settings, 'INDICE_CODIGOS_TAMANHO', 50000)
+    lista = list(Item.objects.order_by('pk').values_list('codigo', flat=True)[:limite])
+    for inicio in range(0, len(lista), TAMANHO_LOTE_CODIGOS):
+        codigos.buscar(lista[inicio:inicio + TAMANHO_LOTE_CODIGOS])
+    return len(lista)
+
+
+# Herdáveis pelo fork: não expiram nem dependem de invalidação
+ETAPAS_COMPARTILHADAS = ('rotas', 'templates', 'ativos', 'alertas')
+# Caches em memória com validade (busca.py, codigos.py): um por processo
+ETAPAS_DO_PROCESSO = ('busca', 'codigos')
+ETAPAS = ETAPAS_COMPARTILHADAS + ETAPAS_DO_PROCESSO
+
+
+def aquecer(termos=(), etapas=ETAPAS):
+    """
+    Executa as etapas pedidas, na ordem de ``ETAPAS``.
+
+    Args:
+        termos (iterable): Termos de busca a guardar além da listagem sem termo
+        etapas (iterable): Nomes das etapas (padrão: todas)
+
+    Returns:
+        list: Tuplas (etapa, resultado, segundos)
+    """
+    funcoes = {
+        'rotas': aquecer_rotas,
+        'templates': aquecer_templates,
+        'ativos': aquecer_ativos,
+        'alertas': aquecer_alertas,
+        'busca': lambda: aquecer_busca(termos),
+        'codigos': aquecer_codigos,
+    }
+    resultado = []
+    for nome in ETAPAS:
+        if nome not in etapas:
+            continue
+        inicio = time.perf_counter()
+        valor = funcoes[nome]()
+        resultado.append((nome, valor, time.perf_counter() - inicio))
+    return resultado
@@ -0,0 +1,313 @@
+"""
+Arquivamento do razão de movimentações em segmentos colunares.
+
+``manage.py archive_movimentacoes --before AAAA-MM`` move os meses fechados da
+tabela ``Movimentacao`` para arquivos em ``settings.ARQUIVO_MOVIMENTACOES_DIR``,
+um por mês. Cada coluna é um vetor de inteiros de largura fixa (módulo
+``array``); a leitura usa ``mmap``, sem copiar o arquivo para a memória.
+
+O registro de cada segmento (``SegmentoMovimentacao``) guarda os totais do
+mês. Assim, as consultas históricas somam os totais dos meses inteiros e só
+percorrem as linhas do mês coberto parcialmente pelo intervalo.
+
+Formato do arquivo::
+
+    b'ESTQSEG1' | uint32 tamanho do cabeçalho | cabeçalho JSON | colunas
+
+Cada coluna começa em um deslocamento múltiplo de 8 (informado no cabeçalho)
+e tem ``largura`` valores por linha (1, exceto ``hash_razao``: 32 bytes).
+Valores nulos são gravados como 0 (chaves e datas) ou ``NULO`` (custo). Os
+números de lote vão em um dicionário no cabeçalho (``lotes``, índice 0 =
+sem lote) e a coluna guarda o índice. ``Segmento.registros`` devolve as
+linhas com os mesmos valores da tabela.
+"""
+import array
+import bisect
+import json
+import mmap
+import struct
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+
+MAGICO = b'ESTQSEG1'
+NULO = -2 ** 63
+# Custos com 4 casas decimais gravados como inteiros (exatos)
+ESCALA_CUSTO = 10 ** 4
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+COLUNAS = (
+    ('id', 'q'),
+    ('item_id', 'q'),
+    ('almoxarifado_id', 'q'),
+    ('tipo', 'B'),
+    ('quantidade', 'q'),
+    ('data', 'q'),  # microssegundos desde 1970-01-01 UTC
+    ('custo_unitario', 'q'),
+    ('usuario_id', 'q'),
+    ('data_devolucao_prevista', 'q'),  # date.toordinal()
+    ('inventario_id', 'q'),
+    ('transferencia_id', 'q'),
+    ('pedido_id', 'q'),
+    ('lote_numero', 'I'),  # índice em ``lotes`` do cabeçalho
+    ('validade', 'q'),  # date.toordinal()
+    ('sequencia', 'q'),
+    ('saldo_razao', 'q'),
+    ('hash_razao', 'B'),  # SHA-256 em bytes (zeros = sem hash)
+)
+CAMPOS = tuple(nome for nome, _ in COLUNAS)
+# Valores por linha das colunas de largura maior que 1
+LARGURAS = {'hash_razao': 32}
+
+
+def diretorio():
+    return Path(settings.ARQUIVO_MOVIMENTACOES_DIR)
+
+
+def para_micros(data):
+    return (data - EPOCA) // timedelta(microseconds=1)
+
+
+def de_micros(micros):
+    return EPOCA + timedelta(microseconds=micros)
+
+
+def _alinhar(tamanho):
+    return (tamanho + 7) // 8 * 8
+
+
+def escrever_segmento(caminho, linhas, tipos):
+    """
+    Grava um segmento a partir de linhas no formato de ``CAMPOS``.
+
+    Args:
+        caminho (Path): Arquivo de destino
+        linhas (iterable): tuplas com os valores de ``CAMPOS`` (ordenadas por data)
+        tipos (list): códigos de ``Movimentacao.tipo``; a coluna ``tipo`` guarda o índice
+
+    Returns:
+        int: Linhas gravadas
+    """
+    indice_tipo = {tipo: i for i, tipo in enumerate(tipos)}
+    lotes = {'': 0}
+    total = 0
+    vetores = {nome: array.array(formato) for nome, formato in COLUNAS}
+    for linha in linhas:
+        valores = dict(zip(CAMPOS, linha))
+        custo = valores['custo_unitario']
+        devolucao = valores['data_devolucao_prevista']
+        validade = valores['validade']
+        vetores['id'].append(valores['id'])
+        vetores['item_id'].append(valores['item_id'])
+        vetores['almoxarifado_id'].append(valores['almoxarifado_id'] or 0)
+        vetores['tipo'].append(indice_tipo[valores['tipo']])
+        vetores['quantidade'].append(valores['quantidade'])
+        vetores['data'].append(para_micros(valores['data']))
+        vetores['custo_unitario'].append(NULO if custo is None else int(custo * ESCALA_CUSTO))
+        vetores['usuario_id'].append(valores['usuario_id'] or 0)
+        vetores['data_devolucao_prevista'].append(devolucao.toordinal() if devolucao else 0)
+        vetores['inventario_id'].append(valores['inventario_id'] or 0)
+        vetores['transferencia_id'].append(valores['transferencia_id'] or 0)
+        vetores['pedido_id'].append(valores['pedido_id'] or 0)
+        vetores['lote_numero'].append(lotes.setdefault(valores['lote_numero'] or '', len(lotes)))
+        vetores['validade'].append(validade.toordinal() if validade else 0)
+        vetores['sequencia'].append(valores['sequencia'])
+        vetores['saldo_razao'].append(valores['saldo_razao'])
+        vetores['hash_razao'].frombytes(bytes.fromhex(valores['hash_razao']) if valores['hash_razao'] else bytes(32))
+        total += 1
+
+    colunas = []
+    deslocamento = 0
+    for nome, formato in COLUNAS:
+        colunas.append({
+            'nome': nome, 'formato': formato, 'largura': LARGURAS.get(nome, 1), 'deslocamento': deslocamento,
+        })
+        deslocamento = _alinhar(deslocamento + len(vetores[nome]) * vetores[nome].itemsize)
+    cabecalho = json.dumps({
+        'linhas': total, 'tipos': list(tipos), 'lotes': list(lotes), 'colunas': colunas,
+    }).encode()
+    inicio_dados = _alinhar(len(MAGICO) + 4 + len(cabecalho))
+
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(MAGICO + struct.pack('<I', len(cabecalho)) + cabecalho)
+        for coluna in colunas:
+            arquivo.seek(inicio_dados + coluna['deslocamento'])
+            arquivo.write(vetores[coluna['nome']].tobytes())
+        arquivo.truncate(inicio_dados + deslocamento)
+    return total
+
+
+class Segmento:
+    """
+    Segmento aberto com ``mmap``. As colunas são ``memoryview`` tipados,
+    indexáveis e fatiáveis sem cópia. Use como context manager.
+    """
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'rb')
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mapa[:len(MAGICO)] != MAGICO:
+            self.close()
+            raise ValueError(f'{caminho} não é um segmento de movimentações.')
+        tamanho = struct.unpack_from('<I', self._mapa, len(MAGICO))[0]
+        inicio = len(MAGICO) + 4
+        cabecalho = json.loads(self._mapa[inicio:inicio + tamanho])
+        inicio_dados = _alinhar(inicio + tamanho)
+
+        self.linhas = cabecalho['linhas']
+        self.tipos = cabecalho['tipos']
+        self.lotes = cabecalho.get('lotes', [''])
+        self._visoes = []
+        self.colunas = {}
+        base = memoryview(self._mapa)
+        self._visoes.append(base)
+        for coluna in cabecalho['colunas']:
+            tamanho_item = array.array(coluna['formato']).itemsize
+            comeco = inicio_dados + coluna['deslocamento']
+            tamanho_coluna = self.linhas * coluna.get('largura', 1) * tamanho_item
+            visao = base[comeco:comeco + tamanho_coluna].cast(coluna['formato'])
+            self._visoes.append(visao)
+            self.colunas[coluna['nome']] = visao
+
+    def intervalo(self, desde=None, ate=None):
+        """Índices [inicio, fim) das linhas com ``desde <= data <= ate`` (busca binária na coluna ``data``)."""
+        datas = self.colunas['data']
+        inicio = bisect.bisect_left(datas, para_micros(desde)) if desde is not None else 0
+        fim = bisect.bisect_right(datas, para_micros(ate)) if ate is not None else self.linhas
+        return inicio, fim
+
+    def registros(self, inicio=0, fim=None):
+        """
+        Linhas ``[inicio, fim)`` com os valores de ``CAMPOS`` como na tabela
+        (nulos, datas, custo e hash decodificados). Segmentos gravados antes
+        das colunas de lote, pedido e razão trazem None nelas.
+
+        Yields:
+            tuple: valores na ordem de ``CAMPOS``
+        """
+        fim = self.linhas if fim is None else fim
+        colunas = self.colunas
+        for i in range(inicio, fim):
+            valores = {nome: colunas[nome][i] for nome in CAMPOS if nome in colunas and nome not in LARGURAS}
+            custo = valores['custo_unitario']
+            valores.update(
+                almoxarifado_id=valores['almoxarifado_id'] or None,
+                tipo=self.tipos[valores['tipo']],
+                data=de_micros(valores['data']),
+                custo_unitario=None if custo == NULO else Decimal(custo).scaleb(-4),
+                usuario_id=valores['usuario_id'] or None,
+                data_devolucao_prevista=(
+                    date.fromordinal(valores['data_devolucao_prevista']) if valores['data_devolucao_prevista'] else None
+                ),
+                inventario_id=valores['inventario_id'] or None,
+                transferencia_id=valores['transferencia_id'] or None,
+            )
+            if 'hash_razao' in colunas:
+                largura = LARGURAS['hash_razao']
+                hash_razao = bytes(colunas['hash_razao'][i * largura:(i + 1) * largura])
+                valores.update(
+                    pedido_id=valores['pedido_id'] or None,
+                    lote_numero=self.lotes[valores['lote_numero']],
+                    validade=date.fromordinal(valores['validade']) if valores['validade'] else None,
+                    hash_razao=hash_razao.hex() if any(hash_razao) else '',
+                )
+            yield tuple(valores.get(nome) for nome in CAMPOS)
+
+    def valor(self, tipos_positivos, tipos_negativos=(), desde=None, ate=None):
+        """
+        Soma ``quantidade * custo_unitario`` das linhas no intervalo, com sinal
+        conforme o tipo.
+
+        Returns:
+            Decimal: valor com 4 casas decimais
+        """
+        sinais = [
+            1 if tipo in tipos_positivos else -1 if tipo in tipos_negativos else 0
+            for tipo in self.tipos
+        ]
+        inicio, fim = self.intervalo(desde, ate)
+        tipo = self.colunas['tipo'][inicio:fim]
+        quantidade = self.colunas['quantidade'][inicio:fim]
+        custo = self.colunas['custo_unitario'][inicio:fim]
+        total = 0
+        for i in range(fim - inicio):
+            sinal = sinais[tipo[i]]
+            if sinal and custo[i] != NULO:
+                total += sinal * quantidade[i] * custo[i]
+        return Decimal(total) / ESCALA_CUSTO
+
+    def valores_por_grupo(self, grupo_por_item, tipos_positivos, tipos_negativos, tipos_compras):
+        """
+        Percorre o segmento somando valor líquido e compras por grupo de itens.
+
+        Args:
+            grupo_por_item (dict): {item_id: grupo} (ex.: fornecedor_id)
+            tipos_positivos, tipos_negativos: tipos que somam / subtraem no líquido
+            tipos_compras: tipos somados em compras
+
+        Returns:
+            dict: {grupo: [liquido, compras]} em Decimal
+        """
+        sinais = [
+            1 if tipo in tipos_positivos else -1 if tipo in tipos_negativos else 0
+            for tipo in self.tipos
+        ]
+        compra = [tipo in tipos_compras for tipo in self.tipos]
+        item = self.colunas['item_id']
+        tipo = self.colunas['tipo']
+        quantidade = self.colunas['quantidade']
+        custo = self.colunas['custo_unitario']
+        totais = {}
+        for i in range(self.linhas):
+            if custo[i] == NULO:
+                continue
+            valor = quantidade[i] * custo[i]
+            soma = totais.setdefault(grupo_por_item.get(item[i]), [0, 0])
+            soma[0] += sinais[tipo[i]] * valor
+            if compra[tipo[i]]:
+                soma[1] += valor
+        return {grupo: [Decimal(v) / ESCALA_CUSTO for v in soma] for grupo, soma in totais.items()}
+
+    def close(self):
+        for visao in reversed(getattr(self, '_visoes', [])):
+            visao.release()
+        self._visoes = []
+        self._mapa.close()
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def valor_arquivado(segmentos, tipos_positivos, tipos_negativos=(), desde=None, ate=None):
+    """
+    Valor das movimentações arquivadas em um intervalo de datas.
+
+    Meses inteiramente dentro do intervalo usam os totais do registro; só os
+    segmentos cortados pelo intervalo são lidos do disco.
+
+    Args:
+        segmentos (iterable): instâncias de SegmentoMovimentacao
+        tipos_positivos, tipos_negativos: tipos que somam / subtraem
+        desde, ate (datetime | None): limites inclusivos
+
+    Returns:
+        Decimal: soma de quantidade * custo_unitario
+    """
+    total = Decimal('0')
+    for segmento in segmentos:
+        if (ate is not None and segmento.data_inicial > ate) or (desde is not None and segmento.data_final < desde):
+            continue
+        inteiro = (ate is None or segmento.data_final <= ate) and (desde is None or segmento.data_inicial >= desde)
+        if inteiro:
+            total += segmento.total_para(tipos_positivos, tipos_negativos)
+            continue
+        with Segmento(diretorio() / segmento.arquivo) as dados:
+            total += dados.valor(tipos_positivos, tipos_negativos, desde=desde, ate=ate)
+    return total
@@ -0,0 +1,127 @@
+"""
+Bibliotecas de front-end servidas pelo próprio sistema.
+
+``ATIVOS`` fixa a versão de cada biblioteca usada pelos templates, com o
+caminho da cópia local em ``static/vendor/`` e a URL de origem. A cópia é
+baixada uma vez com ``manage.py vendorizar_ativos`` e versionada junto com
+o código; ``collectstatic`` gera os nomes com hash (``ManifestStaticFilesStorage``)
+e as versões comprimidas (ver ``estoque/estaticos.py``).
+
+Sem a cópia local, ``url()`` só devolve a URL da CDN com
+``settings.ATIVOS_CDN`` (padrão: o valor de ``DEBUG``). Em produção a falta
+da cópia é um erro: ``url()`` levanta ``ImproperlyConfigured`` e a
+verificação ``estoque.E001`` (``check``, ``collectstatic``) lista os
+arquivos que faltam.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.templatetags.static import static
+
+# nome -> (caminho em static/, URL de origem)
+ATIVOS = {
+    'bootstrap.css': (
+        'vendor/bootstrap/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    ),
+    'bootstrap.js': (
+        'vendor/bootstrap/bootstrap.bundle.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    ),
+    'bootstrap-icons.css': (
+        'vendor/bootstrap-icons/bootstrap-icons.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css',
+    ),
+    'fontawesome.css': (
+        'vendor/fontawesome/css/all.min.css',
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/css/all.min.css',
+    ),
+    'sweetalert2.css': (
+        'vendor/sweetalert2/sweetalert2.min.css',
+        'https://cdn.jsdelivr.net/npm/sweetalert2@11.10.5/dist/sweetalert2.min.css',
+    ),
+    'sweetalert2.js': (
+        'vendor/sweetalert2/sweetalert2.all.min.js',
+        'https://cdn.jsdelivr.net/npm/sweetalert2@11.10.5/dist/sweetalert2.all.min.js',
+    ),
+    'jquery.js': (
+        'vendor/jquery/jquery.min.js',
+        'https://code.jquery.com/jquery-3.7.1.min.js',
+    ),
+    'htmx.js': (
+        'vendor/htmx/htmx.min.js',
+        'https://unpkg.com/htmx.org@1.9.12/dist/htmx.min.js',
+    ),
+    'imask.js': (
+        'vendor/imask/imask.min.js',
+        'https://unpkg.com/imask@7.6.1/dist/imask.min.js',
+    ),
+}
+
+# Arquivos referenciados pelos CSS via url(): precisam existir para o collectstatic
+DEPENDENCIAS = (
+    ('vendor/bootstrap-icons/fonts/bootstrap-icons.woff2',
+     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2'),
+    ('vendor/bootstrap-icons/fonts/bootstrap-icons.woff',
+     'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff'),
+) + tuple(
+    (f'vendor/fontawesome/webfonts/{fonte}',
+     f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/webfonts/{fonte}')
+    for fonte in (
+        'fa-brands-400.woff2', 'fa-brands-400.ttf',
+        'fa-regular-400.woff2', 'fa-regular-400.ttf',
+        'fa-solid-900.woff2', 'fa-solid-900.ttf',
+        'fa-v4compatibility.woff2', 'fa-v4compatibility.ttf',
+    )
+)
+
+
+@lru_cache(maxsize=None)
+def local(caminho):
+    """Indica se a cópia local existe (consultado uma vez por processo)."""
+    return finders.find(caminho) is not None
+
+
+def faltantes():
+    """Caminhos de ``ATIVOS`` e ``DEPENDENCIAS`` sem cópia local."""
+    return [caminho for caminho, _ in (*ATIVOS.values(), *DEPENDENCIAS) if not local(caminho)]
+
+
+def url(nome):
+    """
+    URL de uma biblioteca de ``ATIVOS``.
+
+    Returns:
+        str: URL estática (com hash em produção) ou, sem cópia local e com
+        ``ATIVOS_CDN``, a da CDN
+
+    Raises:
+        KeyError: se ``nome`` não estiver em ``ATIVOS``
+        ImproperlyConfigured: sem cópia local e sem ``ATIVOS_CDN``
+    """
+    caminho, origem = ATIVOS[nome]
+    if local(caminho):
+        return static(caminho)
+    if not settings.ATIVOS_CDN:
+        raise ImproperlyConfigured(f'{caminho} não está em static/; rode manage.py vendorizar_ativos.')
+    return origem
+
+
+def verificar_copias(app_configs, **kwargs):
+    """
+    Verificação do sistema (registrada em ``EstoqueConfig.ready``): sem
+    ``ATIVOS_CDN``, toda biblioteca (e fonte) precisa da cópia local.
+    """
+    if settings.ATIVOS_CDN:
+        return []
+    ausentes = faltantes()
+    if not ausentes:
+        return []
+    return [checks.Error(
+        f'Bibliotecas de front-end sem cópia local: {", ".join(ausentes)}.',
+        hint='Rode manage.py vendorizar_ativos e versione static/vendor/ (ou defina ATIVOS_CDN).',
+        id='estoque.E001',
+    )]
@@ -0,0 +1,271 @@
+"""
+Trilha de auditoria gravada em lote, fora das transações de escrita.
+
+Item, Fornecedor e Movimentacao guardam em ``from_db`` os valores dos campos
+de ``CAMPOS_AUDITORIA``. Os receptores de ``post_save``/``post_delete``
+comparam com o estado salvo e, após o commit, colocam um
+``RegistroAuditoria`` (ainda não gravado) na fila do processo; transações
+desfeitas não geram registro. O usuário vem da requisição em andamento
+(``AuditoriaMiddleware``) ou de ``como_usuario()``.
+
+Uma thread por processo grava a fila com ``bulk_create`` a cada
+``settings.AUDITORIA_LOTE`` registros ou ``settings.AUDITORIA_INTERVALO``
+segundos, o que vier primeiro; ao encerrar o processo o restante é gravado
+(``atexit``). Com ``settings.AUDITORIA_ASSINCRONA`` desligado (testes) a
+thread não é iniciada e a fila só é gravada por ``descarregar()``.
+
+As movimentações excluídas em cascata com o item não geram registro
+próprio: o registro de exclusão do item as cobre.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Requisição em andamento (o usuário só é lido quando algo é auditado)
+_requisicao = ContextVar('auditoria_requisicao', default=None)
+_usuario = ContextVar('auditoria_usuario', default=None)
+
+_fila = queue.Queue()
+_SENTINELA = object()
+_trava = threading.Lock()
+_gravador = None
+
+
+def _tamanho_lote():
+    return getattr(settings, 'AUDITORIA_LOTE', 500)
+
+
+def _intervalo():
+    return getattr(settings, 'AUDITORIA_INTERVALO', 2.0)
+
+
+# ================================
+# CAPTURA
+# ================================
+
+def guardar_estado(instancia):
+    """Guarda os campos auditados carregados do banco (chamado em ``from_db``)."""
+    diferidos = instancia.get_deferred_fields()
+    instancia._estado_auditoria = {
+        campo: getattr(instancia, campo)
+        for campo in instancia.CAMPOS_AUDITORIA
+        if campo not in diferidos
+    }
+
+
+def _estado_salvo(instancia):
+    """Estado anterior ao save(); campos que não vieram do banco são buscados."""
+    estado = getattr(instancia, '_estado_auditoria', None) or {}
+    faltantes = [campo for campo in instancia.CAMPOS_AUDITORIA if campo not in estado]
+    if faltantes and instancia.pk is not None:
+        salvo = type(instancia)._base_manager.filter(pk=instancia.pk).values(*faltantes).first()
+        estado = {**estado, **(salvo or {})}
+    return estado
+
+
+def _usuario_atual():
+    usuario = _usuario.get()
+    if usuario is not None:
+        return usuario.pk
+    requisicao = _requisicao.get()
+    user = getattr(requisicao, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def _registrar(instancia, acao, alteracoes):
+    from .models import RegistroAuditoria
+
+    registro = RegistroAuditoria(
+        modelo=instancia._meta.model_name,
+        objeto_id=instancia.pk,
+        acao=acao,
+        alteracoes=alteracoes,
+        usuario_id=_usuario_atual(),
+        data=timezone.now(),
+    )
+    transaction.on_commit(partial(enfileirar, registro), using=instancia._state.db)
+
+
+def preparar(sender, instance, raw=False, **kwargs):
+    """Receptor de pre_save: completa o estado anterior de instâncias sem ``from_db``."""
+    if raw or instance._state.adding:
+        return
+    campos = kwargs.get('update_fields')
+    if campos is not None and not set(campos) & set(instance.CAMPOS_AUDITORIA):
+        return
+    instance._estado_auditoria = _estado_salvo(instance)
+
+
+def registrar_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Receptor de post_save: registra os campos auditados que mudaram."""
+    if raw:
+        return
+    anterior = {} if created else getattr(instance, '_estado_auditoria', {})
+    campos = instance.CAMPOS_AUDITORIA
+    if update_fields is not None:
+        campos = [campo for campo in campos if campo in update_fields]
+    alteracoes = {}
+    for campo in campos:
+        depois = getattr(instance, campo)
+        antes = anterior.get(campo)
+        if antes != depois:
+            alteracoes[campo] = [antes, depois]
+    instance._estado_auditoria = {**anterior, **{campo: getattr(instance, campo) for campo in campos}}
+    if alteracoes:
+        _registrar(instance, 'CRIACAO' if created else 'ALTERACAO', alteracoes)
+
+
+def registrar_exclusao(sender=None, instance=None, **kwargs):
+    """Receptor de post_delete."""
+    anterior = getattr(instance, '_estado_auditoria', None) or {
+        campo: getattr(instance, campo) for campo in instance.CAMPOS_AUDITORIA
+    }
+    _registrar(instance, 'EXCLUSAO', {campo: [valor, None] for campo, valor in anterior.items() if valor is not None})
+
+
+@contextmanager
+def como_usuario(usuario):
+    """Atribui ao ``usuario`` as alterações feitas no bloco (comandos, tarefas)."""
+    token = _usuario.set(usuario)
+    try:
+        yield
+    finally:
+        _usuario.reset(token)
+
+
+class AuditoriaMiddleware:
+    """Disponibiliza a requisição (e seu usuário) para os registros de auditoria."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _requisicao.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _requisicao.reset(token)
+
+
+# ================================
+# GRAVAÇÃO
+# ================================
+
+def enfileirar(registro):
+    _fila.put(registro)
+    if getattr(settings, 'AUDITORIA_ASSINCRONA', True):
+        _iniciar_gravador()
+
+
+def _iniciar_gravador():
+    global _gravador
+    gravador = _gravador
+    if gravador is not None and gravador.pid == os.getpid() and gravador.is_alive():
+        return
+    with _trava:
+        # Após um fork a thread do processo pai não existe no filho
+        if _gravador is None or _gravador.pid != os.getpid() or not _gravador.is_alive():
+            _gravador = _Gravador()
+            _gravador.start()
+
+
+def _coletar(tamanho, intervalo):
+    """
+    Próximo lote da fila: espera o primeiro registro e junta os seguintes até
+    ``tamanho`` registros ou ``intervalo`` segundos.
+
+    Returns:
+        tuple: (lote, encerrar) — ``encerrar`` indica o pedido de parada
+    """
+    primeiro = _fila.get()
+    if primeiro is _SENTINELA:
+        return [], True
+    lote = [primeiro]
+    prazo = time.monotonic() + intervalo
+    while len(lote) < tamanho:
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            break
+        try:
+            registro = _fila.get(timeout=restante)
+        except queue.Empty:
+            break
+        if registro is _SENTINELA:
+            return lote, True
+        lote.append(registro)
+    return lote, False
+
+
+def _gravar(lote):
+    from .models import RegistroAuditoria
+
+    try:
+        RegistroAuditoria.objects.bulk_create(lote, batch_size=_tamanho_lote())
+    except Exception:
+        logger.exception('Falha ao gravar %d registro(s) de auditoria', len(lote))
+
+
+class _Gravador(threading.Thread):
+    def __init__(self):
+        super().__init__(name='auditoria', daemon=True)
+        self.pid = os.getpid()
+
+    def run(self):
+        encerrar = False
+        while not encerrar:
+            lote, encerrar = _coletar(_tamanho_lote(), _intervalo())
+            if lote:
+                close_old_connections()
+                _gravar(lote)
+
+
+def descarregar():
+    """
+    Grava agora tudo o que está na fila, na conexão da thread atual.
+
+    Returns:
+        int: Registros gravados
+    """
+    lote = []
+    while True:
+        try:
+            registro = _fila.get_nowait()
+        except queue.Empty:
+            break
+        if registro is not _SENTINELA:
+            lote.append(registro)
+    if lote:
+        _gravar(lote)
+    return len(lote)
+
+
+def limpar():
+    """Descarta a fila sem gravar (testes)."""
+    while True:
+        try:
+            _fila.get_nowait()
+        except queue.Empty:
+            return
+
+
+@atexit.register
+def _encerrar():
+    gravador = _gravador
+    if gravador is None or gravador.pid != os.getpid():
+        return
+    if gravador.is_alive():
+        _fila.put(_SENTINELA)
+        gravador.join(timeout=10)
+    descarregar()
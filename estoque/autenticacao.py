@@ -0,0 +1,106 @@
+"""
+Usuário e permissões em cache entre requisições.
+
+Com o ``ModelBackend`` do Django cada requisição autenticada busca o usuário
+e, no primeiro ``has_perm``, as permissões dele e dos grupos (três
+consultas). ``BackendPermissoesEmCache`` guarda o usuário e o conjunto de
+permissões no cache ``settings.PERMISSOES_CACHE`` por
+``settings.PERMISSOES_CACHE_TTL`` segundos.
+
+As chaves levam uma geração global. Salvar ou excluir o usuário apaga as
+chaves dele; mudanças em grupos, permissões ou nas associações entre eles
+(``m2m_changed``) trocam a geração, o que descarta todas as chaves de uma
+vez. Com um cache compartilhado (banco, Redis), todos os processos enxergam
+a invalidação na hora. Com o cache em memória do processo (``LocMemCache``),
+os demais processos só a enxergam quando a chave expira; por isso, nesse
+caso, a validade cai para ``settings.PERMISSOES_CACHE_TTL_LOCAL`` segundos
+(um usuário desativado ou uma permissão revogada deixa de valer em poucos
+segundos em todos os workers).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+CHAVE_GERACAO = 'auth:geracao'
+
+
+def _cache():
+    return caches[getattr(settings, 'PERMISSOES_CACHE', 'default')]
+
+
+def _ttl():
+    ttl = getattr(settings, 'PERMISSOES_CACHE_TTL', 300)
+    if isinstance(_cache(), LocMemCache):
+        return min(ttl, getattr(settings, 'PERMISSOES_CACHE_TTL_LOCAL', 5))
+    return ttl
+
+
+def _geracao():
+    geracao = _cache().get(CHAVE_GERACAO)
+    if geracao is None:
+        # Valor novo (e não 0) se a chave foi removida do cache: chaves antigas não voltam a valer
+        _cache().add(CHAVE_GERACAO, time.time_ns(), None)
+        geracao = _cache().get(CHAVE_GERACAO)
+    return geracao
+
+
+def _chave(tipo, user_id, geracao=None):
+    return f'auth:{tipo}:{user_id}:{geracao if geracao is not None else _geracao()}'
+
+
+class BackendPermissoesEmCache(ModelBackend):
+    """ModelBackend com ``get_user`` e ``get_all_permissions`` atendidos pelo cache."""
+
+    def get_user(self, user_id):
+        chave = _chave('usuario', user_id)
+        user = _cache().get(chave)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                _cache().set(chave, user, _ttl())
+        return user
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            chave = _chave('permissoes', user_obj.pk)
+            permissoes = _cache().get(chave)
+            if permissoes is None:
+                permissoes = super().get_all_permissions(user_obj)
+                _cache().set(chave, permissoes, _ttl())
+            user_obj._perm_cache = permissoes
+        return user_obj._perm_cache
+
+
+def _apagar_usuario(user_id):
+    geracao = _geracao()
+    _cache().delete_many([_chave('usuario', user_id, geracao), _chave('permissoes', user_id, geracao)])
+
+
+def _nova_geracao():
+    _cache().set(CHAVE_GERACAO, time.time_ns(), None)
+
+
+def usuario_alterado(sender, instance, **kwargs):
+    """
+    Receptor de post_save/post_delete do usuário.
+
+    Apaga já e de novo após o commit: uma requisição concorrente feita antes
+    do commit ainda guardaria o valor antigo.
+    """
+    user_id = instance.pk
+    _apagar_usuario(user_id)
+    transaction.on_commit(lambda: _apagar_usuario(user_id))
+
+
+def permissoes_alteradas(sender, **kwargs):
+    """Receptor de grupos, permissões e associações (m2m_changed): descarta todo o cache."""
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    _nova_geracao()
+    transaction.on_commit(_nova_geracao)
@@ -0,0 +1,204 @@
+"""
+Cache em memória da busca de itens da listagem (``buscar_item``, HTMX).
+
+A caixa de busca dispara uma requisição a cada prefixo digitado ("p", "pa",
+"par", ...). Cada processo mantém um LRU (``settings.BUSCA_CACHE_TAMANHO``
+termos, válidos por ``settings.BUSCA_CACHE_TTL`` segundos) com
+``termo normalizado -> itens encontrados``, e responde:
+
+* termo em cache: sem consulta;
+* termo que estende um termo em cache: filtra os itens dele em memória
+  (todo item que contém "para" contém "par"). Só ficam em cache resultados
+  de até ``settings.BUSCA_CACHE_REFINAR_MAXIMO`` itens;
+* demais: uma consulta; buscas idênticas simultâneas no processo esperam a
+  mesma consulta em vez de repeti-la.
+
+Os sinais ``post_save``/``post_delete`` de Item removem os termos cujo
+resultado contém o item ou que passam a encontrá-lo; caminhos em massa
+chamam ``invalidar()`` com os ids. Como no índice de códigos
+(``codigos.py``), os demais processos só enxergam a alteração quando o termo
+expira. ``estatisticas()`` expõe a taxa de acerto.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+# Colunas exibidas na tabela (linha_item.html) mais as usadas para refinar em memória
+COLUNAS = ('codigo', 'descricao', 'quantidade_atual', 'estoque_minimo', 'versao', 'codigo_busca', 'descricao_busca')
+# Itens exibidos com a busca vazia
+LIMITE_SEM_TERMO = 50
+
+_trava = threading.Lock()
+# termo -> (itens, ids, expira)
+_entradas = OrderedDict()
+# termo -> _Consulta em andamento (coalescência)
+_em_andamento = {}
+# Incrementada a cada invalidação: consultas iniciadas antes dela não entram no cache
+_geracao = 0
+_contadores = {'acertos': 0, 'refinamentos': 0, 'coalescidas': 0, 'consultas': 0}
+
+
+def _tamanho_maximo():
+    return getattr(settings, 'BUSCA_CACHE_TAMANHO', 256)
+
+
+def _ttl():
+    return getattr(settings, 'BUSCA_CACHE_TTL', 30)
+
+
+def _refinar_maximo():
+    return getattr(settings, 'BUSCA_CACHE_REFINAR_MAXIMO', 2000)
+
+
+class _Consulta:
+    """Consulta ao banco de um termo, compartilhada pelas buscas simultâneas."""
+
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.itens = None
+
+
+def _consultar(termo):
+    from .models import Item
+
+    itens = Item.objects.only(*COLUNAS)
+    if termo:
+        # Os campos de busca já estão normalizados (ver CampoBusca)
+        itens = itens.filter(codigo_busca__contains=termo) | itens.filter(descricao_busca__contains=termo)
+        return list(itens.order_by('descricao', 'pk'))
+    return list(itens.order_by('descricao', 'pk')[:LIMITE_SEM_TERMO])
+
+
+def _encontra(item, termo):
+    return termo in item.codigo_busca or termo in item.descricao_busca
+
+
+def _do_cache(termo, agora):
+    """Itens de ``termo`` a partir do cache, ou None. Chamar com a trava."""
+    entrada = _entradas.get(termo)
+    if entrada is not None and entrada[2] > agora:
+        _entradas.move_to_end(termo)
+        _contadores['acertos'] += 1
+        return entrada[0], 'acerto'
+    # O prefixo mais longo em cache (só há em cache resultados pequenos o bastante para filtrar)
+    for tamanho in range(len(termo) - 1, 0, -1):
+        entrada = _entradas.get(termo[:tamanho])
+        if entrada is None or entrada[2] <= agora:
+            continue
+        _contadores['refinamentos'] += 1
+        itens = [item for item in entrada[0] if _encontra(item, termo)]
+        _guardar(termo, itens, entrada[2])
+        return itens, 'refinado'
+    return None
+
+
+def _guardar(termo, itens, expira):
+    """Chamar com a trava."""
+    if len(itens) > _refinar_maximo():
+        # Termos curtos que encontram boa parte do catálogo não compensam a memória
+        return
+    _entradas[termo] = (itens, frozenset(item.pk for item in itens), expira)
+    _entradas.move_to_end(termo)
+    while len(_entradas) > _tamanho_maximo():
+        _entradas.popitem(last=False)
+
+
+def buscar(termo):
+    """
+    Itens cujo código ou descrição contém o termo (sem diferenciar maiúsculas
+    e acentos), ordenados pela descrição; termo vazio traz os primeiros
+    LIMITE_SEM_TERMO itens.
+
+    Os itens são compartilhados entre as requisições: somente leitura.
+
+    Args:
+        termo (str): Termo já normalizado (``normalizar_busca``)
+
+    Returns:
+        tuple: (itens, origem) — origem é 'acerto', 'refinado', 'coalescida' ou 'consulta'
+    """
+    with _trava:
+        encontrado = _do_cache(termo, time.monotonic())
+        if encontrado is not None:
+            return encontrado
+        consulta = _em_andamento.get(termo)
+        if consulta is None:
+            consulta = _em_andamento[termo] = _Consulta()
+            responsavel = True
+            geracao = _geracao
+        else:
+            responsavel = False
+
+    if not responsavel:
+        consulta.pronta.wait()
+        if consulta.itens is not None:
+            with _trava:
+                _contadores['coalescidas'] += 1
+            return consulta.itens, 'coalescida'
+        # A consulta compartilhada falhou: cada requisição tenta a sua
+        return _consultar(termo), 'consulta'
+
+    try:
+        itens = _consultar(termo)
+        with _trava:
+            _contadores['consultas'] += 1
+            if geracao == _geracao:
+                _guardar(termo, itens, time.monotonic() + _ttl())
+        consulta.itens = itens
+    finally:
+        with _trava:
+            _em_andamento.pop(termo, None)
+        consulta.pronta.set()
+    return itens, 'consulta'
+
+
+def invalidar(item_ids=(), textos=()):
+    """
+    Remove os termos cujo resultado contém algum dos itens ou que encontram
+    algum dos textos (código/descrição normalizados de itens novos ou alterados).
+    """
+    global _geracao
+    item_ids = set(item_ids)
+    with _trava:
+        _geracao += 1
+        for termo in list(_entradas):
+            _, ids, _ = _entradas[termo]
+            if ids & item_ids or any(termo in texto for texto in textos) or (not termo and textos):
+                del _entradas[termo]
+
+
+def limpar():
+    global _geracao
+    with _trava:
+        _geracao += 1
+        _entradas.clear()
+        for contador in _contadores:
+            _contadores[contador] = 0
+
+
+def estatisticas():
+    """
+    Returns:
+        dict: contadores do processo, termos em cache e taxa_acerto (fração das
+        buscas respondidas sem consulta própria ao banco)
+    """
+    with _trava:
+        dados = dict(_contadores, termos=len(_entradas))
+    total = dados['acertos'] + dados['refinamentos'] + dados['coalescidas'] + dados['consultas']
+    dados['taxa_acerto'] = round((total - dados['consultas']) / total, 4) if total else None
+    return dados
+
+
+def item_alterado(sender, instance, **kwargs):
+    """
+    Receptor de post_save/post_delete de Item.
+
+    Invalida já e de novo após o commit: uma consulta concorrente feita antes
+    do commit ainda veria o valor antigo.
+    """
+    item_ids, textos = [instance.pk], [instance.codigo_busca, instance.descricao_busca]
+    invalidar(item_ids, textos)
+    transaction.on_commit(lambda: invalidar(item_ids, textos))
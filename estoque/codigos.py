@@ -0,0 +1,122 @@
+"""
+Índice em memória código → item para a leitura de códigos de barras.
+
+Cada processo mantém um LRU (``settings.INDICE_CODIGOS_TAMANHO`` entradas)
+com ``codigo -> (id, quantidade_atual, status_estoque)``. Consultas em lote
+buscam todos os códigos ausentes em um único SELECT pelo índice único de
+``Item.codigo``; códigos desconhecidos também ficam em cache.
+
+Os sinais ``post_save``/``post_delete`` de Item removem as entradas do
+processo que gravou; caminhos em massa (``QuerySet.update``) chamam
+``invalidar()`` explicitamente. Os demais processos só enxergam a alteração
+quando a entrada expira (``settings.INDICE_CODIGOS_TTL`` segundos).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+_trava = threading.Lock()
+_entradas = OrderedDict()
+# item_id -> codigo, para invalidar pelo id (ex.: código alterado no save)
+_codigo_por_id = {}
+# Incrementada a cada invalidação: leituras do banco iniciadas antes dela não entram no cache
+_geracao = 0
+
+
+def _tamanho_maximo():
+    return getattr(settings, 'INDICE_CODIGOS_TAMANHO', 50000)
+
+
+def _ttl():
+    return getattr(settings, 'INDICE_CODIGOS_TTL', 30)
+
+
+def buscar(codigos):
+    """
+    Localiza itens pelo código exato.
+
+    Args:
+        codigos (iterable): Códigos lidos
+
+    Returns:
+        dict: {codigo: (id, quantidade_atual, status_estoque) ou None se desconhecido}
+    """
+    from .models import Item
+
+    agora = time.monotonic()
+    resultado = {}
+    faltantes = []
+    with _trava:
+        geracao = _geracao
+        for codigo in codigos:
+            entrada = _entradas.get(codigo)
+            if entrada is not None and entrada[1] > agora:
+                _entradas.move_to_end(codigo)
+                resultado[codigo] = entrada[0]
+            elif codigo not in resultado:
+                faltantes.append(codigo)
+
+    if not faltantes:
+        return resultado
+
+    encontrados = {
+        codigo: (pk, quantidade, status)
+        for codigo, pk, quantidade, status in Item.objects.filter(codigo__in=faltantes).values_list(
+            'codigo', 'pk', 'quantidade_atual', 'status_estoque',
+        )
+    }
+    expira = time.monotonic() + _ttl()
+    with _trava:
+        guardar = geracao == _geracao
+        for codigo in faltantes:
+            valor = encontrados.get(codigo)
+            resultado[codigo] = valor
+            if not guardar:
+                continue
+            _entradas[codigo] = (valor, expira)
+            _entradas.move_to_end(codigo)
+            if valor is not None:
+                _codigo_por_id[valor[0]] = codigo
+        while len(_entradas) > _tamanho_maximo():
+            codigo, (valor, _) = _entradas.popitem(last=False)
+            if valor is not None and _codigo_por_id.get(valor[0]) == codigo:
+                del _codigo_por_id[valor[0]]
+    return resultado
+
+
+def invalidar(item_ids=(), codigos=()):
+    """Remove do índice os itens (por id) e os códigos informados."""
+    global _geracao
+    with _trava:
+        _geracao += 1
+        for item_id in item_ids:
+            codigo = _codigo_por_id.pop(item_id, None)
+            if codigo is not None:
+                _entradas.pop(codigo, None)
+        for codigo in codigos:
+            entrada = _entradas.pop(codigo, None)
+            if entrada is not None and entrada[0] is not None:
+                _codigo_por_id.pop(entrada[0][0], None)
+
+
+def limpar():
+    global _geracao
+    with _trava:
+        _geracao += 1
+        _entradas.clear()
+        _codigo_por_id.clear()
+
+
+def item_alterado(sender, instance, **kwargs):
+    """
+    Receptor de post_save/post_delete de Item.
+
+    Invalida já e de novo após o commit: uma leitura concorrente feita antes
+    do commit ainda veria o valor antigo.
+    """
+    item_ids, codigos = [instance.pk], [instance.codigo]
+    invalidar(item_ids, codigos)
+    transaction.on_commit(lambda: invalidar(item_ids, codigos))
@@ -0,0 +1,112 @@
+"""
+Arquivos estáticos de produção: nomes com hash, versões comprimidas e cache longo.
+
+``ArmazenamentoComprimido`` (``STORAGES['staticfiles']``) é o
+``ManifestStaticFilesStorage`` do Django com um passo a mais no
+``collectstatic``: cada arquivo com hash de texto ganha ao lado as versões
+``.gz`` e, com o pacote ``brotli`` instalado, ``.br``.
+
+``servir`` entrega ``STATIC_ROOT`` quando ``settings.SERVIR_ESTATICOS`` está
+ligado (instalações sem nginx na frente): escolhe a versão comprimida pelo
+``Accept-Encoding`` e marca os nomes com hash como imutáveis por um ano, então
+o navegador não revalida nada nas visitas seguintes. Os demais arquivos vão
+com ``no-cache`` e respondem 304 pelo ``Last-Modified``.
+"""
+import gzip
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+EXTENSOES_COMPRIMIDAS = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.ttf', '.ico', '.xml')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+# nome.<12 hexadecimais>.ext, como gerado pelo ManifestStaticFilesStorage
+_COM_HASH = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+
+def _comprimir_brotli(conteudo):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(conteudo, quality=11)
+
+
+class ArmazenamentoComprimido(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que grava .gz/.br ao lado dos arquivos com hash."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for nome in set(self.hashed_files.values()):
+            if nome.endswith(EXTENSOES_COMPRIMIDAS):
+                self._comprimir(Path(self.path(nome)))
+
+    def _comprimir(self, caminho):
+        # O nome tem o hash do conteúdo: versões já gravadas continuam válidas
+        conteudo = None
+        for extensao, comprimir in (
+            ('.gz', lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)),
+            ('.br', _comprimir_brotli),
+        ):
+            destino = caminho.with_name(caminho.name + extensao)
+            if destino.exists():
+                continue
+            if conteudo is None:
+                conteudo = caminho.read_bytes()
+            comprimido = comprimir(conteudo)
+            # Só vale a pena se economizar ao menos 5%
+            if comprimido is not None and len(comprimido) < len(conteudo) * 0.95:
+                destino.write_bytes(comprimido)
+
+
+def _versao_comprimida(request, arquivo):
+    aceitas = request.headers.get('Accept-Encoding', '')
+    for codificacao, extensao in (('br', '.br'), ('gzip', '.gz')):
+        if re.search(rf'\b{codificacao}\b', aceitas):
+            alternativa = arquivo.with_name(arquivo.name + extensao)
+            if alternativa.is_file():
+                return alternativa, codificacao
+    return arquivo, None
+
+
+def servir(request, caminho):
+    """
+    Entrega um arquivo de ``STATIC_ROOT`` com os cabeçalhos de cache.
+
+    Args:
+        caminho (str): Caminho relativo a STATIC_URL
+
+    Raises:
+        Http404: com SERVIR_ESTATICOS desligado ou arquivo inexistente
+    """
+    if not getattr(settings, 'SERVIR_ESTATICOS', False) or not settings.STATIC_ROOT:
+        raise Http404
+    caminho = posixpath.normpath(caminho).lstrip('/')
+    arquivo = Path(safe_join(settings.STATIC_ROOT, caminho))
+    if not arquivo.is_file():
+        raise Http404
+
+    estado = arquivo.stat()
+    imutavel = bool(_COM_HASH.search(caminho))
+    if not imutavel and not was_modified_since(request.headers.get('If-Modified-Since'), estado.st_mtime):
+        return HttpResponseNotModified()
+
+    entregue, codificacao = _versao_comprimida(request, arquivo)
+    tipo, _ = mimetypes.guess_type(arquivo.name)
+    resposta = FileResponse(entregue.open('rb'), content_type=tipo or 'application/octet-stream')
+    resposta['Cache-Control'] = CACHE_IMUTAVEL if imutavel else 'no-cache'
+    resposta['Last-Modified'] = http_date(estado.st_mtime)
+    resposta['Vary'] = 'Accept-Encoding'
+    if codificacao:
+        resposta['Content-Encoding'] = codificacao
+    return resposta
@@ -1,19 +1,189 @@
+import csv
+import io
+
 from django import forms
-from .models import Fornecedor, Item, Movimentacao
+from django.conf import settings
+from django.urls import reverse_lazy
+from django.utils.html import format_html
+from .models import Fornecedor, Item, Movimentacao, Inventario, Almoxarifado, TIPOS_ENTRADA, TIPOS_TRANSFERENCIA
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select que carrega as opções sob demanda a partir de um endpoint JSON.
+    
+    Só a opção selecionada é renderizada (uma consulta por pk), em vez do
+    catálogo inteiro; o script ``js/autocomplete.js`` busca as demais
+    conforme o usuário digita. A validação continua sendo a do
+    ModelChoiceField (o id enviado precisa existir no queryset).
+    """
+    
+    class Media:
+        js = ('js/autocomplete.js',)
+    
+    def __init__(self, url, placeholder='Digite para buscar...', attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.placeholder = placeholder
+    
+    def optgroups(self, name, value, attrs=None):
+        valores = [v for v in value if v not in (None, '')]
+        self._selecionados = []
+        if valores:
+            self._selecionados = [(obj.pk, str(obj)) for obj in self.choices.queryset.filter(pk__in=valores)]
+        opcoes = [('', '---------')] + self._selecionados
+        
+        grupos = []
+        for indice, (valor, rotulo) in enumerate(opcoes):
+            selecionado = str(valor) in valores
+            grupos.append((None, [self.create_option(name, valor, rotulo, selecionado, indice, attrs=attrs)], indice))
+        return grupos
+    
+    def render(self, name, value, attrs=None, renderer=None):
+        select = super().render(name, value, attrs, renderer)
+        rotulo = self._selecionados[0][1] if self._selecionados else ''
+        return format_html(
+            '<div class="autocomplete position-relative" data-url="{}">'
+            '<input type="search" class="form-control autocomplete-busca" autocomplete="off" placeholder="{}" value="{}">'
+            '<div class="d-none">{}</div>'
+            '<div class="list-group autocomplete-resultados position-absolute w-100 shadow-sm d-none" style="z-index: 1000;"></div>'
+            '</div>',
+            self.url, self.placeholder, rotulo, select,
+        )
 
 class ItemForm(forms.ModelForm):
     class Meta:
         model = Item
         fields = '__all__'
+        widgets = {
+            'fornecedor': AutocompleteSelect(
+                url=reverse_lazy('api_fornecedores_autocomplete'),
+                placeholder='Digite o nome do fornecedor...',
+            ),
+        }
 
 class MovimentacaoForm(forms.ModelForm):
     class Meta:
         model = Movimentacao
-        fields = ['item', 'tipo', 'quantidade', 'data_devolucao_prevista']
+        fields = [
+            'item', 'almoxarifado', 'tipo', 'quantidade', 'custo_unitario', 'lote_numero', 'validade',
+            'data_devolucao_prevista',
+        ]
+        widgets = {
+            'item': AutocompleteSelect(
+                url=reverse_lazy('api_itens_autocomplete'),
+                placeholder='Digite o código ou a descrição do item...',
+            ),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Transferências são registradas em pares pela tela própria (TransferenciaForm)
+        self.fields['tipo'].choices = [
+            (valor, rotulo) for valor, rotulo in self.fields['tipo'].choices if valor not in TIPOS_TRANSFERENCIA
+        ]
+        almoxarifado = self.fields['almoxarifado']
+        almoxarifado.queryset = Almoxarifado.objects.filter(ativo=True)
+        almoxarifado.help_text = 'Se vazio, usa o almoxarifado padrão.'
+        if not self.is_bound and self.instance.almoxarifado_id is None:
+            almoxarifado.initial = almoxarifado.queryset.filter(codigo=settings.ALMOXARIFADO_PADRAO).first()
+        # Saídas não escolhem o lote: consomem primeiro os que vencem antes (FEFO)
+        self.fields['lote_numero'].help_text = 'Somente em entradas de itens controlados por lote.'
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('tipo') not in TIPOS_ENTRADA and (dados.get('lote_numero') or dados.get('validade')):
+            raise forms.ValidationError('Lote e validade só são informados nas entradas e devoluções.')
+        return dados
+
+
+class TransferenciaForm(forms.Form):
+    item = forms.ModelChoiceField(
+        queryset=Item.objects.all(),
+        widget=AutocompleteSelect(
+            url=reverse_lazy('api_itens_autocomplete'),
+            placeholder='Digite o código ou a descrição do item...',
+        ),
+    )
+    origem = forms.ModelChoiceField(queryset=Almoxarifado.objects.filter(ativo=True))
+    destino = forms.ModelChoiceField(queryset=Almoxarifado.objects.filter(ativo=True))
+    quantidade = forms.IntegerField(min_value=1)
+
+    def clean(self):
+        dados = super().clean()
+        if dados.get('origem') and dados.get('origem') == dados.get('destino'):
+            raise forms.ValidationError('Origem e destino devem ser almoxarifados diferentes.')
+        return dados
 
 
 # NOVO FORMULÁRIO DE FORNECEDOR
 class FornecedorForm(forms.ModelForm):
     class Meta:
         model = Fornecedor
-        fields = ['nome', 'cnpj', 'contato', 'telefone', 'email']
\ No newline at end of file
+        fields = ['nome', 'cnpj', 'contato', 'telefone', 'email']
+
+
+class InventarioForm(forms.ModelForm):
+    class Meta:
+        model = Inventario
+        fields = ['descricao', 'almoxarifado']
+
+
+class ContagemUploadForm(forms.Form):
+    """
+    Upload da contagem física em planilha (.xlsx) ou CSV.
+    
+    A primeira linha é o cabeçalho; as colunas usadas são ``codigo`` e
+    ``quantidade``. Após a validação, ``cleaned_data['arquivo']`` contém
+    o dicionário {codigo: quantidade}.
+    """
+    arquivo = forms.FileField(help_text='Planilha .xlsx ou .csv com as colunas "codigo" e "quantidade".')
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        nome = arquivo.name.lower()
+        if nome.endswith('.xlsx'):
+            linhas = self._ler_xlsx(arquivo)
+        elif nome.endswith('.csv'):
+            linhas = self._ler_csv(arquivo)
+        else:
+            raise forms.ValidationError('Formato não suportado. Envie um arquivo .xlsx ou .csv.')
+        
+        cabecalho = [str(coluna or '').strip().lower() for coluna in next(linhas, [])]
+        if 'codigo' not in cabecalho or 'quantidade' not in cabecalho:
+            raise forms.ValidationError('O cabeçalho deve conter as colunas "codigo" e "quantidade".')
+        idx_codigo, idx_quantidade = cabecalho.index('codigo'), cabecalho.index('quantidade')
+        
+        contagens = {}
+        for numero, linha in enumerate(linhas, start=2):
+            if not linha or all(valor in (None, '') for valor in linha):
+                continue
+            codigo = str(linha[idx_codigo] or '').strip()
+            try:
+                quantidade = int(linha[idx_quantidade])
+            except (TypeError, ValueError, IndexError):
+                raise forms.ValidationError(f'Linha {numero}: quantidade inválida.')
+            if not codigo or quantidade < 0:
+                raise forms.ValidationError(f'Linha {numero}: código vazio ou quantidade negativa.')
+            contagens[codigo] = quantidade
+        
+        if not contagens:
+            raise forms.ValidationError('O arquivo não contém contagens.')
+        return contagens
+
+    @staticmethod
+    def _ler_xlsx(arquivo):
+        from openpyxl import load_workbook
+        try:
+            planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+        except Exception:
+            raise forms.ValidationError('Não foi possível ler a planilha.')
+        return planilha.iter_rows(values_only=True)
+
+    @staticmethod
+    def _ler_csv(arquivo):
+        texto = io.TextIOWrapper(arquivo.file, encoding='utf-8-sig')
+        amostra = texto.read(2048)
+        texto.seek(0)
+        delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+        return csv.reader(texto, delimiter=delimitador)
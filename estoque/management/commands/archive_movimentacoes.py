@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from estoque.models import Movimentacao, SegmentoMovimentacao, SequenciaSincronizacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as movimentações anteriores ao mês informado para segmentos "
+        "colunares em disco (um por mês) e atualiza o checkpoint por item. "
+        "Relatórios históricos passam a ler os segmentos de forma transparente. "
+        "Também limpa os registros antigos da sequência de sincronização."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', required=True, metavar='AAAA-MM',
+            help='Primeiro mês que permanece na tabela (todos os anteriores são arquivados).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mes = datetime.strptime(options['before'], '%Y-%m')
+        except ValueError:
+            raise CommandError('Use --before no formato AAAA-MM.')
+        corte = timezone.make_aware(mes)
+        if corte > timezone.now():
+            raise CommandError('Só meses já iniciados podem ser usados como corte.')
+
+        try:
+            segmentos = SegmentoMovimentacao.arquivar(corte)
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        removidos = SequenciaSincronizacao.limpar()
+
+        for segmento in segmentos:
+            self.stdout.write(f'{segmento.competencia:%Y-%m}: {segmento.linhas} movimentação(ões) -> {segmento.arquivo}')
+        self.stdout.write(f'{removidos} registro(s) antigo(s) da sequência de sincronização removido(s).')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(segmentos)} mês(es) arquivado(s); {Movimentacao.objects.count()} movimentação(ões) na tabela.'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from estoque.models import Item, Movimentacao, recalcular_custos_historicos
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprocessa o razão em ordem cronológica e preenche o custo unitário de "
+        "cada movimentação e o custo médio ponderado de cada item."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Linhas por bulk_update.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            itens, movimentacoes = recalcular_custos_historicos(Item, Movimentacao, tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Custos preenchidos: {itens} item(ns), {movimentacoes} movimentação(ões).'
+        ))
@@ -0,0 +1,148 @@
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from estoque.models import Item
+
+# Executado em um processo novo por medição: inicia a aplicação WSGI como o
+# servidor, aquece (ou não) e faz a primeira e a segunda requisição de cada rota
+PROCESSO = '''
+import json, os, sys, time
+inicio = time.perf_counter()
+parametros = json.loads(sys.argv[1])
+os.environ['DJANGO_SETTINGS_MODULE'] = parametros['settings']
+from django.conf import settings
+for alias in ('default', 'replica'):
+    settings.DATABASES[alias]['NAME'] = parametros['banco']
+# Sem collectstatic no banco temporário: estáticos sem o manifesto, e a CDN
+# para as bibliotecas ainda não vendorizadas
+settings.STORAGES = dict(settings.STORAGES, staticfiles={
+    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+})
+settings.ATIVOS_CDN = True
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+aplicacao = time.perf_counter()
+if parametros['aquecer']:
+    from django.db import connections
+    from estoque import aquecimento
+    aquecimento.aquecer()
+    connections.close_all()
+pronto = time.perf_counter()
+
+from django.test import Client
+client = Client(SERVER_NAME='localhost')
+client.cookies[settings.SESSION_COOKIE_NAME] = parametros['sessao']
+requisicoes = {}
+for nome, url in parametros['urls']:
+    tempos = []
+    for _ in range(2):
+        antes = time.perf_counter()
+        status = client.get(url).status_code
+        tempos.append(time.perf_counter() - antes)
+        assert status == 200, (url, status)
+    requisicoes[nome] = tempos
+print(json.dumps({
+    'aplicacao': aplicacao - inicio, 'aquecimento': pronto - aplicacao, 'requisicoes': requisicoes,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o início do processo e a latência da primeira requisição de cada "
+        "rota (listagem, busca, alertas e detalhe do item), com e sem o "
+        "aquecimento (estoque/aquecimento.py). Cada medição roda em um processo "
+        "novo sobre um banco temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=5000)
+        parser.add_argument('--repeticoes', type=int, default=5, help='Processos por modo.')
+        parser.add_argument(
+            '--perfil', default='almoxarifado.settings_producao',
+            help='Módulo de settings dos processos medidos.',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as pasta:
+            banco = Path(pasta) / 'aquecimento.sqlite3'
+            parametros = self._preparar(banco, options)
+
+            self.stdout.write(f'{options["itens"]} itens, {options["repeticoes"]} processo(s) por modo, perfil {options["perfil"]}')
+            self.stdout.write(
+                f"{'modo':<10}{'processo ms':>13}{'app ms':>9}{'aquec. ms':>11}"
+                + ''.join(f'{nome + " 1a/2a ms":>24}' for nome, _ in parametros['urls'])
+            )
+            for modo, aquecer in (('frio', False), ('aquecido', True)):
+                medicoes = [self._medir(dict(parametros, aquecer=aquecer)) for _ in range(options['repeticoes'])]
+                mediana = lambda valores: statistics.median(valores) * 1000
+                linha = (
+                    f"{modo:<10}{mediana([m['processo'] for m in medicoes]):>13.1f}"
+                    f"{mediana([m['aplicacao'] for m in medicoes]):>9.1f}"
+                    f"{mediana([m['aquecimento'] for m in medicoes]):>11.1f}"
+                )
+                for nome, _ in parametros['urls']:
+                    primeira = mediana([m['requisicoes'][nome][0] for m in medicoes])
+                    segunda = mediana([m['requisicoes'][nome][1] for m in medicoes])
+                    linha += f'{f"{primeira:.1f}/{segunda:.1f}":>24}'
+                self.stdout.write(linha)
+
+    def _preparar(self, banco, options):
+        connections.close_all()
+        for alias in ('default', 'replica'):
+            if alias in connections.settings:
+                connections.settings[alias]['NAME'] = str(banco)
+
+        call_command('migrate', verbosity=0)
+        usuario = User.objects.create_superuser(username='benchmark', password=None)
+        itens = Item.objects.bulk_create([
+            Item(codigo=f'AQ{i:06d}', descricao=f'Parafuso {i}' if i % 10 == 0 else f'Item {i}',
+                 unidade_medida='UN', valor_unitario=Decimal('1.00'), estoque_minimo=300, estoque_maximo=1000,
+                 quantidade_atual=(i * 37) % 1200)
+            for i in range(options['itens'])
+        ])
+        sessao = SessionStore()
+        sessao[SESSION_KEY] = str(usuario.pk)
+        sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sessao.create()
+        connections.close_all()
+
+        return {
+            'settings': options['perfil'],
+            'banco': str(banco),
+            'sessao': sessao.session_key,
+            'urls': [
+                ('listagem', reverse('index')),
+                ('busca', f"{reverse('buscar_item')}?q=parafuso"),
+                ('alertas', reverse('api_alertas_estoque')),
+                ('item', reverse('item_detail', kwargs={'pk': itens[0].pk})),
+            ],
+        }
+
+    def _medir(self, parametros):
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, '-c', PROCESSO, json.dumps(parametros)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if processo.returncode:
+            raise CommandError(f'Processo medido falhou:\n{processo.stderr}')
+        resultado = json.loads(processo.stdout.strip().splitlines()[-1])
+        resultado['processo'] = time.perf_counter() - inicio
+        return resultado
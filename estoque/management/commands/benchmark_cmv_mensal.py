@@ -0,0 +1,114 @@
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from estoque.models import Fornecedor, Item, Movimentacao
+from estoque.views import _proximo_mes, get_historical_stock_value, serie_cmv_mensal
+
+
+def serie_por_intervalos(meses):
+    """Forma anterior: o relatório de intervalo único chamado mês a mês (duas varreduras do razão por mês)."""
+    resultado = []
+    for mes in meses:
+        inicio = timezone.make_aware(datetime.combine(mes, datetime.min.time()))
+        fim = timezone.make_aware(datetime.combine(_proximo_mes(mes), datetime.min.time())) - timedelta(microseconds=1)
+        inicial = get_historical_stock_value(inicio)
+        compras = Movimentacao.objects.filter(tipo='ENTRADA', data__range=(inicio, fim)).aggregate(
+            total=Coalesce(Sum(F('quantidade') * F('custo_unitario'), output_field=DecimalField()), Decimal('0')),
+        )['total']
+        final = get_historical_stock_value(fim)
+        resultado.append((inicial, compras, final, inicial + compras - final))
+    return resultado
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a série mensal do custo de uso calculada mês a mês (relatório de "
+        "intervalo único) com a consulta única por somas em janela, sobre vários "
+        "anos de movimentações. Usa um banco temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos', type=int, default=5)
+        parser.add_argument('--itens', type=int, default=2000)
+        parser.add_argument('--fornecedores', type=int, default=20)
+        parser.add_argument('--movimentacoes', type=int, default=200000)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as pasta:
+            connections.close_all()
+            for alias in ('default', 'replica'):
+                if alias in connections.settings:
+                    connections.settings[alias]['NAME'] = str(Path(pasta) / 'cmv_mensal.sqlite3')
+            call_command('migrate', verbosity=0)
+            primeiro_mes = self._popular(options)
+
+            meses = [primeiro_mes]
+            for _ in range(options['anos'] * 12 - 1):
+                meses.append(_proximo_mes(meses[-1]))
+            repeticoes = options['repeticoes']
+            resultados = [
+                ('mes_a_mes', self._medir(lambda: serie_por_intervalos(meses), repeticoes)),
+                ('janela', self._medir(lambda: serie_cmv_mensal(meses[0], meses[-1]), repeticoes)),
+                ('janela_fornecedor', self._medir(
+                    lambda: serie_cmv_mensal(meses[0], meses[-1], por_fornecedor=True), repeticoes,
+                )),
+            ]
+            connections.close_all()
+
+        self.stdout.write(f"{len(meses)} meses, {options['movimentacoes']} movimentações")
+        self.stdout.write(f"{'consulta':<20}{'p50 ms':>10}{'min ms':>10}")
+        for nome, tempos in resultados:
+            self.stdout.write(f"{nome:<20}{statistics.median(tempos):>10.1f}{min(tempos):>10.1f}")
+
+    def _popular(self, options):
+        aleatorio = random.Random(37)
+        fornecedores = Fornecedor.objects.bulk_create([
+            Fornecedor(nome=f'Fornecedor {i}') for i in range(options['fornecedores'])
+        ])
+        itens = Item.objects.bulk_create([
+            Item(codigo=f'CMV{i:06d}', descricao=f'Item {i}', unidade_medida='UN',
+                 valor_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+                 fornecedor=fornecedores[i % len(fornecedores)],
+                 estoque_minimo=10, estoque_maximo=1000, quantidade_atual=100)
+            for i in range(options['itens'])
+        ])
+        inicio = timezone.localdate().replace(day=1)
+        for _ in range(options['anos'] * 12):
+            inicio = (inicio - timedelta(days=1)).replace(day=1)
+        instante_inicial = timezone.make_aware(datetime.combine(inicio, datetime.min.time()))
+        segundos = options['anos'] * 365 * 24 * 3600
+        movimentacoes = Movimentacao.objects.bulk_create([
+            Movimentacao(
+                item=itens[n % len(itens)],
+                tipo='ENTRADA' if n % 3 else 'SAIDA',
+                quantidade=aleatorio.randint(1, 20),
+                custo_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+            )
+            for n in range(options['movimentacoes'])
+        ], batch_size=5000)
+        # data é auto_now_add: as datas espalhadas pelos anos entram por bulk_update
+        for mov in movimentacoes:
+            mov.data = instante_inicial + timedelta(seconds=aleatorio.randrange(segundos))
+        Movimentacao.objects.bulk_update(movimentacoes, ['data'], batch_size=5000)
+        return inicio
+
+    def _medir(self, funcao, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos
@@ -0,0 +1,83 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from estoque import particoes
+from estoque.models import Item, Movimentacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a valorização por item (estoque/particoes.py) com 1 a N processos "
+        "sobre um banco temporário e confere que o resultado não muda."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=5000)
+        parser.add_argument('--movimentacoes', type=int, default=300000)
+        parser.add_argument(
+            '--trabalhadores', default=None,
+            help='Lista separada por vírgulas (padrão: 1, 2, 4... até o número de núcleos).',
+        )
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['trabalhadores']:
+            contagens = [int(n) for n in options['trabalhadores'].split(',')]
+        else:
+            contagens = [1]
+            while contagens[-1] * 2 <= (os.cpu_count() or 1):
+                contagens.append(contagens[-1] * 2)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            connections.close_all()
+            for alias in ('default', 'replica'):
+                if alias in connections.settings:
+                    connections.settings[alias]['NAME'] = str(Path(pasta) / 'particoes.sqlite3')
+            call_command('migrate', verbosity=0)
+            self._popular(options)
+            connections.close_all()
+
+            referencia = None
+            resultados = []
+            for trabalhadores in contagens:
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    inicio = time.perf_counter()
+                    linhas = particoes.valorizacao_por_item(trabalhadores=trabalhadores)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                referencia = referencia or linhas
+                resultados.append((trabalhadores, tempos, linhas == referencia))
+            connections.close_all()
+
+        base = statistics.median(resultados[0][1])
+        self.stdout.write(f"{'processos':<12}{'p50 ms':>10}{'speedup':>10}{'igual':>8}")
+        for trabalhadores, tempos, igual in resultados:
+            mediana = statistics.median(tempos)
+            self.stdout.write(f"{trabalhadores:<12}{mediana:>10.1f}{base / mediana:>10.2f}{'sim' if igual else 'NÃO':>8}")
+
+    def _popular(self, options):
+        aleatorio = random.Random(38)
+        itens = Item.objects.bulk_create([
+            Item(codigo=f'PAR{i:06d}', descricao=f'Item {i}', unidade_medida='UN',
+                 valor_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+                 estoque_minimo=10, estoque_maximo=1000, quantidade_atual=100)
+            for i in range(options['itens'])
+        ])
+        Movimentacao.objects.bulk_create([
+            Movimentacao(
+                item=itens[aleatorio.randrange(len(itens))],
+                tipo='ENTRADA' if n % 3 else 'SAIDA',
+                quantidade=aleatorio.randint(1, 20),
+                custo_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+            )
+            for n in range(options['movimentacoes'])
+        ], batch_size=5000)
@@ -0,0 +1,108 @@
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+
+from estoque.models import Item
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão de requisições concorrentes (POST de movimentacao_create e "
+        "GET de api_alertas_estoque) com o SQLite padrão e com o modo de alta "
+        "concorrência (WAL + pragmas + BEGIN IMMEDIATE). Usa bancos temporários."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operacoes', type=int, default=50, help='Requisições por thread.')
+        parser.add_argument('--itens', type=int, default=200)
+        parser.add_argument(
+            '--proporcao-escrita', type=float, default=0.5,
+            help='Fração das requisições que registram movimentações (0 a 1).',
+        )
+
+    def handle(self, *args, **options):
+        resultados = []
+        with tempfile.TemporaryDirectory() as pasta:
+            for nome, ativo in (('padrao', False), ('alta_concorrencia', True)):
+                resultados.append((nome, self._executar(Path(pasta) / f'{nome}.sqlite3', ativo, options)))
+
+        self.stdout.write(f"{'modo':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'erros':>8}")
+        for nome, r in resultados:
+            self.stdout.write(f"{nome:<20}{r['vazao']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['erros']:>8}")
+
+    def _executar(self, arquivo, ativo, options):
+        connections.close_all()
+        for alias in ('default', 'replica'):
+            if alias in connections.settings:
+                connections.settings[alias]['NAME'] = str(arquivo)
+        settings.SQLITE_ALTA_CONCORRENCIA = ativo
+
+        call_command('migrate', verbosity=0)
+        usuario = User.objects.create_user(username='benchmark')
+        usuario.user_permissions.add(Permission.objects.get(codename='add_movimentacao'))
+        itens = Item.objects.bulk_create([
+            Item(codigo=f'BENCH{i:05d}', descricao=f'Item {i}', unidade_medida='UN',
+                 valor_unitario=Decimal('1.00'), estoque_minimo=300, estoque_maximo=1000,
+                 quantidade_atual=500)
+            for i in range(options['itens'])
+        ])
+        connections.close_all()
+
+        latencias = []
+        erros = []
+        trava = threading.Lock()
+
+        def trabalhador(indice):
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(usuario)
+            escritas = int(options['operacoes'] * options['proporcao_escrita'])
+            for n in range(options['operacoes']):
+                inicio = time.perf_counter()
+                try:
+                    if n < escritas:
+                        item = itens[(indice * options['operacoes'] + n) % len(itens)]
+                        response = client.post(reverse('movimentacao_create'), {
+                            'item': item.pk, 'tipo': 'ENTRADA' if n % 2 else 'SAIDA', 'quantidade': 1,
+                        })
+                    else:
+                        response = client.get(reverse('api_alertas_estoque'))
+                except OperationalError as e:
+                    with trava:
+                        erros.append(str(e))
+                    continue
+                if response.status_code >= 400:
+                    with trava:
+                        erros.append(f'HTTP {response.status_code}')
+                    continue
+                with trava:
+                    latencias.append(time.perf_counter() - inicio)
+            connections.close_all()
+
+        threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(options['threads'])]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+        connections.close_all()
+
+        latencias.sort()
+        return {
+            'vazao': len(latencias) / duracao,
+            'p50': statistics.median(latencias) * 1000 if latencias else 0,
+            'p95': latencias[int(len(latencias) * 0.95) - 1] * 1000 if latencias else 0,
+            'erros': len(erros),
+        }
@@ -0,0 +1,87 @@
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Sum, When
+from django.utils import timezone
+
+from estoque.models import TIPOS_ENTRADA, TIPOS_SAIDA, Item, Movimentacao
+from estoque.views import get_historical_stock_value
+
+
+def valor_historico_com_join(end_date):
+    """Agregação anterior: valoriza o razão pelo valor_unitario atual (JOIN com Item)."""
+    valor = ExpressionWrapper(F('quantidade') * F('item__valor_unitario'), output_field=DecimalField())
+    return Movimentacao.objects.filter(data__lte=end_date).select_related('item').aggregate(
+        total=Sum(Case(
+            When(tipo__in=TIPOS_ENTRADA, then=valor),
+            When(tipo__in=TIPOS_SAIDA, then=valor * Decimal('-1')),
+            default=Decimal('0.00'),
+            output_field=DecimalField(),
+        ))
+    )['total'] or Decimal('0.00')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o tempo do cálculo do valor histórico do estoque com JOIN em "
+        "item__valor_unitario (anterior) e sem JOIN, pelo custo_unitario gravado "
+        "em cada movimentação. Usa um banco temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--itens', type=int, default=2000)
+        parser.add_argument('--movimentacoes', type=int, default=200000)
+        parser.add_argument('--repeticoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as pasta:
+            connections.close_all()
+            for alias in ('default', 'replica'):
+                if alias in connections.settings:
+                    connections.settings[alias]['NAME'] = str(Path(pasta) / 'valorizacao.sqlite3')
+            call_command('migrate', verbosity=0)
+            self._popular(options)
+
+            data_fim = timezone.now()
+            resultados = [
+                ('com_join', self._medir(valor_historico_com_join, data_fim, options['repeticoes'])),
+                ('sem_join', self._medir(get_historical_stock_value, data_fim, options['repeticoes'])),
+            ]
+            connections.close_all()
+
+        self.stdout.write(f"{'consulta':<12}{'p50 ms':>10}{'min ms':>10}")
+        for nome, tempos in resultados:
+            self.stdout.write(f"{nome:<12}{statistics.median(tempos):>10.1f}{min(tempos):>10.1f}")
+
+    def _popular(self, options):
+        aleatorio = random.Random(32)
+        itens = Item.objects.bulk_create([
+            Item(codigo=f'VAL{i:06d}', descricao=f'Item {i}', unidade_medida='UN',
+                 valor_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+                 estoque_minimo=10, estoque_maximo=1000, quantidade_atual=100)
+            for i in range(options['itens'])
+        ])
+        Movimentacao.objects.bulk_create([
+            Movimentacao(
+                item=itens[n % len(itens)],
+                tipo='ENTRADA' if n % 3 else 'SAIDA',
+                quantidade=aleatorio.randint(1, 20),
+                custo_unitario=Decimal(aleatorio.randint(100, 10000)) / 100,
+            )
+            for n in range(options['movimentacoes'])
+        ], batch_size=5000)
+
+    def _medir(self, funcao, data_fim, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao(data_fim)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return tempos
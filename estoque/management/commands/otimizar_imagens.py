@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera ao lado de cada PNG/JPEG de static/imagens uma versão WebP com no "
+        "máximo --largura pixels de largura. Requer o pacote Pillow."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pasta', default=str(Path(settings.STATICFILES_DIRS[0]) / 'imagens'))
+        parser.add_argument('--largura', type=int, default=800)
+        parser.add_argument('--qualidade', type=int, default=80)
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image
+        except ImportError:
+            raise CommandError('Instale o Pillow para converter as imagens (pip install Pillow).')
+
+        largura_maxima = options['largura']
+        for origem in sorted(Path(options['pasta']).iterdir()):
+            if origem.suffix.lower() not in ('.png', '.jpg', '.jpeg'):
+                continue
+            destino = origem.with_suffix('.webp')
+            with Image.open(origem) as imagem:
+                if imagem.width > largura_maxima:
+                    altura = round(imagem.height * largura_maxima / imagem.width)
+                    imagem = imagem.resize((largura_maxima, altura), Image.LANCZOS)
+                imagem.save(destino, 'WEBP', quality=options['qualidade'], method=6)
+            self.stdout.write(
+                f'{origem.name}: {origem.stat().st_size // 1024} KB -> {destino.name}: {destino.stat().st_size // 1024} KB'
+            )
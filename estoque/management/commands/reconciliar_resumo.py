@@ -0,0 +1,154 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from estoque import particoes
+from estoque.models import (
+    Almoxarifado, Item, Lote, ResumoEstoque, ResumoFornecedor, ResumoMovimentacaoDiaria, SaldoEstoque,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os contadores incrementais do painel (ResumoEstoque e "
+        "ResumoMovimentacaoDiaria), os contadores de itens por fornecedor, o "
+        "status indexado dos itens e a soma dos saldos por almoxarifado com um "
+        "recálculo completo, e verifica que os lotes não passam do saldo do local."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Substitui os contadores divergentes pelos valores recalculados.',
+        )
+        parser.add_argument(
+            '--trabalhadores', type=int, default=1,
+            help='Processos para comparar os saldos por almoxarifado (faixas de itens em paralelo).',
+        )
+
+    def handle(self, *args, **options):
+        divergencias = (
+            self._verificar_resumo() + self._verificar_diario() + self._verificar_fornecedores()
+            + self._verificar_status() + self._verificar_saldos(options['trabalhadores'])
+            + self._verificar_lotes()
+        )
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS('Contadores consistentes com o recálculo completo.'))
+            return
+
+        for linha in divergencias:
+            self.stdout.write(self.style.WARNING(linha))
+
+        if not options['corrigir']:
+            raise CommandError(f'{len(divergencias)} divergência(s) encontrada(s). Use --corrigir para ajustar.')
+
+        with transaction.atomic():
+            Item.objects.exclude(status_estoque=Item.expressao_status()).update(
+                status_estoque=Item.expressao_status(),
+            )
+            # A diferença entre o total do item e a soma dos locais vai para o almoxarifado padrão
+            padrao = Almoxarifado.padrao()
+            for item in self._itens_com_saldo_divergente():
+                SaldoEstoque.movimentar(item, padrao, item.quantidade_atual - item.soma_saldos)
+            # Excedente dos lotes sobre o saldo do local: baixa FEFO, como uma saída
+            Lote.consumir([
+                (None, item_id, almoxarifado_id, soma_lotes - quantidade)
+                for item_id, almoxarifado_id, _, _, quantidade, soma_lotes in self._lotes_excedentes()
+            ])
+            ResumoEstoque.recalcular()
+            # Compras e prazos são históricos (ver ResumoFornecedor): só os contadores de itens
+            ResumoFornecedor.recalcular(historico=False)
+            ResumoMovimentacaoDiaria.objects.all().delete()
+            ResumoMovimentacaoDiaria.objects.bulk_create([
+                ResumoMovimentacaoDiaria(
+                    data=data, tipo=tipo,
+                    total_movimentacoes=total, quantidade_total=quantidade,
+                )
+                for (data, tipo), (total, quantidade) in ResumoMovimentacaoDiaria.calcular_valores().items()
+            ])
+        self.stdout.write(self.style.SUCCESS(f'{len(divergencias)} divergência(s) corrigida(s).'))
+
+    def _verificar_resumo(self):
+        esperado = ResumoEstoque.calcular_valores()
+        resumo = ResumoEstoque.objects.filter(pk=ResumoEstoque.PK_UNICA).first()
+        if resumo is None:
+            return ['Resumo do estoque ainda não foi criado.']
+        return [
+            f'Resumo.{campo}: armazenado={getattr(resumo, campo)} recalculado={valor}'
+            for campo, valor in esperado.items()
+            if getattr(resumo, campo) != valor
+        ]
+
+    def _verificar_diario(self):
+        esperado = ResumoMovimentacaoDiaria.calcular_valores()
+        armazenado = {
+            (linha.data, linha.tipo): (linha.total_movimentacoes, linha.quantidade_total)
+            for linha in ResumoMovimentacaoDiaria.objects.all()
+        }
+        divergencias = []
+        for chave in sorted(set(esperado) | set(armazenado)):
+            valor_esperado = esperado.get(chave, (0, 0))
+            valor_armazenado = armazenado.get(chave, (0, 0))
+            if valor_esperado != valor_armazenado:
+                data, tipo = chave
+                divergencias.append(
+                    f'Movimentações {data} {tipo}: armazenado={valor_armazenado} recalculado={valor_esperado}'
+                )
+        return divergencias
+
+    def _verificar_fornecedores(self):
+        esperado = ResumoFornecedor.calcular_itens()
+        vazio = dict.fromkeys(ResumoFornecedor.CAMPOS_ITENS, 0)
+        divergencias = []
+        linhas = ResumoFornecedor.objects.values_list('fornecedor_id', *ResumoFornecedor.CAMPOS_ITENS)
+        armazenados = {linha[0]: dict(zip(ResumoFornecedor.CAMPOS_ITENS, linha[1:])) for linha in linhas}
+        for fornecedor_id in sorted(set(esperado) | set(armazenados)):
+            valor_esperado = esperado.get(fornecedor_id, vazio)
+            valor_armazenado = armazenados.get(fornecedor_id)
+            if valor_armazenado is None:
+                divergencias.append(f'Fornecedor {fornecedor_id}: indicadores ainda não criados')
+            elif valor_armazenado != valor_esperado:
+                divergencias.append(
+                    f'Fornecedor {fornecedor_id}: armazenado={valor_armazenado} recalculado={valor_esperado}'
+                )
+        return divergencias
+
+    def _verificar_status(self):
+        desatualizados = Item.objects.exclude(status_estoque=Item.expressao_status()).count()
+        if not desatualizados:
+            return []
+        return [f'Item.status_estoque: {desatualizados} item(ns) com status desatualizado']
+
+    def _itens_com_saldo_divergente(self):
+        soma = SaldoEstoque.objects.filter(item_id=OuterRef('pk')).values('item_id').annotate(
+            total=Sum('quantidade'),
+        ).values('total')
+        return Item.objects.annotate(soma_saldos=Coalesce(Subquery(soma), 0)).exclude(
+            quantidade_atual=F('soma_saldos'),
+        )
+
+    def _verificar_saldos(self, trabalhadores):
+        divergentes = particoes.executar(
+            particoes.saldos_divergentes_faixa, particoes.combinar_linhas, trabalhadores=trabalhadores,
+        )
+        return [
+            f'Saldos de {codigo}: total do item={quantidade} soma dos almoxarifados={soma}'
+            for codigo, quantidade, soma in divergentes
+        ]
+
+    def _lotes_excedentes(self):
+        soma = Lote.objects.filter(
+            item_id=OuterRef('item_id'), almoxarifado_id=OuterRef('almoxarifado_id'), quantidade__gt=0,
+        ).values('item_id').annotate(total=Sum('quantidade')).values('total')
+        return SaldoEstoque.objects.annotate(soma_lotes=Coalesce(Subquery(soma), 0)).filter(
+            soma_lotes__gt=F('quantidade'),
+        ).values_list('item_id', 'almoxarifado_id', 'item__codigo', 'almoxarifado__codigo', 'quantidade', 'soma_lotes')
+
+    def _verificar_lotes(self):
+        return [
+            f'Lotes de {codigo} em {almoxarifado}: saldo do local={quantidade} soma dos lotes={soma}'
+            for _, _, codigo, almoxarifado, quantidade, soma in self._lotes_excedentes()
+        ]
@@ -0,0 +1,49 @@
+import csv
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from estoque import particoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera em CSV a quantidade e o valor pelo razão de cada item, calculados "
+        "em paralelo por faixas de ids (estoque/particoes.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ate', metavar='AAAA-MM-DD', help='Data de referência (padrão: todo o razão).')
+        parser.add_argument('--trabalhadores', type=int, help='Processos (padrão: RELATORIOS_TRABALHADORES ou núcleos).')
+        parser.add_argument('--saida', help='Arquivo CSV de destino (padrão: saída padrão).')
+
+    def handle(self, *args, **options):
+        ate = None
+        if options['ate']:
+            try:
+                dia = datetime.strptime(options['ate'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Use --ate no formato AAAA-MM-DD.')
+            ate = timezone.make_aware(datetime.combine(dia, datetime.max.time()))
+
+        try:
+            linhas = particoes.valorizacao_por_item(ate=ate, trabalhadores=options['trabalhadores'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        destino = open(options['saida'], 'w', newline='', encoding='utf-8') if options['saida'] else sys.stdout
+        try:
+            escritor = csv.writer(destino)
+            escritor.writerow(['codigo', 'descricao', 'quantidade', 'valor'])
+            total = Decimal('0.00')
+            for _, codigo, descricao, quantidade, valor in linhas:
+                valor = Decimal(valor).quantize(Decimal('0.01'))
+                total += valor
+                escritor.writerow([codigo, descricao, quantidade, valor])
+        finally:
+            if destino is not sys.stdout:
+                destino.close()
+        self.stderr.write(self.style.SUCCESS(f'{len(linhas)} item(ns); valor total R$ {total}'))
@@ -0,0 +1,45 @@
+import re
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from estoque.ativos import ATIVOS, DEPENDENCIAS
+
+# O collectstatic com manifesto exige que todo arquivo referenciado exista;
+# os .map não são distribuídos, então as referências saem
+_MAPA_FONTE = re.compile(rb'/[*/]# sourceMappingURL=[^\n]*')
+
+
+class Command(BaseCommand):
+    help = (
+        "Baixa as bibliotecas de front-end de estoque/ativos.py (e as fontes que "
+        "seus CSS referenciam) para static/vendor/. Rode ao atualizar uma versão "
+        "e versione os arquivos; os templates passam a usá-los automaticamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', default=str(settings.STATICFILES_DIRS[0]))
+        parser.add_argument('--forcar', action='store_true', help='Baixa de novo arquivos já existentes')
+
+    def handle(self, *args, **options):
+        destino = Path(options['destino'])
+        arquivos = list(ATIVOS.values()) + list(DEPENDENCIAS)
+        baixados = 0
+        for caminho, origem in arquivos:
+            arquivo = destino / caminho
+            if arquivo.exists() and not options['forcar']:
+                continue
+            try:
+                with urlopen(origem, timeout=30) as resposta:
+                    conteudo = resposta.read()
+            except OSError as e:
+                raise CommandError(f'Falha ao baixar {origem}: {e}')
+            if caminho.endswith(('.css', '.js')):
+                conteudo = _MAPA_FONTE.sub(b'', conteudo)
+            arquivo.parent.mkdir(parents=True, exist_ok=True)
+            arquivo.write_bytes(conteudo)
+            baixados += 1
+            self.stdout.write(f'{caminho} ({len(conteudo) // 1024} KB)')
+        self.stdout.write(self.style.SUCCESS(f'{baixados} arquivo(s) baixado(s) em {destino}.'))
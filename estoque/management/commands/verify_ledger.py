@@ -0,0 +1,58 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from estoque import razao
+from estoque.models import Item, VerificacaoRazao
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere a cadeia de hashes e os saldos do razão nas movimentações "
+        "lançadas desde o último ponto de verificação, e a quantidade dos itens "
+        "movimentados contra o razão (com --completo, a de todos os itens). Sem "
+        "divergências, avança o ponto de verificação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Confere o razão inteiro e a quantidade de todos os itens, ignorando o ponto de verificação.',
+        )
+        parser.add_argument(
+            '--corrigir', action='store_true',
+            help=(
+                'Refaz a cadeia dos itens divergentes e iguala a quantidade deles à do razão '
+                '(a diferença vai para o almoxarifado padrão).'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        ponto = VerificacaoRazao.obter()
+        desde = 0 if options['completo'] else ponto.ultima_movimentacao
+        divergencias, ultima = razao.verificar(desde)
+
+        if divergencias:
+            codigos = dict(Item.objects.filter(pk__in={item_id for item_id, _ in divergencias}).values_list('pk', 'codigo'))
+            for item_id, descricao in divergencias:
+                self.stdout.write(self.style.WARNING(f'{codigos.get(item_id, item_id)}: {descricao}'))
+            if not options['corrigir']:
+                raise CommandError(
+                    f'{len(divergencias)} divergência(s) no razão após a movimentação {desde}. '
+                    'Use --corrigir para ajustar.'
+                )
+            ajustados = razao.corrigir([item_id for item_id, _ in divergencias], desde)
+            if ajustados:
+                # Saldos por almoxarifado, status e contadores derivados da quantidade
+                call_command('reconciliar_resumo', corrigir=True, stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(divergencias)} divergência(s) corrigida(s); {ajustados} item(ns) com a quantidade ajustada.'
+            ))
+
+        ponto.ultima_movimentacao = max(ultima, ponto.ultima_movimentacao)
+        ponto.verificado_em = timezone.now()
+        ponto.save()
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS(
+                f'Razão consistente até a movimentação {ponto.ultima_movimentacao}.'
+            ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from estoque import aquecimento
+
+
+class Command(BaseCommand):
+    help = (
+        "Aquece o processo: compila rotas e templates, resolve os ativos, lê os "
+        "alertas e preenche os caches da busca e do índice de códigos. O "
+        "gunicorn.conf.py divide as etapas entre o processo mestre (antes do "
+        "fork) e cada worker (caches com validade)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--termos', nargs='*', default=[],
+            help='Termos de busca a guardar em cache além da listagem sem termo.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for etapa, resultado, segundos in aquecimento.aquecer(options['termos']):
+            total += segundos
+            self.stdout.write(f'{etapa:<12}{str(resultado):>14}{segundos * 1000:>10.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Aquecimento concluído em {total * 1000:.1f} ms.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+
+from .routers import CHAVE_SESSAO_PRIMARIO
+
+
+class ReplicaLeituraMiddleware:
+    """
+    Garante "read-your-writes" com a réplica de leitura: após uma requisição
+    de escrita bem-sucedida, as leituras do mesmo usuário ficam no primário
+    por ``settings.REPLICA_ATRASO_MAXIMO`` segundos.
+    """
+
+    METODOS_ESCRITA = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in self.METODOS_ESCRITA and response.status_code < 400 and hasattr(request, 'session'):
+            atraso = getattr(settings, 'REPLICA_ATRASO_MAXIMO', 5)
+            request.session[CHAVE_SESSAO_PRIMARIO] = time.time() + atraso
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-19 02:04
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0002_fornecedor_email_fornecedor_telefone_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor_total_estoque', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total_itens', models.IntegerField(default=0)),
+                ('itens_critico', models.IntegerField(default=0)),
+                ('itens_baixo', models.IntegerField(default=0)),
+                ('itens_ok', models.IntegerField(default=0)),
+                ('itens_alto', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumoMovimentacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo', models.CharField(choices=[('ENTRADA', 'Entrada'), ('SAIDA', 'Saída'), ('RETIRADA', 'Retirada Temporária'), ('DEVOLUCAO', 'Devolução')], max_length=15)),
+                ('total_movimentacoes', models.IntegerField(default=0)),
+                ('quantidade_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='resumomovimentacaodiaria',
+            constraint=models.UniqueConstraint(fields=('data', 'tipo'), name='resumo_mov_diaria_unico'),
+        ),
+    ]
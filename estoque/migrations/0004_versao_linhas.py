@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0003_resumo_estoque'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fornecedor',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
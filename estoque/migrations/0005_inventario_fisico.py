@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-19 02:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('estoque', '0004_versao_linhas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=150)),
+                ('status', models.CharField(choices=[('ABERTO', 'Aberto'), ('APLICADO', 'Aplicado')], default='ABERTO', max_length=10)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('aplicado_em', models.DateTimeField(blank=True, null=True)),
+                ('aplicado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContagemInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade_contada', models.PositiveIntegerField()),
+                ('quantidade_sistema', models.IntegerField(blank=True, null=True)),
+                ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contagens', to='estoque.inventario')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contagens_inventario', to='estoque.item')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='inventario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ajustes', to='estoque.inventario'),
+        ),
+        migrations.AddConstraint(
+            model_name='contageminventario',
+            constraint=models.UniqueConstraint(fields=('inventario', 'item'), name='contagem_inventario_item_unico'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-19 02:15
+
+from django.db import migrations
+import estoque.models
+
+
+def preencher_campos_busca(apps, schema_editor):
+    normalizar = estoque.models.normalizar_busca
+    Item = apps.get_model('estoque', 'Item')
+    Fornecedor = apps.get_model('estoque', 'Fornecedor')
+
+    itens = list(Item.objects.only('codigo', 'descricao'))
+    for item in itens:
+        item.codigo_busca = normalizar(item.codigo)[:20]
+        item.descricao_busca = normalizar(item.descricao)[:150]
+    Item.objects.bulk_update(itens, ['codigo_busca', 'descricao_busca'], batch_size=1000)
+
+    fornecedores = list(Fornecedor.objects.only('nome'))
+    for fornecedor in fornecedores:
+        fornecedor.nome_busca = normalizar(fornecedor.nome)[:100]
+    Fornecedor.objects.bulk_update(fornecedores, ['nome_busca'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0005_inventario_fisico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fornecedor',
+            name='nome_busca',
+            field=estoque.models.CampoBusca(db_index=True, default='', editable=False, max_length=100, origem='nome'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='codigo_busca',
+            field=estoque.models.CampoBusca(db_index=True, default='', editable=False, max_length=20, origem='codigo'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='descricao_busca',
+            field=estoque.models.CampoBusca(db_index=True, default='', editable=False, max_length=150, origem='descricao'),
+        ),
+        migrations.RunPython(preencher_campos_busca, migrations.RunPython.noop),
+    ]
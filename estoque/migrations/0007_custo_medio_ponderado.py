@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 02:17
+
+from django.db import migrations, models
+import estoque.models
+
+
+def preencher_custos(apps, schema_editor):
+    estoque.models.recalcular_custos_historicos(
+        apps.get_model('estoque', 'Item'), apps.get_model('estoque', 'Movimentacao'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0006_campos_busca_autocomplete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='custo_medio',
+            field=models.DecimalField(blank=True, decimal_places=4, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='custo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Somente para entradas. Se vazio, usa o valor unitário do item.', max_digits=14, null=True, verbose_name='Custo unitário'),
+        ),
+        migrations.RunPython(preencher_custos, migrations.RunPython.noop),
+    ]
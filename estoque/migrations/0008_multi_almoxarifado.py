@@ -0,0 +1,105 @@
+# Generated by Django 4.2 on 2026-10-19 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+import estoque.models
+
+
+def distribuir_saldos(apps, schema_editor):
+    """Cria o almoxarifado padrão com o saldo atual de cada item e associa o histórico a ele."""
+    Almoxarifado = apps.get_model('estoque', 'Almoxarifado')
+    Item = apps.get_model('estoque', 'Item')
+    SaldoEstoque = apps.get_model('estoque', 'SaldoEstoque')
+    padrao, _ = Almoxarifado.objects.get_or_create(
+        codigo=settings.ALMOXARIFADO_PADRAO, defaults={'nome': 'Almoxarifado Central'},
+    )
+    Item.objects.update(status_estoque=estoque.models.EstoqueManager.expressao_status(
+        F('quantidade_atual'), F('estoque_minimo'), F('estoque_maximo'),
+    ))
+    SaldoEstoque.objects.bulk_create(
+        [
+            SaldoEstoque(
+                item=Item(pk=pk, estoque_minimo=minimo, estoque_maximo=maximo),
+                almoxarifado=padrao, quantidade=quantidade,
+            )
+            for pk, quantidade, minimo, maximo in Item.objects.filter(quantidade_atual__gt=0).values_list(
+                'pk', 'quantidade_atual', 'estoque_minimo', 'estoque_maximo',
+            ).iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+    apps.get_model('estoque', 'Movimentacao').objects.update(almoxarifado=padrao)
+    apps.get_model('estoque', 'Inventario').objects.update(almoxarifado=padrao)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0007_custo_medio_ponderado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Almoxarifado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=20, unique=True)),
+                ('nome', models.CharField(max_length=100)),
+                ('ativo', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='status_estoque',
+            field=estoque.models.CampoStatusEstoque(db_index=True, default='OK', editable=False, limites=None, max_length=10, quantidade='quantidade_atual'),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='transferencia',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='estoque.movimentacao'),
+        ),
+        migrations.AlterField(
+            model_name='movimentacao',
+            name='tipo',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SAIDA', 'Saída'), ('RETIRADA', 'Retirada Temporária'), ('DEVOLUCAO', 'Devolução'), ('TRANSF_SAIDA', 'Transferência (saída)'), ('TRANSF_ENTRADA', 'Transferência (entrada)')], max_length=15),
+        ),
+        migrations.AlterField(
+            model_name='resumomovimentacaodiaria',
+            name='tipo',
+            field=models.CharField(choices=[('ENTRADA', 'Entrada'), ('SAIDA', 'Saída'), ('RETIRADA', 'Retirada Temporária'), ('DEVOLUCAO', 'Devolução'), ('TRANSF_SAIDA', 'Transferência (saída)'), ('TRANSF_ENTRADA', 'Transferência (entrada)')], max_length=15),
+        ),
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField(default=0)),
+                ('status_estoque', estoque.models.CampoStatusEstoque(default='OK', editable=False, limites='item', max_length=10, quantidade='quantidade')),
+                ('almoxarifado', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='saldos', to='estoque.almoxarifado')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='estoque.item')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='almoxarifado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='inventarios', to='estoque.almoxarifado'),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='almoxarifado',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimentacoes', to='estoque.almoxarifado'),
+        ),
+        migrations.AddIndex(
+            model_name='saldoestoque',
+            index=models.Index(fields=['almoxarifado', 'status_estoque'], name='saldo_almox_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='saldoestoque',
+            constraint=models.UniqueConstraint(fields=('item', 'almoxarifado'), name='saldo_item_almoxarifado_unico'),
+        ),
+        migrations.RunPython(distribuir_saldos, migrations.RunPython.noop),
+    ]
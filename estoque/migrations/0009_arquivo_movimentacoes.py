@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-19 02:31
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0008_multi_almoxarifado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoMovimentacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(unique=True)),
+                ('arquivo', models.CharField(max_length=255)),
+                ('linhas', models.IntegerField()),
+                ('data_inicial', models.DateTimeField()),
+                ('data_final', models.DateTimeField()),
+                ('valor_por_tipo', models.JSONField(default=dict)),
+                ('resumo_diario', models.JSONField(default=dict)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['competencia'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoArquivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corte', models.DateTimeField()),
+                ('quantidade_liquida', models.IntegerField(default=0)),
+                ('valor_liquido', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_arquivado', to='estoque.item')),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-19 02:34
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def numerar_existentes(apps, schema_editor):
+    """
+    Numera as linhas existentes com ``id`` + deslocamento por tabela (um UPDATE
+    por tabela): os números ficam únicos e o contador começa após o maior.
+    """
+    deslocamento = 0
+    for nome in ('Fornecedor', 'Item', 'Movimentacao'):
+        model = apps.get_model('estoque', nome)
+        model.objects.update(sequencia=F('id') + deslocamento)
+        deslocamento += model.objects.aggregate(maior=Max('id'))['maior'] or 0
+    apps.get_model('estoque', 'SequenciaSincronizacao').objects.create(pk=1, valor=deslocamento)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0009_arquivo_movimentacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExclusaoSincronizacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('item', 'Item'), ('fornecedor', 'Fornecedor'), ('movimentacao', 'Movimentação')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('sequencia', models.BigIntegerField(db_index=True)),
+                ('excluido_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SequenciaSincronizacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='fornecedor',
+            name='sequencia',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='sequencia',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='sequencia',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(numerar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0010_sincronizacao_incremental'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['data'], name='mov_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['item', 'data'], name='mov_item_data_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-19 02:59
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('estoque', '0011_indices_movimentacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('item', 'Item'), ('fornecedor', 'Fornecedor'), ('movimentacao', 'Movimentação')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('acao', models.CharField(choices=[('CRIACAO', 'Criação'), ('ALTERACAO', 'Alteração'), ('EXCLUSAO', 'Exclusão')], max_length=10)),
+                ('alteracoes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('data', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='registroauditoria',
+            index=models.Index(fields=['modelo', 'objeto_id', 'data'], name='auditoria_objeto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroauditoria',
+            index=models.Index(fields=['usuario', 'data'], name='auditoria_usuario_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-19 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('estoque', '0012_auditoria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('RASCUNHO', 'Rascunho'), ('RECEBIDO', 'Recebido')], default='RASCUNHO', max_length=10)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('recebido_em', models.DateTimeField(blank=True, null=True)),
+                ('almoxarifado', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pedidos', to='estoque.almoxarifado')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('fornecedor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos', to='estoque.fornecedor')),
+                ('recebido_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ItemPedidoCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.PositiveIntegerField()),
+                ('custo_unitario', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Custo unitário')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linhas_pedido', to='estoque.item')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linhas', to='estoque.pedidocompra')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='pedido',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entradas', to='estoque.pedidocompra'),
+        ),
+        migrations.AddConstraint(
+            model_name='itempedidocompra',
+            constraint=models.UniqueConstraint(fields=('pedido', 'item'), name='pedido_item_unico'),
+        ),
+    ]
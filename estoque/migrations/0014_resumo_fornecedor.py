@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-19 03:08
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Q, Sum
+import django.db.models.deletion
+
+
+def calcular_indicadores(apps, schema_editor):
+    """Cria a linha de indicadores de cada fornecedor com o recálculo completo."""
+    Fornecedor = apps.get_model('estoque', 'Fornecedor')
+    Item = apps.get_model('estoque', 'Item')
+    Movimentacao = apps.get_model('estoque', 'Movimentacao')
+    PedidoCompra = apps.get_model('estoque', 'PedidoCompra')
+    ResumoFornecedor = apps.get_model('estoque', 'ResumoFornecedor')
+
+    valores = {pk: {} for pk in Fornecedor.objects.values_list('pk', flat=True)}
+    for grupo in Item.objects.filter(fornecedor__isnull=False).values('fornecedor_id').annotate(
+        total_itens=Count('id'),
+        itens_critico=Count('id', filter=Q(status_estoque='CRITICO')),
+        itens_baixo=Count('id', filter=Q(status_estoque='BAIXO')),
+    ).order_by():
+        valores[grupo.pop('fornecedor_id')].update(grupo)
+    for grupo in Movimentacao.objects.filter(
+        tipo='ENTRADA', inventario__isnull=True, item__fornecedor__isnull=False,
+    ).values('item__fornecedor_id').annotate(
+        entradas=Count('id'),
+        quantidade_comprada=Sum('quantidade'),
+        valor_compras=Sum(
+            F('quantidade') * F('custo_unitario'), output_field=models.DecimalField(max_digits=18, decimal_places=4),
+        ),
+        ultima_compra=Max('data'),
+    ).order_by():
+        valores[grupo.pop('item__fornecedor_id')].update(grupo)
+    for fornecedor_id, criado_em, recebido_em in PedidoCompra.objects.filter(
+        status='RECEBIDO', fornecedor__isnull=False,
+    ).values_list('fornecedor_id', 'criado_em', 'recebido_em'):
+        campos = valores[fornecedor_id]
+        campos['pedidos_recebidos'] = campos.get('pedidos_recebidos', 0) + 1
+        campos['prazo_total'] = campos.get('prazo_total', 0) + int((recebido_em - criado_em).total_seconds())
+    ResumoFornecedor.objects.bulk_create(
+        [ResumoFornecedor(fornecedor_id=pk, **campos) for pk, campos in valores.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0013_pedidos_compra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoFornecedor',
+            fields=[
+                ('fornecedor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='estoque.fornecedor')),
+                ('total_itens', models.IntegerField(default=0)),
+                ('itens_critico', models.IntegerField(default=0)),
+                ('itens_baixo', models.IntegerField(default=0)),
+                ('entradas', models.IntegerField(default=0)),
+                ('quantidade_comprada', models.BigIntegerField(default=0)),
+                ('valor_compras', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=18)),
+                ('ultima_compra', models.DateTimeField(blank=True, null=True)),
+                ('pedidos_recebidos', models.IntegerField(default=0)),
+                ('prazo_total', models.BigIntegerField(default=0)),
+                ('versao', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+        ),
+        migrations.RunPython(calcular_indicadores, migrations.RunPython.noop),
+    ]
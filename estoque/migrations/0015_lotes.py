@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-19 03:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0014_resumo_fornecedor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.CharField(blank=True, max_length=50, verbose_name='Lote')),
+                ('validade', models.DateField(blank=True, null=True)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('almoxarifado', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lotes', to='estoque.almoxarifado')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='estoque.item')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='lote_numero',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Lote'),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='validade',
+            field=models.DateField(blank=True, null=True, verbose_name='Validade'),
+        ),
+        migrations.CreateModel(
+            name='MovimentacaoLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField()),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentacoes', to='estoque.lote')),
+                ('movimentacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='estoque.movimentacao')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaolote',
+            index=models.Index(fields=['lote', 'movimentacao'], name='movlote_lote_mov_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(condition=models.Q(('quantidade__gt', 0)), fields=['item', 'almoxarifado', 'validade'], name='lote_fefo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(condition=models.Q(('quantidade__gt', 0)), fields=['validade'], name='lote_vencimento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['item', 'almoxarifado', 'numero'], name='lote_identidade_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-19 03:29
+
+from django.db import migrations, models
+import estoque.razao
+
+
+def encadear_historico(apps, schema_editor):
+    estoque.razao.reconstruir(apps.get_model('estoque', 'Item'), apps.get_model('estoque', 'Movimentacao'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0015_lotes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificacaoRazao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_movimentacao', models.BigIntegerField(default=0)),
+                ('verificado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='razao_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='razao_saldo',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='hash_razao',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='movimentacao',
+            name='saldo_razao',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(encadear_historico, migrations.RunPython.noop),
+    ]
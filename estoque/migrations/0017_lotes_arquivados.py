@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-19 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('estoque', '0016_cadeia_razao'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimentacao',
+            name='transferencia',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='estoque.movimentacao'),
+        ),
+        migrations.CreateModel(
+            name='MovimentacaoLoteArquivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movimentacao_id', models.BigIntegerField()),
+                ('data', models.DateTimeField()),
+                ('tipo', models.CharField(choices=[('ENTRADA', 'Entrada'), ('SAIDA', 'Saída'), ('RETIRADA', 'Retirada Temporária'), ('DEVOLUCAO', 'Devolução'), ('TRANSF_SAIDA', 'Transferência (saída)'), ('TRANSF_ENTRADA', 'Transferência (entrada)')], max_length=15)),
+                ('quantidade', models.IntegerField()),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentacoes_arquivadas', to='estoque.lote')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaolotearquivada',
+            index=models.Index(fields=['lote', 'movimentacao_id'], name='movlote_arq_lote_mov_idx'),
+        ),
+    ]
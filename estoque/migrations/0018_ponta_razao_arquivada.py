@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0017_lotes_arquivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saldoarquivado',
+            name='razao_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='saldoarquivado',
+            name='razao_saldo',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
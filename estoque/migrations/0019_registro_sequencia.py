@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-19 05:10
+
+import datetime
+
+import django.utils.timezone
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def continuar_sequencia(apps, schema_editor):
+    """
+    Troca o contador de linha única por um registro com o último número já
+    usado como ``id``: o autoincremento continua a partir dele. O registro
+    fica com data antiga para não contar como lacuna recente.
+    """
+    model = apps.get_model('estoque', 'SequenciaSincronizacao')
+    ultimo = model.objects.filter(pk=1).values_list('valor', flat=True).first() or 0
+    model.objects.all().delete()
+    model.objects.create(pk=max(ultimo, 1), criado_em=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc))
+    with schema_editor.connection.cursor() as cursor:
+        for sql in schema_editor.connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0018_ponta_razao_arquivada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sequenciasincronizacao',
+            name='criado_em',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(continuar_sequencia, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='sequenciasincronizacao',
+            name='valor',
+        ),
+    ]
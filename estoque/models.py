@@ -1,8 +1,69 @@
 # estoque/models.py
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Count, Max, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+from django.db.models.lookups import GreaterThan, LessThan
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+import os
+import unicodedata
+
+from . import auditoria, busca, codigos, razao
+from .sqlite import transacao_escrita
+
+
+def normalizar_busca(texto):
+    """
+    Normaliza um texto para busca: minúsculas, sem acentos e sem espaços repetidos.
+    
+    Args:
+        texto (str): Texto original
+    
+    Returns:
+        str: Texto normalizado (ex.: "Cabo Elétrico" -> "cabo eletrico")
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+class CampoBusca(models.CharField):
+    """
+    Cópia normalizada e indexada de outro campo, usada nas buscas por prefixo
+    (autocomplete). É preenchida em save() e bulk_create() via pre_save().
+    """
+    
+    def __init__(self, *args, origem=None, **kwargs):
+        self.origem = origem
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('db_index', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['origem'] = self.origem
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        valor = normalizar_busca(getattr(model_instance, self.origem))[:self.max_length]
+        setattr(model_instance, self.attname, valor)
+        return valor
+
+    @staticmethod
+    def filtro_prefixo(campo, prefixo):
+        """
+        Filtro por prefixo na forma de intervalo (campo >= p AND campo < p + U+FFFF),
+        que usa o índice B-tree em qualquer banco.
+        """
+        prefixo = normalizar_busca(prefixo)
+        return models.Q(**{f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + '\uffff'})
 
 
 class EstoqueManager:
@@ -30,17 +91,95 @@ class EstoqueManager:
     STATUS_OK = 'OK'
     STATUS_ALTO = 'ALTO'
     
-    def __init__(self, item):
+    # Chaves de get_status_estoque(), na ordem de serialização
+    CAMPOS_STATUS = (
+        'status', 'quantidade_atual', 'estoque_minimo', 'estoque_maximo', 'percentual',
+        'requer_acao', 'mensagem', 'item_id', 'item_codigo', 'item_descricao',
+    )
+    # Chaves das APIs de alerta: as do status mais as de reposição
+    CAMPOS_ALERTA = CAMPOS_STATUS + ('nivel_urgencia', 'quantidade_reposicao_sugerida')
+    # Colunas de Item sempre lidas: o status e a urgência dependem delas
+    COLUNAS_CALCULO = ('id', 'quantidade_atual', 'estoque_minimo', 'estoque_maximo')
+    # Colunas de Item lidas só quando a chave correspondente é pedida
+    COLUNAS_CAMPOS = {'item_codigo': 'codigo', 'item_descricao': 'descricao'}
+    
+    def __init__(self, item, quantidade_atual=None):
         """
         Inicializa o gerenciador com uma instância de Item.
         
         Args:
             item (Item): Instância do modelo Item
+            quantidade_atual (int): Saldo a avaliar (ex.: o de um almoxarifado);
+                por padrão, o saldo total do item
         """
         self.item = item
         self.estoque_minimo = item.estoque_minimo if item.estoque_minimo > 0 else self.ESTOQUE_MINIMO_PADRAO
         self.estoque_maximo = item.estoque_maximo if item.estoque_maximo > 0 else self.ESTOQUE_MAXIMO_PADRAO
-        self.quantidade_atual = item.quantidade_atual
+        self.quantidade_atual = item.quantidade_atual if quantidade_atual is None else quantidade_atual
+    
+    @classmethod
+    def classificar(cls, quantidade, estoque_minimo, estoque_maximo):
+        """
+        Calcula o status de um saldo sem instanciar o gerenciador.
+        
+        Args:
+            quantidade (int): Saldo
+            estoque_minimo (int): Limite mínimo (0 usa o padrão)
+            estoque_maximo (int): Limite máximo (0 usa o padrão)
+        
+        Returns:
+            str: STATUS_CRITICO, STATUS_BAIXO, STATUS_OK ou STATUS_ALTO
+        """
+        minimo = estoque_minimo if estoque_minimo > 0 else cls.ESTOQUE_MINIMO_PADRAO
+        maximo = estoque_maximo if estoque_maximo > 0 else cls.ESTOQUE_MAXIMO_PADRAO
+        if quantidade < minimo * cls.PERCENTUAL_CRITICO:
+            return cls.STATUS_CRITICO
+        elif quantidade < minimo:
+            return cls.STATUS_BAIXO
+        elif quantidade > maximo:
+            return cls.STATUS_ALTO
+        return cls.STATUS_OK
+    
+    @classmethod
+    def expressao_limites(cls, estoque_minimo, estoque_maximo):
+        """
+        Limites efetivos no banco (0 usa o padrão), como no __init__.
+        
+        Returns:
+            tuple: (Case do mínimo, Case do máximo)
+        """
+        minimo = models.Case(
+            models.When(GreaterThan(estoque_minimo, 0), then=estoque_minimo),
+            default=models.Value(cls.ESTOQUE_MINIMO_PADRAO),
+        )
+        maximo = models.Case(
+            models.When(GreaterThan(estoque_maximo, 0), then=estoque_maximo),
+            default=models.Value(cls.ESTOQUE_MAXIMO_PADRAO),
+        )
+        return minimo, maximo
+    
+    @classmethod
+    def expressao_status(cls, quantidade, estoque_minimo, estoque_maximo):
+        """
+        Equivalente SQL de classificar(), para UPDATEs e agregações no banco.
+        
+        Args:
+            quantidade, estoque_minimo, estoque_maximo: expressões (ex.: F('quantidade_atual'))
+        
+        Returns:
+            Case: expressão com o código do status
+        """
+        minimo, maximo = cls.expressao_limites(estoque_minimo, estoque_maximo)
+        limite_critico = models.ExpressionWrapper(
+            minimo * models.Value(cls.PERCENTUAL_CRITICO), output_field=models.FloatField(),
+        )
+        return models.Case(
+            models.When(LessThan(quantidade, limite_critico), then=models.Value(cls.STATUS_CRITICO)),
+            models.When(LessThan(quantidade, minimo), then=models.Value(cls.STATUS_BAIXO)),
+            models.When(GreaterThan(quantidade, maximo), then=models.Value(cls.STATUS_ALTO)),
+            default=models.Value(cls.STATUS_OK),
+            output_field=models.CharField(),
+        )
     
     def verifica_estoque_critico(self):
         """
@@ -81,10 +220,71 @@ class EstoqueManager:
             return 0.0
         return (self.quantidade_atual / self.estoque_minimo) * 100
     
-    def get_status_estoque(self):
+    def get_status(self):
+        """
+        Retorna apenas o código do status atual do estoque.
+        
+        Returns:
+            str: STATUS_CRITICO, STATUS_BAIXO, STATUS_OK ou STATUS_ALTO
+        """
+        return self.classificar(self.quantidade_atual, self.estoque_minimo, self.estoque_maximo)
+    
+    @classmethod
+    def colunas_item(cls, campos):
+        """
+        Colunas de Item necessárias para serializar as chaves pedidas.
+        
+        Args:
+            campos (iterable): Chaves de CAMPOS_ALERTA
+        
+        Returns:
+            list: Nomes de campos para QuerySet.only()
+        """
+        return list(cls.COLUNAS_CALCULO) + [cls.COLUNAS_CAMPOS[campo] for campo in campos if campo in cls.COLUNAS_CAMPOS]
+    
+    def get_mensagem(self, status=None):
+        """
+        Descrição legível do status.
+        
+        Args:
+            status (str): Status já calculado (por padrão, get_status())
+        
+        Returns:
+            str: Mensagem com o saldo e o limite ultrapassado
+        """
+        status = status or self.get_status()
+        if status == self.STATUS_CRITICO:
+            return f"CRÍTICO: Estoque abaixo de 50% do mínimo ({self.quantidade_atual}/{self.estoque_minimo})"
+        elif status == self.STATUS_BAIXO:
+            return f"BAIXO: Estoque abaixo do mínimo ({self.quantidade_atual}/{self.estoque_minimo})"
+        elif status == self.STATUS_ALTO:
+            return f"ALTO: Estoque acima do máximo ({self.quantidade_atual}/{self.estoque_maximo})"
+        return f"OK: Estoque dentro dos limites ({self.quantidade_atual})"
+    
+    # Chave -> valor; os derivados (percentual, mensagem, ...) só são calculados se pedidos
+    _VALORES = {
+        'status': lambda manager, status: status,
+        'quantidade_atual': lambda manager, status: manager.quantidade_atual,
+        'estoque_minimo': lambda manager, status: manager.estoque_minimo,
+        'estoque_maximo': lambda manager, status: manager.estoque_maximo,
+        'percentual': lambda manager, status: round(manager.get_percentual_estoque(), 2),
+        'requer_acao': lambda manager, status: status != manager.STATUS_OK,
+        'mensagem': lambda manager, status: manager.get_mensagem(status),
+        'item_id': lambda manager, status: manager.item.id,
+        'item_codigo': lambda manager, status: manager.item.codigo,
+        'item_descricao': lambda manager, status: manager.item.descricao,
+        'nivel_urgencia': lambda manager, status: manager.get_nivel_urgencia(),
+        'quantidade_reposicao_sugerida': lambda manager, status: manager.calcular_quantidade_reposicao(),
+    }
+    
+    def get_status_estoque(self, campos=None):
         """
         Retorna o status atual do estoque com informações detalhadas.
         
+        Args:
+            campos (iterable): Chaves a incluir, de CAMPOS_ALERTA (None: CAMPOS_STATUS;
+                vazio: nenhuma)
+        
         Returns:
             dict: Dicionário contendo:
                 - status (str): STATUS_CRITICO, STATUS_BAIXO, STATUS_OK ou STATUS_ALTO
@@ -94,38 +294,12 @@ class EstoqueManager:
                 - percentual (float): Percentual em relação ao mínimo
                 - requer_acao (bool): Se requer ação imediata
                 - mensagem (str): Descrição do status
+                - item_id, item_codigo, item_descricao: Identificação do item
         """
-        percentual = self.get_percentual_estoque()
-        
-        if self.verifica_estoque_critico():
-            status = self.STATUS_CRITICO
-            requer_acao = True
-            mensagem = f"CRÍTICO: Estoque abaixo de 50% do mínimo ({self.quantidade_atual}/{self.estoque_minimo})"
-        elif self.verifica_estoque_baixo():
-            status = self.STATUS_BAIXO
-            requer_acao = True
-            mensagem = f"BAIXO: Estoque abaixo do mínimo ({self.quantidade_atual}/{self.estoque_minimo})"
-        elif self.verifica_estoque_alto():
-            status = self.STATUS_ALTO
-            requer_acao = True
-            mensagem = f"ALTO: Estoque acima do máximo ({self.quantidade_atual}/{self.estoque_maximo})"
-        else:
-            status = self.STATUS_OK
-            requer_acao = False
-            mensagem = f"OK: Estoque dentro dos limites ({self.quantidade_atual})"
-        
-        return {
-            'status': status,
-            'quantidade_atual': self.quantidade_atual,
-            'estoque_minimo': self.estoque_minimo,
-            'estoque_maximo': self.estoque_maximo,
-            'percentual': round(percentual, 2),
-            'requer_acao': requer_acao,
-            'mensagem': mensagem,
-            'item_id': self.item.id,
-            'item_codigo': self.item.codigo,
-            'item_descricao': self.item.descricao
-        }
+        if campos is None:
+            campos = self.CAMPOS_STATUS
+        status = self.get_status()
+        return {campo: self._VALORES[campo](self, status) for campo in campos}
     
     def requer_reposicao(self):
         """
@@ -162,12 +336,118 @@ class EstoqueManager:
             return 1
         return 0
 
+class CampoStatusEstoque(models.CharField):
+    """
+    Status do saldo (CRITICO, BAIXO, OK ou ALTO) gravado em coluna indexada,
+    para que os alertas filtrem pelo índice em vez de avaliar cada item em
+    Python. É preenchido em save() e bulk_create() via pre_save(); caminhos
+    com QuerySet.update() usam EstoqueManager.expressao_status().
+    """
+    
+    def __init__(self, *args, quantidade='quantidade_atual', limites=None, **kwargs):
+        # limites: atributo do objeto com estoque_minimo/estoque_maximo (None = a própria instância)
+        self.quantidade = quantidade
+        self.limites = limites
+        kwargs.setdefault('max_length', 10)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', EstoqueManager.STATUS_OK)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['quantidade'] = self.quantidade
+        kwargs['limites'] = self.limites
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        limites = getattr(model_instance, self.limites) if self.limites else model_instance
+        valor = EstoqueManager.classificar(
+            getattr(model_instance, self.quantidade), limites.estoque_minimo, limites.estoque_maximo,
+        )
+        setattr(model_instance, self.attname, valor)
+        return valor
+
+
+def incrementar_versao(instance, save_kwargs):
+    """Avança o campo ``versao`` da instância antes de um save()."""
+    instance.versao = (instance.versao or 0) + 1
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        save_kwargs['update_fields'] = set(update_fields) | {'versao'}
+
+
+def registrar_sequencia(instance, save_kwargs):
+    """
+    Atribui à instância o próximo número da sequência de sincronização
+    (ver SequenciaSincronizacao). Deve ser chamada dentro da transação do save().
+    """
+    instance.sequencia = SequenciaSincronizacao.reservar()
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        save_kwargs['update_fields'] = set(update_fields) | {'sequencia'}
+
+
 class Fornecedor(models.Model):
     nome = models.CharField(max_length=100) # Nome/Razão Social
     cnpj = models.CharField("CNPJ", max_length=18, blank=True, null=True)
     contato = models.CharField("Pessoa de Contato", max_length=100, blank=True, null=True)
     telefone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(max_length=100, blank=True, null=True)
+    nome_busca = CampoBusca(max_length=100, origem='nome')
+    # Incrementada a cada save(); compõe a chave do cache das linhas da listagem
+    versao = models.PositiveIntegerField(default=0, editable=False)
+    # Posição da última alteração na sequência global (API de sincronização)
+    sequencia = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    # Campos cujas alterações vão para a trilha de auditoria (estoque/auditoria.py)
+    CAMPOS_AUDITORIA = ('nome', 'cnpj', 'contato', 'telefone', 'email')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        auditoria.guardar_estado(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        novo = self._state.adding
+        incrementar_versao(self, kwargs)
+        with transaction.atomic():
+            registrar_sequencia(self, kwargs)
+            super().save(*args, **kwargs)
+            if novo:
+                ResumoFornecedor.objects.create(fornecedor=self)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            itens = list(Item.objects.filter(fornecedor=self).values_list('pk', flat=True))
+            ExclusaoSincronizacao.registrar(self)
+            resultado = super().delete(*args, **kwargs)
+            # O SET_NULL em Item.fornecedor não passa por Item.save()
+            SequenciaSincronizacao.renumerar(Item, itens)
+        return resultado
+
+    def __str__(self):
+        return self.nome
+
+class Almoxarifado(models.Model):
+    """Unidade de armazenagem (local) com saldos próprios de cada item."""
+    codigo = models.CharField(max_length=20, unique=True)
+    nome = models.CharField(max_length=100)
+    ativo = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['nome']
+
+    @classmethod
+    def padrao(cls):
+        """
+        Almoxarifado usado quando a movimentação não informa o local
+        (``settings.ALMOXARIFADO_PADRAO``); é criado na primeira chamada.
+        """
+        almoxarifado, _ = cls.objects.get_or_create(
+            codigo=settings.ALMOXARIFADO_PADRAO, defaults={'nome': 'Almoxarifado Central'},
+        )
+        return almoxarifado
 
     def __str__(self):
         return self.nome
@@ -181,6 +461,20 @@ class Item(models.Model):
     estoque_minimo = models.IntegerField(default=0)
     estoque_maximo = models.IntegerField(default=0)
     quantidade_atual = models.IntegerField(default=0)
+    # Custo médio ponderado, atualizado a cada ENTRADA (ver Movimentacao.save)
+    custo_medio = models.DecimalField(max_digits=14, decimal_places=4, null=True, blank=True, editable=False)
+    codigo_busca = CampoBusca(max_length=20, origem='codigo')
+    descricao_busca = CampoBusca(max_length=150, origem='descricao')
+    # Status do saldo total, indexado para os alertas (ver CampoStatusEstoque)
+    status_estoque = CampoStatusEstoque(db_index=True)
+    # Incrementada a cada save(); compõe a chave do cache das linhas da listagem
+    versao = models.PositiveIntegerField(default=0, editable=False)
+    # Posição da última alteração na sequência global (API de sincronização)
+    sequencia = models.BigIntegerField(default=0, db_index=True, editable=False)
+    # Ponta da cadeia do razão (estoque/razao.py): total segundo as movimentações
+    # e hash da última; começa na quantidade com que o item foi cadastrado
+    razao_saldo = models.IntegerField(default=0, editable=False)
+    razao_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
 
     # NOVO: Calcula o valor total deste item em estoque
     @property
@@ -188,6 +482,15 @@ class Item(models.Model):
         # O cálculo deve ser feito com o custo (valor_unitario)
         return self.quantidade_atual * self.valor_unitario
     
+    @property
+    def valor_estoque_custo_medio(self):
+        """Valor deste item em estoque pelo custo médio ponderado."""
+        return self.quantidade_atual * self.get_custo_medio()
+
+    def get_custo_medio(self):
+        """Custo médio ponderado (ou o valor unitário, antes da primeira entrada)."""
+        return self.custo_medio if self.custo_medio is not None else self.valor_unitario
+
     @property
     def estoque_manager(self):
         """
@@ -204,33 +507,1992 @@ class Item(models.Model):
         """
         return EstoqueManager(self)
 
+    CAMPOS_RESUMO = ('quantidade_atual', 'valor_unitario', 'estoque_minimo', 'estoque_maximo')
+    # Campos cujas alterações vão para a trilha de auditoria (estoque/auditoria.py);
+    # quantidade_atual fica de fora: o histórico dela são as movimentações
+    CAMPOS_AUDITORIA = (
+        'codigo', 'descricao', 'unidade_medida', 'valor_unitario', 'fornecedor_id', 'estoque_minimo', 'estoque_maximo',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o estado carregado para calcular o delta dos contadores no save()
+        diferidos = instance.get_deferred_fields()
+        if not diferidos & set(cls.CAMPOS_RESUMO):
+            instance._estado_resumo = instance.get_estado_resumo()
+            instance._quantidade_salva = instance.quantidade_atual
+        if 'fornecedor_id' not in diferidos:
+            instance._fornecedor_salvo = instance.fornecedor_id
+        auditoria.guardar_estado(instance)
+        return instance
+
+    @staticmethod
+    def expressao_status():
+        """Status do saldo total calculado no banco (ver EstoqueManager.expressao_status)."""
+        return EstoqueManager.expressao_status(F('quantidade_atual'), F('estoque_minimo'), F('estoque_maximo'))
+
+    def get_estado_resumo(self):
+        """
+        Retorna a contribuição deste item para os contadores do ResumoEstoque.
+        
+        Returns:
+            tuple: (valor_total_estoque, status)
+        """
+        return (self.valor_total_estoque, self.estoque_manager.get_status())
+
+    def save(self, *args, sincronizar_saldos=True, **kwargs):
+        """
+        Salva o item e ajusta os contadores do ResumoEstoque.
+        
+        Args:
+            sincronizar_saldos (bool): Lança a variação de ``quantidade_atual``
+                no almoxarifado padrão e reavalia o status dos saldos por local
+                (edição direta do item). Movimentações passam False, pois já
+                atualizaram o saldo do seu almoxarifado.
+        """
+        anterior = getattr(self, '_estado_resumo', None)
+        quantidade_anterior = getattr(self, '_quantidade_salva', None)
+        fornecedor_anterior = getattr(self, '_fornecedor_salvo', None)
+        if not self._state.adding and (anterior is None or not hasattr(self, '_fornecedor_salvo')):
+            # Instância carregada sem os campos do resumo: busca o estado salvo
+            salvo = Item.objects.filter(pk=self.pk).only(*self.CAMPOS_RESUMO, 'fornecedor').first()
+            if anterior is None:
+                anterior = salvo.get_estado_resumo() if salvo else None
+                quantidade_anterior = salvo.quantidade_atual if salvo else None
+            fornecedor_anterior = salvo.fornecedor_id if salvo else None
+        if self.custo_medio is None and self.valor_unitario is not None:
+            self.custo_medio = self.valor_unitario
+        if self._state.adding:
+            # Saldo de abertura do razão
+            self.razao_saldo = self.quantidade_atual
+        incrementar_versao(self, kwargs)
+        with transaction.atomic():
+            registrar_sequencia(self, kwargs)
+            super().save(*args, **kwargs)
+            atual = self.get_estado_resumo()
+            ResumoEstoque.aplicar_delta(anterior, atual)
+            ResumoFornecedor.aplicar_deltas([(
+                (fornecedor_anterior, anterior[1]) if anterior is not None else None,
+                (self.fornecedor_id, atual[1]),
+            )])
+            if sincronizar_saldos:
+                SaldoEstoque.sincronizar_item(self, self.quantidade_atual - (quantidade_anterior or 0))
+        self._estado_resumo = atual
+        self._quantidade_salva = self.quantidade_atual
+        self._fornecedor_salvo = self.fornecedor_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            anterior = Item.objects.filter(pk=self.pk).only(*self.CAMPOS_RESUMO, 'fornecedor').first()
+            ResumoMovimentacaoDiaria.remover_item(self)
+            # As movimentações do item saem em cascata; a exclusão do item basta para os clientes
+            ExclusaoSincronizacao.registrar(self)
+            resultado = super().delete(*args, **kwargs)
+            if anterior is not None:
+                estado = anterior.get_estado_resumo()
+                ResumoEstoque.aplicar_delta(estado, None)
+                # Os totais de compras do fornecedor são históricos e permanecem
+                ResumoFornecedor.aplicar_deltas([((anterior.fornecedor_id, estado[1]), None)])
+        self._estado_resumo = None
+        return resultado
+
     def __str__(self):
         return f"{self.codigo} - {self.descricao}"
 
+
+class SaldoEstoque(models.Model):
+    """
+    Saldo de um item em um almoxarifado.
+    
+    ``Item.quantidade_atual`` é a soma dos saldos do item em todos os locais;
+    ambos são atualizados na mesma transação da movimentação. O status por
+    local usa os limites do item e fica em coluna indexada junto com o
+    almoxarifado, para que os alertas de um local leiam só as linhas em alerta.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='saldos')
+    almoxarifado = models.ForeignKey(Almoxarifado, on_delete=models.PROTECT, related_name='saldos')
+    quantidade = models.IntegerField(default=0)
+    status_estoque = CampoStatusEstoque(quantidade='quantidade', limites='item')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'almoxarifado'], name='saldo_item_almoxarifado_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['almoxarifado', 'status_estoque'], name='saldo_almox_status_idx'),
+        ]
+
+    @property
+    def estoque_manager(self):
+        """EstoqueManager avaliando o saldo deste local com os limites do item."""
+        return EstoqueManager(self.item, self.quantidade)
+
+    @classmethod
+    def movimentar(cls, item, almoxarifado, variacao):
+        """
+        Soma ``variacao`` ao saldo do item no almoxarifado (criando a linha se
+        preciso), sem deixar o saldo negativo.
+        
+        Args:
+            item (Item): Item movimentado (seus limites definem o status)
+            almoxarifado (Almoxarifado): Local
+            variacao (int): Quantidade positiva (entrada) ou negativa (saída)
+        
+        Returns:
+            int: Variação efetivamente aplicada
+        """
+        saldo = cls.objects.select_for_update().filter(item=item, almoxarifado=almoxarifado).first()
+        if saldo is None:
+            saldo = cls(almoxarifado=almoxarifado, quantidade=0)
+        saldo.item = item
+        nova = max(0, saldo.quantidade + variacao)
+        aplicada = nova - saldo.quantidade
+        if aplicada or saldo._state.adding:
+            saldo.quantidade = nova
+            saldo.save()
+        return aplicada
+
+    @classmethod
+    def sincronizar_item(cls, item, variacao):
+        """
+        Após uma edição direta do item: lança a variação de quantidade no
+        almoxarifado padrão e reavalia o status dos saldos (os limites podem
+        ter mudado). Custa uma consulta por chamada, mais as escritas.
+        """
+        if variacao:
+            padrao = Almoxarifado.padrao()
+            aplicada = cls.movimentar(item, padrao, variacao)
+            if aplicada < 0:
+                # Sem movimentação: baixa os lotes sem registrar no histórico deles
+                Lote.consumir([(None, item.pk, padrao.pk, -aplicada)])
+        alterados = []
+        for saldo in cls.objects.filter(item=item):
+            status = EstoqueManager.classificar(saldo.quantidade, item.estoque_minimo, item.estoque_maximo)
+            if status != saldo.status_estoque:
+                saldo.status_estoque = status
+                alterados.append(saldo)
+        cls.objects.bulk_update(alterados, ['status_estoque'])
+
+    def __str__(self):
+        return f"{self.item.codigo} @ {self.almoxarifado}: {self.quantidade}"
+
+# Tipos que somam / subtraem do estoque no razão de movimentações
+TIPOS_ENTRADA = ('ENTRADA', 'DEVOLUCAO')
+TIPOS_SAIDA = ('SAIDA', 'RETIRADA')
+# Pares de transferência entre almoxarifados: não alteram o saldo total do item
+TIPOS_TRANSFERENCIA = ('TRANSF_SAIDA', 'TRANSF_ENTRADA')
+
+
+def recalcular_custos_historicos(item_model, movimentacao_model, tamanho_lote=2000):
+    """
+    Reprocessa o razão em ordem cronológica preenchendo ``Movimentacao.custo_unitario``
+    e ``Item.custo_medio`` (usado pela migração e por ``manage.py backfill_custo_medio``).
+    
+    O saldo de abertura de cada item (quantidade atual menos o líquido do razão)
+    é valorizado pelo ``valor_unitario``; custos já informados nas ENTRADAs são mantidos.
+    
+    Args:
+        item_model, movimentacao_model: classes de modelo (reais ou históricas)
+        tamanho_lote (int): linhas por bulk_update
+    
+    Returns:
+        tuple: (itens_atualizados, movimentacoes_atualizadas)
+    """
+    liquidos = dict(
+        movimentacao_model.objects.values('item_id').annotate(liquido=Sum(models.Case(
+            models.When(tipo__in=TIPOS_ENTRADA, then=F('quantidade')),
+            models.When(tipo__in=TIPOS_SAIDA, then=-F('quantidade')),
+            default=0,
+        ))).order_by().values_list('item_id', 'liquido')
+    )
+    estado = {}
+    for pk, quantidade, valor_unitario in item_model.objects.values_list(
+        'pk', 'quantidade_atual', 'valor_unitario'
+    ).iterator(chunk_size=tamanho_lote):
+        estado[pk] = [max(0, quantidade - (liquidos.get(pk) or 0)), valor_unitario, valor_unitario]
+    
+    pendentes = []
+    total_movimentacoes = 0
+    movimentacoes = movimentacao_model.objects.order_by('item_id', 'data', 'id').values_list(
+        'pk', 'item_id', 'tipo', 'quantidade', 'custo_unitario',
+    )
+    for pk, item_id, tipo, quantidade, custo in movimentacoes.iterator(chunk_size=tamanho_lote):
+        saldo, medio, valor_unitario = estado[item_id]
+        if tipo == 'ENTRADA':
+            if custo is None:
+                custo = valor_unitario
+            total = saldo + quantidade
+            if total > 0:
+                medio = ((saldo * medio + quantidade * custo) / total).quantize(Decimal('0.0001'))
+            saldo = total
+        else:
+            custo = medio
+            if tipo in TIPOS_ENTRADA:
+                saldo += quantidade
+            elif tipo in TIPOS_SAIDA:
+                saldo = max(0, saldo - quantidade)
+        estado[item_id] = [saldo, medio, valor_unitario]
+        pendentes.append(movimentacao_model(pk=pk, custo_unitario=custo))
+        if len(pendentes) >= tamanho_lote:
+            movimentacao_model.objects.bulk_update(pendentes, ['custo_unitario'])
+            total_movimentacoes += len(pendentes)
+            pendentes = []
+    if pendentes:
+        movimentacao_model.objects.bulk_update(pendentes, ['custo_unitario'])
+        total_movimentacoes += len(pendentes)
+    
+    itens = [item_model(pk=pk, custo_medio=medio) for pk, (_, medio, _) in estado.items()]
+    item_model.objects.bulk_update(itens, ['custo_medio'], batch_size=tamanho_lote)
+    return len(itens), total_movimentacoes
+
+
 class Movimentacao(models.Model):
     TIPO_CHOICES = [
         ('ENTRADA', 'Entrada'),
         ('SAIDA', 'Saída'),
         ('RETIRADA', 'Retirada Temporária'),
         ('DEVOLUCAO', 'Devolução'),
+        ('TRANSF_SAIDA', 'Transferência (saída)'),
+        ('TRANSF_ENTRADA', 'Transferência (entrada)'),
     ]
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    # Vazio na criação = almoxarifado padrão (preenchido em save())
+    almoxarifado = models.ForeignKey(
+        Almoxarifado, on_delete=models.PROTECT, null=True, blank=True, related_name='movimentacoes',
+    )
     tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
     quantidade = models.IntegerField()
     data = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     data_devolucao_prevista = models.DateField(null=True, blank=True)
+    # Custo unitário no momento do lançamento: preço de compra nas ENTRADAs,
+    # custo médio do item nas demais. Permite valorizar o histórico sem JOIN.
+    custo_unitario = models.DecimalField(
+        "Custo unitário", max_digits=14, decimal_places=4, null=True, blank=True,
+        help_text="Somente para entradas. Se vazio, usa o valor unitário do item.",
+    )
+    # Preenchido nos ajustes gerados pela aplicação de um inventário físico
+    inventario = models.ForeignKey('Inventario', on_delete=models.SET_NULL, null=True, blank=True, related_name='ajustes')
+    # Movimentação correspondente do outro almoxarifado, nas transferências
+    # Sem restrição no banco: o arquivamento pode levar uma das metades do par
+    # para um segmento (ver SegmentoMovimentacao), e a outra mantém o id dela
+    transferencia = models.ForeignKey(
+        'self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+    )
+    # Preenchido nas ENTRADAs geradas pelo recebimento de um pedido de compra
+    pedido = models.ForeignKey('PedidoCompra', on_delete=models.SET_NULL, null=True, blank=True, related_name='entradas')
+    # Lote criado (ou acrescido) pelas entradas; vazios = entrada sem lote (ver Lote)
+    lote_numero = models.CharField("Lote", max_length=50, blank=True)
+    validade = models.DateField("Validade", null=True, blank=True)
+    # Elo da cadeia do razão do item (estoque/razao.py): total do item após a
+    # movimentação e hash encadeado com a anterior
+    saldo_razao = models.IntegerField(default=0, editable=False)
+    hash_razao = models.CharField(max_length=64, blank=True, default='', editable=False)
+    # Posição da última alteração na sequência global (API de sincronização)
+    sequencia = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Hierarquia de datas e ordenação do admin, somas históricas por intervalo
+            models.Index(fields=['data'], name='mov_data_idx'),
+            # Movimentações recentes de um item (item_detail)
+            models.Index(fields=['item', 'data'], name='mov_item_data_idx'),
+        ]
+
+    # Campos cujas alterações vão para a trilha de auditoria (estoque/auditoria.py)
+    CAMPOS_AUDITORIA = ('item_id', 'almoxarifado_id', 'tipo', 'quantidade', 'custo_unitario', 'data_devolucao_prevista')
+    # Aplicados aos saldos, lotes, custo médio e razão na criação; fixos depois dela
+    CAMPOS_EFEITO = ('item_id', 'almoxarifado_id', 'tipo', 'quantidade', 'custo_unitario', 'lote_numero', 'validade')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        auditoria.guardar_estado(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Salva movimentação e atualiza o saldo do almoxarifado, o estoque do item
+        # (soma dos almoxarifados) e os contadores do resumo. Os efeitos valem só
+        # na criação: numa movimentação já gravada, apenas os campos fora de
+        # CAMPOS_EFEITO podem mudar, sem nova sequência (ela compõe o hash do razão)
+        if not self._state.adding:
+            self._validar_alteracao()
+            super().save(*args, **kwargs)
+            return
+        with transacao_escrita():
+            if self.almoxarifado_id is None:
+                self.almoxarifado = Almoxarifado.padrao()
+            self._recarregar_item()
+            self._aplicar_custo()
+            registrar_sequencia(self, kwargs)
+            if self.tipo in TIPOS_ENTRADA or self.tipo == 'TRANSF_ENTRADA':
+                variacao = self.quantidade
+            elif self.tipo in ('SAIDA', 'RETIRADA', 'TRANSF_SAIDA'):
+                variacao = -self.quantidade
+            else:
+                variacao = 0
+            # O saldo do local não fica negativo; o total acompanha o que foi aplicado
+            aplicada = SaldoEstoque.movimentar(self.item, self.almoxarifado, variacao)
+            if self.tipo not in TIPOS_TRANSFERENCIA:
+                self.item.quantidade_atual += aplicada
+            razao.encadear(self, self.item, 0 if self.tipo in TIPOS_TRANSFERENCIA else aplicada)
+            super().save(*args, **kwargs)
+            self.item.save(sincronizar_saldos=False)
+            self._movimentar_lotes(aplicada)
+            ResumoMovimentacaoDiaria.registrar(self)
+            if self.tipo == 'ENTRADA' and self.inventario_id is None:
+                ResumoFornecedor.registrar_compras([
+                    (self.item.fornecedor_id, self.quantidade, self.quantidade * self.custo_unitario, self.data),
+                ])
+
+    def _validar_alteracao(self):
+        """
+        Impede que uma movimentação gravada mude de efeito (saldos, lotes,
+        custo e razão já foram aplicados com os valores originais).
+        
+        Raises:
+            ValidationError: se algum campo de ``CAMPOS_EFEITO`` mudou
+        """
+        gravado = Movimentacao.objects.filter(pk=self.pk).values(*self.CAMPOS_EFEITO).first()
+        if gravado is None:
+            return
+        alterados = [campo for campo, valor in gravado.items() if getattr(self, campo) != valor]
+        if alterados:
+            raise ValidationError(
+                f'Movimentações gravadas não podem mudar {", ".join(alterados)}; '
+                'registre uma movimentação de correção.'
+            )
+
+    def delete(self, *args, **kwargs):
+        # Saldos, lotes, custo médio e a cadeia do razão já contam com ela:
+        # correções são movimentações inversas. A exclusão de um item remove as
+        # movimentações dele em cascata, sem passar por aqui.
+        raise ValidationError('Movimentações não podem ser excluídas; registre uma movimentação inversa.')
+
+    @classmethod
+    def transferir(cls, item, origem, destino, quantidade, usuario=None):
+        """
+        Transfere saldo entre almoxarifados com um par de movimentações
+        (TRANSF_SAIDA na origem e TRANSF_ENTRADA no destino) ligadas pelo
+        campo ``transferencia``. O saldo total do item não muda.
+        
+        Args:
+            item (Item): Item transferido
+            origem (Almoxarifado): Local de saída
+            destino (Almoxarifado): Local de entrada
+            quantidade (int): Quantidade transferida
+            usuario (User): Responsável
+        
+        Returns:
+            tuple: (movimentacao_saida, movimentacao_entrada)
+        
+        Raises:
+            ValidationError: mesmo local, quantidade inválida ou saldo insuficiente na origem
+        """
+        if origem.pk == destino.pk:
+            raise ValidationError('Origem e destino devem ser almoxarifados diferentes.')
+        if quantidade <= 0:
+            raise ValidationError('A quantidade transferida deve ser positiva.')
+        with transacao_escrita():
+            disponivel = SaldoEstoque.objects.select_for_update().filter(
+                item=item, almoxarifado=origem,
+            ).values_list('quantidade', flat=True).first() or 0
+            if disponivel < quantidade:
+                raise ValidationError(
+                    f'Saldo insuficiente em {origem}: disponível {disponivel}, solicitado {quantidade}.'
+                )
+            saida = cls.objects.create(
+                item=item, almoxarifado=origem, tipo='TRANSF_SAIDA', quantidade=quantidade, usuario=usuario,
+            )
+            entrada = cls.objects.create(
+                item=item, almoxarifado=destino, tipo='TRANSF_ENTRADA', quantidade=quantidade, usuario=usuario,
+                transferencia=saida,
+            )
+            cls.objects.filter(pk=saida.pk).update(transferencia=entrada)
+            saida.transferencia = entrada
+        return saida, entrada
+
+    def _aplicar_custo(self):
+        """
+        Define o custo unitário da movimentação e, nas ENTRADAs, atualiza o
+        custo médio ponderado do item em O(1):
+        
+            novo_medio = (saldo * medio + quantidade * custo) / (saldo + quantidade)
+        """
+        item = self.item
+        custo_medio = item.get_custo_medio()
+        if self.tipo != 'ENTRADA':
+            self.custo_unitario = custo_medio
+            return
+        if self.custo_unitario is None:
+            self.custo_unitario = item.valor_unitario
+        saldo = max(item.quantidade_atual, 0)
+        total = saldo + self.quantidade
+        if total > 0:
+            item.custo_medio = (
+                (saldo * custo_medio + self.quantidade * self.custo_unitario) / total
+            ).quantize(Decimal('0.0001'))
+
+    def _movimentar_lotes(self, aplicada):
+        """
+        Entradas com lote (ou validade) somam ao lote; a entrada de uma
+        transferência recria no destino os lotes baixados na origem; saídas
+        consomem os lotes do local na ordem FEFO.
+        """
+        if aplicada < 0:
+            Lote.consumir([(self, self.item_id, self.almoxarifado_id, -aplicada)])
+        elif aplicada > 0:
+            if self.tipo == 'TRANSF_ENTRADA' and self.transferencia_id:
+                partidas = [
+                    (numero, validade, -quantidade)
+                    for numero, validade, quantidade in MovimentacaoLote.objects.filter(
+                        movimentacao_id=self.transferencia_id,
+                    ).values_list('lote__numero', 'lote__validade', 'quantidade')
+                ]
+            elif self.lote_numero or self.validade:
+                partidas = [(self.lote_numero, self.validade, aplicada)]
+            else:
+                return
+            Lote.entrar(self, partidas)
+
+    def _recarregar_item(self):
+        """
+        Relê o saldo do item dentro da transação de escrita, para que duas
+        movimentações simultâneas não partam da mesma quantidade em memória.
+        """
+        campos = (*Item.CAMPOS_RESUMO, 'versao', 'custo_medio', 'razao_saldo', 'razao_hash')
+        atual = Item.objects.select_for_update().only(*campos, 'fornecedor').get(pk=self.item_id)
+        for campo in campos:
+            setattr(self.item, campo, getattr(atual, campo))
+        self.item._estado_resumo = atual._estado_resumo
+        self.item._quantidade_salva = atual._quantidade_salva
+        self.item._fornecedor_salvo = atual._fornecedor_salvo
+
+    def __str__(self):
+        return f"{self.tipo} - {self.item.descricao} ({self.quantidade})"
+
+
+class Lote(models.Model):
+    """
+    Saldo de um lote (número e validade) de um item em um almoxarifado.
+    
+    Entradas com número de lote ou validade criam o lote, ou somam ao de
+    mesmo número e validade no local. SAIDA, RETIRADA, TRANSF_SAIDA e os
+    ajustes negativos de inventário consomem os lotes do local na ordem FEFO
+    (validade mais próxima primeiro, lotes sem validade por último); a
+    TRANSF_ENTRADA recria no destino os lotes baixados na origem. Cada
+    entrada e baixa fica em MovimentacaoLote (histórico do lote).
+    
+    Entradas sem lote (pedidos recebidos, saldos anteriores aos lotes) formam
+    o saldo "sem lote" do local, ``SaldoEstoque.quantidade`` menos a soma dos
+    lotes, que nunca é negativo: as saídas consomem os lotes antes dele.
+    
+    A separação, os alertas de vencimento e o histórico são consultas por
+    índice; nenhuma lê o razão de movimentações.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='lotes')
+    almoxarifado = models.ForeignKey(Almoxarifado, on_delete=models.PROTECT, related_name='lotes')
+    numero = models.CharField("Lote", max_length=50, blank=True)
+    validade = models.DateField(null=True, blank=True)
+    quantidade = models.IntegerField(default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    TAMANHO_LOTE = 1000
+
+    class Meta:
+        indexes = [
+            # Separação FEFO: lotes com saldo de um item no local, por validade
+            models.Index(
+                fields=['item', 'almoxarifado', 'validade'], condition=models.Q(quantidade__gt=0),
+                name='lote_fefo_idx',
+            ),
+            # Lotes a vencer até uma data (só os que ainda têm saldo)
+            models.Index(fields=['validade'], condition=models.Q(quantidade__gt=0), name='lote_vencimento_idx'),
+            # Entrada em lote já existente
+            models.Index(fields=['item', 'almoxarifado', 'numero'], name='lote_identidade_idx'),
+        ]
+
+    ORDEM_FEFO = (F('validade').asc(nulls_last=True), 'pk')
+
+    @property
+    def dias_para_vencer(self):
+        if self.validade is None:
+            return None
+        return (self.validade - timezone.localdate()).days
+
+    @classmethod
+    def a_vencer(cls, dias, almoxarifado=None):
+        """
+        Lotes com saldo que vencem em até ``dias`` dias (inclui os vencidos),
+        validade mais próxima primeiro.
+        
+        Args:
+            dias (int): Horizonte a partir de hoje
+            almoxarifado (Almoxarifado): Restringe ao local (padrão: todos)
+        
+        Returns:
+            QuerySet: Lotes, com item e almoxarifado no mesmo SELECT
+        """
+        lotes = cls.objects.filter(
+            quantidade__gt=0, validade__lte=timezone.localdate() + timedelta(days=dias),
+        )
+        if almoxarifado is not None:
+            lotes = lotes.filter(almoxarifado=almoxarifado)
+        return lotes.select_related('item', 'almoxarifado').order_by('validade', 'pk')
+
+    @classmethod
+    def entrar(cls, movimentacao, partidas):
+        """
+        Soma as partidas aos lotes do item no local da movimentação, criando
+        os que não existem. Chamar dentro da transação da movimentação.
+        
+        Args:
+            movimentacao (Movimentacao): Entrada já salva
+            partidas (list): Tuplas (numero, validade, quantidade)
+        """
+        registros = []
+        for numero, validade, quantidade in partidas:
+            lote = cls.objects.select_for_update().filter(
+                item_id=movimentacao.item_id, almoxarifado_id=movimentacao.almoxarifado_id,
+                numero=numero, validade=validade,
+            ).first()
+            if lote is None:
+                lote = cls(
+                    item_id=movimentacao.item_id, almoxarifado_id=movimentacao.almoxarifado_id,
+                    numero=numero, validade=validade,
+                )
+            lote.quantidade += quantidade
+            lote.save()
+            registros.append(MovimentacaoLote(movimentacao=movimentacao, lote=lote, quantidade=quantidade))
+        MovimentacaoLote.objects.bulk_create(registros)
+
+    @classmethod
+    def consumir(cls, baixas):
+        """
+        Baixa os lotes na ordem FEFO, com uma leitura dos lotes por lote de
+        TAMANHO_LOTE itens e uma escrita em massa (qualquer número de baixas).
+        
+        O que passa da soma dos lotes do local sai do saldo sem lote.
+        
+        Args:
+            baixas (list): Tuplas (movimentacao, item_id, almoxarifado_id,
+                quantidade). ``movimentacao`` None (edição direta do item,
+                reconciliação) baixa sem registrar no histórico do lote.
+        
+        Returns:
+            int: Quantidade baixada dos lotes
+        """
+        baixas = [baixa for baixa in baixas if baixa[3] > 0]
+        if not baixas:
+            return 0
+        item_ids = sorted({item_id for _, item_id, _, _ in baixas})
+        almoxarifado_ids = {almoxarifado_id for _, _, almoxarifado_id, _ in baixas}
+        disponiveis = {}
+        for inicio in range(0, len(item_ids), cls.TAMANHO_LOTE):
+            lotes = cls.objects.select_for_update().filter(
+                quantidade__gt=0,
+                item_id__in=item_ids[inicio:inicio + cls.TAMANHO_LOTE],
+                almoxarifado_id__in=almoxarifado_ids,
+            ).only('item_id', 'almoxarifado_id', 'validade', 'quantidade').order_by(*cls.ORDEM_FEFO)
+            for lote in lotes:
+                disponiveis.setdefault((lote.item_id, lote.almoxarifado_id), []).append(lote)
+        
+        alterados = {}
+        registros = []
+        baixado = 0
+        for movimentacao, item_id, almoxarifado_id, quantidade in baixas:
+            fila = disponiveis.get((item_id, almoxarifado_id), [])
+            while quantidade > 0 and fila:
+                lote = fila[0]
+                retirada = min(quantidade, lote.quantidade)
+                lote.quantidade -= retirada
+                quantidade -= retirada
+                baixado += retirada
+                alterados[lote.pk] = lote
+                if movimentacao is not None:
+                    registros.append(MovimentacaoLote(movimentacao=movimentacao, lote=lote, quantidade=-retirada))
+                if not lote.quantidade:
+                    fila.pop(0)
+        cls.objects.bulk_update(alterados.values(), ['quantidade'], batch_size=cls.TAMANHO_LOTE)
+        MovimentacaoLote.objects.bulk_create(registros, batch_size=cls.TAMANHO_LOTE)
+        return baixado
+
+    def __str__(self):
+        validade = self.validade.strftime('%d/%m/%Y') if self.validade else 'sem validade'
+        return f"{self.item.codigo} lote {self.numero or '-'} ({validade}) @ {self.almoxarifado}: {self.quantidade}"
+
+
+class MovimentacaoLote(models.Model):
+    """Parte de uma movimentação atribuída a um lote: positiva nas entradas, negativa nas baixas."""
+    movimentacao = models.ForeignKey(Movimentacao, on_delete=models.CASCADE, related_name='lotes')
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='movimentacoes')
+    quantidade = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            # Histórico de um lote, na ordem dos lançamentos
+            models.Index(fields=['lote', 'movimentacao'], name='movlote_lote_mov_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.movimentacao_id} -> lote {self.lote_id}: {self.quantidade}"
+
+
+class MovimentacaoLoteArquivada(models.Model):
+    """
+    MovimentacaoLote de uma movimentação arquivada em segmento: o formato do
+    segmento não tem os lotes, então o histórico do lote fica aqui, com os
+    dados da movimentação usados pela API.
+    """
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name='movimentacoes_arquivadas')
+    # Id da movimentação no segmento
+    movimentacao_id = models.BigIntegerField()
+    data = models.DateTimeField()
+    tipo = models.CharField(max_length=15, choices=Movimentacao.TIPO_CHOICES)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    quantidade = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['lote', 'movimentacao_id'], name='movlote_arq_lote_mov_idx'),
+        ]
+
+    @classmethod
+    def arquivar(cls, movimentacoes):
+        """
+        Copia os registros de lote das movimentações que serão arquivadas.
+        
+        Args:
+            movimentacoes (QuerySet): Movimentações do período arquivado
+        
+        Returns:
+            int: Registros copiados
+        """
+        registros = [
+            cls(
+                lote_id=lote_id, movimentacao_id=movimentacao_id, data=data, tipo=tipo,
+                usuario_id=usuario_id, quantidade=quantidade,
+            )
+            for lote_id, movimentacao_id, data, tipo, usuario_id, quantidade in MovimentacaoLote.objects.filter(
+                movimentacao__in=movimentacoes,
+            ).values_list(
+                'lote_id', 'movimentacao_id', 'movimentacao__data', 'movimentacao__tipo',
+                'movimentacao__usuario_id', 'quantidade',
+            ).iterator(chunk_size=Lote.TAMANHO_LOTE)
+        ]
+        cls.objects.bulk_create(registros, batch_size=Lote.TAMANHO_LOTE)
+        return len(registros)
+
+    def __str__(self):
+        return f"{self.movimentacao_id} (arquivada) -> lote {self.lote_id}: {self.quantidade}"
+
+
+class ResumoEstoque(models.Model):
+    """
+    Contadores corridos do estoque, mantidos incrementalmente a cada
+    alteração de Item (e, portanto, a cada Movimentacao).
+    
+    Existe uma única linha (pk=1). A leitura do painel é O(1); o comando
+    ``manage.py reconciliar_resumo`` compara os contadores com um
+    recálculo completo.
+    """
+    
+    PK_UNICA = 1
+    
+    CAMPOS_STATUS = {
+        EstoqueManager.STATUS_CRITICO: 'itens_critico',
+        EstoqueManager.STATUS_BAIXO: 'itens_baixo',
+        EstoqueManager.STATUS_OK: 'itens_ok',
+        EstoqueManager.STATUS_ALTO: 'itens_alto',
+    }
+    
+    valor_total_estoque = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total_itens = models.IntegerField(default=0)
+    itens_critico = models.IntegerField(default=0)
+    itens_baixo = models.IntegerField(default=0)
+    itens_ok = models.IntegerField(default=0)
+    itens_alto = models.IntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def aplicar_delta(cls, anterior, atual):
+        """
+        Aplica aos contadores a diferença entre dois estados de um item.
+        
+        Args:
+            anterior (tuple | None): (valor, status) antes da alteração, ou None se o item é novo
+            atual (tuple | None): (valor, status) depois da alteração, ou None se o item foi removido
+        """
+        cls.aplicar_deltas([(anterior, atual)])
+
+    @classmethod
+    def aplicar_deltas(cls, alteracoes):
+        """
+        Aplica várias alterações de itens com um único UPDATE.
+        
+        Args:
+            alteracoes (iterable): pares (anterior, atual) como em aplicar_delta()
+        """
+        deltas = {}
+        for anterior, atual in alteracoes:
+            for estado, sinal in ((anterior, -1), (atual, 1)):
+                if estado is None:
+                    continue
+                valor, status = estado
+                campo = cls.CAMPOS_STATUS[status]
+                deltas['valor_total_estoque'] = deltas.get('valor_total_estoque', 0) + sinal * valor
+                deltas['total_itens'] = deltas.get('total_itens', 0) + sinal
+                deltas[campo] = deltas.get(campo, 0) + sinal
+        
+        updates = {campo: F(campo) + delta for campo, delta in deltas.items() if delta}
+        if not updates:
+            return
+        updates['atualizado_em'] = timezone.now()
+        if not cls.objects.filter(pk=cls.PK_UNICA).update(**updates):
+            # Primeira escrita (ou tabela limpa): o recálculo já inclui esta alteração
+            cls.recalcular()
+
+    @classmethod
+    def calcular_valores(cls):
+        """
+        Recalcula todos os contadores a partir da tabela de itens.
+        
+        Returns:
+            dict: valores de cada campo do resumo
+        """
+        valores = {campo: 0 for campo in cls.CAMPOS_STATUS.values()}
+        valores['valor_total_estoque'] = Decimal('0.00')
+        valores['total_itens'] = 0
+        
+        # Um GROUP BY no banco; o status é recalculado das quantidades, não lido da coluna
+        grupos = Item.objects.annotate(status_calculado=Item.expressao_status()).values(
+            'status_calculado',
+        ).annotate(
+            total=Count('id'),
+            valor=Sum(
+                F('quantidade_atual') * F('valor_unitario'),
+                output_field=models.DecimalField(max_digits=18, decimal_places=2),
+            ),
+        ).order_by()
+        for grupo in grupos:
+            valores['valor_total_estoque'] += grupo['valor'] or 0
+            valores['total_itens'] += grupo['total']
+            valores[cls.CAMPOS_STATUS[grupo['status_calculado']]] += grupo['total']
+        return valores
+
+    @classmethod
+    def recalcular(cls):
+        """Substitui os contadores pelo recálculo completo."""
+        resumo, _ = cls.objects.update_or_create(pk=cls.PK_UNICA, defaults=cls.calcular_valores())
+        return resumo
+
+    @classmethod
+    def obter(cls):
+        """Retorna a linha do resumo, criando-a na primeira leitura."""
+        return cls.objects.filter(pk=cls.PK_UNICA).first() or cls.recalcular()
+
+    @property
+    def total_alertas(self):
+        """Itens que requerem ação (CRITICO, BAIXO ou ALTO)."""
+        return self.itens_critico + self.itens_baixo + self.itens_alto
+
+    def get_contagem_status(self):
+        return {status: getattr(self, campo) for status, campo in self.CAMPOS_STATUS.items()}
+
+    def __str__(self):
+        return f"Resumo do estoque ({self.total_itens} itens)"
+
+
+class ResumoMovimentacaoDiaria(models.Model):
+    """
+    Quantidade de movimentações registradas por tipo e por dia (data local).
+    Incrementado na criação de cada Movimentacao.
+    """
+    data = models.DateField()
+    tipo = models.CharField(max_length=15, choices=Movimentacao.TIPO_CHOICES)
+    total_movimentacoes = models.IntegerField(default=0)
+    quantidade_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['data', 'tipo'], name='resumo_mov_diaria_unico'),
+        ]
+
+    @classmethod
+    def somar(cls, data, tipo, movimentacoes, quantidade):
+        """Soma (ou subtrai, com valores negativos) ao contador de um dia/tipo."""
+        atualizados = cls.objects.filter(data=data, tipo=tipo).update(
+            total_movimentacoes=F('total_movimentacoes') + movimentacoes,
+            quantidade_total=F('quantidade_total') + quantidade,
+        )
+        if atualizados:
+            return
+        try:
+            # Savepoint: a falha não invalida a transação de quem chamou
+            with transaction.atomic():
+                cls.objects.create(
+                    data=data, tipo=tipo,
+                    total_movimentacoes=movimentacoes, quantidade_total=quantidade,
+                )
+        except IntegrityError:
+            # Outra transação criou a linha do dia/tipo entre o UPDATE e o INSERT
+            cls.objects.filter(data=data, tipo=tipo).update(
+                total_movimentacoes=F('total_movimentacoes') + movimentacoes,
+                quantidade_total=F('quantidade_total') + quantidade,
+            )
+
+    @classmethod
+    def registrar(cls, movimentacao):
+        """Soma uma movimentação recém-criada ao contador do seu dia."""
+        data = timezone.localdate(movimentacao.data)
+        cls.somar(data, movimentacao.tipo, 1, movimentacao.quantidade)
+
+    @classmethod
+    def remover_item(cls, item):
+        """Desconta as movimentações de um item que será excluído (cascade)."""
+        for linha in cls._agrupar(Movimentacao.objects.filter(item=item)):
+            cls.somar(linha['dia'], linha['tipo'], -linha['total'], -linha['quantidade'])
+
+    @staticmethod
+    def _agrupar(movimentacoes):
+        return movimentacoes.annotate(dia=TruncDate('data')).values('dia', 'tipo').annotate(
+            total=Count('id'), quantidade=Sum('quantidade'),
+        ).order_by()
+
+    @classmethod
+    def calcular_valores(cls):
+        """
+        Recalcula os contadores diários a partir de todas as movimentações,
+        inclusive as arquivadas (totais gravados em SegmentoMovimentacao).
+        
+        Returns:
+            dict: {(data, tipo): (total_movimentacoes, quantidade_total)}
+        """
+        valores = {
+            (linha['dia'], linha['tipo']): (linha['total'], linha['quantidade'] or 0)
+            for linha in cls._agrupar(Movimentacao.objects.all())
+        }
+        for resumo_diario in SegmentoMovimentacao.objects.values_list('resumo_diario', flat=True):
+            for dia, tipos in resumo_diario.items():
+                data = date.fromisoformat(dia)
+                for tipo, (total, quantidade) in tipos.items():
+                    atual = valores.get((data, tipo), (0, 0))
+                    valores[(data, tipo)] = (atual[0] + total, atual[1] + quantidade)
+        return valores
+
+    def __str__(self):
+        return f"{self.data} {self.tipo}: {self.total_movimentacoes}"
+
+
+class ResumoFornecedor(models.Model):
+    """
+    Indicadores de um fornecedor mantidos incrementalmente, como o ResumoEstoque.
+    
+    Os contadores de itens (total e em estoque CRITICO/BAIXO) acompanham cada
+    gravação de Item; os de compras somam as ENTRADAs (exceto ajustes de
+    inventário) no fornecedor do item, e o prazo de entrega soma o tempo entre
+    a criação e o recebimento de cada pedido de compra. A leitura é uma linha
+    por fornecedor, sem percorrer Movimentacao.
+    
+    Compras e prazos são históricos: permanecem após a exclusão do item ou o
+    arquivamento das movimentações, então o recálculo completo só os
+    reconstrói a partir do que ainda está na tabela. ``reconciliar_resumo``
+    confere apenas os contadores de itens.
+    """
+    
+    CAMPOS_STATUS = {
+        EstoqueManager.STATUS_CRITICO: 'itens_critico',
+        EstoqueManager.STATUS_BAIXO: 'itens_baixo',
+    }
+    CAMPOS_ITENS = ('total_itens', 'itens_critico', 'itens_baixo')
+    CAMPOS_HISTORICO = (
+        'entradas', 'quantidade_comprada', 'valor_compras', 'ultima_compra', 'pedidos_recebidos', 'prazo_total',
+    )
+    # Ordenações aceitas pela API (campos e anotações de com_indicadores())
+    INDICADORES = (
+        'total_itens', 'itens_critico', 'itens_baixo', 'percentual_alerta', 'entradas', 'quantidade_comprada',
+        'valor_compras', 'ultima_compra', 'pedidos_recebidos', 'prazo_medio_dias',
+    )
+    
+    fornecedor = models.OneToOneField(Fornecedor, on_delete=models.CASCADE, primary_key=True, related_name='resumo')
+    total_itens = models.IntegerField(default=0)
+    itens_critico = models.IntegerField(default=0)
+    itens_baixo = models.IntegerField(default=0)
+    entradas = models.IntegerField(default=0)
+    quantidade_comprada = models.BigIntegerField(default=0)
+    valor_compras = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    ultima_compra = models.DateTimeField(null=True, blank=True)
+    pedidos_recebidos = models.IntegerField(default=0)
+    # Soma, em segundos, do tempo entre criação e recebimento dos pedidos
+    prazo_total = models.BigIntegerField(default=0)
+    # Incrementada a cada alteração; compõe a chave do cache das linhas da listagem
+    versao = models.PositiveIntegerField(default=0, editable=False)
+
+    @property
+    def itens_alerta(self):
+        return self.itens_critico + self.itens_baixo
+
+    @property
+    def percentual_alerta(self):
+        """Percentual dos itens do fornecedor em estoque CRITICO ou BAIXO."""
+        return 100 * self.itens_alerta / self.total_itens if self.total_itens else None
+
+    @property
+    def prazo_medio_dias(self):
+        """Prazo médio entre a criação e o recebimento dos pedidos, em dias."""
+        return self.prazo_total / 86400 / self.pedidos_recebidos if self.pedidos_recebidos else None
+
+    @classmethod
+    def com_indicadores(cls):
+        """QuerySet com percentual_alerta e prazo_medio_dias calculados no banco (para ordenar)."""
+        return cls.objects.annotate(
+            percentual_alerta=models.ExpressionWrapper(
+                100.0 * (F('itens_critico') + F('itens_baixo')) / NullIf(F('total_itens'), 0),
+                output_field=models.FloatField(),
+            ),
+            prazo_medio_dias=models.ExpressionWrapper(
+                F('prazo_total') / 86400.0 / NullIf(F('pedidos_recebidos'), 0),
+                output_field=models.FloatField(),
+            ),
+        )
+
+    @classmethod
+    def _somar(cls, deltas, ultimas=None):
+        """
+        Soma os deltas de vários fornecedores com um único UPDATE.
+        
+        Args:
+            deltas (dict): {fornecedor_id: {campo: delta}}
+            ultimas (dict): {fornecedor_id: data} para ultima_compra (mantém a mais recente)
+        """
+        ultimas = ultimas or {}
+        deltas = {
+            fornecedor_id: campos for fornecedor_id, campos in deltas.items()
+            if fornecedor_id is not None and (any(campos.values()) or fornecedor_id in ultimas)
+        }
+        if not deltas:
+            return
+        updates = {}
+        for campo in {campo for campos in deltas.values() for campo in campos}:
+            casos = [
+                models.When(fornecedor_id=fornecedor_id, then=models.Value(campos[campo]))
+                for fornecedor_id, campos in deltas.items() if campos.get(campo)
+            ]
+            if casos:
+                updates[campo] = F(campo) + models.Case(
+                    *casos, default=models.Value(0), output_field=cls._meta.get_field(campo),
+                )
+        if ultimas:
+            updates['ultima_compra'] = models.Case(
+                *[
+                    models.When(
+                        Q(fornecedor_id=fornecedor_id) & (Q(ultima_compra__isnull=True) | Q(ultima_compra__lt=data)),
+                        then=models.Value(data),
+                    )
+                    for fornecedor_id, data in ultimas.items()
+                ],
+                default=F('ultima_compra'),
+            )
+        updates['versao'] = F('versao') + 1
+        atualizados = cls.objects.filter(fornecedor_id__in=deltas).update(**updates)
+        if atualizados < len(deltas):
+            # Fornecedor sem linha (criado por bulk_create): o recálculo já inclui esta alteração
+            existentes = set(cls.objects.filter(fornecedor_id__in=deltas).values_list('fornecedor_id', flat=True))
+            cls.recalcular([fornecedor_id for fornecedor_id in deltas if fornecedor_id not in existentes])
+
+    @classmethod
+    def aplicar_deltas(cls, alteracoes):
+        """
+        Aplica as alterações de vários itens aos contadores de itens.
+        
+        Args:
+            alteracoes (iterable): pares (anterior, atual) de (fornecedor_id, status);
+                None para item novo (anterior) ou removido (atual)
+        """
+        deltas = {}
+        for anterior, atual in alteracoes:
+            for estado, sinal in ((anterior, -1), (atual, 1)):
+                if estado is None or estado[0] is None:
+                    continue
+                fornecedor_id, status = estado
+                campos = deltas.setdefault(fornecedor_id, {})
+                campos['total_itens'] = campos.get('total_itens', 0) + sinal
+                campo = cls.CAMPOS_STATUS.get(status)
+                if campo:
+                    campos[campo] = campos.get(campo, 0) + sinal
+        cls._somar(deltas)
+
+    @classmethod
+    def registrar_compras(cls, compras):
+        """
+        Soma ENTRADAs de compra aos totais dos fornecedores.
+        
+        Args:
+            compras (iterable): tuplas (fornecedor_id, quantidade, valor, data)
+        """
+        deltas = {}
+        ultimas = {}
+        for fornecedor_id, quantidade, valor, data in compras:
+            if fornecedor_id is None:
+                continue
+            campos = deltas.setdefault(
+                fornecedor_id, {'entradas': 0, 'quantidade_comprada': 0, 'valor_compras': Decimal('0')},
+            )
+            campos['entradas'] += 1
+            campos['quantidade_comprada'] += quantidade
+            campos['valor_compras'] += valor
+            ultimas[fornecedor_id] = max(ultimas.get(fornecedor_id, data), data)
+        cls._somar(deltas, ultimas)
+
+    @classmethod
+    def registrar_recebimento(cls, pedido):
+        """Soma um pedido de compra recebido ao prazo de entrega do fornecedor."""
+        prazo = int((pedido.recebido_em - pedido.criado_em).total_seconds())
+        cls._somar({pedido.fornecedor_id: {'pedidos_recebidos': 1, 'prazo_total': prazo}})
+
+    @classmethod
+    def calcular_itens(cls, fornecedor_ids=None):
+        """
+        Recalcula os contadores de itens a partir da tabela de itens.
+        
+        Returns:
+            dict: {fornecedor_id: {campo: valor}} (só fornecedores com itens)
+        """
+        itens = Item.objects.filter(fornecedor__isnull=False)
+        if fornecedor_ids is not None:
+            itens = itens.filter(fornecedor_id__in=fornecedor_ids)
+        grupos = itens.values('fornecedor_id').annotate(
+            total_itens=Count('id'),
+            itens_critico=Count('id', filter=Q(status_estoque=EstoqueManager.STATUS_CRITICO)),
+            itens_baixo=Count('id', filter=Q(status_estoque=EstoqueManager.STATUS_BAIXO)),
+        ).order_by()
+        return {grupo.pop('fornecedor_id'): grupo for grupo in grupos}
+
+    @classmethod
+    def calcular_historico(cls, fornecedor_ids=None):
+        """
+        Recalcula compras e prazos a partir das movimentações na tabela e dos
+        pedidos recebidos (as compras vão para o fornecedor atual do item).
+        
+        Returns:
+            dict: {fornecedor_id: {campo: valor}}
+        """
+        compras = Movimentacao.objects.filter(
+            tipo='ENTRADA', inventario__isnull=True, item__fornecedor__isnull=False,
+        )
+        pedidos = PedidoCompra.objects.filter(status=PedidoCompra.STATUS_RECEBIDO, fornecedor__isnull=False)
+        if fornecedor_ids is not None:
+            compras = compras.filter(item__fornecedor_id__in=fornecedor_ids)
+            pedidos = pedidos.filter(fornecedor_id__in=fornecedor_ids)
+        
+        valores = {}
+        for grupo in compras.values('item__fornecedor_id').annotate(
+            entradas=Count('id'),
+            quantidade_comprada=Sum('quantidade'),
+            valor_compras=Sum(
+                F('quantidade') * F('custo_unitario'), output_field=models.DecimalField(max_digits=18, decimal_places=4),
+            ),
+            ultima_compra=Max('data'),
+        ).order_by():
+            valores[grupo.pop('item__fornecedor_id')] = grupo
+        for fornecedor_id, criado_em, recebido_em in pedidos.values_list('fornecedor_id', 'criado_em', 'recebido_em'):
+            campos = valores.setdefault(fornecedor_id, {})
+            campos['pedidos_recebidos'] = campos.get('pedidos_recebidos', 0) + 1
+            campos['prazo_total'] = campos.get('prazo_total', 0) + int((recebido_em - criado_em).total_seconds())
+        return valores
+
+    @classmethod
+    def recalcular(cls, fornecedor_ids=None, historico=True):
+        """
+        Substitui os indicadores pelo recálculo completo.
+        
+        Args:
+            fornecedor_ids (list): Fornecedores a recalcular (padrão: todos)
+            historico (bool): Recalcula também compras e prazos; com False só os contadores de itens
+        """
+        fornecedores = Fornecedor.objects.all()
+        if fornecedor_ids is not None:
+            fornecedores = fornecedores.filter(pk__in=fornecedor_ids)
+        ids = list(fornecedores.values_list('pk', flat=True))
+        itens = cls.calcular_itens(fornecedor_ids)
+        campos = list(cls.CAMPOS_ITENS)
+        historicos = {}
+        if historico:
+            historicos = cls.calcular_historico(fornecedor_ids)
+            campos += cls.CAMPOS_HISTORICO
+        cls.objects.bulk_create(
+            [
+                cls(fornecedor_id=fornecedor_id, **itens.get(fornecedor_id, {}), **historicos.get(fornecedor_id, {}))
+                for fornecedor_id in ids
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['fornecedor'],
+            update_fields=campos,
+        )
+        atualizados = cls.objects.all() if fornecedor_ids is None else cls.objects.filter(fornecedor_id__in=ids)
+        atualizados.update(versao=F('versao') + 1)
+
+    def __str__(self):
+        return f"Indicadores de {self.fornecedor_id}"
+
+
+class Inventario(models.Model):
+    """
+    Sessão de inventário físico (contagem) do almoxarifado.
+    
+    A contagem é feita em um almoxarifado. As contagens são carregadas em
+    lote (planilha ou API) e, ao aplicar a sessão, as divergências com o
+    saldo do local viram movimentações de ajuste (ENTRADA para sobra, SAIDA
+    para falta) gravadas com ``bulk_create``, um upsert nos saldos e
+    UPDATEs únicos nos itens, sem save() por linha.
+    """
+    
+    STATUS_ABERTO = 'ABERTO'
+    STATUS_APLICADO = 'APLICADO'
+    STATUS_CHOICES = [
+        (STATUS_ABERTO, 'Aberto'),
+        (STATUS_APLICADO, 'Aplicado'),
+    ]
+    
+    # Tamanho dos lotes de INSERT / consulta por código
+    TAMANHO_LOTE = 1000
+    
+    descricao = models.CharField(max_length=150)
+    # Vazio na criação = almoxarifado padrão (preenchido em save())
+    almoxarifado = models.ForeignKey(
+        Almoxarifado, on_delete=models.PROTECT, null=True, blank=True, related_name='inventarios',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ABERTO)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    criado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    aplicado_em = models.DateTimeField(null=True, blank=True)
+    aplicado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    @property
+    def aberto(self):
+        return self.status == self.STATUS_ABERTO
 
     def save(self, *args, **kwargs):
-        # Salva movimentação e atualiza estoque do item
+        if self.almoxarifado_id is None:
+            self.almoxarifado = Almoxarifado.padrao()
         super().save(*args, **kwargs)
-        if self.tipo == 'ENTRADA' or self.tipo == 'DEVOLUÇÃO':
-            self.item.quantidade_atual += self.quantidade
-        elif self.tipo in ('SAIDA', 'RETIRADA'):
-            self.item.quantidade_atual -= self.quantidade
-            if self.item.quantidade_atual < 0:
-                self.item.quantidade_atual = 0
-        self.item.save()
+
+    def _saldo_local(self):
+        """Saldo do item da contagem neste almoxarifado (0 se não houver linha)."""
+        return Coalesce(
+            Subquery(
+                SaldoEstoque.objects.filter(
+                    item_id=OuterRef('item_id'), almoxarifado_id=self.almoxarifado_id,
+                ).values('quantidade')[:1]
+            ),
+            0,
+        )
+
+    def registrar_contagens(self, contagens):
+        """
+        Grava (ou sobrescreve) as quantidades contadas, identificadas pelo código do item.
+        
+        Args:
+            contagens (dict): {codigo: quantidade_contada}
+        
+        Returns:
+            list: códigos que não correspondem a nenhum item
+        """
+        if not self.aberto:
+            raise ValidationError('Inventário já aplicado não aceita novas contagens.')
+        
+        codigos = list(contagens)
+        desconhecidos = []
+        for inicio in range(0, len(codigos), self.TAMANHO_LOTE):
+            lote = codigos[inicio:inicio + self.TAMANHO_LOTE]
+            ids = dict(Item.objects.filter(codigo__in=lote).values_list('codigo', 'id'))
+            desconhecidos.extend(codigo for codigo in lote if codigo not in ids)
+            ContagemInventario.objects.bulk_create(
+                [
+                    ContagemInventario(inventario=self, item_id=ids[codigo], quantidade_contada=contagens[codigo])
+                    for codigo in lote if codigo in ids
+                ],
+                update_conflicts=True,
+                unique_fields=['inventario', 'item'],
+                update_fields=['quantidade_contada'],
+            )
+        return desconhecidos
+
+    def divergencias(self):
+        """
+        Contagens que diferem do saldo do almoxarifado (um único SELECT com JOIN em Item).
+        
+        Returns:
+            QuerySet: ContagemInventario anotado com ``saldo_sistema`` e ``diferenca``
+        """
+        return self.contagens.select_related('item').only(
+            'item_id', 'quantidade_contada', 'item__codigo', 'item__descricao',
+        ).annotate(
+            saldo_sistema=self._saldo_local(),
+        ).annotate(
+            diferenca=F('quantidade_contada') - F('saldo_sistema'),
+        ).exclude(diferenca=0)
+
+    def aplicar(self, usuario=None):
+        """
+        Aplica o inventário: gera as movimentações de ajuste e atualiza os itens.
+        
+        Tudo ocorre em uma transação e com um número constante de comandos por
+        lote, independente da quantidade de linhas contadas.
+        
+        Args:
+            usuario (User): Responsável pela aplicação
+        
+        Returns:
+            dict: itens_ajustados, entradas, saidas (quantidades totais)
+        """
+        with transaction.atomic():
+            inventario = Inventario.objects.select_for_update().get(pk=self.pk)
+            if not inventario.aberto:
+                raise ValidationError('Este inventário já foi aplicado.')
+            
+            contagens = ContagemInventario.objects.filter(inventario=self)
+            linhas = list(
+                contagens.select_for_update().annotate(saldo_sistema=self._saldo_local()).exclude(
+                    quantidade_contada=F('saldo_sistema'),
+                ).values_list(
+                    'item_id', 'quantidade_contada', 'saldo_sistema', 'item__quantidade_atual',
+                    'item__valor_unitario', 'item__estoque_minimo', 'item__estoque_maximo',
+                    'item__custo_medio', 'item__fornecedor_id', 'item__razao_saldo', 'item__razao_hash',
+                )
+            )
+            
+            # Fotografa o saldo do local em todas as contagens (um UPDATE com subconsulta)
+            contagens.update(quantidade_sistema=self._saldo_local())
+            
+            movimentacoes = []
+            saldos = []
+            sequencias = []
+            alteracoes = []
+            alteracoes_fornecedor = []
+            totais = {'ENTRADA': [0, 0], 'SAIDA': [0, 0]}
+            # bulk_create e update() não passam pelo save(): reserva as sequências de uma vez
+            numeros = iter(SequenciaSincronizacao.reservar_lote(2 * len(linhas)))
+            for (item_id, contada, sistema, total, valor_unitario, minimo, maximo, custo_medio,
+                 fornecedor_id, razao_saldo, razao_hash) in linhas:
+                tipo = 'ENTRADA' if contada > sistema else 'SAIDA'
+                quantidade = abs(contada - sistema)
+                # Ajustes são valorizados pelo custo médio e não o alteram
+                movimentacao = Movimentacao(
+                    item_id=item_id, almoxarifado_id=self.almoxarifado_id, tipo=tipo, quantidade=quantidade,
+                    usuario=usuario, inventario=self,
+                    custo_unitario=custo_medio if custo_medio is not None else valor_unitario,
+                    sequencia=next(numeros),
+                )
+                ponta = Item(pk=item_id, sequencia=next(numeros), razao_saldo=razao_saldo, razao_hash=razao_hash)
+                razao.encadear(movimentacao, ponta, contada - sistema)
+                movimentacoes.append(movimentacao)
+                sequencias.append(ponta)
+                # O item em memória só fornece os limites para o status do saldo
+                saldos.append(SaldoEstoque(
+                    item=Item(pk=item_id, estoque_minimo=minimo, estoque_maximo=maximo),
+                    almoxarifado_id=self.almoxarifado_id, quantidade=contada,
+                ))
+                totais[tipo][0] += 1
+                totais[tipo][1] += quantidade
+                alteracoes.append(tuple(
+                    Item(
+                        quantidade_atual=quantidade_atual, valor_unitario=valor_unitario,
+                        estoque_minimo=minimo, estoque_maximo=maximo,
+                    ).get_estado_resumo()
+                    for quantidade_atual in (total, total + contada - sistema)
+                ))
+                alteracoes_fornecedor.append(tuple((fornecedor_id, status) for _, status in alteracoes[-1]))
+            
+            Movimentacao.objects.bulk_create(movimentacoes, batch_size=self.TAMANHO_LOTE)
+            Lote.consumir([
+                (movimentacao, movimentacao.item_id, self.almoxarifado_id, movimentacao.quantidade)
+                for movimentacao in movimentacoes if movimentacao.tipo == 'SAIDA'
+            ])
+            SaldoEstoque.objects.bulk_create(
+                saldos,
+                batch_size=self.TAMANHO_LOTE,
+                update_conflicts=True,
+                unique_fields=['item', 'almoxarifado'],
+                update_fields=['quantidade', 'status_estoque'],
+            )
+            ajustados = Item.objects.filter(
+                pk__in=contagens.exclude(quantidade_contada=F('quantidade_sistema')).values('item_id')
+            )
+            ajustados.update(
+                quantidade_atual=F('quantidade_atual') + Subquery(
+                    contagens.filter(item_id=OuterRef('pk')).annotate(
+                        diferenca=F('quantidade_contada') - F('quantidade_sistema'),
+                    ).values('diferenca')[:1]
+                ),
+                versao=F('versao') + 1,
+                # Ponta da cadeia do razão: o elo do ajuste deste inventário
+                razao_saldo=Subquery(self.ajustes.filter(item_id=OuterRef('pk')).values('saldo_razao')[:1]),
+                razao_hash=Subquery(self.ajustes.filter(item_id=OuterRef('pk')).values('hash_razao')[:1]),
+            )
+            # Em UPDATE separado, para o status enxergar a quantidade já ajustada
+            ajustados.update(status_estoque=Item.expressao_status())
+            Item.objects.bulk_update(sequencias, ['sequencia'], batch_size=self.TAMANHO_LOTE)
+            # update() não dispara post_save: o índice de códigos e a busca são invalidados aqui
+            ajustados_ids = [item.pk for item in sequencias]
+            transaction.on_commit(lambda: codigos.invalidar(item_ids=ajustados_ids))
+            transaction.on_commit(lambda: busca.invalidar(item_ids=ajustados_ids))
+            
+            ResumoEstoque.aplicar_deltas(alteracoes)
+            ResumoFornecedor.aplicar_deltas(alteracoes_fornecedor)
+            hoje = timezone.localdate()
+            for tipo, (total, quantidade) in totais.items():
+                if total:
+                    ResumoMovimentacaoDiaria.somar(hoje, tipo, total, quantidade)
+            
+            inventario.status = self.STATUS_APLICADO
+            inventario.aplicado_em = timezone.now()
+            inventario.aplicado_por = usuario
+            inventario.save(update_fields=['status', 'aplicado_em', 'aplicado_por'])
+        
+        self.status, self.aplicado_em, self.aplicado_por = inventario.status, inventario.aplicado_em, usuario
+        return {
+            'itens_ajustados': len(linhas),
+            'entradas': totais['ENTRADA'][1],
+            'saidas': totais['SAIDA'][1],
+        }
+
+    def __str__(self):
+        return f"Inventário #{self.pk} - {self.descricao}"
+
+
+class ContagemInventario(models.Model):
+    """Quantidade contada de um item em uma sessão de inventário."""
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='contagens')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='contagens_inventario')
+    quantidade_contada = models.PositiveIntegerField()
+    # Saldo do sistema no momento da aplicação do inventário
+    quantidade_sistema = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['inventario', 'item'], name='contagem_inventario_item_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantidade_contada}"
+
+
+class PedidoCompra(models.Model):
+    """
+    Pedido de compra de reposição para um fornecedor.
+    
+    ``gerar_rascunhos()`` calcula a reposição de todos os itens em uma única
+    consulta agregada e grava um rascunho por fornecedor com ``bulk_create``.
+    ``receber()`` lança as ENTRADAs de todas as linhas no almoxarifado do
+    pedido como o Inventario.aplicar: INSERTs em lote, upsert dos saldos e um
+    UPDATE em lote nos itens. O número de comandos não depende da quantidade
+    de itens (até TAMANHO_LOTE linhas por lote).
+    """
+    
+    STATUS_RASCUNHO = 'RASCUNHO'
+    STATUS_RECEBIDO = 'RECEBIDO'
+    STATUS_CHOICES = [
+        (STATUS_RASCUNHO, 'Rascunho'),
+        (STATUS_RECEBIDO, 'Recebido'),
+    ]
+    
+    TAMANHO_LOTE = 1000
+    
+    fornecedor = models.ForeignKey(Fornecedor, on_delete=models.SET_NULL, null=True, related_name='pedidos')
+    # Local que recebe a mercadoria (padrão: almoxarifado padrão)
+    almoxarifado = models.ForeignKey(Almoxarifado, on_delete=models.PROTECT, related_name='pedidos')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RASCUNHO)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    criado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    recebido_em = models.DateTimeField(null=True, blank=True)
+    recebido_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    @property
+    def rascunho(self):
+        return self.status == self.STATUS_RASCUNHO
+
+    @classmethod
+    def reposicao_pendente(cls):
+        """
+        Quanto pedir de cada item em alerta (CRITICO ou BAIXO), já descontado o
+        que está em rascunhos abertos: até o estoque máximo efetivo.
+        
+        Returns:
+            QuerySet: tuplas (item_id, fornecedor_id, valor_unitario, quantidade)
+            ordenadas por fornecedor e código
+        """
+        em_rascunho = ItemPedidoCompra.objects.filter(
+            item_id=OuterRef('pk'), pedido__status=cls.STATUS_RASCUNHO,
+        ).values('item_id').annotate(total=Sum('quantidade')).values('total')
+        _, maximo = EstoqueManager.expressao_limites(F('estoque_minimo'), F('estoque_maximo'))
+        return Item.objects.filter(
+            status_estoque__in=(EstoqueManager.STATUS_CRITICO, EstoqueManager.STATUS_BAIXO),
+        ).annotate(
+            quantidade_pedido=maximo - F('quantidade_atual') - Coalesce(Subquery(em_rascunho), 0),
+        ).filter(quantidade_pedido__gt=0).order_by('fornecedor_id', 'codigo').values_list(
+            'pk', 'fornecedor_id', 'valor_unitario', 'quantidade_pedido',
+        )
+
+    @classmethod
+    def gerar_rascunhos(cls, usuario=None, almoxarifado=None):
+        """
+        Cria um pedido em rascunho por fornecedor com toda a reposição pendente.
+        
+        Args:
+            usuario (User): Responsável
+            almoxarifado (Almoxarifado): Local de recebimento (padrão: almoxarifado padrão)
+        
+        Returns:
+            tuple: (pedidos criados, quantidade de itens sem fornecedor, que ficam de fora)
+        """
+        with transacao_escrita():
+            por_fornecedor = {}
+            sem_fornecedor = 0
+            for item_id, fornecedor_id, valor_unitario, quantidade in cls.reposicao_pendente():
+                if fornecedor_id is None:
+                    sem_fornecedor += 1
+                else:
+                    por_fornecedor.setdefault(fornecedor_id, []).append((item_id, valor_unitario, quantidade))
+            if not por_fornecedor:
+                return [], sem_fornecedor
+            
+            almoxarifado = almoxarifado or Almoxarifado.padrao()
+            pedidos = cls.objects.bulk_create([
+                cls(fornecedor_id=fornecedor_id, almoxarifado=almoxarifado, criado_por=usuario)
+                for fornecedor_id in por_fornecedor
+            ])
+            ItemPedidoCompra.objects.bulk_create(
+                [
+                    ItemPedidoCompra(pedido=pedido, item_id=item_id, quantidade=quantidade, custo_unitario=valor_unitario)
+                    for pedido, linhas in zip(pedidos, por_fornecedor.values())
+                    for item_id, valor_unitario, quantidade in linhas
+                ],
+                batch_size=cls.TAMANHO_LOTE,
+            )
+        return pedidos, sem_fornecedor
+
+    def receber(self, usuario=None):
+        """
+        Registra o recebimento do pedido inteiro: uma ENTRADA por linha, com o
+        custo da linha entrando no custo médio ponderado do item.
+        
+        Args:
+            usuario (User): Responsável pelo recebimento
+        
+        Returns:
+            dict: itens_recebidos, quantidade (total de unidades), valor
+        
+        Raises:
+            ValidationError: se o pedido já foi recebido
+        """
+        with transacao_escrita():
+            pedido = PedidoCompra.objects.select_for_update().get(pk=self.pk)
+            if not pedido.rascunho:
+                raise ValidationError('Este pedido já foi recebido.')
+            
+            saldo_local = Coalesce(
+                Subquery(
+                    SaldoEstoque.objects.filter(
+                        item_id=OuterRef('item_id'), almoxarifado_id=pedido.almoxarifado_id,
+                    ).values('quantidade')[:1]
+                ),
+                0,
+            )
+            linhas = list(
+                self.linhas.select_for_update().filter(quantidade__gt=0).annotate(saldo_local=saldo_local).values_list(
+                    'item_id', 'quantidade', 'custo_unitario', 'saldo_local', 'item__quantidade_atual',
+                    'item__valor_unitario', 'item__estoque_minimo', 'item__estoque_maximo',
+                    'item__custo_medio', 'item__versao', 'item__fornecedor_id',
+                    'item__razao_saldo', 'item__razao_hash',
+                )
+            )
+            
+            movimentacoes = []
+            saldos = []
+            itens = []
+            alteracoes = []
+            alteracoes_fornecedor = []
+            fornecedores = []
+            total_quantidade = 0
+            total_valor = Decimal('0')
+            # bulk_create e bulk_update não passam pelo save(): reserva as sequências de uma vez
+            numeros = iter(SequenciaSincronizacao.reservar_lote(2 * len(linhas)))
+            agora = timezone.now()
+            for (item_id, quantidade, custo, local, atual, valor_unitario, minimo, maximo,
+                 custo_medio, versao, fornecedor_id, razao_saldo, razao_hash) in linhas:
+                custo = custo if custo is not None else valor_unitario
+                # Mesma fórmula de Movimentacao._aplicar_custo
+                medio = custo_medio if custo_medio is not None else valor_unitario
+                saldo = max(atual, 0)
+                novo_medio = ((saldo * medio + quantidade * custo) / (saldo + quantidade)).quantize(Decimal('0.0001'))
+                nova = atual + quantidade
+                
+                movimentacao = Movimentacao(
+                    item_id=item_id, almoxarifado_id=pedido.almoxarifado_id, tipo='ENTRADA', quantidade=quantidade,
+                    usuario=usuario, pedido=pedido, custo_unitario=custo, sequencia=next(numeros),
+                )
+                item = Item(
+                    pk=item_id, quantidade_atual=nova, custo_medio=novo_medio, versao=versao + 1,
+                    status_estoque=EstoqueManager.classificar(nova, minimo, maximo), sequencia=next(numeros),
+                    razao_saldo=razao_saldo, razao_hash=razao_hash,
+                )
+                razao.encadear(movimentacao, item, quantidade)
+                movimentacoes.append(movimentacao)
+                itens.append(item)
+                # O item em memória só fornece os limites para o status do saldo
+                saldos.append(SaldoEstoque(
+                    item=Item(pk=item_id, estoque_minimo=minimo, estoque_maximo=maximo),
+                    almoxarifado_id=pedido.almoxarifado_id, quantidade=local + quantidade,
+                ))
+                alteracoes.append(tuple(
+                    Item(
+                        quantidade_atual=quantidade_atual, valor_unitario=valor_unitario,
+                        estoque_minimo=minimo, estoque_maximo=maximo,
+                    ).get_estado_resumo()
+                    for quantidade_atual in (atual, nova)
+                ))
+                alteracoes_fornecedor.append(tuple((fornecedor_id, status) for _, status in alteracoes[-1]))
+                fornecedores.append(fornecedor_id)
+                total_quantidade += quantidade
+                total_valor += quantidade * custo
+            
+            Movimentacao.objects.bulk_create(movimentacoes, batch_size=self.TAMANHO_LOTE)
+            SaldoEstoque.objects.bulk_create(
+                saldos,
+                batch_size=self.TAMANHO_LOTE,
+                update_conflicts=True,
+                unique_fields=['item', 'almoxarifado'],
+                update_fields=['quantidade', 'status_estoque'],
+            )
+            Item.objects.bulk_update(
+                itens,
+                [
+                    'quantidade_atual', 'custo_medio', 'versao', 'status_estoque', 'sequencia',
+                    'razao_saldo', 'razao_hash',
+                ],
+                batch_size=self.TAMANHO_LOTE,
+            )
+            # bulk_update não dispara post_save: o índice de códigos e a busca são invalidados aqui
+            recebidos_ids = [item.pk for item in itens]
+            transaction.on_commit(lambda: codigos.invalidar(item_ids=recebidos_ids))
+            transaction.on_commit(lambda: busca.invalidar(item_ids=recebidos_ids))
+            
+            ResumoEstoque.aplicar_deltas(alteracoes)
+            ResumoFornecedor.aplicar_deltas(alteracoes_fornecedor)
+            # A data das movimentações é preenchida no bulk_create (auto_now_add)
+            ResumoFornecedor.registrar_compras(
+                (fornecedor_id, movimentacao.quantidade, movimentacao.quantidade * movimentacao.custo_unitario,
+                 movimentacao.data)
+                for fornecedor_id, movimentacao in zip(fornecedores, movimentacoes)
+            )
+            if movimentacoes:
+                ResumoMovimentacaoDiaria.somar(timezone.localdate(), 'ENTRADA', len(movimentacoes), total_quantidade)
+            
+            pedido.status = self.STATUS_RECEBIDO
+            pedido.recebido_em = agora
+            pedido.recebido_por = usuario
+            pedido.save(update_fields=['status', 'recebido_em', 'recebido_por'])
+            ResumoFornecedor.registrar_recebimento(pedido)
+        
+        self.status, self.recebido_em, self.recebido_por = pedido.status, pedido.recebido_em, usuario
+        return {
+            'itens_recebidos': len(linhas),
+            'quantidade': total_quantidade,
+            'valor': total_valor,
+        }
+
+    def __str__(self):
+        return f"Pedido #{self.pk} - {self.fornecedor or 'sem fornecedor'}"
+
+
+class ItemPedidoCompra(models.Model):
+    """Linha de um pedido de compra (editável enquanto o pedido é rascunho)."""
+    pedido = models.ForeignKey(PedidoCompra, on_delete=models.CASCADE, related_name='linhas')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='linhas_pedido')
+    quantidade = models.PositiveIntegerField()
+    # Preço de compra previsto (valor unitário do item na geração)
+    custo_unitario = models.DecimalField("Custo unitário", max_digits=14, decimal_places=4)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pedido', 'item'], name='pedido_item_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.quantidade}"
+
+
+class SegmentoMovimentacao(models.Model):
+    """
+    Mês do razão de movimentações arquivado em disco (ver ``estoque/arquivo.py``).
+    
+    Os totais por tipo e por dia permitem responder às consultas históricas
+    sem abrir o arquivo quando o intervalo cobre o mês inteiro.
+    """
+    # Primeiro dia do mês arquivado (horário local)
+    competencia = models.DateField(unique=True)
+    # Nome do arquivo em settings.ARQUIVO_MOVIMENTACOES_DIR
+    arquivo = models.CharField(max_length=255)
+    linhas = models.IntegerField()
+    data_inicial = models.DateTimeField()
+    data_final = models.DateTimeField()
+    # {tipo: "soma de quantidade * custo_unitario"}
+    valor_por_tipo = models.JSONField(default=dict)
+    # {"AAAA-MM-DD": {tipo: [movimentacoes, quantidade]}}, somado em ResumoMovimentacaoDiaria.calcular_valores
+    resumo_diario = models.JSONField(default=dict)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    # Linhas lidas por vez do cursor ao arquivar um mês
+    TAMANHO_LOTE = 2000
+
+    class Meta:
+        ordering = ['competencia']
+
+    def total_para(self, tipos_positivos, tipos_negativos=()):
+        """Valor líquido do mês para os tipos informados, a partir dos totais gravados."""
+        total = Decimal('0')
+        for tipo, valor in self.valor_por_tipo.items():
+            if tipo in tipos_positivos:
+                total += Decimal(valor)
+            elif tipo in tipos_negativos:
+                total -= Decimal(valor)
+        return total
+
+    @classmethod
+    def arquivar(cls, corte):
+        """
+        Move para segmentos em disco as movimentações anteriores a ``corte``,
+        um segmento por mês, e atualiza o checkpoint de cada item (SaldoArquivado).
+        
+        Args:
+            corte (datetime): Início (local) do primeiro mês que permanece na tabela
+        
+        Returns:
+            list: segmentos criados
+        
+        Raises:
+            ValidationError: se um mês já arquivado voltar a ter movimentações
+        """
+        criados = []
+        while True:
+            primeira = Movimentacao.objects.filter(data__lt=corte).order_by('data').values_list('data', flat=True).first()
+            if primeira is None:
+                return criados
+            competencia = timezone.localtime(primeira).date().replace(day=1)
+            if cls.objects.filter(competencia=competencia).exists():
+                raise ValidationError(f'O mês {competencia:%Y-%m} já foi arquivado e voltou a ter movimentações.')
+            inicio = timezone.make_aware(datetime(competencia.year, competencia.month, 1))
+            proximo = (competencia + timedelta(days=32)).replace(day=1)
+            fim = min(timezone.make_aware(datetime(proximo.year, proximo.month, 1)), corte)
+            criados.append(cls._arquivar_periodo(competencia, inicio, fim))
+
+    @classmethod
+    def _arquivar_periodo(cls, competencia, inicio, fim):
+        from . import arquivo
+        
+        movimentacoes = Movimentacao.objects.filter(data__gte=inicio, data__lt=fim)
+        campos = {nome: i for i, nome in enumerate(arquivo.CAMPOS)}
+        valor_por_tipo = {}
+        resumo_diario = {}
+        por_item = {}
+        datas = {}
+        
+        def linhas():
+            # Lidas do cursor em blocos e somadas enquanto o arquivo é gravado
+            consulta = movimentacoes.order_by('data', 'id').values_list(*arquivo.CAMPOS)
+            for linha in consulta.iterator(chunk_size=cls.TAMANHO_LOTE):
+                tipo, quantidade, custo = linha[campos['tipo']], linha[campos['quantidade']], linha[campos['custo_unitario']]
+                valor = quantidade * custo if custo is not None else Decimal('0')
+                valor_por_tipo[tipo] = valor_por_tipo.get(tipo, Decimal('0')) + valor
+                
+                data = linha[campos['data']]
+                datas.setdefault('inicial', data)
+                datas['final'] = data
+                dia = resumo_diario.setdefault(timezone.localdate(data).isoformat(), {})
+                contagem = dia.setdefault(tipo, [0, 0])
+                contagem[0] += 1
+                contagem[1] += quantidade
+                
+                sinal = 1 if tipo in TIPOS_ENTRADA else -1 if tipo in TIPOS_SAIDA else 0
+                if sinal:
+                    acumulado = por_item.setdefault(linha[campos['item_id']], [0, Decimal('0')])
+                    acumulado[0] += sinal * quantidade
+                    acumulado[1] += sinal * valor
+                yield linha
+        
+        nome = f'movimentacoes-{competencia:%Y-%m}.seg'
+        destino = arquivo.diretorio() / nome
+        # Gravado com outro nome e renomeado só no commit: um rollback não deixa segmento
+        temporario = destino.with_name(f'{nome}.tmp')
+        total = arquivo.escrever_segmento(temporario, linhas(), [t for t, _ in Movimentacao.TIPO_CHOICES])
+        
+        try:
+            with transaction.atomic():
+                segmento = cls.objects.create(
+                    competencia=competencia,
+                    arquivo=nome,
+                    linhas=total,
+                    data_inicial=datas['inicial'],
+                    data_final=datas['final'],
+                    valor_por_tipo={tipo: str(valor) for tipo, valor in valor_por_tipo.items()},
+                    resumo_diario=resumo_diario,
+                )
+                SaldoArquivado.acumular(por_item, fim, cls._pontas_razao(movimentacoes))
+                # O segmento não guarda os lotes: sem a cópia, o CASCADE apagaria o histórico deles
+                MovimentacaoLoteArquivada.arquivar(movimentacoes)
+                movimentacoes.delete()
+                transaction.on_commit(lambda: os.replace(temporario, destino))
+        except BaseException:
+            temporario.unlink(missing_ok=True)
+            raise
+        return segmento
+
+    @staticmethod
+    def _pontas_razao(movimentacoes):
+        """(hash_razao, saldo_razao) da última movimentação de cada item no período."""
+        ultimas = movimentacoes.values('item_id').annotate(ultima=Max('pk')).values_list('ultima', flat=True)
+        return {
+            item_id: (hash_razao, saldo)
+            for item_id, hash_razao, saldo in Movimentacao.objects.filter(pk__in=ultimas).values_list(
+                'item_id', 'hash_razao', 'saldo_razao',
+            ).iterator(chunk_size=2000)
+        }
+
+    def __str__(self):
+        return f"{self.competencia:%Y-%m} ({self.linhas} movimentações)"
+
+
+class SaldoArquivado(models.Model):
+    """
+    Checkpoint por item no corte do arquivamento: líquido (quantidade e
+    valor) das ENTRADAS/DEVOLUÇÕES menos SAÍDAS/RETIRADAS já arquivadas.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name='saldo_arquivado')
+    corte = models.DateTimeField()
+    quantidade_liquida = models.IntegerField(default=0)
+    valor_liquido = models.DecimalField(max_digits=18, decimal_places=4, default=Decimal('0'))
+    # Ponta da cadeia do razão (estoque/razao.py) na última movimentação arquivada
+    razao_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    razao_saldo = models.IntegerField(null=True, blank=True, editable=False)
+
+    @classmethod
+    def acumular(cls, por_item, corte, pontas=None):
+        """
+        Soma ao checkpoint de cada item o líquido de um período recém-arquivado.
+        
+        Args:
+            por_item (dict): {item_id: [quantidade_liquida, valor_liquido]}
+            corte (datetime): Fim do período arquivado
+            pontas (dict): {item_id: (hash_razao, saldo_razao)} da última
+                movimentação arquivada de cada item no período
+        """
+        pontas = pontas or {}
+        # Todos os itens avançam o corte, inclusive os sem movimentação no período
+        cls.objects.update(corte=corte)
+        atuais = {
+            item_id: (quantidade, valor, razao_hash, razao_saldo)
+            for item_id, quantidade, valor, razao_hash, razao_saldo in cls.objects.values_list(
+                'item_id', 'quantidade_liquida', 'valor_liquido', 'razao_hash', 'razao_saldo',
+            )
+        }
+        registros = []
+        for item_id in por_item.keys() | pontas.keys():
+            quantidade, valor = por_item.get(item_id, (0, 0))
+            anterior = atuais.get(item_id, (0, 0, '', None))
+            razao_hash, razao_saldo = pontas.get(item_id, anterior[2:])
+            registros.append(cls(
+                item_id=item_id, corte=corte,
+                quantidade_liquida=anterior[0] + quantidade, valor_liquido=anterior[1] + valor,
+                razao_hash=razao_hash, razao_saldo=razao_saldo,
+            ))
+        cls.objects.bulk_create(
+            registros,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['item'],
+            update_fields=['corte', 'quantidade_liquida', 'valor_liquido', 'razao_hash', 'razao_saldo'],
+        )
+
+    def __str__(self):
+        return f"{self.item_id} até {self.corte:%Y-%m-%d}: {self.quantidade_liquida}"
+
+
+class VerificacaoRazao(models.Model):
+    """
+    Ponto de verificação do razão (linha única): ``manage.py verify_ledger``
+    confere só as movimentações com pk maior que ``ultima_movimentacao`` e o
+    avança quando não há divergências (ou após corrigi-las).
+    """
+    ultima_movimentacao = models.BigIntegerField(default=0)
+    verificado_em = models.DateTimeField(null=True, blank=True)
+
+    PK = 1
+
+    @classmethod
+    def obter(cls):
+        return cls.objects.get_or_create(pk=cls.PK)[0]
+
+    def __str__(self):
+        return f"Razão verificado até a movimentação {self.ultima_movimentacao}"
+
+
+class SequenciaSincronizacao(models.Model):
+    """
+    Registro de alterações da API de sincronização: cada número da sequência
+    é o ``id`` (autoincremento) de uma linha desta tabela.
+    
+    Cada gravação de Item, Fornecedor ou Movimentacao insere sua linha dentro
+    da própria transação. Escritores concorrentes não disputam nenhuma linha,
+    mas podem confirmar fora de ordem: enquanto a transação que reservou um
+    número está aberta, ele é uma lacuna para os leitores. ``confirmado_ate``
+    corta a leitura antes da primeira lacuna recente, para que um cliente que
+    já leu até N não perca alterações com número menor. Lacunas mais antigas
+    que ``SINCRONIZACAO_ESPERA_LACUNA`` segundos são de transações desfeitas.
+    """
+    criado_em = models.DateTimeField(default=timezone.now, db_index=True)
+
+    @classmethod
+    def reservar(cls):
+        """
+        Reserva o próximo número da sequência (na transação que grava a linha).
+        
+        Returns:
+            int: O número reservado
+        """
+        return cls.objects.create().pk
+
+    @classmethod
+    def reservar_lote(cls, quantidade):
+        """
+        Reserva ``quantidade`` números em um INSERT (na transação que grava as linhas).
+        
+        Returns:
+            list: Os números reservados, em ordem crescente (não necessariamente consecutivos)
+        """
+        if not quantidade:
+            return []
+        agora = timezone.now()
+        return sorted(registro.pk for registro in cls.objects.bulk_create([cls(criado_em=agora) for _ in range(quantidade)]))
+
+    @classmethod
+    def espera(cls):
+        return timedelta(seconds=settings.SINCRONIZACAO_ESPERA_LACUNA)
+
+    @classmethod
+    def confirmado_ate(cls, desde):
+        """
+        Maior número após ``desde`` sem lacuna recente antes dele.
+        
+        Só as linhas criadas dentro da janela de espera são lidas: uma lacuna
+        seguida de uma linha mais antiga que a janela é dada como desfeita.
+        
+        Args:
+            desde (int): Cursor do cliente
+        
+        Returns:
+            int | None: O limite, ou None se não houver lacuna recente após ``desde``
+        """
+        registros = cls.objects
+        janela = timezone.now() - cls.espera()
+        anterior = registros.filter(criado_em__lt=janela).aggregate(maior=Max('pk'))['maior'] or 0
+        anterior = max(anterior, desde)
+        for numero in registros.filter(pk__gt=anterior).order_by('pk').values_list('pk', flat=True).iterator():
+            if numero != anterior + 1:
+                return anterior
+            anterior = numero
+        return None
+
+    @classmethod
+    def limpar(cls):
+        """
+        Remove os registros mais antigos que a janela de espera, menos o último
+        deles: ``confirmado_ate`` parte dele, então um cursor anterior à limpeza
+        não enxerga lacunas. O autoincremento não reutiliza os números.
+        
+        Returns:
+            int: Registros removidos
+        """
+        antigos = cls.objects.filter(criado_em__lt=timezone.now() - cls.espera())
+        ultimo = antigos.aggregate(maior=Max('pk'))['maior']
+        if ultimo is None:
+            return 0
+        return antigos.filter(pk__lt=ultimo).delete()[0]
+
+    @classmethod
+    def renumerar(cls, model, pks):
+        """Atribui novos números às linhas alteradas sem passar pelo save() (ex.: SET_NULL)."""
+        pks = list(pks)
+        if not pks:
+            return
+        model.objects.bulk_update(
+            [model(pk=pk, sequencia=numero) for pk, numero in zip(pks, cls.reservar_lote(len(pks)))],
+            ['sequencia'],
+            batch_size=1000,
+        )
+
+
+class ExclusaoSincronizacao(models.Model):
+    """
+    Registro de exclusão (tombstone) para a API de sincronização.
+    
+    Movimentações removidas pelo arquivamento (SegmentoMovimentacao) não geram
+    registro: continuam válidas, apenas saíram da tabela.
+    """
+    MODELO_CHOICES = [
+        ('item', 'Item'),
+        ('fornecedor', 'Fornecedor'),
+        ('movimentacao', 'Movimentação'),
+    ]
+
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    sequencia = models.BigIntegerField(db_index=True)
+    excluido_em = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def registrar(cls, instancia):
+        """Registra a exclusão de ``instancia`` (chamar na transação do delete(), antes de excluir)."""
+        return cls.objects.create(
+            modelo=instancia._meta.model_name,
+            objeto_id=instancia.pk,
+            sequencia=SequenciaSincronizacao.reservar(),
+        )
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} (#{self.sequencia})"
+
+
+class RegistroAuditoria(models.Model):
+    """
+    Alteração de Item, Fornecedor ou Movimentacao (ver estoque/auditoria.py).
+    
+    ``alteracoes`` guarda ``{campo: [antes, depois]}`` só com os campos que
+    mudaram; na criação ``antes`` é nulo e na exclusão ``depois`` é nulo.
+    """
+    ACAO_CHOICES = [
+        ('CRIACAO', 'Criação'),
+        ('ALTERACAO', 'Alteração'),
+        ('EXCLUSAO', 'Exclusão'),
+    ]
+
+    modelo = models.CharField(max_length=20, choices=ExclusaoSincronizacao.MODELO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    acao = models.CharField(max_length=10, choices=ACAO_CHOICES)
+    alteracoes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Momento da alteração (a gravação do registro acontece depois, em lote)
+    data = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Histórico de um objeto (api_historico_item)
+            models.Index(fields=['modelo', 'objeto_id', 'data'], name='auditoria_objeto_idx'),
+            # Alterações feitas por um usuário
+            models.Index(fields=['usuario', 'data'], name='auditoria_usuario_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.tipo} - {self.item.descricao} ({self.quantidade})"
\ No newline at end of file
+        return f"{self.get_acao_display()} {self.modelo} {self.objeto_id} em {self.data:%d/%m/%Y %H:%M}"
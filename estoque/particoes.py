@@ -0,0 +1,194 @@
+"""
+Relatórios do catálogo inteiro divididos em faixas de ids de item.
+
+``executar(tarefa, combinar, ...)`` divide os itens em faixas com quantidades
+parecidas e roda ``tarefa(inicio, fim, **parametros)`` para cada faixa em um
+``ProcessPoolExecutor``; cada processo abre a própria conexão com o banco.
+Os resultados parciais chegam na ordem das faixas (ids crescentes), então
+``combinar`` produz sempre o mesmo resultado, com qualquer número de processos.
+
+As tarefas precisam ser funções de módulo (serializáveis). Cada faixa é lida
+em sua própria transação: use em relatórios sobre dados fechados ou que
+toleram leituras de instantes ligeiramente diferentes entre as faixas.
+
+Sem paralelismo possível (um trabalhador, banco SQLite em memória ou chamada
+dentro de uma transação, cujas escritas os outros processos não enxergam) as
+faixas rodam em sequência no próprio processo.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+
+def trabalhadores_padrao():
+    return getattr(settings, 'RELATORIOS_TRABALHADORES', None) or os.cpu_count() or 1
+
+
+def faixas_de_itens(partes):
+    """
+    Divide os ids de Item em até ``partes`` faixas com quantidades parecidas.
+
+    Returns:
+        list: tuplas (inicio, fim) com inicio <= id < fim; ``fim`` None na última
+    """
+    from .models import Item
+
+    total = Item.objects.count()
+    if not total:
+        return []
+    partes = max(1, min(partes, total))
+    ids = Item.objects.order_by('pk').values_list('pk', flat=True)
+    inicios = [ids[total * parte // partes] for parte in range(partes)]
+    return list(zip(inicios, inicios[1:] + [None]))
+
+
+def filtrar_faixa(queryset, inicio, fim, campo='pk'):
+    queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    return queryset if fim is None else queryset.filter(**{f'{campo}__lt': fim})
+
+
+def _paralelizavel():
+    conexao = connections[DEFAULT_DB_ALIAS]
+    if conexao.in_atomic_block:
+        return False
+    return not (conexao.vendor == 'sqlite' and conexao.is_in_memory_db())
+
+
+def _contexto():
+    # fork herda as configurações alteradas em tempo de execução (ex.: bancos temporários dos benchmarks)
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+
+
+def _inicializar_trabalhador():
+    import django
+    django.setup()
+    # Conexões herdadas do processo pai nunca são reutilizadas
+    for conexao in connections.all():
+        conexao.connection = None
+        conexao.close()
+
+
+def executar(tarefa, combinar, trabalhadores=None, partes=None, **parametros):
+    """
+    Executa ``tarefa`` em cada faixa de itens e combina os parciais.
+
+    Args:
+        tarefa (callable): ``tarefa(inicio, fim, **parametros)``, função de módulo
+        combinar (callable): recebe a lista de parciais na ordem das faixas
+        trabalhadores (int): processos (padrão: settings.RELATORIOS_TRABALHADORES ou núcleos)
+        partes (int): faixas (padrão: 4 por trabalhador, para equilibrar a carga)
+
+    Returns:
+        o valor de ``combinar(parciais)``
+    """
+    trabalhadores = trabalhadores or trabalhadores_padrao()
+    faixas = faixas_de_itens(partes or trabalhadores * 4)
+    funcao = partial(tarefa, **parametros)
+    if trabalhadores == 1 or len(faixas) < 2 or not _paralelizavel():
+        return combinar([funcao(inicio, fim) for inicio, fim in faixas])
+
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=min(trabalhadores, len(faixas)), mp_context=_contexto(), initializer=_inicializar_trabalhador,
+    ) as pool:
+        parciais = list(pool.map(funcao, [inicio for inicio, _ in faixas], [fim for _, fim in faixas]))
+    return combinar(parciais)
+
+
+# ================================
+# TAREFAS
+# ================================
+
+def valorizar_faixa(inicio, fim, ate=None):
+    """
+    Quantidade e valor de cada item da faixa pelo razão (até ``ate``), mais o
+    líquido já arquivado (SaldoArquivado).
+
+    Returns:
+        list: tuplas (item_id, codigo, descricao, quantidade, valor) por id
+    """
+    from .models import TIPOS_ENTRADA, TIPOS_SAIDA, Movimentacao, SaldoArquivado, Item
+    from .views import _valor_movimentado
+
+    movimentacoes = filtrar_faixa(Movimentacao.objects.all(), inicio, fim, campo='item_id')
+    if ate is not None:
+        movimentacoes = movimentacoes.filter(data__lte=ate)
+    por_item = {
+        item_id: (saldo or 0, valor or 0)
+        for item_id, saldo, valor in movimentacoes.values('item_id').annotate(
+            saldo=Sum(Case(
+                When(tipo__in=TIPOS_ENTRADA, then=F('quantidade')),
+                When(tipo__in=TIPOS_SAIDA, then=-F('quantidade')),
+                default=0,
+                output_field=IntegerField(),
+            )),
+            valor_total=Sum(_valor_movimentado()),
+        ).order_by().values_list('item_id', 'saldo', 'valor_total')
+    }
+    arquivados = {
+        item_id: (quantidade, valor)
+        for item_id, quantidade, valor in filtrar_faixa(SaldoArquivado.objects.all(), inicio, fim, campo='item_id')
+        .values_list('item_id', 'quantidade_liquida', 'valor_liquido')
+    }
+
+    linhas = []
+    for item_id, codigo, descricao in filtrar_faixa(Item.objects.order_by('pk'), inicio, fim).values_list(
+        'pk', 'codigo', 'descricao',
+    ):
+        quantidade, valor = por_item.get(item_id, (0, 0))
+        quantidade_arquivada, valor_arquivado = arquivados.get(item_id, (0, 0))
+        linhas.append((item_id, codigo, descricao, quantidade + quantidade_arquivada, valor + valor_arquivado))
+    return linhas
+
+
+def combinar_linhas(parciais):
+    return [linha for parcial in parciais for linha in parcial]
+
+
+def valorizacao_por_item(ate=None, trabalhadores=None):
+    """
+    Quantidade e valor pelo razão de todos os itens, em paralelo por faixas.
+
+    Args:
+        ate (datetime | None): Data de referência (padrão: todo o razão)
+        trabalhadores (int): ver ``executar``
+
+    Returns:
+        list: tuplas (item_id, codigo, descricao, quantidade, valor) por id
+
+    Raises:
+        ValueError: se ``ate`` for anterior ao corte do arquivamento
+    """
+    from .models import SaldoArquivado
+
+    corte = SaldoArquivado.objects.aggregate(corte=Max('corte'))['corte']
+    if ate is not None and corte is not None and ate < corte:
+        raise ValueError(f'Data anterior ao período arquivado (corte em {corte:%Y-%m-%d}).')
+    return executar(valorizar_faixa, combinar_linhas, trabalhadores=trabalhadores, ate=ate)
+
+
+def saldos_divergentes_faixa(inicio, fim):
+    """
+    Itens da faixa cujo total difere da soma dos saldos por almoxarifado.
+
+    Returns:
+        list: tuplas (codigo, quantidade_atual, soma_saldos) por id
+    """
+    from .models import Item, SaldoEstoque
+
+    soma = SaldoEstoque.objects.filter(item_id=OuterRef('pk')).values('item_id').annotate(
+        total=Sum('quantidade'),
+    ).values('total')
+    return list(
+        filtrar_faixa(Item.objects.order_by('pk'), inicio, fim)
+        .annotate(soma_saldos=Coalesce(Subquery(soma), 0))
+        .exclude(quantidade_atual=F('soma_saldos'))
+        .values_list('codigo', 'quantidade_atual', 'soma_saldos')
+    )
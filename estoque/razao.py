@@ -0,0 +1,302 @@
+"""
+Encadeamento e verificação incremental do razão de movimentações.
+
+Cada movimentação guarda ``saldo_razao`` (total do item após ela, segundo o
+razão) e ``hash_razao``, o SHA-256 do hash da movimentação anterior do mesmo
+item mais os campos que definem o lançamento (ver ``calcular_hash``). O item
+guarda a ponta da cadeia (``razao_saldo``/``razao_hash``), então encadear uma
+movimentação não custa consulta além da leitura do item já feita no save().
+
+``verificar()`` percorre só as movimentações posteriores ao último ponto de
+verificação (``VerificacaoRazao``), partindo da última movimentação já
+verificada de cada item:
+
+* hash diferente do recalculado: movimentação alterada, inserida ou excluída;
+* saldo incompatível com o tipo e a quantidade;
+* ponta da cadeia no item diferente da última movimentação;
+* ``quantidade_atual`` diferente de ``razao_saldo``: estoque alterado fora do
+  razão (edição direta da quantidade, UPDATE manual, devoluções anteriores à
+  correção do tipo DEVOLUCAO). Na verificação incremental, só nos itens com
+  movimentações novas; a completa (``desde=0``) confere todos os itens.
+
+Movimentações arquivadas (``SegmentoMovimentacao``) saem da tabela; a ponta
+da cadeia de cada item no corte fica em ``SaldoArquivado`` e ancora a
+primeira movimentação que permaneceu.
+
+``corrigir()`` refaz a cadeia dos itens afetados e iguala a quantidade dos
+itens à do razão.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import F, Max
+
+# Hash "anterior" da primeira movimentação de cada item
+GENESE = ''
+TAMANHO_LOTE = 1000
+
+_ENTRADAS = ('ENTRADA', 'DEVOLUCAO')
+_SAIDAS = ('SAIDA', 'RETIRADA')
+
+
+def calcular_hash(anterior, item_id, almoxarifado_id, tipo, quantidade, saldo, sequencia):
+    conteudo = f'{anterior}|{item_id}|{almoxarifado_id}|{tipo}|{quantidade}|{saldo}|{sequencia}'
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+def encadear(movimentacao, item, variacao):
+    """
+    Liga a movimentação (ainda não gravada) à cadeia do item e avança a ponta.
+    O item deve ter sido lido com trava (select_for_update) na transação.
+
+    Args:
+        movimentacao (Movimentacao): com ``sequencia`` e ``almoxarifado_id`` preenchidos
+        item (Item): item da movimentação (é alterado, não gravado)
+        variacao (int): variação aplicada ao total do item
+    """
+    movimentacao.saldo_razao = item.razao_saldo + variacao
+    movimentacao.hash_razao = calcular_hash(
+        item.razao_hash, movimentacao.item_id, movimentacao.almoxarifado_id, movimentacao.tipo,
+        movimentacao.quantidade, movimentacao.saldo_razao, movimentacao.sequencia,
+    )
+    item.razao_saldo = movimentacao.saldo_razao
+    item.razao_hash = movimentacao.hash_razao
+
+
+def saldo_compativel(tipo, quantidade, anterior, saldo):
+    """Se a variação do total é possível para o lançamento (saídas podem ser limitadas pelo saldo do local)."""
+    variacao = saldo - anterior
+    if tipo in _ENTRADAS:
+        return variacao == quantidade
+    if tipo in _SAIDAS:
+        return -quantidade <= variacao <= 0
+    return variacao == 0
+
+
+def _efeito(tipo, quantidade, saldo):
+    """Variação do total na reconstrução da cadeia (saídas não deixam o total negativo)."""
+    if tipo in _ENTRADAS:
+        return quantidade
+    if tipo in _SAIDAS:
+        return -min(quantidade, max(saldo, 0))
+    return 0
+
+
+_CAMPOS = ('pk', 'item_id', 'almoxarifado_id', 'tipo', 'quantidade', 'saldo_razao', 'hash_razao', 'sequencia')
+
+
+def _ancoras(movimentacao_model, item_ids, ate):
+    """
+    (hash, saldo) da última movimentação de cada item com pk <= ``ate`` ou,
+    sem nenhuma na tabela, da última arquivada (ponta guardada em SaldoArquivado).
+    """
+    from .models import SaldoArquivado
+
+    ultimas = movimentacao_model.objects.filter(item_id__in=item_ids, pk__lte=ate).values('item_id').annotate(
+        ultima=Max('pk'),
+    ).values_list('ultima', flat=True)
+    ancoras = {
+        item_id: (hash_razao, saldo)
+        for item_id, hash_razao, saldo in movimentacao_model.objects.filter(pk__in=list(ultimas)).values_list(
+            'item_id', 'hash_razao', 'saldo_razao',
+        )
+    }
+    arquivadas = SaldoArquivado.objects.filter(
+        item_id__in=[item_id for item_id in item_ids if item_id not in ancoras],
+    ).exclude(razao_hash=GENESE).values_list('item_id', 'razao_hash', 'razao_saldo')
+    for item_id, hash_razao, saldo in arquivadas:
+        ancoras[item_id] = (hash_razao, saldo)
+    return ancoras
+
+
+def _lotes_de_itens(movimentacao_model, desde):
+    item_ids = sorted(set(
+        movimentacao_model.objects.filter(pk__gt=desde).values_list('item_id', flat=True).distinct()
+    ))
+    for inicio in range(0, len(item_ids), TAMANHO_LOTE):
+        yield item_ids[inicio:inicio + TAMANHO_LOTE]
+
+
+def verificar(desde=0):
+    """
+    Confere as movimentações com pk > ``desde`` e a quantidade dos itens que
+    as têm. Com ``desde=0`` confere a quantidade de todos os itens, o que
+    revela também as alterações feitas sem nenhuma movimentação.
+
+    Args:
+        desde (int): pk da última movimentação já verificada (0 = razão inteiro)
+
+    Returns:
+        tuple: (divergencias, ultima) — divergencias é uma lista de tuplas
+        (item_id, descricao); ultima é o maior pk conferido
+    """
+    from .models import Item, Movimentacao
+
+    divergencias = []
+    ultima = desde
+    for item_ids in _lotes_de_itens(Movimentacao, desde):
+        ancoras = _ancoras(Movimentacao, item_ids, desde)
+        pontas = dict(
+            (pk, (razao_hash, razao_saldo))
+            for pk, razao_hash, razao_saldo in Item.objects.filter(pk__in=item_ids).values_list(
+                'pk', 'razao_hash', 'razao_saldo',
+            )
+        )
+        atual = None
+        movimentacoes = Movimentacao.objects.filter(item_id__in=item_ids, pk__gt=desde).order_by('item_id', 'pk')
+        for pk, item_id, almoxarifado_id, tipo, quantidade, saldo, hash_razao, sequencia in (
+            movimentacoes.values_list(*_CAMPOS).iterator(chunk_size=TAMANHO_LOTE)
+        ):
+            if atual is None or atual[0] != item_id:
+                if atual is not None:
+                    divergencias.extend(_conferir_ponta(atual, pontas))
+                anterior, saldo_anterior = ancoras.get(item_id, (GENESE, None))
+                atual = [item_id, anterior, saldo_anterior]
+            _, anterior, saldo_anterior = atual
+            esperado = calcular_hash(anterior, item_id, almoxarifado_id, tipo, quantidade, saldo, sequencia)
+            if hash_razao != esperado:
+                divergencias.append((item_id, f'movimentação {pk}: hash não confere com a cadeia'))
+            elif saldo_anterior is not None and not saldo_compativel(tipo, quantidade, saldo_anterior, saldo):
+                divergencias.append(
+                    (item_id, f'movimentação {pk}: saldo {saldo_anterior} -> {saldo} incompatível com {tipo} de {quantidade}')
+                )
+            atual[1], atual[2] = hash_razao, saldo
+            ultima = max(ultima, pk)
+        if atual is not None:
+            divergencias.extend(_conferir_ponta(atual, pontas))
+        if desde:
+            divergencias.extend(_conferir_quantidades(Item.objects.filter(pk__in=item_ids)))
+
+    if not desde:
+        # Só na verificação completa: percorre todos os itens
+        divergencias.extend(_conferir_quantidades(Item.objects.all()))
+    return divergencias, ultima
+
+
+def _conferir_quantidades(itens):
+    return [
+        (pk, f'quantidade_atual={quantidade} razão={razao_saldo}')
+        for pk, quantidade, razao_saldo in itens.exclude(quantidade_atual=F('razao_saldo')).values_list(
+            'pk', 'quantidade_atual', 'razao_saldo',
+        )
+    ]
+
+
+def _conferir_ponta(atual, pontas):
+    item_id, hash_razao, saldo = atual
+    if pontas.get(item_id) != (hash_razao, saldo):
+        return [(item_id, 'ponta da cadeia no item não corresponde à última movimentação')]
+    return []
+
+
+def reconstruir(item_model, movimentacao_model, tamanho_lote=TAMANHO_LOTE):
+    """
+    Cria a cadeia de todos os itens a partir do saldo de abertura de cada um
+    (ver ``_abertura``), sem alterar ``quantidade_atual``. Usado pela
+    migração que criou a cadeia.
+
+    Args:
+        item_model, movimentacao_model: classes de modelo (reais ou históricas)
+
+    Returns:
+        int: Movimentações encadeadas
+    """
+    total = 0
+    itens = list(item_model.objects.order_by('pk').values_list('pk', 'quantidade_atual'))
+    for inicio in range(0, len(itens), tamanho_lote):
+        lote = dict(itens[inicio:inicio + tamanho_lote])
+        por_item = {}
+        for linha in movimentacao_model.objects.filter(item_id__in=list(lote)).order_by('item_id', 'pk').values_list(
+            'pk', 'item_id', 'almoxarifado_id', 'tipo', 'quantidade', 'sequencia',
+        ):
+            por_item.setdefault(linha[1], []).append(linha)
+        pendentes = []
+        pontas = []
+        for item_id, quantidade_atual in lote.items():
+            linhas = por_item.get(item_id, [])
+            anterior, saldo = GENESE, _abertura(quantidade_atual, linhas)
+            for pk, _, almoxarifado_id, tipo, quantidade, sequencia in linhas:
+                saldo += _efeito(tipo, quantidade, saldo)
+                anterior = calcular_hash(anterior, item_id, almoxarifado_id, tipo, quantidade, saldo, sequencia)
+                pendentes.append(movimentacao_model(pk=pk, saldo_razao=saldo, hash_razao=anterior))
+            pontas.append(item_model(pk=item_id, razao_saldo=saldo, razao_hash=anterior))
+        movimentacao_model.objects.bulk_update(pendentes, ['saldo_razao', 'hash_razao'], batch_size=tamanho_lote)
+        item_model.objects.bulk_update(pontas, ['razao_saldo', 'razao_hash'], batch_size=tamanho_lote)
+        total += len(pendentes)
+    return total
+
+
+def _abertura(quantidade_atual, linhas):
+    """
+    Saldo antes da primeira movimentação. As DEVOLUCOES não entram: até a
+    correção do tipo em Movimentacao.save() elas não somavam ao estoque, e a
+    diferença passa a aparecer como divergência do item.
+    """
+    liquido = 0
+    for _, _, _, tipo, quantidade, _ in linhas:
+        if tipo == 'ENTRADA':
+            liquido += quantidade
+        elif tipo in _SAIDAS:
+            liquido -= quantidade
+    return max(0, quantidade_atual - liquido)
+
+
+def corrigir(item_ids, desde=0):
+    """
+    Refaz a cadeia dos itens a partir da última movimentação verificada e
+    iguala ``quantidade_atual`` ao saldo do razão. A diferença vai para o
+    almoxarifado padrão pelo ``reconciliar_resumo --corrigir``, que também
+    recalcula os contadores derivados.
+
+    Args:
+        item_ids (iterable): Itens com divergência
+        desde (int): pk da última movimentação já verificada
+
+    Returns:
+        int: Itens cuja quantidade foi alterada
+    """
+    from . import busca, codigos
+    from .models import Item, Movimentacao
+
+    item_ids = sorted(set(item_ids))
+    with transaction.atomic():
+        for inicio in range(0, len(item_ids), TAMANHO_LOTE):
+            _reencadear(Item, Movimentacao, item_ids[inicio:inicio + TAMANHO_LOTE], desde)
+        alterados = Item.objects.filter(pk__in=item_ids).exclude(quantidade_atual=F('razao_saldo'))
+        ajustados = list(alterados.values_list('pk', flat=True))
+        alterados.update(quantidade_atual=F('razao_saldo'), versao=F('versao') + 1)
+        transaction.on_commit(lambda: codigos.invalidar(item_ids=ajustados))
+        transaction.on_commit(lambda: busca.invalidar(item_ids=ajustados))
+    return len(ajustados)
+
+
+def _reencadear(item_model, movimentacao_model, item_ids, desde):
+    """
+    Religa as movimentações com pk > ``desde``. A variação gravada é mantida
+    quando compatível com o lançamento; senão, é recalculada.
+    """
+    ancoras = _ancoras(movimentacao_model, item_ids, desde)
+    pendentes = []
+    pontas = []
+    atual = None
+    linhas = movimentacao_model.objects.filter(item_id__in=item_ids, pk__gt=desde).order_by('item_id', 'pk')
+    for pk, item_id, almoxarifado_id, tipo, quantidade, saldo_gravado, _, sequencia in linhas.values_list(*_CAMPOS):
+        if atual is None or atual[0] != item_id:
+            if atual is not None:
+                pontas.append(item_model(pk=atual[0], razao_hash=atual[1], razao_saldo=atual[2]))
+            # Sem movimentação verificada, a primeira do item define a abertura
+            sinal = 1 if tipo in _ENTRADAS else -1 if tipo in _SAIDAS else 0
+            anterior, saldo = ancoras.get(item_id, (GENESE, saldo_gravado - sinal * quantidade))
+            atual = [item_id, anterior, saldo, saldo]
+        _, anterior, saldo, gravado_anterior = atual
+        if saldo_compativel(tipo, quantidade, gravado_anterior, saldo_gravado):
+            novo = saldo + saldo_gravado - gravado_anterior
+        else:
+            novo = saldo + _efeito(tipo, quantidade, saldo)
+        hash_razao = calcular_hash(anterior, item_id, almoxarifado_id, tipo, quantidade, novo, sequencia)
+        pendentes.append(movimentacao_model(pk=pk, saldo_razao=novo, hash_razao=hash_razao))
+        atual[1:] = [hash_razao, novo, saldo_gravado]
+    if atual is not None:
+        pontas.append(item_model(pk=atual[0], razao_hash=atual[1], razao_saldo=atual[2]))
+    movimentacao_model.objects.bulk_update(pendentes, ['saldo_razao', 'hash_razao'], batch_size=TAMANHO_LOTE)
+    item_model.objects.bulk_update(pontas, ['razao_saldo', 'razao_hash'], batch_size=TAMANHO_LOTE)
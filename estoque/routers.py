@@ -0,0 +1,103 @@
+"""
+Roteamento de leituras para a réplica do banco de dados.
+
+Relatórios e APIs de consulta são marcados com ``@leitura_em_replica``;
+dentro deles, as leituras vão para ``settings.DATABASE_ALIAS_LEITURA``.
+Todas as escritas (e leituras dentro de transações) ficam no primário.
+
+Para garantir "read-your-writes", o ``ReplicaLeituraMiddleware`` marca a
+sessão após qualquer requisição de escrita; durante
+``settings.REPLICA_ATRASO_MAXIMO`` segundos as leituras desse usuário
+continuam no primário.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+CHAVE_SESSAO_PRIMARIO = '_leitura_primario_ate'
+
+_usar_replica = ContextVar('usar_replica', default=False)
+# Instante (time.monotonic) até o qual a réplica é considerada indisponível
+_replica_indisponivel_ate = {}
+
+
+def alias_leitura():
+    return getattr(settings, 'DATABASE_ALIAS_LEITURA', DEFAULT_DB_ALIAS)
+
+
+def replica_disponivel(alias):
+    """
+    Verifica se a conexão com a réplica está utilizável.
+
+    Uma falha desativa a réplica por ``REPLICA_INTERVALO_VERIFICACAO``
+    segundos, e as leituras voltam ao primário nesse período.
+
+    Returns:
+        bool: True se a réplica pode receber leituras
+    """
+    if _replica_indisponivel_ate.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        intervalo = getattr(settings, 'REPLICA_INTERVALO_VERIFICACAO', 30)
+        _replica_indisponivel_ate[alias] = time.monotonic() + intervalo
+        return False
+    return True
+
+
+@contextmanager
+def leitura_replica():
+    """Envia à réplica as leituras executadas dentro do bloco."""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def leitura_em_replica(view):
+    """
+    Decorator para views somente leitura (relatórios e APIs GET).
+
+    Não usa a réplica quando a sessão registrou uma escrita recente.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        sessao = getattr(request, 'session', None)
+        if sessao is not None and sessao.get(CHAVE_SESSAO_PRIMARIO, 0) > time.time():
+            return view(request, *args, **kwargs)
+        with leitura_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaLeituraRouter:
+    """Router que separa leituras de relatório (réplica) das escritas (primário)."""
+
+    def db_for_read(self, model, **hints):
+        alias = alias_leitura()
+        if not _usar_replica.get() or alias == DEFAULT_DB_ALIAS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Dentro de uma transação a leitura precisa enxergar as próprias escritas
+            return DEFAULT_DB_ALIAS
+        if not replica_disponivel(alias):
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema por replicação, não por migrate
+        return db == DEFAULT_DB_ALIAS or db != alias_leitura()
@@ -0,0 +1,108 @@
+"""
+Sincronização incremental para clientes offline (coletores de mão).
+
+Item, Fornecedor e Movimentacao guardam em ``sequencia`` o número da última
+alteração, tirado do registro de alterações (``SequenciaSincronizacao``); as
+exclusões ficam em ``ExclusaoSincronizacao`` com a mesma sequência. Cada
+lote para antes do primeiro número ainda não confirmado por outra transação
+(``SequenciaSincronizacao.confirmado_ate``).
+
+O cliente guarda o cursor ``ate`` de cada resposta e pede
+``/api/sync/?since=<ate>``. Cada chamada lê no máximo ``limite + 1`` linhas
+por origem em faixas do índice de ``sequencia``, então o custo é
+proporcional às alterações e não ao tamanho do catálogo. Linhas alteradas
+várias vezes aparecem uma só vez, com o estado atual.
+
+As linhas vão em formato compacto: ``{"campos": [...], "linhas": [[...]]}``.
+
+Cada origem (e as exclusões dela) só vai para quem tem a permissão
+``view_<modelo>`` correspondente, como nas telas (``origens_permitidas``).
+"""
+import heapq
+from itertools import islice
+
+from .models import ExclusaoSincronizacao, Fornecedor, Item, Movimentacao, SequenciaSincronizacao
+
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 5000
+
+ORIGENS = (
+    ('itens', Item, (
+        'id', 'codigo', 'descricao', 'unidade_medida', 'valor_unitario', 'fornecedor_id',
+        'estoque_minimo', 'estoque_maximo', 'quantidade_atual',
+    )),
+    ('fornecedores', Fornecedor, ('id', 'nome', 'cnpj', 'contato', 'telefone', 'email')),
+    ('movimentacoes', Movimentacao, ('id', 'item_id', 'almoxarifado_id', 'tipo', 'quantidade', 'data')),
+)
+
+
+def origens_permitidas(usuario):
+    """
+    Nomes das origens que ``usuario`` pode ler (permissão ``estoque.view_<modelo>``).
+
+    Returns:
+        tuple: Nomes de ``ORIGENS``, na mesma ordem
+    """
+    return tuple(
+        nome for nome, model, _ in ORIGENS
+        if usuario.has_perm(f'{model._meta.app_label}.view_{model._meta.model_name}')
+    )
+
+
+def _faixa(queryset, campos, desde, ate, limite):
+    """Até ``limite + 1`` linhas com desde < sequencia <= ate (sem teto se None), como (sequencia, valores)."""
+    queryset = queryset.filter(sequencia__gt=desde)
+    if ate is not None:
+        queryset = queryset.filter(sequencia__lte=ate)
+    linhas = queryset.order_by('sequencia').values_list('sequencia', *campos)
+    return [(linha[0], linha[1:]) for linha in linhas[:limite + 1]]
+
+
+def alteracoes_desde(desde, limite=LIMITE_PADRAO, origens=None):
+    """
+    Próximo lote de alterações após o cursor ``desde``.
+
+    Args:
+        desde (int): Último número de sequência já aplicado pelo cliente (0 na carga inicial)
+        limite (int): Máximo de registros (linhas + exclusões) no lote
+        origens (iterable): Nomes das origens a incluir (padrão: todas)
+
+    Returns:
+        dict: desde, ate (cursor da próxima chamada), mais (há outro lote),
+        uma entrada compacta por origem incluída e ``exclusoes`` como [modelo, id]
+    """
+    selecionadas = [origem for origem in ORIGENS if origens is None or origem[0] in origens]
+    confirmado = SequenciaSincronizacao.confirmado_ate(desde)
+    fontes = []
+    for nome, model, campos in selecionadas:
+        fontes.append([
+            (sequencia, nome, valores)
+            for sequencia, valores in _faixa(model.objects, campos, desde, confirmado, limite)
+        ])
+    exclusoes = ExclusaoSincronizacao.objects.filter(
+        modelo__in=[model._meta.model_name for _, model, _ in selecionadas],
+    )
+    fontes.append([
+        (sequencia, 'exclusoes', valores)
+        for sequencia, valores in _faixa(exclusoes, ('modelo', 'objeto_id'), desde, confirmado, limite)
+    ])
+
+    # Cada faixa já vem ordenada; a intercalação corta o lote na sequência global
+    lote = list(islice(heapq.merge(*fontes, key=lambda registro: registro[0]), limite + 1))
+    mais = len(lote) > limite
+    lote = lote[:limite]
+
+    resposta = {
+        'desde': desde,
+        'ate': lote[-1][0] if lote else desde,
+        'mais': mais,
+    }
+    for nome, _, campos in selecionadas:
+        resposta[nome] = {'campos': list(campos), 'linhas': []}
+    resposta['exclusoes'] = []
+    for _, nome, valores in lote:
+        if nome == 'exclusoes':
+            resposta['exclusoes'].append(list(valores))
+        else:
+            resposta[nome]['linhas'].append(list(valores))
+    return resposta
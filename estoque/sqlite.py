@@ -0,0 +1,57 @@
+"""
+Modo de alta concorrência para SQLite.
+
+Com ``settings.SQLITE_ALTA_CONCORRENCIA`` ativo:
+
+- cada nova conexão SQLite recebe os ``settings.SQLITE_PRAGMAS`` (WAL,
+  synchronous=NORMAL, busy_timeout, mmap_size, cache_size...), aplicados
+  pelo sinal ``connection_created``;
+- ``transacao_escrita()`` abre a transação com ``BEGIN IMMEDIATE``, que
+  reserva o lock de escrita logo no início (respeitando o busy_timeout)
+  em vez de falhar com "database is locked" ao promover um lock de leitura.
+
+Em outros bancos (ou com o modo desativado) ``transacao_escrita()`` é
+apenas um ``transaction.atomic()``.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def modo_ativo(connection):
+    return connection.vendor == 'sqlite' and getattr(settings, 'SQLITE_ALTA_CONCORRENCIA', False)
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: configura a conexão SQLite recém-aberta."""
+    if not modo_ativo(connection):
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {valor}')
+
+
+@contextmanager
+def transacao_escrita(using=None):
+    """
+    Transação para caminhos de escrita (ex.: registro de movimentação).
+
+    No SQLite em modo de alta concorrência, a transação externa é iniciada
+    com BEGIN IMMEDIATE; blocos aninhados usam savepoints normalmente.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if not modo_ativo(connection) or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Atomic.__enter__ inicia a transação por este método; a troca vale só para este BEGIN
+    connection._start_transaction_under_autocommit = lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+    try:
+        with transaction.atomic(using=using):
+            del connection._start_transaction_under_autocommit
+            yield
+    finally:
+        connection.__dict__.pop('_start_transaction_under_autocommit', None)
@@ -0,0 +1,17 @@
+from django import template
+
+from estoque import ativos
+
+register = template.Library()
+
+
+@register.simple_tag
+def ativo(nome):
+    """
+    URL de uma biblioteca de front-end (ver ``estoque/ativos.py``).
+
+    Uso:
+        {% load estoque_ativos %}
+        <link href="{% ativo 'bootstrap.css' %}" rel="stylesheet">
+    """
+    return ativos.url(nome)
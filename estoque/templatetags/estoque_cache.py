@@ -0,0 +1,54 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+def _versao(obj):
+    # Linhas que exibem dados de outra tabela anotam versao_linha (ex.: fornecedor + indicadores)
+    return getattr(obj, 'versao_linha', obj.versao)
+
+
+@register.simple_tag(takes_context=True)
+def linhas_em_cache(context, objetos, template_linha, nome, *variacoes):
+    """
+    Renderiza uma linha de tabela por objeto, reaproveitando o HTML em cache.
+    
+    A chave de cada linha é formada pelo template, pelo pk e pela ``versao``
+    do objeto (incrementada a cada save()), mais as variações informadas
+    (ex.: permissões que mudam os botões exibidos). Todas as chaves são lidas
+    com um único ``cache.get_many`` e só as linhas ausentes são renderizadas.
+    
+    Uso:
+        {% linhas_em_cache items 'estoque/partials/linha_item.html' 'item' perms.estoque.change_item as linhas %}
+        {% for linha in linhas %}{{ linha }}{% endfor %}
+    
+    Returns:
+        list: HTML (seguro) de cada linha, na ordem de ``objetos``
+    """
+    objetos = list(objetos)
+    if not objetos:
+        return []
+    
+    variacao = hashlib.md5(':'.join(str(v) for v in variacoes).encode()).hexdigest()[:12]
+    chaves = [f'linha:{template_linha}:{obj.pk}:{_versao(obj)}:{variacao}' for obj in objetos]
+    em_cache = cache.get_many(chaves)
+    
+    tpl = context.template.engine.get_template(template_linha)
+    linhas = []
+    novas = {}
+    for chave, obj in zip(chaves, objetos):
+        html = em_cache.get(chave)
+        if html is None:
+            with context.push(**{nome: obj}):
+                html = tpl.render(context)
+            novas[chave] = html
+        linhas.append(mark_safe(html))
+    
+    if novas:
+        cache.set_many(novas, getattr(settings, 'CACHE_LINHAS_TIMEOUT', 60 * 60))
+    return linhas
@@ -5,70 +5,93 @@ Execução dos testes:
     python manage.py test estoque
 """
 
-from django.test import TestCase, Client
-from django.contrib.auth.models import User, Permission
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, Client
+from django.contrib.auth.models import Group, User, Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.urls import reverse
+from django.utils import timezone
 from decimal import Decimal
-from .models import Item, Fornecedor, EstoqueManager
+from io import StringIO
+from datetime import datetime, timedelta
+from pathlib import Path
+import gzip
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
+from .models import (
+    Item, Fornecedor, EstoqueManager, Movimentacao,
+    ResumoEstoque, ResumoMovimentacaoDiaria, Inventario, Almoxarifado, SaldoEstoque,
+    SegmentoMovimentacao, SaldoArquivado, RegistroAuditoria, PedidoCompra, ResumoFornecedor,
+    Lote, MovimentacaoLote, MovimentacaoLoteArquivada, VerificacaoRazao, SequenciaSincronizacao,
+)
+import json
+from .routers import leitura_replica
+from .sqlite import aplicar_pragmas
+from . import aquecimento, arquivo, ativos, auditoria, autenticacao, busca, codigos, particoes, razao
+
+
+# ================================
+# FÁBRICAS
+# ================================
+
+def criar_fornecedor(**campos):
+    """Cria um Fornecedor com valores padrão para os campos não informados."""
+    campos.setdefault('nome', f'Fornecedor {Fornecedor.objects.count() + 1}')
+    return Fornecedor.objects.create(**campos)
+
+
+def criar_item(codigo, quantidade_atual=0, **campos):
+    """Cria um Item com mínimo 300, máximo 1000 e os demais campos padrão."""
+    campos.setdefault('descricao', f'Item {codigo}')
+    campos.setdefault('unidade_medida', 'UN')
+    campos.setdefault('valor_unitario', Decimal('10.00'))
+    campos.setdefault('estoque_minimo', 300)
+    campos.setdefault('estoque_maximo', 1000)
+    return Item.objects.create(codigo=codigo, quantidade_atual=quantidade_atual, **campos)
+
+
+def arquivar_movimentacoes(antes):
+    """Roda archive_movimentacoes executando os on_commit (o segmento só é publicado no commit)."""
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        call_command('archive_movimentacoes', '--before', antes, stdout=StringIO())
+
+
+def criar_usuario(username, *permissoes, password='testpass123'):
+    """Cria um usuário com as permissões (codenames) informadas."""
+    user = User.objects.create_user(username=username, password=password)
+    if permissoes:
+        user.user_permissions.add(*Permission.objects.filter(codename__in=permissoes))
+    return user
+
 
 
 class EstoqueManagerTestCase(TestCase):
     """Testes para a classe EstoqueManager"""
     
-    def setUp(self):
-        """Configura dados de teste"""
-        self.fornecedor = Fornecedor.objects.create(
-            nome="Fornecedor Teste",
-            cnpj="12.345.678/0001-90"
-        )
-        
-        # Item com estoque crítico (abaixo de 50% do mínimo)
-        self.item_critico = Item.objects.create(
-            codigo="CRIT001",
-            descricao="Item Crítico",
-            unidade_medida="UN",
-            valor_unitario=Decimal("10.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=100  # Menos de 50% do mínimo (150)
-        )
-        
-        # Item com estoque baixo (abaixo do mínimo)
-        self.item_baixo = Item.objects.create(
-            codigo="BAIX001",
-            descricao="Item Baixo",
-            unidade_medida="UN",
-            valor_unitario=Decimal("15.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=250  # Abaixo do mínimo mas acima de 50%
-        )
-        
-        # Item com estoque OK
-        self.item_ok = Item.objects.create(
-            codigo="OK001",
-            descricao="Item OK",
-            unidade_medida="UN",
-            valor_unitario=Decimal("20.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=500  # Entre mínimo e máximo
-        )
+    @classmethod
+    def setUpTestData(cls):
+        """Configura dados de teste (uma vez para a classe)"""
+        cls.fornecedor = criar_fornecedor(nome="Fornecedor Teste", cnpj="12.345.678/0001-90")
         
-        # Item com estoque alto (acima do máximo)
-        self.item_alto = Item.objects.create(
-            codigo="ALTO001",
-            descricao="Item Alto",
-            unidade_medida="UN",
-            valor_unitario=Decimal("25.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=1500  # Acima do máximo
-        )
+        # Item com estoque crítico (abaixo de 50% do mínimo de 300)
+        cls.item_critico = criar_item("CRIT001", 100, fornecedor=cls.fornecedor, valor_unitario=Decimal("10.00"))
+        # Item com estoque baixo (abaixo do mínimo mas acima de 50%)
+        cls.item_baixo = criar_item("BAIX001", 250, fornecedor=cls.fornecedor, valor_unitario=Decimal("15.00"))
+        # Item com estoque OK (entre mínimo e máximo)
+        cls.item_ok = criar_item("OK001", 500, fornecedor=cls.fornecedor, valor_unitario=Decimal("20.00"))
+        # Item com estoque alto (acima do máximo de 1000)
+        cls.item_alto = criar_item("ALTO001", 1500, fornecedor=cls.fornecedor, valor_unitario=Decimal("25.00"))
     
     def test_verifica_estoque_critico(self):
         """Testa verificação de estoque crítico"""
@@ -187,48 +210,20 @@ class EstoqueManagerTestCase(TestCase):
 class APIAlertasTestCase(TestCase):
     """Testes para as APIs de alertas de estoque"""
     
-    def setUp(self):
-        """Configura dados de teste e autenticação"""
-        self.client = Client()
-        self.user = User.objects.create_user(
-            username='testuser',
-            password='testpass123'
-        )
-        
-        # Adiciona permissões necessárias
-        view_permission = Permission.objects.get(codename='view_item')
-        self.user.user_permissions.add(view_permission)
-        
-        self.client.login(username='testuser', password='testpass123')
-        
-        self.fornecedor = Fornecedor.objects.create(
-            nome="Fornecedor API",
-            cnpj="98.765.432/0001-10"
-        )
-        
-        # Cria itens de teste
-        self.item_critico = Item.objects.create(
-            codigo="API001",
-            descricao="Item Teste Crítico",
-            unidade_medida="UN",
-            valor_unitario=Decimal("10.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=100
-        )
-        
-        self.item_ok = Item.objects.create(
-            codigo="API002",
-            descricao="Item Teste OK",
-            unidade_medida="UN",
-            valor_unitario=Decimal("15.00"),
-            fornecedor=self.fornecedor,
-            estoque_minimo=300,
-            estoque_maximo=1000,
-            quantidade_atual=500
+    @classmethod
+    def setUpTestData(cls):
+        """Configura dados de teste (uma vez para a classe)"""
+        cls.user = criar_usuario('testuser', 'view_item')
+        cls.fornecedor = criar_fornecedor(nome="Fornecedor API", cnpj="98.765.432/0001-10")
+        cls.item_critico = criar_item("API001", 100, fornecedor=cls.fornecedor, descricao="Item Teste Crítico")
+        cls.item_ok = criar_item(
+            "API002", 500, fornecedor=cls.fornecedor, descricao="Item Teste OK", valor_unitario=Decimal("15.00"),
         )
     
+    def setUp(self):
+        """Autentica o cliente sem passar pelo hash de senha"""
+        self.client.force_login(self.user)
+    
     def test_api_alertas_estoque(self):
         """Testa endpoint de alertas gerais"""
         response = self.client.get(reverse('api_alertas_estoque'))
@@ -272,9 +267,1971 @@ class APIAlertasTestCase(TestCase):
         self.assertIn('itens', data)
         self.assertGreater(data['total'], 0)
     
+    def test_fields_limita_chaves_e_colunas(self):
+        """Testa que ?fields= reduz o payload e as colunas lidas do banco"""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('api_alertas_estoque'), {'fields': 'status,item_id'})
+        self.assertEqual(response.json()['alertas'], [{'status': 'CRITICO', 'item_id': self.item_critico.pk}])
+        self.assertEqual(response.json()['resumo']['criticos'], 1)
+        sql = consultas[-1]['sql']
+        self.assertIn('"quantidade_atual"', sql)
+        for coluna in ('"descricao"', '"codigo"', '"valor_unitario"', '"fornecedor_id"'):
+            self.assertNotIn(coluna, sql)
+        
+        url = reverse('api_status_item', kwargs={'item_id': self.item_critico.id})
+        with CaptureQueriesContext(connection) as consultas:
+            data = self.client.get(url, {'fields': 'item_codigo, nivel_urgencia'}).json()
+        self.assertEqual(data, {'item_codigo': 'API001', 'nivel_urgencia': 3})
+        # Sem a consulta dos saldos, que não foram pedidos
+        self.assertNotIn('estoque_saldoestoque', consultas[-1]['sql'])
+        self.assertIn('"codigo"', consultas[-1]['sql'])
+        self.assertNotIn('"descricao"', consultas[-1]['sql'])
+        
+        with CaptureQueriesContext(connection) as consultas:
+            data = self.client.get(url, {'fields': 'saldos'}).json()
+        self.assertEqual(data, {'saldos': [{'almoxarifado': 'CENTRAL', 'quantidade': 100, 'status': 'CRITICO'}]})
+        # Existência do item (só o id) e os saldos; sem carregar colunas adiadas
+        item_sql, saldos_sql = [q['sql'] for q in consultas.captured_queries if 'estoque_' in q['sql']]
+        self.assertTrue(item_sql.startswith('SELECT "estoque_item"."id" FROM'))
+        self.assertIn('estoque_saldoestoque', saldos_sql)
+        
+        data = self.client.get(reverse('api_itens_reposicao'), {'fields': 'mensagem', 'almoxarifado': 'CENTRAL'}).json()
+        self.assertEqual(data['itens'], [{'mensagem': 'CRÍTICO: Estoque abaixo de 50% do mínimo (100/300)'}])
+        
+        response = self.client.get(reverse('api_itens_criticos'), {'fields': 'status,senha'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('senha', response.json()['erro'])
+    
     def test_api_sem_autenticacao(self):
         """Testa que APIs requerem autenticação"""
         self.client.logout()
         response = self.client.get(reverse('api_alertas_estoque'))
         # Deve redirecionar para login (302) ou retornar 401/403
         self.assertIn(response.status_code, [302, 401, 403])
+
+
+class ResumoEstoqueTestCase(TestCase):
+    """Testes para os contadores incrementais do painel"""
+    
+    def setUp(self):
+        """Configura dados de teste"""
+        self.item = Item.objects.create(
+            codigo="RES001",
+            descricao="Item Resumo",
+            unidade_medida="UN",
+            valor_unitario=Decimal("10.00"),
+            estoque_minimo=300,
+            estoque_maximo=1000,
+            quantidade_atual=100
+        )
+        Item.objects.create(
+            codigo="RES002",
+            descricao="Item Resumo OK",
+            unidade_medida="UN",
+            valor_unitario=Decimal("2.50"),
+            estoque_minimo=300,
+            estoque_maximo=1000,
+            quantidade_atual=400
+        )
+    
+    def test_contadores_apos_criacao(self):
+        """Testa que a criação de itens atualiza os contadores"""
+        resumo = ResumoEstoque.obter()
+        self.assertEqual(resumo.total_itens, 2)
+        self.assertEqual(resumo.valor_total_estoque, Decimal("2000.00"))
+        self.assertEqual(resumo.itens_critico, 1)
+        self.assertEqual(resumo.itens_ok, 1)
+        self.assertEqual(resumo.total_alertas, 1)
+    
+    def test_contadores_apos_movimentacao(self):
+        """Testa que movimentações atualizam valor, status e contagem diária"""
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=300)
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=50)
+        
+        resumo = ResumoEstoque.obter()
+        self.assertEqual(resumo.valor_total_estoque, Decimal("4500.00"))
+        self.assertEqual(resumo.itens_critico, 0)
+        self.assertEqual(resumo.itens_ok, 2)
+        
+        diario = ResumoMovimentacaoDiaria.objects.get(data=timezone.localdate(), tipo='ENTRADA')
+        self.assertEqual(diario.total_movimentacoes, 1)
+        self.assertEqual(diario.quantidade_total, 300)
+    
+    def test_exclusao_item(self):
+        """Testa que a exclusão de item desconta seus contadores e movimentações"""
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=10)
+        self.item.delete()
+        
+        resumo = ResumoEstoque.obter()
+        self.assertEqual(resumo.total_itens, 1)
+        self.assertEqual(resumo.itens_critico, 0)
+        diario = ResumoMovimentacaoDiaria.objects.get(data=timezone.localdate(), tipo='ENTRADA')
+        self.assertEqual(diario.total_movimentacoes, 0)
+    
+    def test_movimentacao_nao_e_excluida(self):
+        """Testa que a exclusão de uma movimentação é recusada, mantendo estoque e contagem diária"""
+        movimentacao = Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=3)
+        with self.assertRaises(ValidationError):
+            movimentacao.delete()
+        
+        self.item.refresh_from_db()
+        self.assertTrue(Movimentacao.objects.filter(pk=movimentacao.pk).exists())
+        self.assertEqual(self.item.quantidade_atual, SaldoEstoque.objects.get(item=self.item).quantidade)
+        self.assertEqual(
+            ResumoMovimentacaoDiaria.calcular_valores(), {(timezone.localdate(), 'SAIDA'): (1, 3)},
+        )
+    
+    def test_contagem_diaria_criada_por_outra_transacao(self):
+        """Testa que somar() refaz o UPDATE quando a linha do dia surge entre o UPDATE e o INSERT"""
+        hoje = timezone.localdate()
+        # A outra transação grava a linha do dia logo depois do UPDATE (que não encontrou nada)
+        ResumoMovimentacaoDiaria.objects.create(data=hoje, tipo='RETIRADA', total_movimentacoes=1, quantidade_total=2)
+        update = QuerySet.update
+        chamadas = []
+        
+        def update_concorrente(queryset, **campos):
+            chamadas.append(campos)
+            return 0 if len(chamadas) == 1 else update(queryset, **campos)
+        
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_concorrente):
+            ResumoMovimentacaoDiaria.somar(hoje, 'RETIRADA', 1, 4)
+        self.assertEqual(len(chamadas), 2)
+        diario = ResumoMovimentacaoDiaria.objects.get(data=hoje, tipo='RETIRADA')
+        self.assertEqual((diario.total_movimentacoes, diario.quantidade_total), (2, 6))
+    
+    def test_admin_sem_exclusao_em_massa(self):
+        """Testa que o admin não oferece a exclusão pelo QuerySet, que não atualiza os contadores"""
+        admin_user = User.objects.create_superuser('admin_resumo', password='x')
+        self.client.force_login(admin_user)
+        for modelo in ('item', 'movimentacao', 'fornecedor'):
+            response = self.client.get(reverse(f'admin:estoque_{modelo}_changelist'))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('delete_selected', response.context['cl'].model_admin.get_actions(response.wsgi_request))
+        movimentacao = Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=1)
+        response = self.client.get(reverse('admin:estoque_movimentacao_delete', args=[movimentacao.pk]))
+        self.assertEqual(response.status_code, 403)
+    
+    def test_api_resumo(self):
+        """Testa o endpoint do painel"""
+        self.client.force_login(criar_usuario('painel'))
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=10)
+        
+        response = self.client.get(reverse('api_resumo_estoque'))
+        self.assertEqual(response.status_code, 200)
+        
+        data = response.json()
+        self.assertEqual(data['total_itens'], 2)
+        self.assertEqual(data['itens_por_status']['CRITICO'], 1)
+        self.assertEqual(data['movimentacoes_hoje']['SAIDA']['total'], 1)
+    
+    def test_reconciliar_resumo(self):
+        """Testa que o comando detecta e corrige divergências"""
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=10)
+        call_command('reconciliar_resumo', stdout=StringIO())
+        
+        # Alterações em massa ignoram save() e desalinham os contadores
+        Item.objects.filter(pk=self.item.pk).update(quantidade_atual=900)
+        with self.assertRaises(CommandError):
+            call_command('reconciliar_resumo', stdout=StringIO())
+        
+        call_command('reconciliar_resumo', '--corrigir', stdout=StringIO())
+        self.assertEqual(ResumoEstoque.obter().valor_total_estoque, Decimal("10000.00"))
+        call_command('reconciliar_resumo', stdout=StringIO())
+
+
+class ListagemCacheHTMXTestCase(TestCase):
+    """Testes para o cache das linhas e a paginação parcial via HTMX"""
+    
+    def setUp(self):
+        """Configura dados de teste e autenticação"""
+        cache.clear()
+        self.user = User.objects.create_user(username='lista', password='testpass123')
+        self.client.force_login(self.user)
+        self.itens = [
+            Item.objects.create(
+                codigo=f"LST{i:03d}",
+                descricao=f"Item Lista {i:03d}",
+                unidade_medida="UN",
+                valor_unitario=Decimal("1.00"),
+                quantidade_atual=i
+            )
+            for i in range(25)
+        ]
+    
+    def test_linhas_reaproveitadas_do_cache(self):
+        """Testa que linhas inalteradas vêm do cache e linhas alteradas são renderizadas de novo"""
+        self.client.get(reverse('index'))
+        item = self.itens[0]
+        self.assertEqual(len([k for k in cache._cache if f':{item.pk}:{item.versao}:' in k]), 1)
+        
+        item.descricao = "Descrição Alterada"
+        item.save()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, "Descrição Alterada")
+    
+    def test_paginacao_htmx_retorna_parcial(self):
+        """Testa que a paginação via HTMX devolve apenas a tabela"""
+        response = self.client.get(reverse('index'), {'page': 2}, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, 'id="lista-itens"')
+        self.assertContains(response, 'Item Lista 024')
+        self.assertIn('HX-Request', response['Vary'])
+        
+        response = self.client.get(reverse('index'), {'page': 2})
+        self.assertContains(response, '<html')
+
+
+class InventarioFisicoTestCase(TestCase):
+    """Testes para o inventário físico (contagem em lote)"""
+    
+    def setUp(self):
+        """Configura dados de teste e autenticação"""
+        self.user = User.objects.create_user(username='inventario', password='testpass123')
+        for codename in ('view_inventario', 'add_inventario', 'change_inventario', 'add_movimentacao'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        self.client.force_login(self.user)
+        
+        self.itens = [
+            Item.objects.create(
+                codigo=f"INV{i:03d}",
+                descricao=f"Item Inventário {i}",
+                unidade_medida="UN",
+                valor_unitario=Decimal("2.00"),
+                estoque_minimo=10,
+                estoque_maximo=100,
+                quantidade_atual=50
+            )
+            for i in range(3)
+        ]
+        self.inventario = Inventario.objects.create(descricao="Contagem anual", criado_por=self.user)
+    
+    def test_api_contagens(self):
+        """Testa envio de contagens em lote pela API"""
+        response = self.client.post(
+            reverse('api_inventario_contagens', kwargs={'pk': self.inventario.pk}),
+            data=json.dumps({'contagens': [
+                {'codigo': 'INV000', 'quantidade': 40},
+                {'codigo': 'XXX', 'quantidade': 1},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'registradas': 1, 'codigos_desconhecidos': ['XXX']})
+        
+        # Reenvio sobrescreve a contagem anterior
+        self.inventario.registrar_contagens({'INV000': 45})
+        self.assertEqual(self.inventario.contagens.get().quantidade_contada, 45)
+    
+    def test_upload_csv(self):
+        """Testa upload da contagem em CSV"""
+        arquivo = SimpleUploadedFile('contagem.csv', b'codigo;quantidade\nINV001;60\nINV002;50\n')
+        response = self.client.post(
+            reverse('inventario_detail', kwargs={'pk': self.inventario.pk}), {'arquivo': arquivo},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.inventario.contagens.count(), 2)
+        self.assertEqual(self.inventario.divergencias().get().diferenca, 10)
+        
+        response = self.client.get(reverse('inventario_detail', kwargs={'pk': self.inventario.pk}))
+        self.assertContains(response, 'Divergências (1)')
+        self.assertContains(self.client.get(reverse('inventario_list')), 'Contagem anual')
+    
+    def test_aplicar_inventario(self):
+        """Testa geração dos ajustes e atualização dos itens"""
+        self.inventario.registrar_contagens({'INV000': 30, 'INV001': 70, 'INV002': 50})
+        
+        response = self.client.post(reverse('inventario_aplicar', kwargs={'pk': self.inventario.pk}))
+        self.assertEqual(response.status_code, 302)
+        
+        self.assertEqual(Item.objects.get(codigo='INV000').quantidade_atual, 30)
+        self.assertEqual(Item.objects.get(codigo='INV001').quantidade_atual, 70)
+        ajustes = Movimentacao.objects.filter(inventario=self.inventario)
+        self.assertEqual(ajustes.count(), 2)
+        self.assertEqual(ajustes.get(tipo='SAIDA').quantidade, 20)
+        self.assertEqual(self.inventario.contagens.get(item__codigo='INV002').quantidade_sistema, 50)
+        
+        # Os contadores do painel continuam consistentes
+        call_command('reconciliar_resumo', stdout=StringIO())
+        
+        self.inventario.refresh_from_db()
+        self.assertFalse(self.inventario.aberto)
+        with self.assertRaises(ValidationError):
+            self.inventario.aplicar()
+    
+    def test_aplicar_numero_constante_de_consultas(self):
+        """Testa que a aplicação não executa comandos por linha"""
+        def consultas_para(quantidade):
+            inventario = Inventario.objects.create(descricao=f"Lote {quantidade}")
+            itens = Item.objects.bulk_create([
+                Item(codigo=f"Q{quantidade}-{i}", descricao="Item", unidade_medida="UN",
+                     valor_unitario=Decimal("1.00"), quantidade_atual=5)
+                for i in range(quantidade)
+            ])
+            inventario.registrar_contagens({item.codigo: 7 for item in itens})
+            with CaptureQueriesContext(connection) as contexto:
+                inventario.aplicar()
+            inserts = [q for q in contexto.captured_queries if q['sql'].startswith('INSERT')]
+            return len(contexto) - len(inserts), len(inserts)
+        
+        ResumoEstoque.obter()
+        # Linha do dia já existente: a primeira do dia cria a linha (savepoint + INSERT)
+        ResumoMovimentacaoDiaria.somar(timezone.localdate(), 'ENTRADA', 0, 0)
+        comandos_5, inserts_5 = consultas_para(5)
+        comandos_200, inserts_200 = consultas_para(200)
+        self.assertEqual(comandos_5, comandos_200)
+        # INSERTs crescem só pelos lotes (limite de 999 parâmetros do SQLite), não por linha
+        self.assertLessEqual(inserts_200, inserts_5 + 3)
+
+
+class PedidoCompraTestCase(TestCase):
+    """Testes para os pedidos de compra de reposição"""
+    
+    def setUp(self):
+        """Configura fornecedores, itens em alerta e autenticação"""
+        self.user = criar_usuario(
+            'compras', 'view_pedidocompra', 'add_pedidocompra', 'change_pedidocompra', 'add_movimentacao',
+        )
+        self.client.force_login(self.user)
+        self.fornecedor_a = criar_fornecedor(nome='Fornecedor A')
+        self.fornecedor_b = criar_fornecedor(nome='Fornecedor B')
+        # Máximo 1000: pede 900 do A1, 800 do A2 e 1000 do B1; OK1 está normal
+        criar_item('A1', 100, fornecedor=self.fornecedor_a)
+        criar_item('A2', 200, fornecedor=self.fornecedor_a, valor_unitario=Decimal('4.00'))
+        criar_item('B1', 0, fornecedor=self.fornecedor_b)
+        criar_item('OK1', 600, fornecedor=self.fornecedor_b)
+        criar_item('SEM', 10)
+    
+    def test_gerar_rascunhos_por_fornecedor(self):
+        """Testa o agrupamento por fornecedor e as quantidades até o máximo"""
+        pedidos, sem_fornecedor = PedidoCompra.gerar_rascunhos(usuario=self.user)
+        
+        self.assertEqual(len(pedidos), 2)
+        self.assertEqual(sem_fornecedor, 1)
+        linhas_a = dict(
+            PedidoCompra.objects.get(fornecedor=self.fornecedor_a).linhas.values_list('item__codigo', 'quantidade')
+        )
+        self.assertEqual(linhas_a, {'A1': 900, 'A2': 800})
+        pedido_b = PedidoCompra.objects.get(fornecedor=self.fornecedor_b)
+        self.assertEqual(list(pedido_b.linhas.values_list('item__codigo', 'quantidade')), [('B1', 1000)])
+        self.assertEqual(pedido_b.almoxarifado, Almoxarifado.padrao())
+        
+        # O que já está em rascunho não é pedido de novo
+        self.assertEqual(PedidoCompra.gerar_rascunhos(), ([], 1))
+    
+    def test_receber_pedido(self):
+        """Testa as ENTRADAs, o custo médio e os contadores após o recebimento"""
+        ResumoEstoque.obter()
+        PedidoCompra.gerar_rascunhos()
+        pedido = PedidoCompra.objects.get(fornecedor=self.fornecedor_a)
+        pedido.linhas.filter(item__codigo='A2').update(custo_unitario=Decimal('7.00'))
+        
+        response = self.client.post(reverse('pedido_receber', kwargs={'pk': pedido.pk}))
+        self.assertEqual(response.status_code, 302)
+        
+        a1 = Item.objects.get(codigo='A1')
+        a2 = Item.objects.get(codigo='A2')
+        self.assertEqual(a1.quantidade_atual, 1000)
+        self.assertEqual(a1.status_estoque, EstoqueManager.STATUS_OK)
+        # (200 x 4,00 + 800 x 7,00) / 1000
+        self.assertEqual(a2.custo_medio, Decimal('6.4000'))
+        self.assertEqual(SaldoEstoque.objects.get(item=a2, almoxarifado=pedido.almoxarifado).quantidade, 1000)
+        self.assertEqual(Movimentacao.objects.filter(pedido=pedido, tipo='ENTRADA').count(), 2)
+        self.assertEqual(
+            ResumoMovimentacaoDiaria.objects.get(data=timezone.localdate(), tipo='ENTRADA').quantidade_total, 1700,
+        )
+        # Os contadores do painel continuam consistentes
+        call_command('reconciliar_resumo', stdout=StringIO())
+        
+        pedido.refresh_from_db()
+        self.assertFalse(pedido.rascunho)
+        self.assertEqual(pedido.recebido_por, self.user)
+        with self.assertRaises(ValidationError):
+            pedido.receber()
+        
+        response = self.client.get(reverse('pedido_detail', kwargs={'pk': pedido.pk}))
+        self.assertContains(response, 'Recebido')
+        self.assertContains(self.client.get(reverse('pedido_list')), 'Fornecedor A')
+    
+    def test_gerar_pela_tela(self):
+        """Testa a geração pela listagem e a permissão exigida"""
+        response = self.client.post(reverse('pedido_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(PedidoCompra.objects.count(), 2)
+        
+        self.client.force_login(criar_usuario('leitor', 'view_pedidocompra'))
+        self.client.post(reverse('pedido_list'))
+        self.assertEqual(PedidoCompra.objects.count(), 2)
+    
+    def test_numero_constante_de_consultas(self):
+        """Testa que gerar e receber não executam comandos por item"""
+        def consultas_para(quantidade):
+            fornecedor = criar_fornecedor()
+            Item.objects.bulk_create([
+                Item(codigo=f"P{quantidade}-{i}", descricao="Item", unidade_medida="UN",
+                     valor_unitario=Decimal("1.00"), quantidade_atual=5, fornecedor=fornecedor)
+                for i in range(quantidade)
+            ])
+            with CaptureQueriesContext(connection) as geracao:
+                pedidos, _ = PedidoCompra.gerar_rascunhos()
+            with CaptureQueriesContext(connection) as recebimento:
+                for pedido in pedidos:
+                    pedido.receber()
+            return len(geracao), len(recebimento)
+        
+        ResumoEstoque.obter()
+        # A primeira rodada absorve os itens do setUp
+        consultas_para(1)
+        self.assertEqual(consultas_para(3), consultas_para(15))
+
+
+class ResumoFornecedorTestCase(TestCase):
+    """Testes para os indicadores incrementais por fornecedor"""
+    
+    def setUp(self):
+        """Configura dois fornecedores com itens"""
+        self.user = criar_usuario('analista', 'view_fornecedor')
+        self.client.force_login(self.user)
+        self.fornecedor_a = criar_fornecedor(nome='Fornecedor A')
+        self.fornecedor_b = criar_fornecedor(nome='Fornecedor B')
+        self.item = criar_item('F1', 100, fornecedor=self.fornecedor_a)
+        criar_item('F2', 500, fornecedor=self.fornecedor_a)
+        criar_item('F3', 800, fornecedor=self.fornecedor_b)
+    
+    def resumo(self, fornecedor):
+        return ResumoFornecedor.objects.get(fornecedor=fornecedor)
+    
+    def test_contadores_de_itens(self):
+        """Testa os contadores ao mudar status, fornecedor e ao excluir itens"""
+        resumo = self.resumo(self.fornecedor_a)
+        self.assertEqual((resumo.total_itens, resumo.itens_critico, resumo.itens_baixo), (2, 1, 0))
+        self.assertEqual(resumo.percentual_alerta, 50)
+        
+        # 100 -> 250: de CRITICO para BAIXO
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=150)
+        resumo = self.resumo(self.fornecedor_a)
+        self.assertEqual((resumo.itens_critico, resumo.itens_baixo), (0, 1))
+        
+        item = Item.objects.get(pk=self.item.pk)
+        item.fornecedor = self.fornecedor_b
+        item.save()
+        self.assertEqual(self.resumo(self.fornecedor_a).total_itens, 1)
+        resumo_b = self.resumo(self.fornecedor_b)
+        self.assertEqual((resumo_b.total_itens, resumo_b.itens_baixo), (2, 1))
+        
+        item.delete()
+        self.assertEqual(self.resumo(self.fornecedor_b).total_itens, 1)
+        call_command('reconciliar_resumo', stdout=StringIO())
+    
+    def test_compras_e_prazo(self):
+        """Testa compras por ENTRADA e pedido, sem os ajustes de inventário"""
+        Movimentacao.objects.create(
+            item=self.item, tipo='ENTRADA', quantidade=10, custo_unitario=Decimal('2.50'),
+        )
+        inventario = Inventario.objects.create(descricao='Contagem')
+        inventario.registrar_contagens({'F2': 520})
+        inventario.aplicar()
+        
+        resumo = self.resumo(self.fornecedor_a)
+        self.assertEqual((resumo.entradas, resumo.quantidade_comprada), (1, 10))
+        self.assertEqual(resumo.valor_compras, Decimal('25.0000'))
+        self.assertIsNotNone(resumo.ultima_compra)
+        
+        PedidoCompra.gerar_rascunhos()
+        pedido = PedidoCompra.objects.get(fornecedor=self.fornecedor_a)
+        PedidoCompra.objects.filter(pk=pedido.pk).update(criado_em=timezone.now() - timedelta(days=3))
+        pedido.receber()
+        
+        resumo = self.resumo(self.fornecedor_a)
+        self.assertEqual(resumo.pedidos_recebidos, 1)
+        self.assertAlmostEqual(resumo.prazo_medio_dias, 3, places=2)
+        self.assertEqual(resumo.entradas, 2)
+        self.assertEqual((resumo.itens_critico, resumo.itens_baixo), (0, 0))
+        # O recálculo a partir das tabelas chega aos mesmos valores
+        incremental = ResumoFornecedor.objects.values().get(fornecedor=self.fornecedor_a)
+        ResumoFornecedor.recalcular()
+        recalculado = ResumoFornecedor.objects.values().get(fornecedor=self.fornecedor_a)
+        incremental.pop('versao'), recalculado.pop('versao')
+        self.assertEqual(incremental, recalculado)
+    
+    def test_fornecedor_sem_linha(self):
+        """Testa que um fornecedor criado em lote ganha a linha no primeiro delta"""
+        fornecedor = Fornecedor.objects.bulk_create([Fornecedor(nome='Em lote')])[0]
+        criar_item('F4', 0, fornecedor=fornecedor)
+        criar_item('F5', 0, fornecedor=fornecedor)
+        
+        self.assertEqual(self.resumo(fornecedor).total_itens, 2)
+        self.assertEqual(self.resumo(fornecedor).itens_critico, 2)
+    
+    def test_api_ordenada(self):
+        """Testa a ordenação da API por indicador e a validação dos parâmetros"""
+        url = reverse('api_indicadores_fornecedores')
+        Movimentacao.objects.create(item=Item.objects.get(codigo='F3'), tipo='ENTRADA', quantidade=1)
+        
+        dados = self.client.get(url).json()
+        self.assertEqual([f['nome'] for f in dados['fornecedores']], ['Fornecedor B', 'Fornecedor A'])
+        self.assertEqual(dados['fornecedores'][0]['valor_compras'], '10.0000')
+        
+        dados = self.client.get(url, {'ordem': '-percentual_alerta', 'limite': 1}).json()
+        self.assertEqual(len(dados['fornecedores']), 1)
+        self.assertEqual(dados['fornecedores'][0]['percentual_alerta'], 50.0)
+        
+        self.assertEqual(self.client.get(url, {'ordem': 'nome; drop'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limite': 'x'}).status_code, 400)
+    
+    def test_listagem_exibe_indicadores(self):
+        """Testa os indicadores na listagem e a renovação da linha em cache"""
+        cache.clear()
+        response = self.client.get(reverse('fornecedor_list'))
+        self.assertContains(response, '1 (50%)')
+        
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=800)
+        response = self.client.get(reverse('fornecedor_list'))
+        self.assertNotContains(response, '1 (50%)')
+        self.assertContains(response, 'R$ 8000,00')
+
+
+class ReplicaLeituraTestCase(TransactionTestCase):
+    """
+    Testes para o roteamento de leituras para a réplica.
+    
+    O alias 'replica' é um espelho (TEST.MIRROR) do banco de testes, o que
+    permite verificar em qual conexão cada consulta foi executada.
+    """
+    
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        """Configura dados de teste e autenticação"""
+        self.user = User.objects.create_user(username='replica', password='testpass123')
+        self.user.user_permissions.add(Permission.objects.get(codename='add_movimentacao'))
+        self.client.force_login(self.user)
+        self.item = Item.objects.create(
+            codigo="REP001",
+            descricao="Item Réplica",
+            unidade_medida="UN",
+            valor_unitario=Decimal("1.00"),
+            quantidade_atual=10
+        )
+    
+    def test_roteamento(self):
+        """Testa que só leituras marcadas (e fora de transação) vão para a réplica"""
+        self.assertEqual(Item.objects.all().db, 'default')
+        with leitura_replica():
+            self.assertEqual(Item.objects.all().db, 'replica')
+            self.assertEqual(Item.objects.get(pk=self.item.pk).quantidade_atual, 10)
+            with transaction.atomic():
+                self.assertEqual(Item.objects.all().db, 'default')
+            self.item.descricao = "Alterado"
+            self.item.save()
+            self.assertEqual(self.item._state.db, 'default')
+    
+    def test_api_le_da_replica(self):
+        """Testa que as APIs de consulta usam a réplica"""
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('api_status_item', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica), 0)
+    
+    def test_read_your_writes_apos_movimentacao(self):
+        """Testa que, após registrar uma movimentação, as leituras do usuário ficam no primário"""
+        response = self.client.post(reverse('movimentacao_create'), {
+            'item': self.item.pk, 'tipo': 'ENTRADA', 'quantidade': 5,
+        })
+        self.assertEqual(response.status_code, 302)
+        
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('api_status_item', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.json()['quantidade_atual'], 15)
+        self.assertEqual(len(replica), 0)
+
+
+@override_settings(SQLITE_ALTA_CONCORRENCIA=True)
+class SQLiteAltaConcorrenciaTestCase(TransactionTestCase):
+    """Testes para o modo de alta concorrência do SQLite"""
+    
+    def test_pragmas_aplicados(self):
+        """Testa que os pragmas configurados são aplicados à conexão"""
+        aplicar_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+    
+    def test_movimentacao_usa_begin_immediate(self):
+        """Testa que o registro de movimentação abre a transação com BEGIN IMMEDIATE"""
+        item = Item.objects.create(
+            codigo="SQL001",
+            descricao="Item SQLite",
+            unidade_medida="UN",
+            valor_unitario=Decimal("1.00"),
+            quantidade_atual=10
+        )
+        with CaptureQueriesContext(connection) as contexto:
+            Movimentacao.objects.create(item=item, tipo='ENTRADA', quantidade=5)
+        self.assertEqual(contexto.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+        item.refresh_from_db()
+        self.assertEqual(item.quantidade_atual, 15)
+    
+    def test_movimentacao_parte_do_saldo_gravado(self):
+        """Testa que uma instância de item desatualizada não sobrescreve o saldo"""
+        item = Item.objects.create(
+            codigo="SQL002",
+            descricao="Item SQLite",
+            unidade_medida="UN",
+            valor_unitario=Decimal("1.00"),
+            quantidade_atual=10
+        )
+        copia = Item.objects.get(pk=item.pk)
+        Movimentacao.objects.create(item=item, tipo='ENTRADA', quantidade=5)
+        Movimentacao.objects.create(item=copia, tipo='ENTRADA', quantidade=5)
+        item.refresh_from_db()
+        self.assertEqual(item.quantidade_atual, 20)
+
+
+class AutocompleteTestCase(TestCase):
+    """Testes para o seletor de itens/fornecedores sob demanda"""
+    
+    def setUp(self):
+        """Configura dados de teste e autenticação"""
+        self.user = User.objects.create_user(username='autocomplete', password='testpass123')
+        self.user.user_permissions.add(Permission.objects.get(codename='add_movimentacao'))
+        self.client.force_login(self.user)
+        self.fornecedor = Fornecedor.objects.create(nome="Ferragens Ávila")
+        self.cabo = Item.objects.create(
+            codigo="CAB001", descricao="Cabo Elétrico 2,5mm", unidade_medida="M",
+            valor_unitario=Decimal("3.00"), fornecedor=self.fornecedor
+        )
+        Item.objects.bulk_create([
+            Item(codigo=f"PAR{i:03d}", descricao=f"Parafuso {i:03d}", unidade_medida="UN",
+                 valor_unitario=Decimal("0.10"))
+            for i in range(25)
+        ])
+    
+    def test_busca_por_prefixo_sem_acentos(self):
+        """Testa busca por prefixo do código ou da descrição, ignorando caixa e acentos"""
+        url = reverse('api_itens_autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'cabo ele'}).json()['results'][0]['id'], self.cabo.pk)
+        self.assertEqual(self.client.get(url, {'q': 'cabx'}).json()['results'], [])
+        self.assertEqual(len(self.client.get(url, {'q': 'CAB'}).json()['results']), 1)
+        
+        response = self.client.get(reverse('api_fornecedores_autocomplete'), {'q': 'ferragens av'})
+        self.assertEqual(response.json()['results'][0]['text'], "Ferragens Ávila")
+    
+    def test_paginacao(self):
+        """Testa paginação sem COUNT"""
+        url = reverse('api_itens_autocomplete')
+        primeira = self.client.get(url, {'q': 'par'}).json()
+        self.assertEqual(len(primeira['results']), 20)
+        self.assertTrue(primeira['pagination']['more'])
+        segunda = self.client.get(url, {'q': 'par', 'page': 2}).json()
+        self.assertEqual(len(segunda['results']), 5)
+        self.assertFalse(segunda['pagination']['more'])
+    
+    def test_formulario_nao_renderiza_catalogo(self):
+        """Testa que o formulário de movimentação não lista todos os itens"""
+        response = self.client.get(reverse('movimentacao_create'))
+        self.assertContains(response, reverse('api_itens_autocomplete'))
+        self.assertNotContains(response, 'Parafuso 000')
+    
+    def test_validacao_do_id_enviado(self):
+        """Testa que um id inexistente é rejeitado pelo servidor"""
+        response = self.client.post(reverse('movimentacao_create'), {
+            'item': 999999, 'tipo': 'ENTRADA', 'quantidade': 1,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Movimentacao.objects.exists())
+
+
+class CustoMedioTestCase(TestCase):
+    """Testes para o custo médio ponderado e a valorização histórica"""
+    
+    def setUp(self):
+        self.item = Item.objects.create(
+            codigo="CM001", descricao="Luva", unidade_medida="PAR",
+            valor_unitario=Decimal("10.00"), quantidade_atual=0,
+        )
+    
+    def test_media_ponderada_nas_entradas(self):
+        """Testa a atualização do custo médio a cada ENTRADA e o custo das saídas"""
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=10, custo_unitario=Decimal("10.00"))
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=30, custo_unitario=Decimal("14.00"))
+        saida = Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=5)
+        
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.custo_medio, Decimal("13.0000"))
+        self.assertEqual(saida.custo_unitario, Decimal("13.0000"))
+        self.assertEqual(self.item.quantidade_atual, 35)
+    
+    def test_valor_historico_sem_join(self):
+        """Testa que o valor histórico usa o custo do lançamento, sem JOIN com Item"""
+        from .views import get_historical_stock_value
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=10, custo_unitario=Decimal("10.00"))
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=4)
+        Item.objects.filter(pk=self.item.pk).update(valor_unitario=Decimal("99.00"))
+        
+        with CaptureQueriesContext(connection) as consultas:
+            valor = get_historical_stock_value(timezone.localdate())
+        self.assertEqual(valor, Decimal("60.00"))
+        self.assertNotIn('JOIN', consultas[0]['sql'])
+    
+    def test_backfill(self):
+        """Testa o comando backfill_custo_medio sobre um razão sem custos"""
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=10, custo_unitario=Decimal("20.00"))
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=2)
+        Movimentacao.objects.update(custo_unitario=None)
+        Item.objects.filter(pk=self.item.pk).update(custo_medio=None)
+        
+        call_command('backfill_custo_medio', stdout=StringIO())
+        
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.custo_medio, Decimal("10.0000"))
+        self.assertEqual(
+            list(Movimentacao.objects.order_by('id').values_list('custo_unitario', flat=True)),
+            [Decimal("10.0000"), Decimal("10.0000")],
+        )
+
+
+class MultiAlmoxarifadoTestCase(TestCase):
+    """Testes para saldos por almoxarifado, transferências e alertas por local"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='almox', password='testpass123')
+        self.client.force_login(self.user)
+        self.central = Almoxarifado.padrao()
+        self.anexo = Almoxarifado.objects.create(codigo='ANEXO', nome='Unidade Anexa')
+        self.item = Item.objects.create(
+            codigo="ALM001", descricao="Papel A4", unidade_medida="RESMA",
+            valor_unitario=Decimal("25.00"), estoque_minimo=50, estoque_maximo=200,
+            quantidade_atual=100,
+        )
+    
+    def saldo(self, almoxarifado):
+        return SaldoEstoque.objects.get(item=self.item, almoxarifado=almoxarifado).quantidade
+    
+    def test_transferencia_em_par(self):
+        """Testa a transferência como par de movimentações, sem alterar o total"""
+        saida, entrada = Movimentacao.transferir(self.item, self.central, self.anexo, 30, usuario=self.user)
+        
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade_atual, 100)
+        self.assertEqual((self.saldo(self.central), self.saldo(self.anexo)), (70, 30))
+        self.assertEqual(Movimentacao.objects.get(pk=saida.pk).transferencia_id, entrada.pk)
+        self.assertEqual(entrada.transferencia_id, saida.pk)
+        
+        with self.assertRaises(ValidationError):
+            Movimentacao.transferir(self.item, self.anexo, self.central, 31)
+    
+    def test_movimentacao_por_local(self):
+        """Testa que a movimentação altera o saldo do local e o total do item"""
+        Movimentacao.transferir(self.item, self.central, self.anexo, 30)
+        Movimentacao.objects.create(item=self.item, almoxarifado=self.anexo, tipo='SAIDA', quantidade=50)
+        
+        self.item.refresh_from_db()
+        # A saída não passa do saldo do local
+        self.assertEqual(self.saldo(self.anexo), 0)
+        self.assertEqual(self.item.quantidade_atual, 70)
+        
+        # Edição direta do item lança a diferença no almoxarifado padrão
+        self.item.quantidade_atual = 80
+        self.item.save()
+        self.assertEqual(self.saldo(self.central), 80)
+        call_command('reconciliar_resumo', stdout=StringIO())
+    
+    def test_movimentacao_gravada_nao_reaplica(self):
+        """Testa que salvar de novo uma movimentação não reaplica o efeito e que os campos de efeito são fixos"""
+        saida = Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=10)
+        sequencia = saida.sequencia
+        
+        saida.data_devolucao_prevista = timezone.localdate()
+        saida.save()
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantidade_atual, self.saldo(self.central)), (90, 90))
+        self.assertEqual(Movimentacao.objects.get(pk=saida.pk).sequencia, sequencia)
+        self.assertEqual(razao.verificar()[0], [])
+        
+        saida.quantidade = 15
+        with self.assertRaises(ValidationError):
+            saida.save()
+        self.assertEqual(Movimentacao.objects.get(pk=saida.pk).quantidade, 10)
+        
+        admin_user = User.objects.create_superuser('admin_mov', password='x')
+        self.client.force_login(admin_user)
+        pagina = self.client.get(reverse('admin:estoque_movimentacao_change', args=[saida.pk]))
+        self.assertNotContains(pagina, 'name="quantidade"')
+    
+    def test_alertas_por_almoxarifado(self):
+        """Testa alertas pelo status indexado, no total e por local"""
+        Movimentacao.transferir(self.item, self.central, self.anexo, 80)
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('api_alertas_estoque'))
+        self.assertEqual(response.json()['resumo']['total_alertas'], 0)
+        self.assertIn('"status_estoque" IN', consultas[-1]['sql'])
+        
+        data = self.client.get(reverse('api_alertas_estoque'), {'almoxarifado': 'CENTRAL'}).json()
+        self.assertEqual(data['resumo']['criticos'], 1)
+        self.assertEqual(data['alertas'][0]['quantidade_atual'], 20)
+        
+        resumo = {a['codigo']: a for a in self.client.get(reverse('api_resumo_almoxarifados')).json()['almoxarifados']}
+        self.assertEqual(resumo['CENTRAL']['itens_por_status']['CRITICO'], 1)
+        self.assertEqual(resumo['ANEXO']['quantidade_total'], 80)
+        
+        self.assertEqual(self.client.get(reverse('api_alertas_estoque'), {'almoxarifado': 'X'}).status_code, 404)
+    
+    def test_reconciliar_saldos(self):
+        """Testa que o comando detecta e corrige saldos e status divergentes"""
+        Item.objects.filter(pk=self.item.pk).update(quantidade_atual=10)
+        with self.assertRaises(CommandError):
+            call_command('reconciliar_resumo', stdout=StringIO())
+        
+        call_command('reconciliar_resumo', '--corrigir', stdout=StringIO())
+        self.assertEqual(self.saldo(self.central), 10)
+        self.assertEqual(Item.objects.get(pk=self.item.pk).status_estoque, EstoqueManager.STATUS_CRITICO)
+
+
+class ArquivoMovimentacoesTestCase(TestCase):
+    """Testes para o arquivamento do razão em segmentos e as consultas históricas"""
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        configuracao = override_settings(ARQUIVO_MOVIMENTACOES_DIR=self.pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        
+        self.item = Item.objects.create(
+            codigo="ARQ001", descricao="Toner", unidade_medida="UN", valor_unitario=Decimal("10.00"),
+        )
+        lancamentos = [
+            ('ENTRADA', 10, Decimal("10.00"), (2025, 1, 5)),
+            ('SAIDA', 4, None, (2025, 2, 10)),
+            ('ENTRADA', 6, Decimal("12.50"), (2025, 2, 20)),
+            ('SAIDA', 3, None, None),
+        ]
+        for tipo, quantidade, custo, dia in lancamentos:
+            mov = Movimentacao.objects.create(item=self.item, tipo=tipo, quantidade=quantidade, custo_unitario=custo)
+            if dia:
+                Movimentacao.objects.filter(pk=mov.pk).update(data=self.instante(*dia))
+    
+    def instante(self, ano, mes, dia, hora=12):
+        return timezone.make_aware(datetime(ano, mes, dia, hora))
+    
+    def consultas_historicas(self):
+        from .views import get_historical_stock_value
+        datas = [self.instante(2025, 1, 31), self.instante(2025, 2, 15), self.instante(2025, 3, 1), timezone.now()]
+        return (
+            [get_historical_stock_value(data) for data in datas],
+            ResumoMovimentacaoDiaria.calcular_valores(),
+        )
+    
+    def test_resultados_identicos_apos_arquivar(self):
+        """Testa que valores históricos e contadores não mudam após o arquivamento"""
+        antes = self.consultas_historicas()
+        
+        arquivar_movimentacoes('2025-03')
+        
+        self.assertEqual(Movimentacao.objects.count(), 1)
+        self.assertEqual(SegmentoMovimentacao.objects.count(), 2)
+        self.assertEqual(self.consultas_historicas(), antes)
+        self.assertEqual(antes[0][:2], [Decimal("100.00"), Decimal("60.00")])
+        
+        checkpoint = SaldoArquivado.objects.get(item=self.item)
+        self.assertEqual(checkpoint.quantidade_liquida, 12)
+        self.assertEqual(checkpoint.valor_liquido, Decimal("135.0000"))
+    
+    def test_arquivamento_preserva_lotes_e_transferencias(self):
+        """Testa que o histórico dos lotes e o vínculo das transferências sobrevivem ao arquivamento"""
+        anexo = Almoxarifado.objects.create(codigo='ANEXO', nome='Unidade Anexa')
+        entrada = Movimentacao.objects.create(
+            item=self.item, tipo='ENTRADA', quantidade=5, lote_numero='L1',
+            validade=timezone.localdate() + timedelta(days=90),
+        )
+        Movimentacao.objects.filter(pk=entrada.pk).update(data=self.instante(2025, 2, 25))
+        # Par de transferência que atravessa o corte
+        saida, chegada = Movimentacao.transferir(self.item, Almoxarifado.padrao(), anexo, 2)
+        Movimentacao.objects.filter(pk=saida.pk).update(data=self.instante(2025, 2, 28, 23))
+        lote = Lote.objects.get(numero='L1', almoxarifado=anexo)
+        origem = Lote.objects.get(numero='L1', almoxarifado=Almoxarifado.padrao())
+        
+        arquivar_movimentacoes('2025-03')
+        
+        chegada.refresh_from_db()
+        self.assertEqual(chegada.transferencia_id, saida.pk)
+        self.assertFalse(Movimentacao.objects.filter(pk=saida.pk).exists())
+        
+        self.client.force_login(criar_usuario('lotes_arquivo', 'view_item'))
+        historico = self.client.get(reverse('api_historico_lote', kwargs={'lote_id': origem.pk})).json()
+        self.assertEqual(
+            [(m['movimentacao_id'], m['tipo'], m['quantidade']) for m in historico['movimentacoes']],
+            [(saida.pk, 'TRANSF_SAIDA', -2), (entrada.pk, 'ENTRADA', 5)],
+        )
+        historico = self.client.get(reverse('api_historico_lote', kwargs={'lote_id': lote.pk})).json()
+        self.assertEqual([m['movimentacao_id'] for m in historico['movimentacoes']], [chegada.pk])
+
+    
+    def test_segmentos_guardam_todas_as_colunas(self):
+        """Testa que as linhas arquivadas trazem lote, validade, pedido, sequência e razão como na tabela"""
+        pedido = PedidoCompra.objects.create(almoxarifado=Almoxarifado.padrao())
+        entrada = Movimentacao.objects.create(
+            item=self.item, tipo='ENTRADA', quantidade=5, lote_numero='L9', validade=datetime(2026, 5, 1).date(),
+            custo_unitario=Decimal("9.8765"), pedido=pedido,
+        )
+        Movimentacao.objects.filter(pk=entrada.pk).update(data=self.instante(2025, 2, 25))
+        arquivadas = Movimentacao.objects.filter(data__lt=self.instante(2025, 3, 1, 0))
+        esperado = list(arquivadas.order_by('data', 'id').values_list(*arquivo.CAMPOS))
+        
+        arquivar_movimentacoes('2025-03')
+        
+        linhas = []
+        for segmento in SegmentoMovimentacao.objects.all():
+            with arquivo.Segmento(arquivo.diretorio() / segmento.arquivo) as dados:
+                linhas += list(dados.registros())
+        self.assertEqual(linhas, esperado)
+        self.assertTrue(all(linha[arquivo.CAMPOS.index('hash_razao')] for linha in linhas))
+        self.assertIn(('L9', pedido.pk), [
+            (linha[arquivo.CAMPOS.index('lote_numero')], linha[arquivo.CAMPOS.index('pedido_id')]) for linha in linhas
+        ])
+    
+    def test_segmento_publicado_so_no_commit(self):
+        """Testa que o segmento só aparece com o commit e que um rollback não deixa arquivos"""
+        pasta = Path(self.pasta.name)
+        with mock.patch.object(MovimentacaoLoteArquivada, 'arquivar', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                arquivar_movimentacoes('2025-03')
+        self.assertEqual(list(pasta.iterdir()), [])
+        self.assertEqual(Movimentacao.objects.count(), 4)
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            call_command('archive_movimentacoes', '--before', '2025-02', stdout=StringIO())
+        self.assertEqual([p.name for p in pasta.iterdir()], ['movimentacoes-2025-01.seg.tmp'])
+        for callback in callbacks:
+            callback()
+        self.assertEqual([p.name for p in pasta.iterdir()], ['movimentacoes-2025-01.seg'])
+    
+    def test_relatorio_cmv_com_periodo_arquivado(self):
+        """Testa o relatório de CMV com intervalo que atravessa meses arquivados"""
+        user = User.objects.create_user(username='cmv', password='testpass123')
+        user.user_permissions.add(Permission.objects.get(codename='view_movimentacao'))
+        self.client.force_login(user)
+        url = reverse('relatorio_inventario_periodico')
+        parametros = {'data_inicio': '2025-01-06', 'data_fim': '2025-02-25'}
+        
+        antes = self.client.get(url, parametros).context['valor_compras_liquidas']
+        arquivar_movimentacoes('2025-03')
+        depois = self.client.get(url, parametros).context['valor_compras_liquidas']
+        
+        self.assertEqual(antes, Decimal("75.00"))
+        self.assertEqual(depois, antes)
+    
+    def test_mes_arquivado_nao_recebe_movimentacoes(self):
+        """Testa que um mês já arquivado não é arquivado de novo silenciosamente"""
+        arquivar_movimentacoes('2025-02')
+        mov = Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=1)
+        Movimentacao.objects.filter(pk=mov.pk).update(data=self.instante(2025, 1, 20))
+        
+        with self.assertRaises(CommandError):
+            arquivar_movimentacoes('2025-03')
+
+
+class SincronizacaoTestCase(TestCase):
+    """Testes para a API de sincronização incremental (coletores offline)"""
+    
+    def setUp(self):
+        self.user = criar_usuario('coletor', 'view_item', 'view_fornecedor', 'view_movimentacao')
+        self.client.force_login(self.user)
+        self.fornecedor = Fornecedor.objects.create(nome="Fornecedor Sync")
+        self.itens = [
+            Item.objects.create(
+                codigo=f"SYN{i:03d}", descricao=f"Item Sync {i}", unidade_medida="UN",
+                valor_unitario=Decimal("3.00"), fornecedor=self.fornecedor, quantidade_atual=20,
+            )
+            for i in range(5)
+        ]
+    
+    def sync(self, desde, limite=None):
+        parametros = {'since': desde}
+        if limite:
+            parametros['limite'] = limite
+        response = self.client.get(reverse('api_sync'), parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def ids(self, lote, origem):
+        coluna = lote[origem]['campos'].index('id')
+        return [linha[coluna] for linha in lote[origem]['linhas']]
+    
+    def test_somente_alteracoes_apos_cursor(self):
+        """Testa que a chamada incremental traz só as linhas alteradas após o cursor"""
+        carga = self.sync(0)
+        self.assertFalse(carga['mais'])
+        self.assertEqual(sorted(self.ids(carga, 'itens')), sorted(i.pk for i in self.itens))
+        self.assertEqual(self.ids(carga, 'fornecedores'), [self.fornecedor.pk])
+        
+        Movimentacao.objects.create(item=self.itens[2], tipo='SAIDA', quantidade=5)
+        lote = self.sync(carga['ate'])
+        
+        self.assertEqual(self.ids(lote, 'itens'), [self.itens[2].pk])
+        self.assertEqual(len(lote['movimentacoes']['linhas']), 1)
+        self.assertEqual(self.ids(lote, 'fornecedores'), [])
+        linha = dict(zip(lote['itens']['campos'], lote['itens']['linhas'][0]))
+        self.assertEqual(linha['quantidade_atual'], 15)
+        self.assertEqual(self.sync(lote['ate'])['ate'], lote['ate'])
+    
+    def test_exclusoes(self):
+        """Testa os registros de exclusão, inclusive o SET_NULL do fornecedor nos itens"""
+        cursor = self.sync(0)['ate']
+        item_id, fornecedor_id = self.itens[0].pk, self.fornecedor.pk
+        self.itens[0].delete()
+        self.fornecedor.delete()
+        
+        lote = self.sync(cursor)
+        
+        self.assertEqual(lote['exclusoes'], [['item', item_id], ['fornecedor', fornecedor_id]])
+        self.assertEqual(sorted(self.ids(lote, 'itens')), sorted(i.pk for i in self.itens[1:]))
+        coluna = lote['itens']['campos'].index('fornecedor_id')
+        self.assertTrue(all(linha[coluna] is None for linha in lote['itens']['linhas']))
+    
+    def test_retomada_no_meio_do_lote(self):
+        """Testa a paginação por cursor: sem repetições nem perdas, mesmo com alterações entre lotes"""
+        cursor, vistos, lotes = 0, [], 0
+        while True:
+            lote = self.sync(cursor, limite=2)
+            lotes += 1
+            self.assertLessEqual(sum(len(lote[o]['linhas']) for o in ('itens', 'fornecedores')), 2)
+            vistos += [('item', pk) for pk in self.ids(lote, 'itens')]
+            vistos += [('fornecedor', pk) for pk in self.ids(lote, 'fornecedores')]
+            cursor = lote['ate']
+            if lotes == 1:
+                # Alteração em linha já entregue volta em um lote posterior
+                self.itens[0].descricao = "Item Sync alterado"
+                self.itens[0].save()
+            if not lote['mais']:
+                break
+        
+        esperados = [('fornecedor', self.fornecedor.pk)] + [('item', i.pk) for i in self.itens]
+        self.assertEqual(sorted(vistos), sorted(esperados + [('item', self.itens[0].pk)]))
+        self.assertEqual(vistos[-1], ('item', self.itens[0].pk))
+    
+    def test_inventario_numera_linhas(self):
+        """Testa que a aplicação do inventário (bulk) gera alterações sincronizáveis"""
+        inventario = Inventario.objects.create(descricao="Sync", criado_por=self.user)
+        inventario.registrar_contagens({'SYN001': 12, 'SYN003': 20})
+        cursor = self.sync(0)['ate']
+        
+        inventario.aplicar(self.user)
+        lote = self.sync(cursor)
+        
+        self.assertEqual(self.ids(lote, 'itens'), [self.itens[1].pk])
+        self.assertEqual(len(lote['movimentacoes']['linhas']), 1)
+    
+    def test_parametros_invalidos(self):
+        """Testa a validação de since e limite"""
+        response = self.client.get(reverse('api_sync'), {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_reserva_sem_linha_compartilhada(self):
+        """Testa que a reserva de números só insere no registro (não atualiza uma linha comum)"""
+        with CaptureQueriesContext(connection) as consultas:
+            self.itens[0].save()
+        
+        comandos = [c['sql'] for c in consultas.captured_queries if 'sequenciasincronizacao' in c['sql']]
+        self.assertEqual(len(comandos), 1)
+        self.assertTrue(comandos[0].startswith('INSERT'))
+    
+    def test_lote_para_na_lacuna_recente(self):
+        """Testa que o lote não passa de um número reservado por transação ainda aberta"""
+        cursor = self.sync(0)['ate']
+        # Número reservado por outra transação, ainda invisível (sem linha no registro)
+        aberta = SequenciaSincronizacao.reservar()
+        SequenciaSincronizacao.objects.filter(pk=aberta).delete()
+        self.itens[1].save()
+        
+        lote = self.sync(cursor)
+        self.assertEqual((lote['ate'], lote['itens']['linhas'], lote['mais']), (cursor, [], False))
+        
+        # Passada a espera, a lacuna é de transação desfeita
+        SequenciaSincronizacao.objects.update(criado_em=timezone.now() - timedelta(minutes=5))
+        lote = self.sync(cursor)
+        self.assertEqual(self.ids(lote, 'itens'), [self.itens[1].pk])
+        
+        # A limpeza guarda o último registro antigo e não reaproveita números
+        SequenciaSincronizacao.limpar()
+        self.assertEqual(list(SequenciaSincronizacao.objects.values_list('pk', flat=True)), [lote['ate']])
+        self.itens[2].save()
+        self.assertEqual(self.ids(self.sync(lote['ate']), 'itens'), [self.itens[2].pk])
+    
+    def test_origens_conforme_permissoes(self):
+        """Testa que fornecedores e movimentações (e suas exclusões) exigem as permissões view_"""
+        Movimentacao.objects.create(item=self.itens[0], tipo='SAIDA', quantidade=1)
+        outro = Fornecedor.objects.create(nome="Fornecedor Excluído")
+        outro.delete()
+        excluido = self.itens[4].pk
+        self.itens[4].delete()
+        self.client.force_login(criar_usuario('somente_itens', 'view_item'))
+        
+        lote = self.sync(0)
+        
+        self.assertNotIn('fornecedores', lote)
+        self.assertNotIn('movimentacoes', lote)
+        self.assertEqual(sorted(self.ids(lote, 'itens')), sorted(i.pk for i in self.itens[:4]))
+        self.assertEqual(lote['exclusoes'], [['item', excluido]])
+        
+        self.client.force_login(criar_usuario('sem_permissao'))
+        self.assertEqual(self.client.get(reverse('api_sync')).status_code, 403)
+
+
+class LeituraCodigoTestCase(TestCase):
+    """Testes para a leitura de códigos de barras pelo índice em memória"""
+    
+    def setUp(self):
+        codigos.limpar()
+        self.addCleanup(codigos.limpar)
+        self.user = User.objects.create_user(username='recebimento', password='testpass123')
+        self.client.force_login(self.user)
+        self.itens = [
+            Item.objects.create(
+                codigo=f"789{i:010d}", descricao=f"Produto {i}", unidade_medida="UN",
+                valor_unitario=Decimal("1.00"), estoque_minimo=10, estoque_maximo=100, quantidade_atual=50,
+            )
+            for i in range(3)
+        ]
+    
+    def test_lote_com_uma_consulta(self):
+        """Testa que os códigos ausentes do índice saem de um único SELECT e depois do cache"""
+        lidos = [item.codigo for item in self.itens] + ['000']
+        with self.assertNumQueries(1):
+            primeira = codigos.buscar(lidos)
+        with self.assertNumQueries(0):
+            segunda = codigos.buscar(lidos)
+        
+        self.assertEqual(primeira, segunda)
+        self.assertEqual(primeira[self.itens[0].codigo], (self.itens[0].pk, 50, 'OK'))
+        self.assertIsNone(primeira['000'])
+    
+    def test_api_lote(self):
+        """Testa a resposta da API na ordem dos códigos lidos"""
+        response = self.client.get(
+            reverse('api_itens_por_codigo'), {'codigo': [self.itens[1].codigo, 'XYZ', self.itens[0].codigo]},
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual([i['id'] for i in dados['itens']], [self.itens[1].pk, self.itens[0].pk])
+        self.assertEqual(dados['desconhecidos'], ['XYZ'])
+        self.assertEqual(self.client.get(reverse('api_itens_por_codigo')).status_code, 400)
+    
+    def test_invalidacao_por_alteracao(self):
+        """Testa que movimentações, troca de código e inventário invalidam o índice"""
+        item = self.itens[0]
+        codigo_antigo = item.codigo
+        codigos.buscar([codigo_antigo, self.itens[1].codigo])
+        
+        Movimentacao.objects.create(item=item, tipo='SAIDA', quantidade=45)
+        self.assertEqual(codigos.buscar([codigo_antigo])[codigo_antigo], (item.pk, 5, 'BAIXO'))
+        
+        item.refresh_from_db()
+        item.codigo = "NOVO001"
+        item.save()
+        self.assertIsNone(codigos.buscar([codigo_antigo])[codigo_antigo])
+        
+        inventario = Inventario.objects.create(descricao="Recebimento", criado_por=self.user)
+        inventario.registrar_contagens({self.itens[1].codigo: 80})
+        with self.captureOnCommitCallbacks(execute=True):
+            inventario.aplicar(self.user)
+        self.assertEqual(codigos.buscar([self.itens[1].codigo])[self.itens[1].codigo][1], 80)
+
+
+class BuscaItensCacheTestCase(TestCase):
+    """Testes para o cache em memória da busca de itens (HTMX)"""
+    
+    def setUp(self):
+        busca.limpar()
+        self.addCleanup(busca.limpar)
+        self.client.force_login(criar_usuario('busca', 'view_item'))
+        criar_item('PAR001', descricao='Parafuso Sextavado')
+        criar_item('PAR002', descricao='Parafuso Allen')
+        criar_item('POR001', descricao='Porca Sextavada')
+        self.arruela = criar_item('ARR001', descricao='Arruela Lisa')
+    
+    def buscar(self, termo):
+        response = self.client.get(reverse('buscar_item'), {'q': termo})
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_prefixo_refinado_em_memoria(self):
+        """Testa que os prefixos seguintes não consultam o banco"""
+        with self.assertNumQueries(1):
+            self.assertEqual(len(busca.buscar('pa')[0]), 2)
+        with self.assertNumQueries(0):
+            itens, origem = busca.buscar('paraf')
+            self.assertEqual(origem, 'refinado')
+            self.assertEqual([item.codigo for item in itens], ['PAR002', 'PAR001'])
+            self.assertEqual(busca.buscar('paraf'), (itens, 'acerto'))
+            self.assertEqual(busca.buscar('parafuso s')[0][0].codigo, 'PAR001')
+        
+        self.assertEqual(self.buscar('Sextavad').headers['X-Busca-Cache'], 'consulta')
+        response = self.buscar('SEXTAVADO')
+        self.assertEqual(response.headers['X-Busca-Cache'], 'refinado')
+        self.assertContains(response, 'PAR001')
+        self.assertNotContains(response, 'POR001')
+        
+        estatisticas = self.client.get(reverse('api_busca_estatisticas')).json()
+        self.assertEqual(estatisticas['consultas'], 2)
+        self.assertEqual(estatisticas['taxa_acerto'], 0.6667)
+    
+    def test_invalidacao_ao_alterar_itens(self):
+        """Testa que itens novos, alterados e excluídos invalidam os termos afetados"""
+        busca.buscar('sextavad')
+        busca.buscar('arruela')
+        
+        criar_item('PAR003', descricao='Parafuso Sextavado Inox')
+        self.assertEqual(len(busca.buscar('sextavad')[0]), 3)
+        self.assertEqual(busca.buscar('arruela')[1], 'acerto')
+        
+        Movimentacao.objects.create(item=self.arruela, tipo='ENTRADA', quantidade=7)
+        itens, origem = busca.buscar('arruela')
+        self.assertEqual(origem, 'consulta')
+        self.assertEqual(itens[0].quantidade_atual, 7)
+        
+        self.arruela.delete()
+        self.assertEqual(busca.buscar('arruela')[0], [])
+    
+    def test_buscas_simultaneas_coalescidas(self):
+        """Testa que buscas idênticas simultâneas fazem uma única consulta"""
+        liberar = threading.Event()
+        chamadas = []
+        encontrados = [Item.objects.get(codigo='POR001')]
+        
+        def consultar(termo):
+            chamadas.append(termo)
+            liberar.wait(5)
+            return encontrados
+        
+        resultados = []
+        with mock.patch.object(busca, '_consultar', side_effect=consultar):
+            threads = [
+                threading.Thread(target=lambda: resultados.append(busca.buscar('porca'))) for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            while not chamadas:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            liberar.set()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(chamadas, ['porca'])
+        self.assertEqual(sorted(origem for _, origem in resultados), ['coalescida'] * 3 + ['consulta'])
+        self.assertTrue(all(itens is encontrados for itens, _ in resultados))
+
+
+class CMVMensalTestCase(TestCase):
+    """Testes para a série mensal do custo de uso (somas em janela)"""
+    
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+        configuracao = override_settings(ARQUIVO_MOVIMENTACOES_DIR=self.pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        
+        self.user = User.objects.create_user(username='cmvmensal', password='testpass123')
+        self.user.user_permissions.add(Permission.objects.get(codename='view_movimentacao'))
+        self.client.force_login(self.user)
+        self.fornecedor = Fornecedor.objects.create(nome="Papelaria")
+        self.papel = Item.objects.create(
+            codigo="CMV001", descricao="Papel", unidade_medida="UN", valor_unitario=Decimal("10.00"),
+            fornecedor=self.fornecedor,
+        )
+        self.cafe = Item.objects.create(
+            codigo="CMV002", descricao="Café", unidade_medida="KG", valor_unitario=Decimal("20.00"),
+        )
+        lancamentos = [
+            (self.papel, 'ENTRADA', 10, Decimal("10.00"), (2025, 1, 5)),
+            (self.cafe, 'ENTRADA', 5, Decimal("20.00"), (2025, 1, 20)),
+            (self.papel, 'SAIDA', 4, None, (2025, 2, 10)),
+            (self.papel, 'ENTRADA', 6, Decimal("12.50"), (2025, 4, 2)),
+            (self.cafe, 'SAIDA', 2, None, (2025, 4, 15)),
+        ]
+        for item, tipo, quantidade, custo, dia in lancamentos:
+            mov = Movimentacao.objects.create(item=item, tipo=tipo, quantidade=quantidade, custo_unitario=custo)
+            Movimentacao.objects.filter(pk=mov.pk).update(data=timezone.make_aware(datetime(*dia, 12)))
+    
+    def por_intervalo(self, mes):
+        """Valores do relatório de intervalo único para o mês (referência)."""
+        from .views import _proximo_mes
+        fim = _proximo_mes(mes) - timedelta(days=1)
+        contexto = self.client.get(reverse('relatorio_inventario_periodico'), {
+            'data_inicio': f"{mes:%Y-%m-%d}", 'data_fim': f"{fim:%Y-%m-%d}",
+        }).context
+        return [contexto[c] for c in (
+            'valor_estoque_inicial', 'valor_compras_liquidas', 'valor_estoque_final_contado', 'custo_uso',
+        )]
+    
+    def series(self, **parametros):
+        response = self.client.get(reverse('api_cmv_mensal'), {'inicio': '2024-12', 'fim': '2025-05', **parametros})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_igual_ao_relatorio_por_intervalo(self):
+        """Testa que cada mês da série coincide com o relatório de intervalo único, antes e depois do arquivamento"""
+        dados = self.series()
+        self.assertEqual(len(dados['meses']), 6)
+        serie = dados['series'][0]
+        campos = ('estoque_inicial', 'compras', 'estoque_final', 'custo_uso')
+        for n, mes in enumerate(dados['meses']):
+            esperado = [str(v) for v in self.por_intervalo(datetime.strptime(mes, '%Y-%m').date())]
+            self.assertEqual([serie[c][n] for c in campos], esperado, mes)
+        self.assertEqual(serie['custo_uso'], ['0.00', '0.00', '40.00', '0.00', '40.00', '0.00'])
+        
+        arquivar_movimentacoes('2025-03')
+        self.assertEqual(self.series(), dados)
+    
+    def test_por_fornecedor(self):
+        """Testa a quebra por fornecedor, inclusive com meses arquivados"""
+        total = self.series()['series'][0]
+        arquivar_movimentacoes('2025-02')
+        series = self.series(por_fornecedor='1')['series']
+        
+        self.assertEqual([s['fornecedor'] for s in series], ["Papelaria", "Sem fornecedor"])
+        self.assertEqual(series[0]['compras'], ['0.00', '100.00', '0.00', '0.00', '75.00', '0.00'])
+        self.assertEqual(series[1]['estoque_final'][-1], '60.00')
+        for campo in ('estoque_inicial', 'compras', 'estoque_final', 'custo_uso'):
+            somados = [str(Decimal(a) + Decimal(b)) for a, b in zip(series[0][campo], series[1][campo])]
+            self.assertEqual(somados, total[campo])
+    
+    def test_intervalo_invalido(self):
+        """Testa a validação dos meses informados"""
+        self.assertEqual(self.client.get(reverse('api_cmv_mensal'), {'inicio': '2025-13'}).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('api_cmv_mensal'), {'inicio': '2025-05', 'fim': '2025-01'}).status_code, 400,
+        )
+        self.assertEqual(self.client.get(reverse('relatorio_cmv_mensal')).status_code, 200)
+
+
+class ParticoesTestCase(TestCase):
+    """Testes para os relatórios por faixas de itens (estoque/particoes.py)"""
+    
+    def setUp(self):
+        self.itens = []
+        for i in range(7):
+            item = Item.objects.create(
+                codigo=f"FX{i:03d}", descricao=f"Faixa {i}", unidade_medida="UN", valor_unitario=Decimal("2.00"),
+            )
+            Movimentacao.objects.create(item=item, tipo='ENTRADA', quantidade=10 + i, custo_unitario=Decimal("2.00"))
+            Movimentacao.objects.create(item=item, tipo='SAIDA', quantidade=i)
+            self.itens.append(item)
+    
+    def test_faixas_cobrem_todos_os_itens(self):
+        """Testa que as faixas são contíguas, equilibradas e cobrem cada id uma vez"""
+        faixas = particoes.faixas_de_itens(3)
+        
+        self.assertEqual(len(faixas), 3)
+        self.assertIsNone(faixas[-1][1])
+        contagens = [particoes.filtrar_faixa(Item.objects.all(), inicio, fim).count() for inicio, fim in faixas]
+        self.assertEqual(sum(contagens), 7)
+        self.assertLessEqual(max(contagens) - min(contagens), 1)
+        self.assertEqual(len(particoes.faixas_de_itens(50)), 7)
+    
+    def test_resultado_independe_das_faixas(self):
+        """Testa que a valorização combinada é a mesma com qualquer número de faixas"""
+        from .views import get_historical_stock_value
+        uma = particoes.executar(particoes.valorizar_faixa, particoes.combinar_linhas, trabalhadores=1, partes=1)
+        varias = particoes.executar(particoes.valorizar_faixa, particoes.combinar_linhas, trabalhadores=4, partes=5)
+        
+        self.assertEqual(uma, varias)
+        self.assertEqual([linha[0] for linha in varias], [item.pk for item in self.itens])
+        self.assertEqual(varias[2][3], 10)
+        self.assertEqual(sum(linha[4] for linha in varias), get_historical_stock_value(timezone.now()))
+    
+    def test_reconciliar_saldos_em_faixas(self):
+        """Testa a conferência dos saldos por almoxarifado executada por faixas"""
+        Item.objects.filter(pk=self.itens[4].pk).update(quantidade_atual=999)
+        saida = StringIO()
+        
+        with self.assertRaises(CommandError):
+            call_command('reconciliar_resumo', '--trabalhadores', '2', stdout=saida)
+        self.assertIn('Saldos de FX004: total do item=999', saida.getvalue())
+
+
+class PlanoConsultasListagensTestCase(TestCase):
+    """Testes para o número de consultas das listagens (sem N+1) e os índices usados"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(self.admin)
+        self.item = Item.objects.create(
+            codigo="LST001", descricao="Listado", unidade_medida="UN", valor_unitario=Decimal("1.00"),
+        )
+        self.lancar(5)
+    
+    def lancar(self, quantidade):
+        for n in range(quantidade):
+            usuario = User.objects.create_user(username=f'operador{User.objects.count()}')
+            Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=1, usuario=usuario)
+            Inventario.objects.create(descricao=f"Inventário {n}", criado_por=usuario)
+    
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in consultas.captured_queries]
+    
+    def test_consultas_constantes(self):
+        """Testa que admin, detalhe do item e listagens não crescem com o número de linhas"""
+        urls = [
+            reverse('admin:estoque_movimentacao_changelist'),
+            reverse('admin:estoque_inventario_changelist'),
+            reverse('admin:estoque_item_changelist'),
+            reverse('item_detail', kwargs={'pk': self.item.pk}),
+            reverse('inventario_list'),
+        ]
+        # Primeira requisição: usuário e permissões ainda fora do cache
+        self.client.get(urls[0])
+        antes = [len(self.contar_consultas(url)) for url in urls]
+        self.lancar(15)
+        depois = [len(self.contar_consultas(url)) for url in urls]
+        
+        self.assertEqual(depois, antes)
+    
+    def test_admin_sem_contagem_completa(self):
+        """Testa que a listagem de movimentações faz um único COUNT e carrega só as colunas exibidas"""
+        consultas = self.contar_consultas(reverse('admin:estoque_movimentacao_changelist'))
+        
+        self.assertEqual(sum('COUNT(' in sql for sql in consultas), 1)
+        listagem = next(sql for sql in consultas if 'FROM "estoque_movimentacao"' in sql and 'JOIN' in sql)
+        self.assertNotIn('"estoque_item"."descricao_busca"', listagem)
+        self.assertNotIn('"estoque_movimentacao"."custo_unitario"', listagem)
+    
+    def test_indices_de_data(self):
+        """Testa que a ordenação por data e as movimentações do item usam os índices"""
+        self.assertIn('mov_data_idx', Movimentacao.objects.order_by('-data')[:100].explain())
+        self.assertIn('mov_item_data_idx', Movimentacao.objects.filter(item=self.item).order_by('-data')[:50].explain())
+
+
+class EstaticosTestCase(TestCase):
+    """Testes para os estáticos de produção (ativos locais, hash, compressão e cache)"""
+    
+    def setUp(self):
+        pastas = tempfile.TemporaryDirectory()
+        self.addCleanup(pastas.cleanup)
+        self.vendor = Path(pastas.name) / 'origem'
+        (self.vendor / 'vendor/htmx').mkdir(parents=True)
+        (self.vendor / 'vendor/htmx/htmx.min.js').write_text('var htmx = {};\n' * 200)
+        (self.vendor / 'vendor/bootstrap-icons/fonts').mkdir(parents=True)
+        (self.vendor / 'vendor/bootstrap-icons/bootstrap-icons.min.css').write_text(
+            '@font-face{src:url("fonts/bootstrap-icons.woff2?abc") format("woff2")}\n' + '.bi{display:inline-block}\n' * 100
+        )
+        (self.vendor / 'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2').write_bytes(b'\x00' * 64)
+        
+        configuracoes = override_settings(
+            STATICFILES_DIRS=[settings.BASE_DIR / 'static', self.vendor],
+            STATIC_ROOT=Path(pastas.name) / 'publico',
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'estoque.estaticos.ArmazenamentoComprimido'},
+            },
+            SERVIR_ESTATICOS=True,
+        )
+        configuracoes.enable()
+        self.addCleanup(configuracoes.disable)
+        ativos.local.cache_clear()
+        self.addCleanup(ativos.local.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        
+        self.user = User.objects.create_superuser(username='estaticos', password='pass')
+        self.client = Client()
+        self.client.force_login(self.user)
+    
+    def buscar(self, url, **cabecalhos):
+        resposta = self.client.get(url, **cabecalhos)
+        if resposta.status_code == 200:
+            resposta.conteudo = b''.join(resposta.streaming_content)
+        return resposta
+    
+    def test_visitas_repetidas_sem_revalidacao(self):
+        """Testa que todo estático local da página tem hash e é servido como imutável por um ano"""
+        pagina = self.client.get(reverse('inventario_list')).content.decode()
+        urls = re.findall(r'(?:href|src)="(/static/[^"]+)"', pagina)
+        
+        self.assertTrue(any('vendor/htmx/htmx.min.' in url for url in urls))
+        for url in urls:
+            self.assertRegex(url, r'\.[0-9a-f]{12}\.\w+$')
+            resposta = self.buscar(url)
+            self.assertEqual(resposta.status_code, 200, url)
+            self.assertEqual(resposta['Cache-Control'], 'public, max-age=31536000, immutable')
+    
+    def test_versao_comprimida(self):
+        """Testa que o collectstatic grava o .gz e que ele é entregue conforme o Accept-Encoding"""
+        url = ativos.url('htmx.js')
+        original = self.buscar(url)
+        comprimida = self.buscar(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+        self.assertEqual(comprimida['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(comprimida.conteudo), original.conteudo)
+        self.assertFalse(original.has_header('Content-Encoding'))
+    
+    def test_css_aponta_para_fontes_com_hash(self):
+        """Testa que as fontes referenciadas pelo CSS local também recebem hash"""
+        conteudo = self.buscar(ativos.url('bootstrap-icons.css')).conteudo.decode()
+        
+        self.assertRegex(conteudo, r'fonts/bootstrap-icons\.[0-9a-f]{12}\.woff2\?abc')
+    
+    def test_sem_copia_local_usa_cdn(self):
+        """Testa que, com ATIVOS_CDN, bibliotecas ainda não vendorizadas continuam vindo da CDN"""
+        self.assertEqual(ativos.url('imask.js'), 'https://unpkg.com/imask@7.6.1/dist/imask.min.js')
+        self.assertRegex(ativos.url('jquery.js'), r'^/static/vendor/jquery/jquery\.min\.[0-9a-f]{12}\.js$')
+    
+    def test_sem_copia_local_falha_em_producao(self):
+        """Testa que, sem ATIVOS_CDN, a falta da cópia local é um erro na página e na verificação do sistema"""
+        with override_settings(ATIVOS_CDN=False):
+            with self.assertRaises(ImproperlyConfigured):
+                ativos.url('imask.js')
+            erros = ativos.verificar_copias(None)
+        
+        self.assertEqual([erro.id for erro in erros], ['estoque.E001'])
+        self.assertIn('vendor/imask/imask.min.js', erros[0].msg)
+        self.assertNotIn('vendor/htmx/htmx.min.js', erros[0].msg)
+    
+    def test_arquivo_sem_hash_revalida(self):
+        """Testa que arquivos sem hash vão com no-cache e respondem 304 quando não mudaram"""
+        resposta = self.buscar('/static/js/autocomplete.js')
+        
+        self.assertEqual(resposta['Cache-Control'], 'no-cache')
+        nao_modificado = self.client.get('/static/js/autocomplete.js', HTTP_IF_MODIFIED_SINCE=resposta['Last-Modified'])
+        self.assertEqual(nao_modificado.status_code, 304)
+    
+    def test_desligado(self):
+        """Testa que sem SERVIR_ESTATICOS a rota não entrega arquivos"""
+        with override_settings(SERVIR_ESTATICOS=False):
+            self.assertEqual(self.client.get(ativos.url('htmx.js')).status_code, 404)
+
+
+class AuditoriaTestCase(TestCase):
+    """Testes para a trilha de auditoria gravada em lote"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = criar_usuario('auditor', 'view_registroauditoria', 'change_fornecedor')
+        cls.fornecedor = criar_fornecedor(nome='Fornecedor Auditado', telefone='1111')
+        cls.item = criar_item('AUD001', 50, fornecedor=cls.fornecedor)
+    
+    def setUp(self):
+        auditoria.limpar()
+        self.client.force_login(self.user)
+    
+    def registros(self, modelo, objeto_id):
+        return list(RegistroAuditoria.objects.filter(modelo=modelo, objeto_id=objeto_id).order_by('pk'))
+    
+    def test_diferenca_de_campos_com_usuario_da_requisicao(self):
+        """Testa que a edição pela view registra só os campos alterados e quem alterou"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('fornecedor_edit', kwargs={'pk': self.fornecedor.pk}), {
+                'nome': 'Fornecedor Auditado', 'telefone': '2222',
+            })
+        self.assertEqual(response.status_code, 302)
+        auditoria.descarregar()
+        
+        registro, = self.registros('fornecedor', self.fornecedor.pk)
+        self.assertEqual(registro.acao, 'ALTERACAO')
+        self.assertEqual(registro.alteracoes, {'telefone': ['1111', '2222']})
+        self.assertEqual(registro.usuario, self.user)
+    
+    def test_precos_e_limites_do_item(self):
+        """Testa o registro de preço e limites; o saldo movimentado não entra na trilha do item"""
+        item = Item.objects.get(pk=self.item.pk)
+        item.valor_unitario = Decimal('12.50')
+        item.estoque_minimo = 20
+        with self.captureOnCommitCallbacks(execute=True), auditoria.como_usuario(self.user):
+            item.save()
+            Movimentacao.objects.create(item=item, tipo='ENTRADA', quantidade=5)
+        auditoria.descarregar()
+        
+        registro, = self.registros('item', item.pk)
+        self.assertEqual(registro.alteracoes, {'valor_unitario': ['10.00', '12.50'], 'estoque_minimo': [300, 20]})
+        self.assertEqual(registro.usuario, self.user)
+        self.assertEqual(RegistroAuditoria.objects.filter(modelo='movimentacao', acao='CRIACAO').count(), 1)
+    
+    def test_instancia_sem_estado_carregado(self):
+        """Testa que campos adiados (only) são buscados antes do save para o diff"""
+        item = Item.objects.only('pk', 'codigo').get(pk=self.item.pk)
+        item.descricao = 'Nova descrição'
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        auditoria.descarregar()
+        
+        registro, = self.registros('item', item.pk)
+        self.assertEqual(registro.alteracoes, {'descricao': ['Item AUD001', 'Nova descrição']})
+    
+    def test_gravacao_fora_da_transacao_de_escrita(self):
+        """Testa que o save não grava auditoria e que a fila vai em um único INSERT"""
+        with CaptureQueriesContext(connection) as escrita, self.captureOnCommitCallbacks(execute=True):
+            for minimo in (10, 20, 30):
+                item = Item.objects.get(pk=self.item.pk)
+                item.estoque_minimo = minimo
+                item.save()
+        self.assertFalse(any('estoque_registroauditoria' in q['sql'] for q in escrita.captured_queries))
+        
+        with CaptureQueriesContext(connection) as gravacao:
+            self.assertEqual(auditoria.descarregar(), 3)
+        self.assertEqual(sum('INSERT INTO "estoque_registroauditoria"' in q['sql'] for q in gravacao.captured_queries), 1)
+    
+    def test_transacao_desfeita_sem_registro(self):
+        """Testa que alterações desfeitas não entram na fila"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    item = Item.objects.get(pk=self.item.pk)
+                    item.valor_unitario = Decimal('99.00')
+                    item.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        
+        self.assertEqual(auditoria.descarregar(), 0)
+    
+    def test_lote_por_tamanho_e_por_tempo(self):
+        """Testa que a coleta fecha o lote pelo tamanho ou pelo intervalo"""
+        for numero in range(5):
+            auditoria.enfileirar(numero)
+        
+        lote, encerrar = auditoria._coletar(3, 10)
+        self.assertEqual((lote, encerrar), ([0, 1, 2], False))
+        inicio = time.monotonic()
+        lote, _ = auditoria._coletar(10, 0.05)
+        self.assertEqual(lote, [3, 4])
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.05)
+    
+    def test_historico_do_item(self):
+        """Testa o endpoint de histórico (mais recente primeiro, inclusive após a exclusão)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Item.objects.get(pk=self.item.pk)
+            item.valor_unitario = Decimal('11.00')
+            item.save()
+            Item.objects.get(pk=self.item.pk).delete()
+        auditoria.descarregar()
+        
+        response = self.client.get(reverse('api_historico_item', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.status_code, 200)
+        registros = response.json()['registros']
+        self.assertEqual([r['acao'] for r in registros], ['EXCLUSAO', 'ALTERACAO'])
+        self.assertEqual(registros[1]['alteracoes'], {'valor_unitario': ['10.00', '11.00']})
+        
+        self.client.force_login(criar_usuario('sem_permissao'))
+        response = self.client.get(reverse('api_historico_item', kwargs={'item_id': self.item.pk}))
+        self.assertEqual(response.status_code, 403)
+
+
+class AutenticacaoEmCacheTestCase(TestCase):
+    """Testes para sessões e permissões em cache entre requisições"""
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.usuario = criar_usuario('gestor', 'view_fornecedor')
+        criar_fornecedor(nome='Fornecedor A', cnpj='11.111.111/0001-11')
+    
+    def indicadores(self):
+        return self.client.get(reverse('api_indicadores_fornecedores'))
+    
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_requisicao_autenticada_so_consulta_a_view(self):
+        """Testa que sessão, usuário e permissões saem do cache a partir da segunda requisição"""
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.indicadores().status_code, 200)
+        # Só a consulta dos indicadores: sem sessão, usuário nem permissões
+        with self.assertNumQueries(1):
+            response = self.indicadores()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['fornecedores']), 1)
+    
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_sessao_em_cookie_assinado(self):
+        """Testa a autenticação com a sessão guardada no cookie"""
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.indicadores().status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.indicadores().status_code, 200)
+    
+    def test_alteracoes_de_permissao_invalidam_o_cache(self):
+        """Testa que permissões e grupos alterados valem na requisição seguinte"""
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.indicadores().status_code, 200)
+        
+        permissao = Permission.objects.get(codename='view_fornecedor')
+        self.usuario.user_permissions.remove(permissao)
+        self.assertEqual(self.indicadores().status_code, 403)
+        
+        grupo = Group.objects.create(name='Compras')
+        self.usuario.groups.add(grupo)
+        self.assertEqual(self.indicadores().status_code, 403)
+        grupo.permissions.add(permissao)
+        self.assertEqual(self.indicadores().status_code, 200)
+        
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.indicadores().status_code, 302)
+    
+    def test_cache_do_processo_expira_em_segundos(self):
+        """Testa que, com cache local, revogações feitas em outro processo valem após PERMISSOES_CACHE_TTL_LOCAL"""
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.indicadores().status_code, 200)
+        
+        # Revogação sem sinais neste processo, como se feita por outro worker
+        User.user_permissions.through.objects.filter(user=self.usuario).delete()
+        self.assertEqual(self.indicadores().status_code, 200)
+        agora = time.time()
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=agora + 6):
+            self.assertEqual(self.indicadores().status_code, 403)
+        
+        compartilhado = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(CACHES=dict(settings.CACHES, compartilhado=compartilhado), PERMISSOES_CACHE='compartilhado'):
+            self.assertEqual(autenticacao._ttl(), settings.PERMISSOES_CACHE_TTL)
+
+
+class LoteTestCase(TestCase):
+    """Testes para lotes com validade e a baixa FEFO"""
+    
+    def setUp(self):
+        self.user = criar_usuario('lotes', 'view_item')
+        self.client.force_login(self.user)
+        self.central = Almoxarifado.padrao()
+        self.item = criar_item('MED001', descricao='Soro Fisiológico')
+        self.hoje = timezone.localdate()
+    
+    def entrada(self, quantidade, numero='', dias=None, almoxarifado=None):
+        validade = self.hoje + timedelta(days=dias) if dias is not None else None
+        return Movimentacao.objects.create(
+            item=self.item, almoxarifado=almoxarifado, tipo='ENTRADA', quantidade=quantidade,
+            lote_numero=numero, validade=validade,
+        )
+    
+    def saldos_lotes(self, almoxarifado=None):
+        return dict(
+            Lote.objects.filter(item=self.item, almoxarifado=almoxarifado or self.central)
+            .values_list('numero', 'quantidade')
+        )
+    
+    def test_saida_consome_primeiro_o_que_vence_antes(self):
+        """Testa a baixa FEFO: validade mais próxima, depois sem validade, depois o saldo sem lote"""
+        self.entrada(20, 'L-60', dias=60)
+        self.entrada(10, 'L-10', dias=10)
+        self.entrada(5, 'L-SV')
+        self.entrada(8)
+        self.entrada(5, 'L-10', dias=10)
+        self.assertEqual(self.saldos_lotes(), {'L-60': 20, 'L-10': 15, 'L-SV': 5})
+        
+        saida = Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=18)
+        self.assertEqual(self.saldos_lotes(), {'L-60': 17, 'L-10': 0, 'L-SV': 5})
+        self.assertEqual(
+            sorted(saida.lotes.values_list('lote__numero', 'quantidade')), [('L-10', -15), ('L-60', -3)],
+        )
+        
+        Movimentacao.objects.create(item=self.item, tipo='RETIRADA', quantidade=25)
+        self.assertEqual(self.saldos_lotes(), {'L-60': 0, 'L-10': 0, 'L-SV': 0})
+        self.item.refresh_from_db()
+        # Os 3 restantes saem do saldo sem lote
+        self.assertEqual(self.item.quantidade_atual, 5)
+        
+        lote = Lote.objects.get(numero='L-10')
+        historico = self.client.get(reverse('api_historico_lote', kwargs={'lote_id': lote.pk})).json()
+        self.assertEqual([m['quantidade'] for m in historico['movimentacoes']], [-15, 5, 10])
+        call_command('reconciliar_resumo', stdout=StringIO())
+    
+    def test_transferencia_leva_os_lotes(self):
+        """Testa que a transferência recria no destino os lotes baixados na origem"""
+        anexo = Almoxarifado.objects.create(codigo='ANEXO', nome='Unidade Anexa')
+        self.entrada(10, 'A', dias=30)
+        self.entrada(10, 'B', dias=5)
+        self.entrada(10)
+        
+        Movimentacao.transferir(self.item, self.central, anexo, 15)
+        self.assertEqual(self.saldos_lotes(), {'A': 5, 'B': 0})
+        self.assertEqual(self.saldos_lotes(anexo), {'A': 5, 'B': 10})
+        self.assertEqual(
+            Lote.objects.get(almoxarifado=anexo, numero='B').validade, self.hoje + timedelta(days=5),
+        )
+    
+    def test_ajustes_sem_movimentacao_de_saida(self):
+        """Testa que ajustes de inventário e edições diretas não deixam os lotes acima do saldo"""
+        self.entrada(10, 'A', dias=30)
+        self.entrada(10, 'B', dias=5)
+        
+        inventario = Inventario.objects.create(descricao='Contagem', almoxarifado=self.central)
+        inventario.registrar_contagens({'MED001': 12})
+        inventario.aplicar(self.user)
+        self.assertEqual(self.saldos_lotes(), {'A': 10, 'B': 2})
+        self.assertTrue(MovimentacaoLote.objects.filter(movimentacao__inventario=inventario, quantidade=-8).exists())
+        
+        item = Item.objects.get(pk=self.item.pk)
+        item.quantidade_atual = 4
+        item.save()
+        self.assertEqual(self.saldos_lotes(), {'A': 4, 'B': 0})
+        
+        Lote.objects.filter(numero='A').update(quantidade=9)
+        saida = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('reconciliar_resumo', stdout=saida)
+        self.assertIn('Lotes de MED001 em CENTRAL: saldo do local=4 soma dos lotes=9', saida.getvalue())
+        call_command('reconciliar_resumo', '--corrigir', stdout=StringIO())
+        self.assertEqual(self.saldos_lotes(), {'A': 4, 'B': 0})
+    
+    def test_lotes_a_vencer(self):
+        """Testa o alerta de vencimento por intervalo de validade, pelo índice parcial"""
+        self.entrada(10, 'VENCIDO', dias=-2)
+        self.entrada(10, 'PROXIMO', dias=7)
+        self.entrada(10, 'DISTANTE', dias=90)
+        self.entrada(10, 'SEM')
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=10)
+        
+        data = self.client.get(reverse('api_lotes_vencimento'), {'dias': 30}).json()
+        self.assertEqual([(l['numero'], l['dias_para_vencer']) for l in data['lotes']], [('PROXIMO', 7)])
+        
+        self.entrada(3, 'VENCIDO', dias=-2)
+        data = self.client.get(reverse('api_lotes_vencimento'), {'dias': 30, 'almoxarifado': 'CENTRAL'}).json()
+        self.assertEqual([l['numero'] for l in data['lotes']], ['VENCIDO', 'PROXIMO'])
+        self.assertEqual(self.client.get(reverse('api_lotes_vencimento'), {'dias': 'x'}).status_code, 400)
+        
+        self.assertIn('lote_vencimento_idx', Lote.a_vencer(30).explain())
+        fefo = Lote.objects.filter(item=self.item, almoxarifado=self.central, quantidade__gt=0)
+        self.assertIn('lote_fefo_idx', fefo.order_by(*Lote.ORDEM_FEFO).explain())
+        
+        response = self.client.get(reverse('item_detail', kwargs={'pk': self.item.pk}))
+        self.assertContains(response, 'DISTANTE')
+        self.assertContains(response, 'Sem validade')
+
+
+class VerificacaoRazaoTestCase(TestCase):
+    """Testes para a cadeia de hashes do razão e o comando verify_ledger"""
+    
+    def setUp(self):
+        self.item = criar_item('RZ001', quantidade_atual=10)
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=20)
+        Movimentacao.objects.create(item=self.item, tipo='SAIDA', quantidade=5)
+        Movimentacao.objects.create(item=self.item, tipo='DEVOLUCAO', quantidade=3)
+    
+    def verificar(self, *args):
+        saida = StringIO()
+        call_command('verify_ledger', *args, stdout=saida)
+        return saida.getvalue()
+    
+    def test_cadeia_consistente(self):
+        """Testa o encadeamento nos caminhos unitário e em massa, e a devolução somando ao estoque"""
+        item = Item.objects.get(pk=self.item.pk)
+        self.assertEqual(item.quantidade_atual, 28)
+        self.assertEqual(item.razao_saldo, 28)
+        ultima = Movimentacao.objects.filter(item=item).latest('pk')
+        self.assertEqual((ultima.saldo_razao, ultima.hash_razao), (28, item.razao_hash))
+        
+        inventario = Inventario.objects.create(descricao='Contagem', almoxarifado=Almoxarifado.padrao())
+        inventario.registrar_contagens({'RZ001': 25})
+        inventario.aplicar(criar_usuario('razao'))
+        self.assertEqual(Item.objects.get(pk=item.pk).razao_saldo, 25)
+        
+        self.assertIn('Razão consistente', self.verificar())
+        self.assertEqual(
+            VerificacaoRazao.obter().ultima_movimentacao, Movimentacao.objects.latest('pk').pk,
+        )
+    
+    def test_movimentacao_alterada(self):
+        """Testa que alterar uma movimentação gravada quebra a cadeia"""
+        saida = Movimentacao.objects.get(item=self.item, tipo='SAIDA')
+        Movimentacao.objects.filter(pk=saida.pk).update(quantidade=1)
+        with self.assertRaisesMessage(CommandError, 'divergência'):
+            self.verificar()
+        
+        self.verificar('--corrigir')
+        self.assertIn('Razão consistente', self.verificar('--completo'))
+    
+    def test_quantidade_alterada_fora_do_razao(self):
+        """Testa que a quantidade editada por UPDATE aparece como divergência e é corrigida"""
+        Item.objects.filter(pk=self.item.pk).update(quantidade_atual=50)
+        saida = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verify_ledger', stdout=saida)
+        self.assertIn('RZ001: quantidade_atual=50 razão=28', saida.getvalue())
+        
+        self.verificar('--corrigir')
+        self.assertEqual(Item.objects.get(pk=self.item.pk).quantidade_atual, 28)
+        call_command('reconciliar_resumo', stdout=StringIO())
+        self.assertIn('Razão consistente', self.verificar())
+    
+    def test_verificacao_incremental(self):
+        """Testa que só as movimentações após o ponto de verificação são conferidas"""
+        self.verificar()
+        primeira = Movimentacao.objects.filter(item=self.item).earliest('pk')
+        Movimentacao.objects.filter(pk=primeira.pk).update(quantidade=19)
+        Movimentacao.objects.create(item=self.item, tipo='ENTRADA', quantidade=2)
+        
+        with self.assertNumQueries(8):
+            self.assertIn('Razão consistente', self.verificar())
+        with self.assertRaises(CommandError):
+            self.verificar('--completo')
+    
+    def test_verificacao_apos_arquivamento(self):
+        """Testa que a cadeia continua da ponta guardada no arquivamento, inclusive ao corrigir"""
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        configuracao = override_settings(ARQUIVO_MOVIMENTACOES_DIR=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        
+        antigas = Movimentacao.objects.filter(item=self.item, tipo__in=['ENTRADA', 'SAIDA'])
+        antigas.update(data=timezone.make_aware(datetime(2025, 1, 10, 12)))
+        arquivar_movimentacoes('2025-02')
+        self.assertEqual(Movimentacao.objects.filter(item=self.item).count(), 1)
+        self.assertEqual(SaldoArquivado.objects.get(item=self.item).razao_saldo, 25)
+        
+        self.assertIn('Razão consistente', self.verificar('--completo'))
+        
+        # A correção refaz a cadeia a partir da ponta arquivada, não da gênese
+        devolucao = Movimentacao.objects.get(item=self.item)
+        Movimentacao.objects.filter(pk=devolucao.pk).update(quantidade=4)
+        with self.assertRaisesMessage(CommandError, 'divergência'):
+            self.verificar('--completo')
+        self.verificar('--completo', '--corrigir')
+        devolucao.refresh_from_db()
+        ponta = SaldoArquivado.objects.get(item=self.item)
+        self.assertEqual(devolucao.saldo_razao, 29)
+        self.assertEqual(devolucao.hash_razao, razao.calcular_hash(
+            ponta.razao_hash, self.item.pk, devolucao.almoxarifado_id, 'DEVOLUCAO', 4, 29, devolucao.sequencia,
+        ))
+        self.assertIn('Razão consistente', self.verificar('--completo'))
+
+
+class AquecimentoTestCase(TestCase):
+    """Testes para o aquecimento do processo (manage.py warmup)"""
+    
+    def setUp(self):
+        criar_item('AQ001', descricao='Parafuso Sextavado')
+        criar_item('AQ002', descricao='Arruela Lisa')
+        busca.limpar()
+        codigos.limpar()
+    
+    def test_warmup_preenche_os_caches(self):
+        """Testa que após o warmup a busca e a leitura de códigos não consultam o banco"""
+        saida = StringIO()
+        call_command('warmup', '--termos', 'Parafuso', stdout=saida)
+        self.assertIn('Aquecimento concluído', saida.getvalue())
+        for etapa in ('rotas', 'templates', 'ativos', 'alertas', 'busca', 'codigos'):
+            self.assertIn(etapa, saida.getvalue())
+        
+        with self.assertNumQueries(0):
+            self.assertEqual(busca.buscar('')[1], 'acerto')
+            itens, origem = busca.buscar('parafuso')
+            self.assertEqual((origem, [item.codigo for item in itens]), ('acerto', ['AQ001']))
+            self.assertIsNotNone(codigos.buscar(['AQ002'])['AQ002'])
+    
+    def test_etapas_do_mestre_nao_preenchem_caches_com_validade(self):
+        """Testa que o aquecimento herdado pelo fork deixa busca e códigos para cada worker"""
+        etapas = [etapa for etapa, _, _ in aquecimento.aquecer(etapas=aquecimento.ETAPAS_COMPARTILHADAS)]
+        self.assertEqual(etapas, ['rotas', 'templates', 'ativos', 'alertas'])
+        self.assertEqual(busca.estatisticas()['termos'], 0)
+        
+        aquecimento.aquecer(etapas=aquecimento.ETAPAS_DO_PROCESSO)
+        with self.assertNumQueries(0):
+            self.assertEqual(busca.buscar('')[1], 'acerto')
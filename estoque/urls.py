@@ -14,6 +14,7 @@ urlpatterns = [
 
     # Rota de Movimentação
     path('movimentacao/novo/', views.movimentacao_create, name='movimentacao_create'),
+    path('transferencia/nova/', views.transferencia_create, name='transferencia_create'),
     
     # Rotas de Fornecedor
     path('fornecedores/', views.fornecedor_list, name='fornecedor_list'),
@@ -22,10 +23,34 @@ urlpatterns = [
     path('fornecedor/<int:pk>/excluir/', views.fornecedor_delete, name='fornecedor_delete'),
     path('buscar/fornecedor/', views.buscar_fornecedor, name='buscar_fornecedor'),
     path('inventario/periodico/', views.relatorio_inventario_periodico, name='relatorio_inventario_periodico'),
+    path('inventario/periodico/mensal/', views.relatorio_cmv_mensal, name='relatorio_cmv_mensal'),
+
+    # Rotas de Inventário Físico (contagem)
+    path('inventario/', views.inventario_list, name='inventario_list'),
+    path('inventario/<int:pk>/', views.inventario_detail, name='inventario_detail'),
+    path('inventario/<int:pk>/aplicar/', views.inventario_aplicar, name='inventario_aplicar'),
+
+    # Rotas de Pedidos de Compra (reposição)
+    path('pedidos/', views.pedido_list, name='pedido_list'),
+    path('pedidos/<int:pk>/', views.pedido_detail, name='pedido_detail'),
+    path('pedidos/<int:pk>/receber/', views.pedido_receber, name='pedido_receber'),
     
     # API de Alertas de Estoque
     path('api/alertas/', views.api_alertas_estoque, name='api_alertas_estoque'),
     path('api/item/<int:item_id>/status/', views.api_status_item, name='api_status_item'),
+    path('api/item/<int:item_id>/historico/', views.api_historico_item, name='api_historico_item'),
     path('api/itens/criticos/', views.api_itens_criticos, name='api_itens_criticos'),
     path('api/itens/reposicao/', views.api_itens_reposicao, name='api_itens_reposicao'),
+    path('api/resumo/', views.api_resumo_estoque, name='api_resumo_estoque'),
+    path('api/almoxarifados/resumo/', views.api_resumo_almoxarifados, name='api_resumo_almoxarifados'),
+    path('api/cmv/mensal/', views.api_cmv_mensal, name='api_cmv_mensal'),
+    path('api/sync/', views.api_sync, name='api_sync'),
+    path('api/itens/autocomplete/', views.api_itens_autocomplete, name='api_itens_autocomplete'),
+    path('api/itens/busca/estatisticas/', views.api_busca_estatisticas, name='api_busca_estatisticas'),
+    path('api/itens/codigos/', views.api_itens_por_codigo, name='api_itens_por_codigo'),
+    path('api/fornecedores/autocomplete/', views.api_fornecedores_autocomplete, name='api_fornecedores_autocomplete'),
+    path('api/lotes/vencimento/', views.api_lotes_vencimento, name='api_lotes_vencimento'),
+    path('api/lotes/<int:lote_id>/historico/', views.api_historico_lote, name='api_historico_lote'),
+    path('api/fornecedores/indicadores/', views.api_indicadores_fornecedores, name='api_indicadores_fornecedores'),
+    path('api/inventario/<int:pk>/contagens/', views.api_inventario_contagens, name='api_inventario_contagens'),
 ]
\ No newline at end of file
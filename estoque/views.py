@@ -1,72 +1,241 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
-from .models import Fornecedor, Item, Movimentacao
-from .forms import FornecedorForm, ItemForm, MovimentacaoForm
+from .models import (
+    Fornecedor, Item, Movimentacao, ResumoEstoque, ResumoMovimentacaoDiaria, Inventario, CampoBusca,
+    Almoxarifado, SaldoEstoque, EstoqueManager, SegmentoMovimentacao, RegistroAuditoria, PedidoCompra,
+    ResumoFornecedor, Lote, MovimentacaoLote, TIPOS_ENTRADA, TIPOS_SAIDA, normalizar_busca,
+)
+from . import arquivo, busca, codigos, sincronizacao
+from .forms import (
+    FornecedorForm, ItemForm, MovimentacaoForm, TransferenciaForm, InventarioForm, ContagemUploadForm,
+)
 from django.core.paginator import Paginator
 from django.db.models import Q
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from decimal import Decimal
-from django.db.models import Sum, F, ExpressionWrapper, DecimalField, Case, When
+from django.db.models import (
+    Sum, Count, F, Func, ExpressionWrapper, DecimalField, CharField, Case, When, Window, Value,
+)
+from django.db.models.functions import Coalesce, Concat, TruncMonth
+from django.conf import settings
 from django.utils import timezone
 from django.http import JsonResponse
+from django.core.exceptions import PermissionDenied, ValidationError
+import json
+from collections import Counter
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_vary_headers
+from .routers import leitura_em_replica
+
+
+def _requisicao_htmx(request):
+    """Indica se a requisição foi disparada pelo HTMX (cabeçalho HX-Request)."""
+    return request.headers.get('HX-Request') == 'true'
+
+
+# Colunas exibidas nas linhas das listagens (mais a versao, chave do cache de linhas)
+COLUNAS_LISTA_ITENS = ('codigo', 'descricao', 'quantidade_atual', 'estoque_minimo', 'versao')
+COLUNAS_LISTA_FORNECEDORES = ('nome', 'cnpj', 'telefone', 'email', 'versao')
+COLUNAS_INDICADORES_FORNECEDOR = (
+    'total_itens', 'itens_critico', 'itens_baixo', 'valor_compras', 'pedidos_recebidos', 'prazo_total', 'versao',
+)
+
+
+def _fornecedores_lista():
+    """
+    Fornecedores com os indicadores (ResumoFornecedor) no mesmo SELECT. A
+    versão da linha em cache combina a do fornecedor e a dos indicadores.
+    """
+    return Fornecedor.objects.select_related('resumo').only(
+        *COLUNAS_LISTA_FORNECEDORES, *(f'resumo__{campo}' for campo in COLUNAS_INDICADORES_FORNECEDOR),
+    ).annotate(
+        versao_linha=Concat('versao', Value('.'), Coalesce('resumo__versao', 0), output_field=CharField()),
+    )
+
+def _render_lista(request, template, template_parcial, context):
+    """
+    Renderiza a página completa ou, em requisições HTMX (paginação),
+    apenas o parcial com a tabela e a navegação.
+    """
+    response = render(request, template_parcial if _requisicao_htmx(request) else template, context)
+    patch_vary_headers(response, ('HX-Request',))
+    return response
+
+def _valor_movimentado():
+    """
+    Valor de cada movimentação pelo custo unitário gravado no lançamento:
+    positivo para ENTRADA/DEVOLUCAO e negativo para SAIDA/RETIRADA.
+    """
+    valor = ExpressionWrapper(F('quantidade') * F('custo_unitario'), output_field=DecimalField())
+    return Case(
+        When(tipo__in=TIPOS_ENTRADA, then=valor),
+        When(tipo__in=TIPOS_SAIDA, then=valor * Decimal('-1')),
+        default=Decimal('0.00'),
+        output_field=DecimalField(),
+    )
+
 
 def get_historical_stock_value(end_date):
     """
     Calcula o valor total do estoque em uma data específica
-    somando o valor de todas as ENTREDAS e subtraindo o valor de todas as SAÍDAS
+    somando o valor de todas as ENTRADAS e subtraindo o valor de todas as SAÍDAS
     até essa data.
+    
+    Cada movimentação é valorizada pelo ``custo_unitario`` registrado no
+    momento do lançamento, então a soma é feita só na tabela de movimentações
+    (sem JOIN com Item). Meses arquivados entram pelos totais dos segmentos
+    (ver estoque/arquivo.py).
     """
     
     # Adiciona o fuso horário à data final
     if not isinstance(end_date, datetime):
         end_date = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
 
-    # --- CORREÇÃO DO ERRO: Adicionar output_field em ExpressionWrapper ---
-    
-    # Define o custo negativo para as saídas (SAIDA, RETIRADA)
-    CUSTO_NEGATIVO = ExpressionWrapper(
-        F('quantidade') * F('item__valor_unitario') * Decimal('-1'),
-        # Necessário para forçar o resultado da multiplicação a ser Decimal
-        output_field=DecimalField() 
+    stock_value = Movimentacao.objects.filter(data__lte=end_date).aggregate(
+        total_valor_estoque=Coalesce(Sum(_valor_movimentado()), Decimal('0.00'), output_field=DecimalField())
     )
-    
-    # Define o custo positivo para as entradas (ENTRADA, DEVOLUCAO)
-    CUSTO_POSITIVO = ExpressionWrapper(
-        F('quantidade') * F('item__valor_unitario'),
-        # Necessário para forçar o resultado da multiplicação a ser Decimal
-        output_field=DecimalField()
+    valor_arquivado = arquivo.valor_arquivado(
+        SegmentoMovimentacao.objects.filter(data_inicial__lte=end_date), TIPOS_ENTRADA, TIPOS_SAIDA, ate=end_date,
     )
+    
+    return (stock_value['total_valor_estoque'] + valor_arquivado).quantize(Decimal('0.01'))
 
-    # Calcula a alteração líquida no valor do estoque até a data final
-    stock_value = Movimentacao.objects.filter(
-        data__lte=end_date
-    ).select_related('item').annotate(
-        # Cria o campo 'valor_movimentado'
-        valor_movimentado=ExpressionWrapper(
-            Case(
-                # ENTRADA / DEVOLUCAO adiciona valor
-                When(tipo__in=['ENTRADA', 'DEVOLUCAO'], 
-                     then=CUSTO_POSITIVO),
-                # SAIDA / RETIRADA reduz valor
-                When(tipo__in=['SAIDA', 'RETIRADA'], 
-                     then=CUSTO_NEGATIVO),
-                # Garante que o Case inteiro retorne um Decimal
-                default=Decimal('0.00'),
-                output_field=DecimalField()
-            ),
-            output_field=DecimalField() # Garante que a anotação final é Decimal
-        )
-    ).aggregate(
-        total_valor_estoque=Sum('valor_movimentado')
-    )
+
+class SomaJanela(Func):
+    """SUM() como função de janela sobre um agregado (acumulado de Sum por grupo)."""
+    function = 'SUM'
+    window_compatible = True
+
+
+# Máximo de meses por série do CMV mensal
+CMV_MENSAL_MESES_MAXIMO = 120
+
+
+def _proximo_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def serie_cmv_mensal(primeiro_mes, ultimo_mes, por_fornecedor=False):
+    """
+    Estoque inicial, compras, estoque final e custo de uso de cada mês.
+    
+    Uma única consulta agrupa o razão por mês (e fornecedor do item) e obtém o
+    valor acumulado com uma soma em janela; os meses arquivados entram pelos
+    totais dos segmentos (ou pela leitura deles, na quebra por fornecedor).
+    
+    Args:
+        primeiro_mes, ultimo_mes (date): Primeiros dias dos meses do intervalo
+        por_fornecedor (bool): Uma série por fornecedor atual dos itens
+    
+    Returns:
+        dict: meses (lista "AAAA-MM") e series (lista de dicts com
+        fornecedor_id e as listas estoque_inicial, compras, estoque_final, custo_uso)
+    """
+    meses = [primeiro_mes]
+    while meses[-1] < ultimo_mes:
+        meses.append(_proximo_mes(meses[-1]))
+    limite = timezone.make_aware(datetime.combine(_proximo_mes(ultimo_mes), datetime.min.time()))
+    
+    grupo = ['item__fornecedor_id'] if por_fornecedor else []
+    valor = ExpressionWrapper(F('quantidade') * F('custo_unitario'), output_field=DecimalField())
+    linhas = Movimentacao.objects.filter(data__lt=limite).annotate(mes=TruncMonth('data')).values(
+        'mes', *grupo,
+    ).annotate(
+        compras=Sum(Case(When(tipo='ENTRADA', then=valor), default=Decimal('0'), output_field=DecimalField())),
+    ).annotate(
+        acumulado=Window(
+            SomaJanela(Sum(_valor_movimentado()), output_field=DecimalField()),
+            partition_by=[F(campo) for campo in grupo] or None,
+            order_by=F('mes').asc(),
+        ),
+    ).order_by()
     
-    return stock_value.get('total_valor_estoque') or Decimal('0.00')
+    # {grupo: {mes: [compras, acumulado]}} da tabela e {grupo: {mes: [liquido, compras]}} dos segmentos
+    vivos = {}
+    for linha in linhas:
+        mes = timezone.localtime(linha['mes']).date()
+        vivos.setdefault(linha.get('item__fornecedor_id'), {})[mes] = [
+            linha['compras'] or Decimal('0'), linha['acumulado'] or Decimal('0'),
+        ]
+    arquivados = {}
+    segmentos = list(SegmentoMovimentacao.objects.filter(competencia__lte=ultimo_mes))
+    grupo_por_item = dict(Item.objects.values_list('pk', 'fornecedor_id')) if por_fornecedor and segmentos else {}
+    for segmento in segmentos:
+        if por_fornecedor:
+            with arquivo.Segmento(arquivo.diretorio() / segmento.arquivo) as dados:
+                por_grupo = dados.valores_por_grupo(grupo_por_item, TIPOS_ENTRADA, TIPOS_SAIDA, ('ENTRADA',))
+        else:
+            por_grupo = {None: [segmento.total_para(TIPOS_ENTRADA, TIPOS_SAIDA), segmento.total_para(('ENTRADA',))]}
+        for chave, valores in por_grupo.items():
+            arquivados.setdefault(chave, {})[segmento.competencia] = valores
+    
+    series = []
+    for chave in sorted(set(vivos) | set(arquivados) or {None}, key=lambda c: (c is None, c or 0)):
+        series.append(_serie_mensal(chave, meses, vivos.get(chave, {}), arquivados.get(chave, {})))
+    return {'meses': [f"{mes:%Y-%m}" for mes in meses], 'series': series}
+
+
+def _serie_mensal(chave, meses, vivos, arquivados):
+    """
+    Monta a série de um grupo a partir dos meses com movimento.
+    
+    O acumulado da tabela já vem da soma em janela; o dos segmentos é somado aqui.
+    """
+    eventos = sorted(set(vivos) | set(arquivados))
+    acumulado_vivo = acumulado_arquivado = Decimal('0')
+    i = 0
+    serie = {'fornecedor_id': chave, 'estoque_inicial': [], 'compras': [], 'estoque_final': [], 'custo_uso': []}
+    for mes in meses:
+        inicial = None
+        compras = Decimal('0')
+        while i < len(eventos) and eventos[i] <= mes:
+            evento = eventos[i]
+            if evento == mes:
+                inicial = acumulado_vivo + acumulado_arquivado
+            if evento in vivos:
+                acumulado_vivo = vivos[evento][1]
+                compras += vivos[evento][0] if evento == mes else 0
+            if evento in arquivados:
+                acumulado_arquivado += arquivados[evento][0]
+                compras += arquivados[evento][1] if evento == mes else 0
+            i += 1
+        final = acumulado_vivo + acumulado_arquivado
+        if inicial is None:
+            inicial = final
+        for campo, valor in (
+            ('estoque_inicial', inicial), ('compras', compras),
+            ('estoque_final', final), ('custo_uso', inicial + compras - final),
+        ):
+            serie[campo].append(Decimal(valor).quantize(Decimal('0.01')))
+    return serie
+
+
+def _periodo_mensal(request):
+    """
+    Lê ``inicio`` e ``fim`` (AAAA-MM) da requisição; padrão: últimos 12 meses.
+    
+    Raises:
+        ValueError: formato inválido, fim antes do início ou intervalo longo demais
+    """
+    atual = timezone.localdate().replace(day=1)
+    padrao_inicio = atual
+    for _ in range(11):
+        padrao_inicio = (padrao_inicio - timedelta(days=1)).replace(day=1)
+    try:
+        inicio = datetime.strptime(request.GET.get('inicio') or f"{padrao_inicio:%Y-%m}", '%Y-%m').date()
+        fim = datetime.strptime(request.GET.get('fim') or f"{atual:%Y-%m}", '%Y-%m').date()
+    except ValueError:
+        raise ValueError('Use meses no formato AAAA-MM.')
+    meses = (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+    if meses < 1 or meses > CMV_MENSAL_MESES_MAXIMO:
+        raise ValueError(f'O intervalo deve ter de 1 a {CMV_MENSAL_MESES_MAXIMO} meses.')
+    return inicio, fim
 
 
 @login_required
 @permission_required('estoque.view_movimentacao', raise_exception=True)
+@leitura_em_replica
 def relatorio_inventario_periodico(request):
     # --- 1. DEFINIÇÃO DO PERÍODO ---
     
@@ -95,15 +264,20 @@ def relatorio_inventario_periodico(request):
     valor_estoque_inicial = get_historical_stock_value(data_inicio)
     
     # B. Compras Líquidas (C): Valor de todas as ENTRADAS no período
-    compras_no_periodo = Movimentacao.objects.filter(
+    valor_compras_liquidas = Movimentacao.objects.filter(
         tipo='ENTRADA',
         data__range=(data_inicio, data_fim)
-    ).select_related('item')
-    
-    valor_compras_liquidas = Decimal('0.00')
-    for mov in compras_no_periodo:
-        # Soma o valor total de cada entrada (Quantidade * Custo Unitário)
-        valor_compras_liquidas += mov.quantidade * mov.item.valor_unitario
+    ).aggregate(
+        # Quantidade * custo unitário registrado em cada entrada
+        total=Coalesce(
+            Sum(F('quantidade') * F('custo_unitario'), output_field=DecimalField()),
+            Decimal('0.00'), output_field=DecimalField(),
+        )
+    )['total']
+    valor_compras_liquidas = (valor_compras_liquidas + arquivo.valor_arquivado(
+        SegmentoMovimentacao.objects.filter(data_inicial__lte=data_fim, data_final__gte=data_inicio),
+        ('ENTRADA',), desde=data_inicio, ate=data_fim,
+    )).quantize(Decimal('0.01'))
         
     # C. Estoque Disponível para Uso (EDU): EI + C
     valor_estoque_disponivel = valor_estoque_inicial + valor_compras_liquidas
@@ -131,13 +305,51 @@ def relatorio_inventario_periodico(request):
 
     return render(request, 'estoque/relatorio_cmv.html', context)
 
+
+def _nomear_series(series):
+    """Acrescenta o nome do fornecedor a cada série (None = itens sem fornecedor)."""
+    nomes = dict(Fornecedor.objects.filter(
+        pk__in=[serie['fornecedor_id'] for serie in series if serie['fornecedor_id'] is not None]
+    ).values_list('pk', 'nome'))
+    for serie in series:
+        serie['fornecedor'] = nomes.get(serie['fornecedor_id'], 'Sem fornecedor')
+    return series
+
+
+@login_required
+@permission_required('estoque.view_movimentacao', raise_exception=True)
+@leitura_em_replica
+def relatorio_cmv_mensal(request):
+    """Série mensal do custo de uso (``?inicio=AAAA-MM&fim=AAAA-MM&por_fornecedor=1``)."""
+    por_fornecedor = request.GET.get('por_fornecedor') == '1'
+    try:
+        inicio, fim = _periodo_mensal(request)
+    except ValueError as e:
+        messages.error(request, f"Período inválido. {e}")
+        return render(request, 'estoque/relatorio_cmv_mensal.html', {})
+    
+    resultado = serie_cmv_mensal(inicio, fim, por_fornecedor=por_fornecedor)
+    series = []
+    for serie in _nomear_series(resultado['series']):
+        linhas = zip(
+            resultado['meses'], serie['estoque_inicial'], serie['compras'], serie['estoque_final'], serie['custo_uso'],
+        )
+        series.append({'fornecedor': serie['fornecedor'], 'linhas': list(linhas)})
+    context = {
+        'inicio': f"{inicio:%Y-%m}",
+        'fim': f"{fim:%Y-%m}",
+        'por_fornecedor': por_fornecedor,
+        'series': series,
+    }
+    return render(request, 'estoque/relatorio_cmv_mensal.html', context)
+
 @login_required
 def index(request):
-    items = Item.objects.all().order_by('descricao')
+    items = Item.objects.only(*COLUNAS_LISTA_ITENS).order_by('descricao')
     paginator = Paginator(items, 20)
     page = request.GET.get('page')
     items = paginator.get_page(page)
-    return render(request, 'estoque/item_list.html', {'items': items})
+    return _render_lista(request, 'estoque/item_list.html', 'estoque/partials/lista_itens.html', {'items': items})
 
 @login_required
 @permission_required('estoque.add_item', raise_exception=True)
@@ -189,11 +401,39 @@ def movimentacao_create(request):
         form = MovimentacaoForm()
     return render(request, 'estoque/movimentacao_form.html', {'form': form})
 
+@login_required
+@permission_required('estoque.add_movimentacao', raise_exception=True)
+def transferencia_create(request):
+    if request.method == 'POST':
+        form = TransferenciaForm(request.POST)
+        if form.is_valid():
+            try:
+                Movimentacao.transferir(usuario=request.user, **form.cleaned_data)
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                messages.success(request, 'Transferência registrada.')
+                return redirect('item_detail', pk=form.cleaned_data['item'].pk)
+    else:
+        form = TransferenciaForm()
+    return render(request, 'estoque/transferencia_form.html', {'form': form})
+
 @login_required
 def item_detail(request, pk):
-    item = get_object_or_404(Item, pk=pk)
-    movimentos = Movimentacao.objects.filter(item=item).order_by('-data')[:50]
-    return render(request, 'estoque/item_detail.html', {'item': item, 'movimentos': movimentos})
+    item = get_object_or_404(Item.objects.only(
+        'codigo', 'descricao', 'unidade_medida', 'valor_unitario',
+        'quantidade_atual', 'estoque_minimo', 'estoque_maximo',
+    ), pk=pk)
+    # Índice (item, data); o usuário vem no mesmo SELECT
+    movimentos = Movimentacao.objects.filter(item=item).select_related('usuario').only(
+        'data', 'tipo', 'quantidade', 'usuario__username',
+    ).order_by('-data')[:50]
+    saldos = item.saldos.select_related('almoxarifado').order_by('almoxarifado__nome')
+    # Lotes com saldo na ordem em que serão consumidos (índice lote_fefo_idx)
+    lotes = item.lotes.filter(quantidade__gt=0).select_related('almoxarifado').order_by(*Lote.ORDEM_FEFO)
+    return render(request, 'estoque/item_detail.html', {
+        'item': item, 'movimentos': movimentos, 'saldos': saldos, 'lotes': lotes,
+    })
 
 
 
@@ -202,11 +442,14 @@ def item_detail(request, pk):
 @login_required
 @permission_required('estoque.view_fornecedor', raise_exception=True)
 def fornecedor_list(request):
-    fornecedores = Fornecedor.objects.all().order_by('nome')
+    fornecedores = _fornecedores_lista().order_by('nome')
     paginator = Paginator(fornecedores, 20)
     page = request.GET.get('page')
     fornecedores = paginator.get_page(page)
-    return render(request, 'estoque/fornecedor_list.html', {'fornecedores': fornecedores})
+    return _render_lista(
+        request, 'estoque/fornecedor_list.html', 'estoque/partials/lista_fornecedores.html',
+        {'fornecedores': fornecedores},
+    )
 
 @login_required
 @permission_required('estoque.add_fornecedor', raise_exception=True)
@@ -257,20 +500,14 @@ def fornecedor_delete(request, pk):
 
 @login_required
 def buscar_item(request):
-    search_text = request.GET.get('q', '').strip()
-
-    if search_text:
-        # Usamos Q para buscar no código OU na descrição (icontains não diferencia maiúsculas/minúsculas)
-        items = Item.objects.filter(
-            Q(codigo__icontains=search_text) | 
-            Q(descricao__icontains=search_text)
-        ).order_by('descricao')
-    else:
-        # Se a busca estiver vazia, retorna tudo (limitado para não sobrecarregar)
-        items = Item.objects.all().order_by('descricao')[:50] 
+    # Código OU descrição, sem diferenciar maiúsculas/acentos; vazio traz os 50 primeiros.
+    # Cada prefixo digitado chega aqui: o cache em memória evita repetir a consulta (ver busca.py)
+    items, origem = busca.buscar(normalizar_busca(request.GET.get('q', '')))
 
     # Renderiza APENAS o template parcial com os resultados
-    return render(request, 'estoque/partials/tabela_itens.html', {'items': items})
+    response = render(request, 'estoque/partials/tabela_itens.html', {'items': items})
+    response['X-Busca-Cache'] = origem
+    return response
 
 
 @login_required
@@ -280,29 +517,226 @@ def buscar_fornecedor(request):
 
     if search_text:
         # Busca por Nome, CNPJ ou Email
-        fornecedores = Fornecedor.objects.filter(
+        fornecedores = _fornecedores_lista().filter(
             Q(nome__icontains=search_text) |
             Q(cnpj__icontains=search_text) |
             Q(email__icontains=search_text)
         ).order_by('nome')
     else:
-        fornecedores = Fornecedor.objects.all().order_by('nome')[:50]
+        fornecedores = _fornecedores_lista().order_by('nome')[:50]
 
     # Renderiza APENAS o template parcial
     return render(request, 'estoque/partials/tabela_fornecedores.html', {'fornecedores': fornecedores})
 
 
+# ================================
+# AUTOCOMPLETE (ITEM E FORNECEDOR)
+# ================================
+
+AUTOCOMPLETE_POR_PAGINA = 20
+
+
+def _autocomplete(request, queryset, campos_busca, ordem, rotulo):
+    """
+    Busca paginada por prefixo nos campos normalizados e indexados.
+    
+    Não executa COUNT: busca uma linha a mais para saber se há próxima página.
+    
+    Retorna JSON no formato:
+    {
+        "results": [{"id": 1, "text": "ITEM001 - Parafuso M6"}],
+        "pagination": {"more": false}
+    }
+    """
+    termo = request.GET.get('q', '').strip()
+    try:
+        pagina = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        pagina = 1
+    
+    if termo:
+        filtro = Q()
+        for campo in campos_busca:
+            filtro |= CampoBusca.filtro_prefixo(campo, termo)
+        queryset = queryset.filter(filtro)
+    
+    inicio = (pagina - 1) * AUTOCOMPLETE_POR_PAGINA
+    linhas = list(queryset.order_by(*ordem)[inicio:inicio + AUTOCOMPLETE_POR_PAGINA + 1])
+    
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': rotulo(obj)} for obj in linhas[:AUTOCOMPLETE_POR_PAGINA]],
+        'pagination': {'more': len(linhas) > AUTOCOMPLETE_POR_PAGINA},
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_itens_autocomplete(request):
+    """
+    Endpoint: GET /api/itens/autocomplete/?q=<prefixo>&page=<n>
+    
+    Busca itens cujo código ou descrição comece com o termo (sem diferenciar
+    maiúsculas/acentos). Usado pelo seletor de item de MovimentacaoForm.
+    """
+    return _autocomplete(
+        request,
+        Item.objects.only('id', 'codigo', 'descricao'),
+        campos_busca=('codigo_busca', 'descricao_busca'),
+        ordem=('descricao_busca', 'id'),
+        rotulo=str,
+    )
+
+
+@login_required
+@permission_required('estoque.view_item', raise_exception=True)
+@require_http_methods(["GET"])
+def api_busca_estatisticas(request):
+    """
+    Contadores do cache da busca de itens (ver busca.py) neste processo.
+    
+    Endpoint: GET /api/itens/busca/estatisticas/
+    
+    Exemplo de resposta:
+    {
+        "acertos": 120, "refinamentos": 310, "coalescidas": 4, "consultas": 95,
+        "termos": 180, "taxa_acerto": 0.8204
+    }
+    """
+    return JsonResponse(busca.estatisticas())
+
+
+# Máximo de códigos por requisição na leitura em lote
+CODIGOS_LOTE_MAXIMO = 1000
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_itens_por_codigo(request):
+    """
+    Leitura de código de barras: busca exata por ``Item.codigo``.
+    
+    Endpoint: GET /api/itens/codigos/?codigo=<c1>&codigo=<c2>...
+    
+    Atende pelo índice em memória (ver codigos.py); os códigos ausentes do
+    índice são buscados em um único SELECT. Lê sempre do primário, para não
+    guardar no índice um valor defasado da réplica.
+    
+    Exemplo de resposta:
+    {
+        "itens": [{"codigo": "PAR001", "id": 7, "quantidade_atual": 120, "status_estoque": "OK"}],
+        "desconhecidos": ["XYZ"]
+    }
+    """
+    lidos = list(dict.fromkeys(c.strip() for c in request.GET.getlist('codigo') if c.strip()))
+    if not lidos:
+        return JsonResponse({'erro': 'Informe ao menos um parâmetro codigo.'}, status=400)
+    if len(lidos) > CODIGOS_LOTE_MAXIMO:
+        return JsonResponse({'erro': f'Envie no máximo {CODIGOS_LOTE_MAXIMO} códigos por requisição.'}, status=400)
+    
+    encontrados = codigos.buscar(lidos)
+    itens = []
+    desconhecidos = []
+    for codigo in lidos:
+        valor = encontrados[codigo]
+        if valor is None:
+            desconhecidos.append(codigo)
+        else:
+            itens.append({'codigo': codigo, 'id': valor[0], 'quantidade_atual': valor[1], 'status_estoque': valor[2]})
+    return JsonResponse({'itens': itens, 'desconhecidos': desconhecidos})
+
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_fornecedores_autocomplete(request):
+    """
+    Endpoint: GET /api/fornecedores/autocomplete/?q=<prefixo>&page=<n>
+    
+    Busca fornecedores cujo nome comece com o termo. Usado pelo seletor de
+    fornecedor de ItemForm.
+    """
+    return _autocomplete(
+        request,
+        Fornecedor.objects.only('id', 'nome'),
+        campos_busca=('nome_busca',),
+        ordem=('nome_busca', 'id'),
+        rotulo=str,
+    )
+
+
 # ================================
 # API DE ALERTAS DE ESTOQUE
 # ================================
 
+STATUS_ALERTA = (EstoqueManager.STATUS_CRITICO, EstoqueManager.STATUS_BAIXO, EstoqueManager.STATUS_ALTO)
+
+
+def _campos_pedidos(request, disponiveis):
+    """
+    Chaves pedidas em ``?fields=a,b`` (sparse fieldset), na ordem de ``disponiveis``.
+    
+    Returns:
+        tuple: Chaves a serializar (todas as disponíveis sem o parâmetro)
+    
+    Raises:
+        ValueError: Chave desconhecida
+    """
+    valor = request.GET.get('fields')
+    if not valor:
+        return tuple(disponiveis)
+    pedidos = {campo.strip() for campo in valor.split(',') if campo.strip()}
+    invalidos = pedidos - set(disponiveis)
+    if invalidos:
+        raise ValueError(
+            f'Campo(s) inválido(s): {", ".join(sorted(invalidos))}. Use: {", ".join(disponiveis)}.'
+        )
+    return tuple(campo for campo in disponiveis if campo in pedidos)
+
+
+def _managers_por_status(request, status, campos=EstoqueManager.CAMPOS_ALERTA):
+    """
+    Gerenciadores dos saldos com um dos ``status``, lidos pela coluna indexada
+    ``status_estoque`` (custo proporcional ao resultado, não ao catálogo).
+    
+    Com ``?almoxarifado=<codigo>`` avalia o saldo do item naquele local;
+    sem ele, o saldo total do item. Só são lidas as colunas de Item usadas
+    no cálculo do status e nas chaves de ``campos``.
+    
+    Returns:
+        tuple: (codigo_almoxarifado | None, lista de EstoqueManager)
+    """
+    colunas = EstoqueManager.colunas_item(campos)
+    codigo = request.GET.get('almoxarifado')
+    if codigo:
+        almoxarifado = get_object_or_404(Almoxarifado, codigo=codigo)
+        saldos = SaldoEstoque.objects.filter(
+            almoxarifado=almoxarifado, status_estoque__in=status,
+        ).select_related('item').only('quantidade', 'item', *(f'item__{coluna}' for coluna in colunas))
+        return codigo, [saldo.estoque_manager for saldo in saldos]
+    itens = Item.objects.filter(status_estoque__in=status).only(*colunas)
+    return None, [item.estoque_manager for item in itens]
+
+
+def _alertas(managers, campos):
+    """Status dos gerenciadores com as chaves pedidas, mais urgentes primeiro."""
+    managers = sorted(managers, key=EstoqueManager.get_nivel_urgencia, reverse=True)
+    return [manager.get_status_estoque(campos) for manager in managers]
+
+
 @login_required
 @require_http_methods(["GET"])
+@leitura_em_replica
 def api_alertas_estoque(request):
     """
     API REST que retorna todos os alertas de estoque.
     
-    Endpoint: GET /api/alertas/
+    Endpoint: GET /api/alertas/?almoxarifado=<codigo>&fields=<chaves>
+    
+    Sem ``almoxarifado``, avalia o saldo total de cada item; com ele, o saldo
+    daquele local. Só as linhas em alerta são lidas (coluna de status indexada).
+    ``fields`` (ex.: ``item_id,status``) limita as chaves de cada alerta e as
+    colunas lidas; chaves derivadas só são calculadas se pedidas.
     
     Retorna JSON com:
     - resumo: contadores por tipo de alerta
@@ -310,6 +744,7 @@ def api_alertas_estoque(request):
     
     Exemplo de resposta:
     {
+        "almoxarifado": null,
         "resumo": {
             "total_alertas": 5,
             "criticos": 2,
@@ -334,43 +769,23 @@ def api_alertas_estoque(request):
         ]
     }
     """
-    itens = Item.objects.all()
-    alertas = []
-    contadores = {
-        'criticos': 0,
-        'baixos': 0,
-        'altos': 0
-    }
+    try:
+        campos = _campos_pedidos(request, EstoqueManager.CAMPOS_ALERTA)
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
     
-    for item in itens:
-        manager = item.estoque_manager
-        status_info = manager.get_status_estoque()
-        
-        # Só adiciona aos alertas se requer ação
-        if status_info['requer_acao']:
-            status_info['nivel_urgencia'] = manager.get_nivel_urgencia()
-            status_info['quantidade_reposicao_sugerida'] = manager.calcular_quantidade_reposicao()
-            alertas.append(status_info)
-            
-            # Atualiza contadores
-            if status_info['status'] == 'CRITICO':
-                contadores['criticos'] += 1
-            elif status_info['status'] == 'BAIXO':
-                contadores['baixos'] += 1
-            elif status_info['status'] == 'ALTO':
-                contadores['altos'] += 1
-    
-    # Ordena por nível de urgência (mais urgente primeiro)
-    alertas.sort(key=lambda x: x['nivel_urgencia'], reverse=True)
+    almoxarifado, managers = _managers_por_status(request, STATUS_ALERTA, campos)
+    contadores = Counter(manager.get_status() for manager in managers)
     
     response_data = {
+        'almoxarifado': almoxarifado,
         'resumo': {
-            'total_alertas': len(alertas),
-            'criticos': contadores['criticos'],
-            'baixos': contadores['baixos'],
-            'altos': contadores['altos']
+            'total_alertas': len(managers),
+            'criticos': contadores[EstoqueManager.STATUS_CRITICO],
+            'baixos': contadores[EstoqueManager.STATUS_BAIXO],
+            'altos': contadores[EstoqueManager.STATUS_ALTO],
         },
-        'alertas': alertas
+        'alertas': _alertas(managers, campos),
     }
     
     return JsonResponse(response_data, safe=False)
@@ -378,14 +793,17 @@ def api_alertas_estoque(request):
 
 @login_required
 @require_http_methods(["GET"])
+@leitura_em_replica
 def api_status_item(request, item_id):
     """
     API REST que retorna o status de estoque de um item específico.
     
-    Endpoint: GET /api/item/<id>/status/
+    Endpoint: GET /api/item/<id>/status/?fields=<chaves>
     
     Parâmetros:
     - item_id: ID do item
+    - fields: chaves a retornar, separadas por vírgula (padrão: todas); ``saldos``
+      só é consultado quando pedido
     
     Retorna JSON com informações detalhadas do status do estoque do item.
     
@@ -402,40 +820,291 @@ def api_status_item(request, item_id):
         "requer_acao": true,
         "mensagem": "BAIXO: Estoque abaixo do mínimo (250/300)",
         "nivel_urgencia": 2,
-        "quantidade_reposicao_sugerida": 750
+        "quantidade_reposicao_sugerida": 750,
+        "saldos": [{"almoxarifado": "CENTRAL", "quantidade": 250, "status": "BAIXO"}]
     }
     """
-    item = get_object_or_404(Item, pk=item_id)
-    manager = item.estoque_manager
-    status_info = manager.get_status_estoque()
-    status_info['nivel_urgencia'] = manager.get_nivel_urgencia()
-    status_info['quantidade_reposicao_sugerida'] = manager.calcular_quantidade_reposicao()
+    try:
+        campos = _campos_pedidos(request, EstoqueManager.CAMPOS_ALERTA + ('saldos',))
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    
+    campos_status = [campo for campo in campos if campo != 'saldos']
+    # Só ``saldos``: basta confirmar que o item existe, sem calcular o status
+    colunas = EstoqueManager.colunas_item(campos_status) if campos_status else ['id']
+    item = get_object_or_404(Item.objects.only(*colunas), pk=item_id)
+    status_info = item.estoque_manager.get_status_estoque(campos_status) if campos_status else {}
+    if 'saldos' in campos:
+        status_info['saldos'] = [
+            {'almoxarifado': codigo, 'quantidade': quantidade, 'status': status}
+            for codigo, quantidade, status in item.saldos.order_by('almoxarifado__codigo').values_list(
+                'almoxarifado__codigo', 'quantidade', 'status_estoque',
+            )
+        ]
     
     return JsonResponse(status_info)
 
 
+HISTORICO_LIMITE_PADRAO = 50
+HISTORICO_LIMITE_MAXIMO = 500
+
+
+@login_required
+@permission_required('estoque.view_registroauditoria', raise_exception=True)
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_historico_item(request, item_id):
+    """
+    Histórico de alterações de um item (trilha de auditoria), mais recentes primeiro.
+    
+    Endpoint: GET /api/item/<id>/historico/?limite=<n>
+    
+    Os registros são gravados em lote (ver auditoria.py): uma alteração leva
+    até ``settings.AUDITORIA_INTERVALO`` segundos para aparecer. Funciona
+    também para itens já excluídos.
+    
+    Exemplo de resposta:
+    {
+        "item_id": 7,
+        "mais": false,
+        "registros": [
+            {"data": "2025-06-30T14:02:11-04:00", "acao": "ALTERACAO", "usuario": "maria",
+             "alteracoes": {"valor_unitario": ["10.00", "12.50"]}}
+        ]
+    }
+    """
+    try:
+        limite = int(request.GET.get('limite', HISTORICO_LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'erro': 'O parâmetro limite deve ser inteiro.'}, status=400)
+    limite = max(1, min(limite, HISTORICO_LIMITE_MAXIMO))
+    
+    registros = list(
+        RegistroAuditoria.objects.filter(modelo='item', objeto_id=item_id)
+        .order_by('-data', '-pk')
+        .values('data', 'acao', 'usuario__username', 'alteracoes')[:limite + 1]
+    )
+    return JsonResponse({
+        'item_id': item_id,
+        'mais': len(registros) > limite,
+        'registros': [
+            {
+                'data': registro['data'],
+                'acao': registro['acao'],
+                'usuario': registro['usuario__username'],
+                'alteracoes': registro['alteracoes'],
+            }
+            for registro in registros[:limite]
+        ],
+    })
+
+
+LOTES_DIAS_PADRAO = 30
+LOTES_LIMITE_PADRAO = 100
+LOTES_LIMITE_MAXIMO = 1000
+
+
+@login_required
+@permission_required('estoque.view_item', raise_exception=True)
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_lotes_vencimento(request):
+    """
+    Lotes com saldo que vencem nos próximos dias (inclui os já vencidos),
+    validade mais próxima primeiro. Lê só o intervalo do índice de validade.
+    
+    Endpoint: GET /api/lotes/vencimento/?dias=30&almoxarifado=<codigo>&limite=<n>
+    
+    Exemplo de resposta:
+    {
+        "ate": "2025-07-30",
+        "almoxarifado": null,
+        "mais": false,
+        "lotes": [
+            {"id": 12, "item_id": 3, "item_codigo": "MED001", "item_descricao": "Soro fisiológico",
+             "almoxarifado": "CENTRAL", "numero": "L2405", "validade": "2025-07-10",
+             "dias_para_vencer": 10, "quantidade": 40}
+        ]
+    }
+    """
+    try:
+        dias = int(request.GET.get('dias', LOTES_DIAS_PADRAO))
+        limite = int(request.GET.get('limite', LOTES_LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros dias e limite devem ser inteiros.'}, status=400)
+    limite = max(1, min(limite, LOTES_LIMITE_MAXIMO))
+    
+    codigo = request.GET.get('almoxarifado')
+    almoxarifado = get_object_or_404(Almoxarifado, codigo=codigo) if codigo else None
+    lotes = list(Lote.a_vencer(dias, almoxarifado)[:limite + 1])
+    return JsonResponse({
+        'ate': timezone.localdate() + timedelta(days=dias),
+        'almoxarifado': codigo,
+        'mais': len(lotes) > limite,
+        'lotes': [
+            {
+                'id': lote.pk,
+                'item_id': lote.item_id,
+                'item_codigo': lote.item.codigo,
+                'item_descricao': lote.item.descricao,
+                'almoxarifado': lote.almoxarifado.codigo,
+                'numero': lote.numero,
+                'validade': lote.validade,
+                'dias_para_vencer': lote.dias_para_vencer,
+                'quantidade': lote.quantidade,
+            }
+            for lote in lotes[:limite]
+        ],
+    })
+
+
 @login_required
+@permission_required('estoque.view_item', raise_exception=True)
 @require_http_methods(["GET"])
+@leitura_em_replica
+def api_historico_lote(request, lote_id):
+    """
+    Entradas e baixas de um lote, mais recentes primeiro (índice por lote),
+    seguidas das de movimentações já arquivadas.
+    
+    Endpoint: GET /api/lotes/<id>/historico/?limite=<n>
+    
+    Exemplo de resposta:
+    {
+        "lote": {"id": 12, "item_codigo": "MED001", "numero": "L2405", "validade": "2025-07-10",
+                 "almoxarifado": "CENTRAL", "quantidade": 40},
+        "mais": false,
+        "movimentacoes": [
+            {"movimentacao_id": 90, "data": "2025-06-30T14:02:11-04:00", "tipo": "SAIDA",
+             "quantidade": -10, "usuario": "maria"}
+        ]
+    }
+    """
+    try:
+        limite = int(request.GET.get('limite', HISTORICO_LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'erro': 'O parâmetro limite deve ser inteiro.'}, status=400)
+    limite = max(1, min(limite, HISTORICO_LIMITE_MAXIMO))
+    
+    lote = get_object_or_404(Lote.objects.select_related('item', 'almoxarifado'), pk=lote_id)
+    registros = [
+        {'movimentacao_id': movimentacao_id, 'data': data, 'tipo': tipo, 'quantidade': quantidade, 'usuario': usuario}
+        for movimentacao_id, quantidade, data, tipo, usuario in MovimentacaoLote.objects.filter(lote=lote).order_by(
+            '-movimentacao_id',
+        ).values_list(
+            'movimentacao_id', 'quantidade', 'movimentacao__data', 'movimentacao__tipo',
+            'movimentacao__usuario__username',
+        )[:limite + 1]
+    ]
+    if len(registros) <= limite:
+        # Registros de movimentações já arquivadas em segmentos
+        registros += [
+            {'movimentacao_id': movimentacao_id, 'data': data, 'tipo': tipo, 'quantidade': quantidade, 'usuario': usuario}
+            for movimentacao_id, quantidade, data, tipo, usuario in lote.movimentacoes_arquivadas.order_by(
+                '-movimentacao_id',
+            ).values_list('movimentacao_id', 'quantidade', 'data', 'tipo', 'usuario__username')[:limite + 1 - len(registros)]
+        ]
+    return JsonResponse({
+        'lote': {
+            'id': lote.pk,
+            'item_codigo': lote.item.codigo,
+            'numero': lote.numero,
+            'validade': lote.validade,
+            'almoxarifado': lote.almoxarifado.codigo,
+            'quantidade': lote.quantidade,
+        },
+        'mais': len(registros) > limite,
+        'movimentacoes': registros[:limite],
+    })
+
+
+INDICADORES_LIMITE_PADRAO = 50
+INDICADORES_LIMITE_MAXIMO = 500
+
+
+def _arredondar(valor, casas=2):
+    return round(valor, casas) if valor is not None else None
+
+
+@login_required
+@permission_required('estoque.view_fornecedor', raise_exception=True)
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_indicadores_fornecedores(request):
+    """
+    Indicadores por fornecedor, lidos das linhas pré-calculadas de ResumoFornecedor.
+    
+    Endpoint: GET /api/fornecedores/indicadores/?ordem=-valor_compras&limite=<n>
+    
+    ``ordem`` aceita qualquer indicador de ResumoFornecedor.INDICADORES
+    (prefixo "-" para decrescente; padrão: -valor_compras). Indicadores sem
+    valor (fornecedor sem itens ou sem pedidos recebidos) ficam por último.
+    
+    Exemplo de resposta:
+    {
+        "ordem": "-valor_compras",
+        "fornecedores": [
+            {"id": 3, "nome": "Papelaria Central", "total_itens": 40, "itens_critico": 2,
+             "itens_baixo": 4, "percentual_alerta": 15.0, "entradas": 120,
+             "quantidade_comprada": 5400, "valor_compras": "18250.0000",
+             "ultima_compra": "2025-06-30T14:02:11-04:00", "pedidos_recebidos": 6,
+             "prazo_medio_dias": 4.5}
+        ]
+    }
+    """
+    ordem = request.GET.get('ordem', '-valor_compras')
+    campo = ordem.lstrip('-')
+    if campo not in ResumoFornecedor.INDICADORES:
+        return JsonResponse(
+            {'erro': f'Ordem inválida. Use um de: {", ".join(ResumoFornecedor.INDICADORES)}.'}, status=400,
+        )
+    try:
+        limite = int(request.GET.get('limite', INDICADORES_LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'erro': 'O parâmetro limite deve ser inteiro.'}, status=400)
+    limite = max(1, min(limite, INDICADORES_LIMITE_MAXIMO))
+    
+    expressao = F(campo).desc(nulls_last=True) if ordem.startswith('-') else F(campo).asc(nulls_last=True)
+    linhas = ResumoFornecedor.com_indicadores().order_by(expressao, 'fornecedor__nome').values(
+        'fornecedor_id', 'fornecedor__nome', *ResumoFornecedor.INDICADORES,
+    )[:limite]
+    return JsonResponse({
+        'ordem': ordem,
+        'fornecedores': [
+            {
+                'id': linha.pop('fornecedor_id'),
+                'nome': linha.pop('fornecedor__nome'),
+                **linha,
+                'valor_compras': str(linha['valor_compras']),
+                'percentual_alerta': _arredondar(linha['percentual_alerta']),
+                'prazo_medio_dias': _arredondar(linha['prazo_medio_dias']),
+            }
+            for linha in linhas
+        ],
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
 def api_itens_criticos(request):
     """
     API REST que retorna apenas os itens com estoque crítico.
     
-    Endpoint: GET /api/itens/criticos/
+    Endpoint: GET /api/itens/criticos/?almoxarifado=<codigo>&fields=<chaves>
     
     Retorna JSON com lista de itens em estado crítico (abaixo de 50% do mínimo).
     """
-    itens = Item.objects.all()
-    itens_criticos = []
+    try:
+        campos = _campos_pedidos(request, EstoqueManager.CAMPOS_ALERTA)
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
     
-    for item in itens:
-        manager = item.estoque_manager
-        if manager.verifica_estoque_critico():
-            status_info = manager.get_status_estoque()
-            status_info['nivel_urgencia'] = manager.get_nivel_urgencia()
-            status_info['quantidade_reposicao_sugerida'] = manager.calcular_quantidade_reposicao()
-            itens_criticos.append(status_info)
+    almoxarifado, managers = _managers_por_status(request, (EstoqueManager.STATUS_CRITICO,), campos)
+    itens_criticos = [manager.get_status_estoque(campos) for manager in managers]
     
     return JsonResponse({
+        'almoxarifado': almoxarifado,
         'total': len(itens_criticos),
         'itens_criticos': itens_criticos
     })
@@ -443,29 +1112,397 @@ def api_itens_criticos(request):
 
 @login_required
 @require_http_methods(["GET"])
+@leitura_em_replica
 def api_itens_reposicao(request):
     """
     API REST que retorna itens que necessitam reposição.
     
-    Endpoint: GET /api/itens/reposicao/
+    Endpoint: GET /api/itens/reposicao/?almoxarifado=<codigo>&fields=<chaves>
     
     Retorna JSON com lista de itens que precisam de reposição (críticos ou baixos).
     """
-    itens = Item.objects.all()
-    itens_reposicao = []
-    
-    for item in itens:
-        manager = item.estoque_manager
-        if manager.requer_reposicao():
-            status_info = manager.get_status_estoque()
-            status_info['nivel_urgencia'] = manager.get_nivel_urgencia()
-            status_info['quantidade_reposicao_sugerida'] = manager.calcular_quantidade_reposicao()
-            itens_reposicao.append(status_info)
+    try:
+        campos = _campos_pedidos(request, EstoqueManager.CAMPOS_ALERTA)
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
     
+    almoxarifado, managers = _managers_por_status(
+        request, (EstoqueManager.STATUS_CRITICO, EstoqueManager.STATUS_BAIXO), campos,
+    )
     # Ordena por urgência
-    itens_reposicao.sort(key=lambda x: x['nivel_urgencia'], reverse=True)
+    itens_reposicao = _alertas(managers, campos)
     
     return JsonResponse({
+        'almoxarifado': almoxarifado,
         'total': len(itens_reposicao),
         'itens': itens_reposicao
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_resumo_estoque(request):
+    """
+    API REST que retorna os indicadores do painel a partir dos contadores
+    incrementais (ResumoEstoque / ResumoMovimentacaoDiaria), sem varrer
+    itens ou movimentações.
+    
+    Endpoint: GET /api/resumo/
+    
+    Exemplo de resposta:
+    {
+        "valor_total_estoque": "15230.50",
+        "total_itens": 42,
+        "itens_por_status": {"CRITICO": 3, "BAIXO": 5, "OK": 30, "ALTO": 4},
+        "total_alertas": 12,
+        "movimentacoes_hoje": {
+            "data": "2025-11-20",
+            "ENTRADA": {"total": 4, "quantidade": 320},
+            "SAIDA": {"total": 2, "quantidade": 15}
+        },
+        "atualizado_em": "2025-11-20T10:15:00-04:00"
+    }
+    """
+    resumo = ResumoEstoque.obter()
+    hoje = timezone.localdate()
+    
+    movimentacoes_hoje = {'data': hoje.isoformat()}
+    for linha in ResumoMovimentacaoDiaria.objects.filter(data=hoje):
+        movimentacoes_hoje[linha.tipo] = {
+            'total': linha.total_movimentacoes,
+            'quantidade': linha.quantidade_total,
+        }
+    
+    return JsonResponse({
+        'valor_total_estoque': str(resumo.valor_total_estoque),
+        'total_itens': resumo.total_itens,
+        'itens_por_status': resumo.get_contagem_status(),
+        'total_alertas': resumo.total_alertas,
+        'movimentacoes_hoje': movimentacoes_hoje,
+        'atualizado_em': resumo.atualizado_em.isoformat(),
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_resumo_almoxarifados(request):
+    """
+    API REST com os indicadores de cada almoxarifado: um único GROUP BY em
+    (almoxarifado, status), coberto pelo índice dos saldos.
+    
+    Endpoint: GET /api/almoxarifados/resumo/
+    
+    Exemplo de resposta:
+    {
+        "almoxarifados": [
+            {
+                "codigo": "CENTRAL",
+                "nome": "Almoxarifado Central",
+                "total_itens": 42,
+                "quantidade_total": 5310,
+                "itens_por_status": {"CRITICO": 3, "BAIXO": 5, "OK": 30, "ALTO": 4},
+                "total_alertas": 12
+            }
+        ]
+    }
+    """
+    resumos = {}
+    for almoxarifado in Almoxarifado.objects.filter(ativo=True):
+        resumos[almoxarifado.pk] = {
+            'codigo': almoxarifado.codigo,
+            'nome': almoxarifado.nome,
+            'total_itens': 0,
+            'quantidade_total': 0,
+            'itens_por_status': {status: 0 for status in ResumoEstoque.CAMPOS_STATUS},
+            'total_alertas': 0,
+        }
+    
+    grupos = SaldoEstoque.objects.values('almoxarifado_id', 'status_estoque').annotate(
+        total=Count('id'), quantidade=Sum('quantidade'),
+    ).order_by()
+    for grupo in grupos:
+        resumo = resumos.get(grupo['almoxarifado_id'])
+        if resumo is None:
+            continue
+        resumo['total_itens'] += grupo['total']
+        resumo['quantidade_total'] += grupo['quantidade'] or 0
+        resumo['itens_por_status'][grupo['status_estoque']] += grupo['total']
+        if grupo['status_estoque'] in STATUS_ALERTA:
+            resumo['total_alertas'] += grupo['total']
+    
+    return JsonResponse({'almoxarifados': list(resumos.values())})
+
+
+@login_required
+@permission_required('estoque.view_movimentacao', raise_exception=True)
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_cmv_mensal(request):
+    """
+    Série mensal do custo de uso, no formato de gráfico (listas paralelas).
+    
+    Endpoint: GET /api/cmv/mensal/?inicio=AAAA-MM&fim=AAAA-MM&por_fornecedor=1
+    
+    Exemplo de resposta:
+    {
+        "meses": ["2025-01", "2025-02"],
+        "series": [
+            {
+                "fornecedor_id": null,
+                "fornecedor": "Sem fornecedor",
+                "estoque_inicial": ["0.00", "100.00"],
+                "compras": ["100.00", "75.00"],
+                "estoque_final": ["100.00", "135.00"],
+                "custo_uso": ["0.00", "40.00"]
+            }
+        ]
+    }
+    """
+    try:
+        inicio, fim = _periodo_mensal(request)
+    except ValueError as e:
+        return JsonResponse({'erro': str(e)}, status=400)
+    
+    resultado = serie_cmv_mensal(inicio, fim, por_fornecedor=request.GET.get('por_fornecedor') == '1')
+    _nomear_series(resultado['series'])
+    return JsonResponse(resultado)
+
+@login_required
+@require_http_methods(["GET"])
+@leitura_em_replica
+def api_sync(request):
+    """
+    API de sincronização incremental para coletores offline.
+    
+    Endpoint: GET /api/sync/?since=<sequencia>&limite=<n>
+    
+    Retorna só os itens, fornecedores e movimentações alterados e as
+    exclusões com sequência maior que ``since`` (0 na carga inicial). O
+    cliente repete a chamada com ``since=<ate>`` enquanto ``mais`` for true.
+    Cada origem só aparece para quem tem a permissão ``view_`` do modelo
+    (view_item, view_fornecedor, view_movimentacao); sem nenhuma, 403.
+    
+    Exemplo de resposta:
+    {
+        "desde": 120,
+        "ate": 125,
+        "mais": false,
+        "itens": {"campos": ["id", "codigo", ...], "linhas": [[7, "PAR001", ...]]},
+        "fornecedores": {"campos": [...], "linhas": []},
+        "movimentacoes": {"campos": [...], "linhas": [[901, 7, 1, "SAIDA", 2, "..."]]},
+        "exclusoes": [["item", 12]]
+    }
+    """
+    try:
+        desde = int(request.GET.get('since', 0))
+        limite = int(request.GET.get('limite', sincronizacao.LIMITE_PADRAO))
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros since e limite devem ser inteiros.'}, status=400)
+    if desde < 0 or limite < 1:
+        return JsonResponse({'erro': 'Parâmetros since e limite devem ser positivos.'}, status=400)
+    origens = sincronizacao.origens_permitidas(request.user)
+    if not origens:
+        raise PermissionDenied
+    
+    return JsonResponse(sincronizacao.alteracoes_desde(desde, min(limite, sincronizacao.LIMITE_MAXIMO), origens))
+
+
+# ================================
+# INVENTÁRIO FÍSICO (CONTAGEM)
+# ================================
+
+@login_required
+@permission_required('estoque.view_inventario', raise_exception=True)
+def inventario_list(request):
+    if request.method == 'POST':
+        if not request.user.has_perm('estoque.add_inventario'):
+            messages.error(request, 'Você não tem permissão para abrir inventários.')
+            return redirect('inventario_list')
+        form = InventarioForm(request.POST)
+        if form.is_valid():
+            inventario = form.save(commit=False)
+            inventario.criado_por = request.user
+            inventario.save()
+            messages.success(request, 'Inventário aberto. Envie as contagens.')
+            return redirect('inventario_detail', pk=inventario.pk)
+    else:
+        form = InventarioForm()
+    
+    inventarios = Inventario.objects.select_related('almoxarifado').annotate(
+        total_contagens=Count('contagens'),
+    ).order_by('-criado_em')
+    paginator = Paginator(inventarios, 20)
+    inventarios = paginator.get_page(request.GET.get('page'))
+    return render(request, 'estoque/inventario_list.html', {'inventarios': inventarios, 'form': form})
+
+
+@login_required
+@permission_required('estoque.view_inventario', raise_exception=True)
+def inventario_detail(request, pk):
+    inventario = get_object_or_404(Inventario.objects.select_related('almoxarifado', 'aplicado_por'), pk=pk)
+    if request.method == 'POST':
+        if not request.user.has_perm('estoque.change_inventario'):
+            messages.error(request, 'Você não tem permissão para enviar contagens.')
+            return redirect('inventario_detail', pk=pk)
+        form = ContagemUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                desconhecidos = inventario.registrar_contagens(form.cleaned_data['arquivo'])
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('inventario_detail', pk=pk)
+            registradas = len(form.cleaned_data['arquivo']) - len(desconhecidos)
+            messages.success(request, f'{registradas} contagem(ns) registrada(s).')
+            if desconhecidos:
+                messages.warning(
+                    request,
+                    f'{len(desconhecidos)} código(s) não encontrado(s): {", ".join(desconhecidos[:20])}',
+                )
+            return redirect('inventario_detail', pk=pk)
+    else:
+        form = ContagemUploadForm()
+    
+    context = {
+        'inventario': inventario,
+        'form': form,
+        'total_contagens': inventario.contagens.count(),
+    }
+    if inventario.aberto:
+        divergencias = inventario.divergencias()
+        context['total_divergencias'] = divergencias.count()
+        context['divergencias'] = divergencias.order_by('item__descricao')[:200]
+    else:
+        context['ajustes'] = inventario.ajustes.values('tipo').annotate(
+            total=Count('id'), quantidade=Sum('quantidade'),
+        ).order_by('tipo')
+    return render(request, 'estoque/inventario_detail.html', context)
+
+
+@login_required
+@permission_required('estoque.change_inventario', raise_exception=True)
+@permission_required('estoque.add_movimentacao', raise_exception=True)
+@require_http_methods(["POST"])
+def inventario_aplicar(request, pk):
+    inventario = get_object_or_404(Inventario, pk=pk)
+    try:
+        resultado = inventario.aplicar(usuario=request.user)
+    except ValidationError as e:
+        messages.error(request, e.messages[0])
+    else:
+        messages.success(
+            request,
+            f"Inventário aplicado: {resultado['itens_ajustados']} item(ns) ajustado(s) "
+            f"(+{resultado['entradas']} / -{resultado['saidas']}).",
+        )
+    return redirect('inventario_detail', pk=pk)
+
+
+@login_required
+@permission_required('estoque.change_inventario', raise_exception=True)
+@require_http_methods(["POST"])
+def api_inventario_contagens(request, pk):
+    """
+    API REST para envio das contagens em lotes.
+    
+    Endpoint: POST /api/inventario/<id>/contagens/
+    
+    Corpo (JSON), até INVENTARIO_LOTE_MAXIMO linhas por requisição:
+    {
+        "contagens": [
+            {"codigo": "ITEM001", "quantidade": 120},
+            {"codigo": "ITEM002", "quantidade": 0}
+        ]
+    }
+    
+    Exemplo de resposta:
+    {
+        "registradas": 1,
+        "codigos_desconhecidos": ["ITEM002"]
+    }
+    """
+    inventario = get_object_or_404(Inventario, pk=pk)
+    lote_maximo = getattr(settings, 'INVENTARIO_LOTE_MAXIMO', 5000)
+    
+    try:
+        linhas = json.loads(request.body)['contagens']
+        contagens = {str(linha['codigo']).strip(): int(linha['quantidade']) for linha in linhas}
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'erro': 'JSON inválido. Esperado {"contagens": [{"codigo", "quantidade"}]}.'}, status=400)
+    if len(contagens) > lote_maximo:
+        return JsonResponse({'erro': f'Envie no máximo {lote_maximo} contagens por requisição.'}, status=400)
+    if any(quantidade < 0 for quantidade in contagens.values()):
+        return JsonResponse({'erro': 'Quantidades não podem ser negativas.'}, status=400)
+    
+    try:
+        desconhecidos = inventario.registrar_contagens(contagens)
+    except ValidationError as e:
+        return JsonResponse({'erro': e.messages[0]}, status=409)
+    
+    return JsonResponse({
+        'registradas': len(contagens) - len(desconhecidos),
+        'codigos_desconhecidos': desconhecidos,
+    })
+
+
+# ================================
+# PEDIDOS DE COMPRA (REPOSIÇÃO)
+# ================================
+
+@login_required
+@permission_required('estoque.view_pedidocompra', raise_exception=True)
+def pedido_list(request):
+    if request.method == 'POST':
+        if not request.user.has_perm('estoque.add_pedidocompra'):
+            messages.error(request, 'Você não tem permissão para gerar pedidos de compra.')
+            return redirect('pedido_list')
+        pedidos, sem_fornecedor = PedidoCompra.gerar_rascunhos(usuario=request.user)
+        if pedidos:
+            messages.success(request, f'{len(pedidos)} pedido(s) em rascunho gerado(s).')
+        else:
+            messages.info(request, 'Nenhuma reposição pendente.')
+        if sem_fornecedor:
+            messages.warning(request, f'{sem_fornecedor} item(ns) em alerta sem fornecedor ficaram fora dos pedidos.')
+        return redirect('pedido_list')
+    
+    pedidos = PedidoCompra.objects.select_related('fornecedor', 'almoxarifado').annotate(
+        total_linhas=Count('linhas'),
+        total_quantidade=Sum('linhas__quantidade'),
+        total_valor=Sum(
+            ExpressionWrapper(F('linhas__quantidade') * F('linhas__custo_unitario'), output_field=DecimalField())
+        ),
+    ).order_by('-criado_em', '-pk')
+    paginator = Paginator(pedidos, 20)
+    pedidos = paginator.get_page(request.GET.get('page'))
+    return render(request, 'estoque/pedido_list.html', {'pedidos': pedidos})
+
+
+@login_required
+@permission_required('estoque.view_pedidocompra', raise_exception=True)
+def pedido_detail(request, pk):
+    pedido = get_object_or_404(
+        PedidoCompra.objects.select_related('fornecedor', 'almoxarifado', 'criado_por', 'recebido_por'), pk=pk,
+    )
+    linhas = pedido.linhas.select_related('item').annotate(
+        subtotal=ExpressionWrapper(F('quantidade') * F('custo_unitario'), output_field=DecimalField()),
+    ).order_by('item__codigo')
+    return render(request, 'estoque/pedido_detail.html', {'pedido': pedido, 'linhas': linhas})
+
+
+@login_required
+@permission_required('estoque.change_pedidocompra', raise_exception=True)
+@permission_required('estoque.add_movimentacao', raise_exception=True)
+@require_http_methods(["POST"])
+def pedido_receber(request, pk):
+    pedido = get_object_or_404(PedidoCompra, pk=pk)
+    try:
+        resultado = pedido.receber(usuario=request.user)
+    except ValidationError as e:
+        messages.error(request, e.messages[0])
+    else:
+        messages.success(
+            request,
+            f"Pedido recebido: {resultado['itens_recebidos']} item(ns), {resultado['quantidade']} unidade(s).",
+        )
+    return redirect('pedido_detail', pk=pk)
@@ -0,0 +1,61 @@
+"""
+Configuração do gunicorn para produção.
+
+Uso:
+    gunicorn -c gunicorn.conf.py
+
+A aplicação é carregada e aquecida (``estoque/aquecimento.py``) uma vez no
+processo mestre; os workers nascem por fork já com rotas e templates prontos
+e, ao nascer, preenchem os próprios caches da busca e dos códigos, então a
+primeira requisição de cada um não paga o início a frio.
+"""
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'almoxarifado.settings_producao')
+
+wsgi_app = 'almoxarifado.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 0)) or multiprocessing.cpu_count() * 2 + 1
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# Reinicia cada worker após N requisições (com variação), limitando o crescimento de memória
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+# Carrega a aplicação no mestre antes do fork: memória compartilhada entre os
+# workers (copy-on-write) e um único aquecimento
+preload_app = True
+
+
+def _termos():
+    return [termo for termo in os.environ.get('DJANGO_AQUECER_TERMOS', '').split(',') if termo]
+
+
+def when_ready(server):
+    """Chamado no mestre após o preload e antes de criar os workers."""
+    if os.environ.get('DJANGO_AQUECER', '1') != '1':
+        return
+    from django.db import connections
+
+    from estoque import aquecimento
+
+    for etapa, resultado, segundos in aquecimento.aquecer(etapas=aquecimento.ETAPAS_COMPARTILHADAS):
+        server.log.info('aquecimento %s: %s em %.1f ms', etapa, resultado, segundos * 1000)
+    # Conexões abertas no mestre não podem ser compartilhadas pelos workers
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    """
+    Chamado em cada worker novo (inclusive os reiniciados por max_requests):
+    caches com validade são preenchidos no próprio processo, com a validade
+    contada a partir de agora.
+    """
+    if os.environ.get('DJANGO_AQUECER', '1') != '1':
+        return
+    from estoque import aquecimento
+
+    for etapa, resultado, segundos in aquecimento.aquecer(_termos(), aquecimento.ETAPAS_DO_PROCESSO):
+        worker.log.info('aquecimento %s (worker %s): %s em %.1f ms', etapa, worker.pid, resultado, segundos * 1000)
@@ -3,6 +3,9 @@ import os
 import sys
 
 if __name__ == '__main__':
+    # A suíte de testes usa configurações próprias (hash rápido, banco em memória, sem migrações)
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'almoxarifado.settings_teste')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'almoxarifado.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,76 @@
+// Seletor com busca sob demanda (estoque.forms.AutocompleteSelect).
+// Consulta o endpoint em data-url e preenche o <select> oculto com a opção escolhida.
+(function () {
+  const ATRASO_MS = 250;
+
+  function iniciar(container) {
+    const busca = container.querySelector('.autocomplete-busca');
+    const select = container.querySelector('select');
+    const lista = container.querySelector('.autocomplete-resultados');
+    let temporizador = null;
+    let termo = '';
+    let pagina = 1;
+
+    function fechar() {
+      lista.classList.add('d-none');
+      lista.innerHTML = '';
+    }
+
+    function escolher(id, texto) {
+      select.innerHTML = '';
+      select.add(new Option(texto, id, true, true));
+      busca.value = texto;
+      fechar();
+      select.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+
+    function carregar(acrescentar) {
+      const url = `${container.dataset.url}?q=${encodeURIComponent(termo)}&page=${pagina}`;
+      fetch(url, {headers: {'Accept': 'application/json'}})
+        .then((resposta) => resposta.json())
+        .then((dados) => {
+          if (!acrescentar) lista.innerHTML = '';
+          lista.querySelector('.autocomplete-mais')?.remove();
+          for (const opcao of dados.results) {
+            const botao = document.createElement('button');
+            botao.type = 'button';
+            botao.className = 'list-group-item list-group-item-action';
+            botao.textContent = opcao.text;
+            botao.addEventListener('click', () => escolher(opcao.id, opcao.text));
+            lista.appendChild(botao);
+          }
+          if (dados.pagination.more) {
+            const mais = document.createElement('button');
+            mais.type = 'button';
+            mais.className = 'list-group-item list-group-item-action text-primary autocomplete-mais';
+            mais.textContent = 'Carregar mais...';
+            mais.addEventListener('click', () => { pagina += 1; carregar(true); });
+            lista.appendChild(mais);
+          }
+          if (!lista.children.length) {
+            lista.innerHTML = '<span class="list-group-item text-muted">Nenhum resultado.</span>';
+          }
+          lista.classList.remove('d-none');
+        });
+    }
+
+    busca.addEventListener('input', () => {
+      clearTimeout(temporizador);
+      if (!busca.value.trim()) {
+        select.innerHTML = '';
+        select.add(new Option('---------', '', true, true));
+      }
+      temporizador = setTimeout(() => {
+        termo = busca.value.trim();
+        pagina = 1;
+        carregar(false);
+      }, ATRASO_MS);
+    });
+    busca.addEventListener('focus', () => { if (!lista.children.length) { termo = busca.value.trim(); pagina = 1; carregar(false); } });
+    document.addEventListener('click', (evento) => { if (!container.contains(evento.target)) fechar(); });
+  }
+
+  document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.autocomplete[data-url]').forEach(iniciar);
+  });
+})();